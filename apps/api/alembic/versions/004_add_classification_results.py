@@ -0,0 +1,41 @@
+"""Add classification_results table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('classification_results',
+        sa.Column('description_hash', sa.String(length=16), nullable=False),
+        sa.Column('country', sa.String(length=50), nullable=False),
+        sa.Column('vector_store_version', sa.String(length=12), nullable=False),
+        sa.Column('canonical_description', sa.Text(), nullable=False),
+        sa.Column('hs_code', sa.String(length=10), nullable=False),
+        sa.Column('confidence', sa.DECIMAL(precision=3, scale=2), nullable=False),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('source', sa.String(length=20), server_default='agent', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.CheckConstraint('confidence >= 0 AND confidence <= 1', name='valid_classification_confidence'),
+        sa.PrimaryKeyConstraint('description_hash', 'country', 'vector_store_version')
+    )
+    op.create_index('ix_classification_results_hs_code', 'classification_results', ['hs_code'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_classification_results_hs_code', table_name='classification_results')
+    op.drop_table('classification_results')
@@ -1,17 +1,22 @@
 """
 HS Code Matching API endpoints
 """
+import json
 import time
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from src.core.auth import get_current_active_user
+from src.core.auth import get_current_active_user, get_admin_user
 from src.models.user import User
 from src.services.hs_matching_service import hs_matching_service
+from src.services.batch_match_jobs import batch_match_jobs
+from src.services.cache_warmer import cache_warmer
 from src.services.analytics_service import analytics_service
 from src.schemas.hs_matching import (
     HSCodeMatchRequest,
@@ -19,9 +24,12 @@ from src.schemas.hs_matching import (
     HSCodeMatchRequestAPI,
     HSCodeBatchMatchRequestAPI,
     HSCodeBatchProductRequest,
+    HSCodeBatchJobRequestAPI,
     HSCodeSearchRequest,
     HSCodeMatchResponse,
     HSCodeBatchMatchResponse,
+    HSCodeBatchJobResponse,
+    HSCodeBatchJobResultsResponse,
     HSCodeSearchResponse,
     HSCodeSearchResult,
     HealthCheckResponse,
@@ -150,8 +158,7 @@ async def match_batch_products(
         
         # Perform batch matching using the service
         results = await hs_matching_service.match_batch_products(
-            requests=service_requests,
-            max_concurrent=5  # Limit concurrent requests to prevent overload
+            requests=service_requests  # Concurrency is governed by the shared adaptive limiter
         )
         
         processing_time = (time.time() - start_time) * 1000
@@ -187,6 +194,146 @@ async def match_batch_products(
         )
 
 
+@router.post("/batch-jobs", response_model=HSCodeBatchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit("5 per minute")
+async def submit_batch_job(
+    request: Request,
+    job_request: HSCodeBatchJobRequestAPI,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Submit a large batch of product descriptions for background HS code matching.
+    
+    Poll the job, page through its results or stream them while it runs.
+    
+    Args:
+        job_request: Products to match
+        current_user: Authenticated user
+        
+    Returns:
+        Queued job status with the job identifier
+        
+    Raises:
+        HTTPException: If the job is invalid or cannot be started
+    """
+    try:
+        service_requests = [
+            HSCodeMatchRequest(
+                product_description=product_request.product_description,
+                country=product_request.country or job_request.country,
+                include_alternatives=product_request.include_alternatives if product_request.include_alternatives is not None else True,
+                confidence_threshold=product_request.confidence_threshold if product_request.confidence_threshold is not None else 0.7
+            )
+            for product_request in job_request.products
+        ]
+        
+        job = await batch_match_jobs.submit(current_user.id, service_requests)
+        return HSCodeBatchJobResponse(success=True, data=job)
+        
+    except ValueError as e:
+        logger.warning(f"Invalid batch job from user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+        
+    except Exception as e:
+        logger.error(f"Batch job submission failed for user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to start batch job. Please try again later."
+        )
+
+
+@router.get("/batch-jobs/{job_id}", response_model=HSCodeBatchJobResponse)
+async def get_batch_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """
+    Get the progress of a batch matching job.
+    
+    Args:
+        job_id: Batch job identifier
+        current_user: Authenticated user
+        
+    Returns:
+        Current job status
+    """
+    job = await batch_match_jobs.get_job(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch job not found")
+    
+    return HSCodeBatchJobResponse(success=True, data=job)
+
+
+@router.get("/batch-jobs/{job_id}/results", response_model=HSCodeBatchJobResultsResponse)
+async def get_batch_job_results(
+    job_id: str,
+    cursor: int = Query(0, ge=0, description="Number of results already read"),
+    limit: int = Query(1000, ge=1, le=5000, description="Maximum results to return"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get results finished since a cursor, in completion order.
+    
+    Available while the job runs; pass next_cursor back to read the next page.
+    
+    Args:
+        job_id: Batch job identifier
+        cursor: Number of results already read
+        limit: Maximum results to return
+        current_user: Authenticated user
+        
+    Returns:
+        Job status, results and the next cursor
+    """
+    page = await batch_match_jobs.get_results(job_id, current_user.id, cursor, limit)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch job not found")
+    
+    job, results, next_cursor = page
+    return HSCodeBatchJobResultsResponse(success=True, job=job, results=results, next_cursor=next_cursor)
+
+
+@router.get("/batch-jobs/{job_id}/stream")
+async def stream_batch_job_results(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """
+    Stream every result of a batch job as newline-delimited JSON until the job ends.
+    
+    Args:
+        job_id: Batch job identifier
+        current_user: Authenticated user
+        
+    Returns:
+        NDJSON stream of {"index", "result"} objects in completion order
+    """
+    if await batch_match_jobs.get_job(job_id, current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch job not found")
+    
+    async def lines():
+        async for item in batch_match_jobs.iter_results(job_id, current_user.id):
+            yield json.dumps(item) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.delete("/batch-jobs/{job_id}", response_model=HSCodeBatchJobResponse)
+async def cancel_batch_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """
+    Cancel a queued or running batch job. Results finished so far stay readable.
+    
+    Args:
+        job_id: Batch job identifier
+        current_user: Authenticated user
+        
+    Returns:
+        Job status after cancellation
+    """
+    job = await batch_match_jobs.cancel(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch job not found")
+    
+    return HSCodeBatchJobResponse(success=True, data=job)
+
+
 @router.get("/search", response_model=HSCodeSearchResponse)
 @limiter.limit("30 per minute")  # Limit search requests to 30 per minute per user
 async def search_hs_codes(
@@ -297,7 +444,7 @@ async def health_check(current_user: User = Depends(get_current_active_user)):
             timestamp=datetime.utcnow().isoformat(),
             openai_response_time_ms=health_data.get("openai_response_time_ms"),
             cache_available=health_data["cache_service"]["available"],
-            configuration=health_data["configuration"]
+            configuration={**health_data["configuration"], "batch_jobs": batch_match_jobs.get_statistics()}
         )
         
     except Exception as e:
@@ -341,18 +488,28 @@ async def get_cache_statistics(current_user: User = Depends(get_current_active_u
 
 
 @router.post("/cache/warm", response_model=CacheOperationResponse)
-async def warm_cache(current_user: User = Depends(get_current_active_user)):
+async def warm_cache(
+    resume: bool = True,
+    background: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
     """
-    Warm the cache with common product descriptions for better performance.
+    Warm the cache with the most frequent descriptions of past product matches.
     
     Args:
+        resume: Continue an interrupted warming run instead of starting over
+        background: Start warming and return without waiting for it
         current_user: Authenticated user
         
     Returns:
         Cache warming operation results
     """
     try:
-        result = await hs_matching_service.warm_cache()
+        if background:
+            cache_warmer.start_in_background(hs_matching_service.warm_cache(resume=resume))
+            result = {"status": "started"}
+        else:
+            result = await hs_matching_service.warm_cache(resume=resume)
         
         return CacheOperationResponse(
             success=True,
@@ -371,6 +528,37 @@ async def warm_cache(current_user: User = Depends(get_current_active_user)):
         )
 
 
+@router.get("/cache/warm/report", response_model=CacheOperationResponse)
+async def get_cache_warming_report(current_user: User = Depends(get_current_active_user)):
+    """
+    Get the last cache warming run and how many warmed entries were read since.
+    
+    Args:
+        current_user: Authenticated user
+        
+    Returns:
+        Cache warming report
+    """
+    try:
+        result = await hs_matching_service.get_warming_report()
+        
+        return CacheOperationResponse(
+            success=True,
+            operation="cache_warm_report",
+            details=result,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error(f"Cache warming report failed: {str(e)}")
+        return CacheOperationResponse(
+            success=False,
+            operation="cache_warm_report",
+            details={"error": str(e)},
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
 @router.delete("/cache/invalidate", response_model=CacheOperationResponse)
 async def invalidate_cache(
     pattern: str = None,
@@ -406,6 +594,143 @@ async def invalidate_cache(
         )
 
 
+@router.post("/cache/generation", response_model=CacheOperationResponse)
+async def bump_cache_generation(
+    country: str = None,
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Invalidate every cached match of a country at once, e.g. after its tariff
+    vector store was updated. Admin only.
+    
+    Args:
+        country: Country to invalidate, all countries if omitted
+        current_user: Authenticated admin user
+        
+    Returns:
+        New cache generation
+    """
+    try:
+        result = await hs_matching_service.bump_cache_generation(country)
+        
+        return CacheOperationResponse(
+            success=True,
+            operation="cache_generation_bump",
+            details=result,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error(f"Cache generation bump failed: {str(e)}")
+        return CacheOperationResponse(
+            success=False,
+            operation="cache_generation_bump",
+            details={"error": str(e)},
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
+@router.post("/vector-index/rebuild", response_model=CacheOperationResponse)
+async def rebuild_vector_index(
+    country: str = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Rebuild the local HS code vector index from stored embeddings.
+    
+    Args:
+        country: Optional country to rebuild, all configured countries if omitted
+        current_user: Authenticated user
+        
+    Returns:
+        Vector index rebuild operation results
+    """
+    try:
+        result = await hs_matching_service.refresh_vector_index(country)
+        
+        return CacheOperationResponse(
+            success=True,
+            operation="vector_index_rebuild",
+            details=result,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error(f"Vector index rebuild failed: {str(e)}")
+        return CacheOperationResponse(
+            success=False,
+            operation="vector_index_rebuild",
+            details={"error": str(e)},
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
+@router.post("/chapter-classifier/train", response_model=CacheOperationResponse)
+async def train_chapter_classifier(current_user: User = Depends(get_current_active_user)):
+    """
+    Retrain the local HS chapter classifier from HS codes and confirmed matches.
+    
+    Args:
+        current_user: Authenticated user
+        
+    Returns:
+        Training sizes and accuracy on held-out confirmed matches
+    """
+    try:
+        result = await hs_matching_service.train_chapter_classifier()
+        
+        return CacheOperationResponse(
+            success=True,
+            operation="chapter_classifier_train",
+            details=result,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error(f"Chapter classifier training failed: {str(e)}")
+        return CacheOperationResponse(
+            success=False,
+            operation="chapter_classifier_train",
+            details={"error": str(e)},
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
+@router.post("/classification-store/backfill", response_model=CacheOperationResponse)
+async def backfill_classification_store(
+    country: str = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Seed the durable classification store from existing product matches.
+    
+    Args:
+        country: Optional country to store every result under, each job's country schema if omitted
+        current_user: Authenticated user
+        
+    Returns:
+        Backfill operation results
+    """
+    try:
+        result = await hs_matching_service.backfill_classification_store(country)
+        
+        return CacheOperationResponse(
+            success=True,
+            operation="classification_store_backfill",
+            details=result,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error(f"Classification store backfill failed: {str(e)}")
+        return CacheOperationResponse(
+            success=False,
+            operation="classification_store_backfill",
+            details={"error": str(e)},
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
 # Analytics endpoints
 
 @router.get("/analytics/metrics", response_model=MatchingMetricsResponse)
@@ -585,6 +910,50 @@ async def get_performance_metrics(
         )
 
 
+@router.get("/analytics/agent-runs", response_model=PerformanceMetricsResponse)
+@limiter.limit("20 per minute")
+async def get_agent_run_metrics(
+    request: Request,
+    minutes: int = 60,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get token usage, tool-call and phase timing distributions of agent runs.
+    
+    Args:
+        minutes: Number of minutes to analyze (default: 60, max: 1440)
+        current_user: Authenticated user
+        
+    Returns:
+        Distributions overall, per country and per priority lane
+    """
+    try:
+        # Validate input
+        if minutes < 1 or minutes > 1440:  # Max 24 hours
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Minutes parameter must be between 1 and 1440"
+            )
+        
+        return PerformanceMetricsResponse(
+            success=True,
+            data=analytics_service.get_agent_run_metrics(minutes),
+            period_minutes=minutes,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get agent run metrics: {str(e)}")
+        return PerformanceMetricsResponse(
+            success=False,
+            error=str(e),
+            period_minutes=minutes,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+
 @router.get("/analytics/confidence", response_model=ConfidenceAnalysisResponse)
 @limiter.limit("10 per minute")
 async def get_confidence_analysis(
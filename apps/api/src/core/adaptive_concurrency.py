@@ -0,0 +1,246 @@
+"""
+Adaptive (AIMD) concurrency limiting for OpenAI agent calls
+
+One limiter is shared by every caller in the process. The concurrency limit
+grows additively while calls finish under the latency target and shrinks
+multiplicatively on timeouts, 429 responses or rising latency. Waiting
+calls are admitted by priority lane, and part of the limit is held back for
+interactive calls.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from openai import RateLimitError
+
+from .config import settings
+from .priority_lanes import Lane, LANE_WEIGHTS, WeightedLaneQueue, current_lane
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an exception is an OpenAI 429 response"""
+    return isinstance(error, RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease limiter around agent calls"""
+
+    OVERLOAD_BACKOFF_RATIO = 0.5  # Timeouts and 429s halve the limit
+    LATENCY_BACKOFF_RATIO = 0.9  # Slow or slowing calls shave 10% off
+    LATENCY_RISE_RATIO = 1.5  # Fast latency average vs. baseline counted as rising
+    DECREASE_COOLDOWN_SECONDS = 1.0  # One decrease per burst of failures
+    WARMUP_SAMPLES = 10
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        latency_target_ms: float = 2000,
+        interactive_reserved_share: float = 0.0
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            initial_limit: Starting concurrency limit
+            min_limit: Lower bound for the limit
+            max_limit: Upper bound for the limit
+            latency_target_ms: Calls slower than this reduce the limit
+            interactive_reserved_share: Share of the limit other lanes cannot use
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.interactive_reserved_share = interactive_reserved_share
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._waiters = WeightedLaneQueue()
+        self._lane_stats = {
+            lane: {"in_flight": 0, "admitted": 0, "waits": 0, "max_queued": 0, "total_wait_ms": 0.0}
+            for lane in LANE_WEIGHTS
+        }
+        self._fast_latency_ms: Optional[float] = None
+        self._baseline_latency_ms: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._stats = {
+            "calls": 0,
+            "increases": 0,
+            "decreases": 0,
+            "timeouts": 0,
+            "rate_limited": 0,
+            "waits": 0,
+        }
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently holding a slot"""
+        return self._in_flight
+
+    @property
+    def interactive_reserved(self) -> int:
+        """Slots of the current limit only interactive calls may take"""
+        if self.interactive_reserved_share <= 0:
+            return 0
+        return min(self.limit - 1, max(1, int(self.limit * self.interactive_reserved_share)))
+
+    def _can_admit(self, lane: str) -> bool:
+        if lane == Lane.INTERACTIVE:
+            return self._in_flight < self.limit
+        return self._in_flight < self.limit - self.interactive_reserved
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting calls, lanes taking turns by weight"""
+        while True:
+            entry = self._waiters.pop(self._can_admit)
+            if entry is None:
+                return
+            lane, (waiter, queued_at) = entry
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            lane_stats = self._lane_stats[lane]
+            lane_stats["in_flight"] += 1
+            lane_stats["admitted"] += 1
+            lane_stats["total_wait_ms"] += (time.monotonic() - queued_at) * 1000
+            waiter.set_result(None)
+
+    async def _acquire(self, lane: str) -> None:
+        """Wait for a slot in the given lane"""
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, time.monotonic())
+        self._waiters.push(lane, entry)
+        self._dispatch()
+        if waiter.done():
+            return
+
+        self._stats["waits"] += 1
+        lane_stats = self._lane_stats[lane]
+        lane_stats["waits"] += 1
+        lane_stats["max_queued"] = max(lane_stats["max_queued"], self._waiters.depth(lane))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as the caller was cancelled
+                self._release(lane)
+            else:
+                self._waiters.remove(lane, entry)
+            raise
+
+    def _release(self, lane: str) -> None:
+        self._in_flight -= 1
+        self._lane_stats[lane]["in_flight"] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, items: int = 1, lane: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot for the duration of one agent call
+
+        The outcome is taken from how the block exits: normal completion
+        feeds the latency controller, ``asyncio.TimeoutError`` and 429 errors
+        trigger a backoff, other errors only release the slot.
+
+        Args:
+            items: Products handled by the call; latency is judged per item
+            lane: Priority lane, taken from the running context if None
+        """
+        lane = lane or current_lane()
+        await self._acquire(lane)
+
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            self._decrease(self.OVERLOAD_BACKOFF_RATIO, "timeout")
+            raise
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self._stats["rate_limited"] += 1
+                self._decrease(self.OVERLOAD_BACKOFF_RATIO, "rate limited")
+            raise
+        else:
+            self._record_latency((time.monotonic() - start) * 1000 / max(1, items))
+        finally:
+            self._stats["calls"] += 1
+            self._release(lane)
+
+    def _record_latency(self, latency_ms: float) -> None:
+        """Grow the limit on fast calls, shrink it on slow or slowing ones"""
+        self._samples += 1
+        if self._fast_latency_ms is None:
+            self._fast_latency_ms = self._baseline_latency_ms = latency_ms
+        else:
+            self._fast_latency_ms += 0.2 * (latency_ms - self._fast_latency_ms)
+            self._baseline_latency_ms += 0.02 * (latency_ms - self._baseline_latency_ms)
+
+        rising = (
+            self._samples >= self.WARMUP_SAMPLES
+            and self._fast_latency_ms > self.LATENCY_RISE_RATIO * self._baseline_latency_ms
+        )
+        if latency_ms > self.latency_target_ms or rising:
+            self._decrease(self.LATENCY_BACKOFF_RATIO, f"latency {latency_ms:.0f}ms")
+        elif self._in_flight >= self.limit - 1:
+            # Only grow while the current limit is actually being used
+            previous = self.limit
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            if self.limit > previous:
+                self._stats["increases"] += 1
+
+    def _decrease(self, ratio: float, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * ratio)
+        self._stats["decreases"] += 1
+        logger.info(f"Concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get the current limit, usage and controller counters"""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "latency_target_ms": self.latency_target_ms,
+            "smoothed_latency_ms": round(self._fast_latency_ms, 1) if self._fast_latency_ms is not None else None,
+            "interactive_reserved": self.interactive_reserved,
+            **self._stats,
+            "lanes": {
+                lane: {
+                    "queued": self._waiters.depth(lane),
+                    "in_flight": stats["in_flight"],
+                    "admitted": stats["admitted"],
+                    "waits": stats["waits"],
+                    "max_queued": stats["max_queued"],
+                    "avg_wait_ms": round(stats["total_wait_ms"] / stats["admitted"], 1) if stats["admitted"] else 0.0,
+                }
+                for lane, stats in self._lane_stats.items()
+            },
+        }
+
+
+# Shared by every agent call in the process
+openai_concurrency_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.HS_MATCH_CONCURRENCY_INITIAL,
+    min_limit=settings.HS_MATCH_CONCURRENCY_MIN,
+    max_limit=settings.HS_MATCH_CONCURRENCY_MAX,
+    latency_target_ms=settings.HS_MATCH_LATENCY_TARGET_MS,
+    interactive_reserved_share=settings.HS_MATCH_INTERACTIVE_RESERVED_SHARE
+)
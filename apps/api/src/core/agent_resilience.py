@@ -0,0 +1,314 @@
+"""
+Tail latency and failure control for OpenAI agent calls
+
+``RequestHedger`` starts a duplicate of a call that runs past a delay derived
+from the recent p95 latency and keeps whichever answer lands first. Calls that
+queue for a budget or concurrency slot first signal when the upstream request
+starts; only that part is timed and hedged, since a duplicate would only queue
+behind the same saturated limits.
+``CircuitBreaker`` stops sending calls while the recent error rate is high,
+so callers fail fast or fall back to local and cached tiers. Only errors
+saying the upstream service is unhealthy count; bad input or malformed
+output would fail the same way against a healthy service.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from openai import APIConnectionError
+
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Set by the hedger in each attempt's task
+_upstream_started: ContextVar[Optional[Callable[[], None]]] = ContextVar("hedge_upstream_started", default=None)
+
+
+def mark_upstream_started() -> None:
+    """Tell the hedger running the current attempt that its upstream request started"""
+    callback = _upstream_started.get()
+    if callback is not None:
+        callback()
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Check whether an error is a timeout, connection error, 429 or 5xx response"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, APIConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class RequestHedger:
+    """Issues a hedged duplicate once a call passes a latency quantile"""
+
+    WINDOW_SIZE = 200  # Successful latencies kept for the quantile
+    MIN_SAMPLES = 20  # No hedging until the quantile is meaningful
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        min_delay_ms: float = 2000,
+        max_delay_ms: float = 15000,
+        enabled: bool = True
+    ):
+        """
+        Initialize the hedger
+
+        Args:
+            quantile: Latency quantile after which the duplicate is sent
+            min_delay_ms: Lower bound for the hedge delay
+            max_delay_ms: Upper bound for the hedge delay
+            enabled: Run calls without hedging when False
+        """
+        self.quantile = quantile
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.enabled = enabled
+        self._latencies: Deque[float] = deque(maxlen=self.WINDOW_SIZE)
+        self._stats = {
+            "calls": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    def record_latency(self, latency_ms: float) -> None:
+        """Add the latency of a successful call to the window"""
+        self._latencies.append(latency_ms)
+
+    def hedge_delay_ms(self) -> Optional[float]:
+        """Delay before hedging, or None while there are too few samples"""
+        if len(self._latencies) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+        return max(self.min_delay_ms, min(self.max_delay_ms, value))
+
+    async def _timed(self, attempt: Callable[[float], Awaitable[T]], elapsed_ms: float, upstream: asyncio.Event) -> T:
+        started = time.monotonic()
+
+        def mark_started() -> None:
+            nonlocal started
+            started = time.monotonic()
+            upstream.set()
+
+        _upstream_started.set(mark_started)
+        result = await attempt(elapsed_ms)
+        self.record_latency((time.monotonic() - started) * 1000)
+        return result
+
+    async def _outlives(
+        self,
+        primary: "asyncio.Future[T]",
+        upstream: asyncio.Event,
+        delay_ms: float,
+        wait_for_upstream: bool
+    ) -> bool:
+        """Wait until the primary's upstream request has run for the delay; False if it ended first"""
+        if wait_for_upstream:
+            started = asyncio.ensure_future(upstream.wait())
+            try:
+                await asyncio.wait({primary, started}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                started.cancel()
+        if primary.done():
+            return False
+        done, _ = await asyncio.wait({primary}, timeout=delay_ms / 1000)
+        return not done
+
+    async def run(self, attempt: Callable[[float], Awaitable[T]], wait_for_upstream: bool = False) -> T:
+        """
+        Run ``attempt`` and hedge it if it is slow
+
+        Args:
+            attempt: Coroutine factory called with the milliseconds already spent
+                on the call (0 for the primary), so a hedge can shorten its timeout
+            wait_for_upstream: Start the hedge delay, and time the attempt, only once
+                it calls ``mark_upstream_started``; otherwise from its start
+
+        Returns:
+            The first successful result; if every attempt fails, the first error is raised
+        """
+        self._stats["calls"] += 1
+        start = time.monotonic()
+        upstream = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed(attempt, 0.0, upstream))
+        delay_ms = self.hedge_delay_ms() if self.enabled else None
+        pending = {primary}
+        hedge = None
+        first_error: Optional[BaseException] = None
+
+        try:
+            if delay_ms is not None and await self._outlives(primary, upstream, delay_ms, wait_for_upstream):
+                self._stats["hedges"] += 1
+                logger.debug(f"Hedging agent call after {delay_ms:.0f}ms upstream")
+                hedge = asyncio.ensure_future(
+                    self._timed(attempt, (time.monotonic() - start) * 1000, asyncio.Event())
+                )
+                pending.add(hedge)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is hedge:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+                    first_error = first_error or error
+            raise first_error
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get hedge counts, win rate and the current delay"""
+        hedges = self._stats["hedges"]
+        delay = self.hedge_delay_ms()
+        return {
+            "enabled": self.enabled,
+            **self._stats,
+            "hedge_rate_percent": round(hedges / self._stats["calls"] * 100, 2) if self._stats["calls"] else 0.0,
+            "hedge_win_rate_percent": round(self._stats["hedge_wins"] / hedges * 100, 2) if hedges else 0.0,
+            "hedge_delay_ms": round(delay, 1) if delay is not None else None,
+        }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by the recent failure rate"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize the breaker
+
+        Args:
+            failure_rate_threshold: Failure share of the window that opens the breaker
+            window_size: Number of recent outcomes considered
+            min_calls: Outcomes needed before the breaker can open
+            open_seconds: Time spent open before probing again
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._stats = {
+            "times_opened": 0,
+            "rejected_calls": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the open period ends"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are rejected outright"""
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go out; counts a probe slot while half-open"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        self._stats["rejected_calls"] += 1
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call; a successful probe closes the breaker"""
+        if self._state == self.HALF_OPEN:
+            logger.info("Agent circuit breaker closed after successful probe")
+            self._state = self.CLOSED
+            self._outcomes.clear()
+            self._probes_in_flight = 0
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call and open the breaker if the failure rate is too high"""
+        if self._state == self.HALF_OPEN:
+            self._open("probe failed")
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate >= self.failure_rate_threshold:
+            self._open(f"failure rate {self.failure_rate:.0%}")
+
+    def record_error(self, error: BaseException) -> None:
+        """Record a failed call; errors not caused by the upstream service are not counted"""
+        if is_upstream_failure(error):
+            self.record_failure()
+        else:
+            self.release()
+
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without an outcome"""
+        if self._state == self.HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    @property
+    def failure_rate(self) -> float:
+        """Share of failures among the recent outcomes"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _open(self, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._outcomes.clear()
+        self._stats["times_opened"] += 1
+        logger.warning(f"Agent circuit breaker opened ({reason}) for {self.open_seconds}s")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate, 3),
+            "recent_calls": len(self._outcomes),
+            **self._stats,
+        }
+
+
+# Shared by every agent call in the process
+agent_hedger = RequestHedger(
+    quantile=settings.HS_MATCH_HEDGE_QUANTILE,
+    min_delay_ms=settings.HS_MATCH_HEDGE_MIN_DELAY_MS,
+    enabled=settings.HS_MATCH_HEDGING_ENABLED
+)
+agent_circuit_breaker = CircuitBreaker(
+    failure_rate_threshold=settings.HS_MATCH_CIRCUIT_FAILURE_RATE,
+    min_calls=settings.HS_MATCH_CIRCUIT_MIN_CALLS,
+    open_seconds=settings.HS_MATCH_CIRCUIT_OPEN_SECONDS
+)
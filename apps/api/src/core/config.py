@@ -35,7 +35,97 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     OPENAI_VECTOR_STORE_ID: str = "vs_hs_codes_turkmenistan"
     OPENAI_HSCODE_DATA_FILE_ID: str = ""
-    
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_AGENTS_EAGER_INIT: bool = False  # Build HS matching agents at startup
+
+    # Matcher backend: "openai" agents, or the offline "simulator" for load tests
+    HS_MATCHER_BACKEND: str = "openai"
+    HS_SIMULATOR_LATENCY_MEDIAN_MS: float = 1500.0
+    HS_SIMULATOR_LATENCY_SIGMA: float = 0.5  # Log-normal shape of the latency distribution
+    HS_SIMULATOR_ERROR_RATE: float = 0.0
+    HS_SIMULATOR_RATE_LIMIT_EVERY_SECONDS: float = 0.0  # Period of 429 bursts; 0 disables them
+    HS_SIMULATOR_RATE_LIMIT_BURST_SECONDS: float = 2.0
+    HS_SIMULATOR_SEED: int = 0
+
+    # Local HS code vector index (built from hs_codes.embedding)
+    HS_VECTOR_INDEX_ENABLED: bool = False
+    HS_VECTOR_INDEX_TOP_K: int = 5
+    HS_VECTOR_INDEX_SKIP_THRESHOLD: float = 0.92  # Skip the agent call above this cosine score
+
+    # Local HS chapter classifier (trained from hs_codes and confirmed product matches)
+    HS_CHAPTER_CLASSIFIER_ENABLED: bool = False
+    HS_CHAPTER_CLASSIFIER_HINT_CONFIDENCE: float = 0.9  # Probability the chapters named to the agent must cover
+    HS_CHAPTER_CLASSIFIER_SKIP_CONFIDENCE: float = 0.98  # Skip the agent above this when a candidate agrees
+    HS_CHAPTER_CLASSIFIER_AGREEMENT_SCORE: float = 0.85  # Minimum cosine score of the agreeing candidate
+
+    # HS matching request coalescing
+    HS_MATCH_CROSS_WORKER_COALESCING: bool = True  # Wait on other workers' in-flight matches via Redis
+    HS_MATCH_PACKED_CHUNK_SIZE: int = 1  # Descriptions per packed agent run in batches; 1 disables packing
+
+    # Adaptive (AIMD) concurrency limit shared by all agent calls in a process
+    HS_MATCH_CONCURRENCY_INITIAL: int = 10
+    HS_MATCH_CONCURRENCY_MIN: int = 2
+    HS_MATCH_CONCURRENCY_MAX: int = 50
+    HS_MATCH_LATENCY_TARGET_MS: int = 2000  # Per-product latency target the limit adapts to
+    HS_MATCH_INTERACTIVE_RESERVED_SHARE: float = 0.2  # Share of the limit file and background work cannot use
+
+    # Cluster-wide OpenAI budget (Redis token bucket shared by all workers)
+    OPENAI_RATE_LIMIT_ENABLED: bool = True
+    OPENAI_REQUESTS_PER_MINUTE: int = 500
+    OPENAI_TOKENS_PER_MINUTE: int = 800000
+    OPENAI_RATE_LIMIT_FALLBACK_SHARE: float = 0.25  # Share of the budget one worker uses without Redis
+
+    # Tail latency and failure control for agent calls
+    HS_MATCH_HEDGING_ENABLED: bool = True
+    HS_MATCH_HEDGE_QUANTILE: float = 0.95  # Latency quantile after which a duplicate call is sent
+    HS_MATCH_HEDGE_MIN_DELAY_MS: int = 2000
+    HS_MATCH_CIRCUIT_FAILURE_RATE: float = 0.5  # Failure share of recent calls that opens the breaker
+    HS_MATCH_CIRCUIT_MIN_CALLS: int = 10
+    HS_MATCH_CIRCUIT_OPEN_SECONDS: int = 30
+
+    # In-process L1 cache in front of Redis
+    HS_CACHE_L1_MAX_ENTRIES: int = 10000  # 0 disables the L1
+
+    # Near-duplicate cache hits on canonical descriptions; off until the
+    # threshold has been measured against agent results
+    HS_CACHE_NEAR_DUP_ENABLED: bool = False
+    HS_CACHE_NEAR_DUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity of description shingles
+    HS_CACHE_NEAR_DUP_MAX_ENTRIES: int = 50000
+
+    # Durable Postgres classification store below Redis (L3)
+    HS_CACHE_L3_ENABLED: bool = True
+
+    # Generation-namespaced cache keys, bumped to invalidate a country at once
+    HS_CACHE_GENERATION_REFRESH_SECONDS: float = 5.0  # How long a worker trusts its copy of the generations
+
+    # Stale-while-revalidate: entries past their soft expiry are served while a
+    # background task refreshes them, and TTLs are jittered so they expire apart.
+    # Readers accept entries with and without a soft expiry, so enable writing
+    # it only once every worker runs a release that can decode it
+    HS_CACHE_STALE_WHILE_REVALIDATE: bool = False
+    HS_CACHE_STALE_GRACE_SHARE: float = 0.1  # Share of the TTL an entry is kept past its soft expiry
+    HS_CACHE_REFRESH_AHEAD_BETA: float = 1.0  # Probabilistic early refresh; larger refreshes earlier, 0 disables
+    HS_CACHE_TTL_JITTER: float = 0.1  # TTLs are shortened by a random share of up to this
+
+    # Cache warming from the most frequent descriptions in past product matches
+    HS_CACHE_WARM_TOP_PER_COUNTRY: int = 500  # Descriptions warmed per country
+    HS_CACHE_WARM_LOOKBACK_DAYS: int = 90  # Only matches this recent are mined
+    HS_CACHE_WARM_HALF_LIFE_DAYS: float = 30.0  # Recency weighting of past matches; 0 counts all equally
+    HS_CACHE_WARM_CONCURRENCY: int = 4  # Descriptions matched at once while warming
+
+    # Short-lived negative cache for deterministic match failures
+    HS_NEGATIVE_CACHE_ENABLED: bool = True
+    HS_NEGATIVE_CACHE_TTL_SECONDS: int = 300
+
+    # Compact encoding of cached match results; readers accept both formats, so
+    # enable writes only once every worker runs a release that can decode them
+    HS_CACHE_COMPACT_CODEC_ENABLED: bool = False
+    HS_CACHE_COMPRESS_MIN_BYTES: int = 512  # Payloads at least this long are zlib-compressed
+
+    # Asynchronous large-batch matching jobs
+    HS_BATCH_JOB_MAX_ITEMS: int = 50000
+    HS_BATCH_JOB_MAX_RUNNING: int = 2  # Jobs matched at once per worker; later jobs wait queued
+
     # File storage settings
     UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024  # 10MB
     UPLOAD_ALLOWED_EXTENSIONS: Union[str, List[str]] = [".pdf", ".xlsx", ".xls", ".csv"]
@@ -71,6 +161,12 @@ class Settings(BaseSettings):
             raise ValueError("NODE_ENV must be one of: development, staging, production")
         return v
     
+    @field_validator("HS_MATCHER_BACKEND")
+    def validate_matcher_backend(cls, v):
+        if v not in ["openai", "simulator"]:
+            raise ValueError("HS_MATCHER_BACKEND must be one of: openai, simulator")
+        return v
+    
     @field_validator("LOG_LEVEL")
     def validate_log_level(cls, v):
         if v not in ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]:
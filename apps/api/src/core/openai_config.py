@@ -1,14 +1,30 @@
 """
 OpenAI Agents SDK configuration for HS Code matching
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from .config import settings
+from .adaptive_concurrency import openai_concurrency_limiter
+from .openai_rate_limiter import openai_token_bucket
+from .agent_resilience import agent_circuit_breaker, agent_hedger, mark_upstream_started
+from .priority_lanes import current_lane
+import time
 import logging
 import asyncio
+import hashlib
 
 # OpenAI Agents SDK imports
-from agents import Agent, FileSearchTool, Runner, set_default_openai_key
+from agents import (
+    Agent,
+    FileSearchTool,
+    Runner,
+    set_default_openai_key,
+    InputGuardrailTripwireTriggered,
+    MaxTurnsExceeded,
+    ModelBehaviorError,
+    OutputGuardrailTripwireTriggered
+)
 from agents.agent import StopAtTools
 
 
@@ -29,12 +45,81 @@ class HSCodeResult(BaseModel):
     reasoning: str = Field(..., description="Brief explanation for why this code matches")
 
 
+class HSCodeRunMetrics(BaseModel):
+    """Token usage, tool calls and phase timings of one agent run"""
+    country: str = "default"
+    lane: str = "interactive"
+    packed_items: int = 1  # Products sharing the run; token counts cover all of them
+    model_requests: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    total_tokens: int = 0
+    budget_wait_ms: float = 0.0  # Waiting for the cluster-wide token bucket
+    queue_wait_ms: float = 0.0  # Waiting for an adaptive concurrency slot
+    agent_ms: float = 0.0  # Model turns and tool calls of the winning attempt
+    total_ms: float = 0.0
+
+
 class HSCodeMatchResult(BaseModel):
     """Complete HS code matching result with alternatives"""
     primary_match: HSCodeResult
     alternative_matches: List[HSCodeResult] = Field(default_factory=list, max_items=3)
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
     query: str = Field(..., description="Original product description query")
+    # Set by the cache layer only, hence hidden from the agent's output schema
+    approximate_cache_hit: SkipJsonSchema[bool] = Field(
+        default=False, description="Served from a near-duplicate cached description"
+    )
+    cache_similarity: SkipJsonSchema[Optional[float]] = Field(
+        default=None, description="Estimated similarity to the cached description"
+    )
+    # Set on error results only
+    error_kind: SkipJsonSchema[Optional[str]] = Field(
+        default=None, description="MatchErrorKind of a failed match"
+    )
+    # In-process metadata of the agent run that produced the result; not
+    # serialized, so cached copies and API responses never carry it
+    run_metrics: SkipJsonSchema[Optional[HSCodeRunMetrics]] = Field(
+        default=None, exclude=True, description="Usage and timings of the producing agent run"
+    )
+
+
+class MatchErrorKind:
+    """How a failed match may be cached"""
+    TRANSIENT = "transient"  # Timeouts, 429s, 5xx, open breaker: never cached
+    DETERMINISTIC = "deterministic"  # The same input fails again: negatively cached for a short TTL
+
+
+# Rejections of the request itself rather than of the service's state;
+# auth and not-found errors are configuration problems and stay transient
+DETERMINISTIC_STATUS_CODES = {400, 413, 422}
+
+
+def classify_match_error(error: BaseException) -> str:
+    """
+    Tell failures worth retrying from ones the same input will hit again
+
+    Args:
+        error: Exception raised while matching
+
+    Returns:
+        MatchErrorKind value; unknown errors are treated as transient
+    """
+    if isinstance(error, (
+        InputGuardrailTripwireTriggered,
+        OutputGuardrailTripwireTriggered,
+        MaxTurnsExceeded,
+        ModelBehaviorError
+    )):
+        return MatchErrorKind.DETERMINISTIC
+
+    status_code = getattr(error, "status_code", None)
+    if status_code in DETERMINISTIC_STATUS_CODES:
+        return MatchErrorKind.DETERMINISTIC
+    return MatchErrorKind.TRANSIENT
 
 
 # Enhanced structured output models for HS code matching
@@ -46,6 +131,18 @@ class HSCodeAlternative(BaseModel):
     reasoning: str = Field(..., description="Brief explanation for this alternative classification")
 
 
+class HSCodePackedMatchItem(BaseModel):
+    """Match result for one product of a packed multi-product request"""
+    index: int = Field(..., ge=0, description="Index of the product in the request list")
+    primary_match: HSCodeResult
+    alternative_matches: List[HSCodeResult] = Field(default_factory=list, max_items=3)
+
+
+class HSCodePackedMatchOutput(BaseModel):
+    """Structured list output for packed multi-product requests"""
+    results: List[HSCodePackedMatchItem] = Field(..., description="One result per product, in any order")
+
+
 class OpenAIAgentConfig:
     """OpenAI Agents SDK configuration for HS Code matching"""
     
@@ -91,24 +188,26 @@ Prioritize accuracy over speed, and provide detailed reasoning for your classifi
     # Model Configuration
     MODEL_NAME = "gpt-4.1"  # Use more capable model for complex HS code analysis
     MODEL_TEMPERATURE = 0.1  # Low temperature for consistent classifications
+    MAX_OUTPUT_TOKENS = 1500  # Sufficient tokens for detailed analysis
+    TIMEOUT_SECONDS = 30.0  # Overall limit for a call, hedged duplicate included
+    PACKED_MAX_OUTPUT_TOKENS = 8000  # Room for a full chunk of packed results
+    PACKED_TIMEOUT_SECONDS = 60.0
+    
+    # Token budget estimation (instructions plus retrieved file search chunks)
+    PROMPT_OVERHEAD_TOKENS = 3000
+    CHARS_PER_TOKEN = 4
     
     @classmethod
-    async def create_agent(cls, country: str = "default") -> Agent:
-        """Create configured OpenAI Agent for HS code matching"""
+    async def create_agent(cls, country: str = "default", packed: bool = False) -> Agent:
+        """Create configured OpenAI Agent for HS code matching
         
-        # Get vector store configuration
-        vector_store_config = cls.get_vector_store_config()
+        Args:
+            country: Country whose vector stores the FileSearchTool should use
+            packed: Create an agent returning a list of results for several products
+        """
         
         # Get vector store IDs for specified country
-        vector_store_ids = vector_store_config.get(
-            country.lower(), 
-            vector_store_config["default"]
-        )
-        
-        # Validate vector store IDs
-        if not vector_store_ids or not any(vector_store_ids):
-            logger.warning(f"No vector store configured for country: {country}")
-            vector_store_ids = vector_store_config["default"]
+        vector_store_ids = cls.resolve_vector_store_ids(country)
         
         # Configure FileSearchTool with performance optimizations
         file_search_tool = FileSearchTool(
@@ -125,28 +224,65 @@ Prioritize accuracy over speed, and provide detailed reasoning for your classifi
             instructions=cls.AGENT_INSTRUCTIONS,
             model=cls.MODEL_NAME,
             tools=[file_search_tool],
-            output_type=HSCodeMatchResult,  # Use enhanced structured output            
+            output_type=HSCodePackedMatchOutput if packed else HSCodeMatchResult,  # Use enhanced structured output
             model_settings=ModelSettings(
                 temperature=cls.MODEL_TEMPERATURE,
-                max_tokens=1500,  # Sufficient tokens for detailed analysis
+                max_tokens=cls.PACKED_MAX_OUTPUT_TOKENS if packed else cls.MAX_OUTPUT_TOKENS,
                 )
         )
         
         return agent
     
+    @classmethod
+    def resolve_vector_store_ids(cls, country: str = "default") -> List[str]:
+        """Get the vector store IDs used for a country, falling back to default"""
+        # Get vector store configuration
+        vector_store_config = cls.get_vector_store_config()
+        
+        # Get vector store IDs for specified country
+        vector_store_ids = vector_store_config.get(
+            country.lower(), 
+            vector_store_config["default"]
+        )
+        
+        # Validate vector store IDs
+        if not vector_store_ids or not any(vector_store_ids):
+            logger.warning(f"No vector store configured for country: {country}")
+            vector_store_ids = vector_store_config["default"]
+        
+        return vector_store_ids
+    
+    @classmethod
+    def get_vector_store_version(cls, country: str = "default") -> str:
+        """Short fingerprint of a country's vector stores; changes when they are replaced"""
+        vector_store_ids = ",".join(sorted(cls.resolve_vector_store_ids(country)))
+        return hashlib.sha256(vector_store_ids.encode()).hexdigest()[:12]
+    
     @classmethod
     def get_available_countries(cls) -> List[str]:
         """Get list of available countries for HS code matching"""
         return list(cls.get_vector_store_config().keys())
     
     @classmethod
-    async def match_hs_code(cls, product_description: str, country: str = "default") -> HSCodeMatchResult:
+    async def match_hs_code(
+        cls,
+        product_description: str,
+        country: str = "default",
+        candidates: Optional[List[Any]] = None,
+        agent: Optional[Agent] = None,
+        chapters: Optional[List[Any]] = None,
+        runner: Optional[Callable[[Agent, str], Awaitable[Any]]] = None
+    ) -> HSCodeMatchResult:
         """
         High-level method to match HS code for a product description
         
         Args:
             product_description: Product description to classify
             country: Country-specific classification context
+            candidates: Optional shortlist from the local vector index passed as context
+            chapters: Optional likely chapters from the local chapter classifier
+            runner: Coroutine function run as ``runner(agent, query)``, ``Runner.run`` if None
+            agent: Prebuilt agent to use, taken from the agent registry if None
             
         Returns:
             HSCodeMatchResult with primary and alternative matches
@@ -156,66 +292,331 @@ Prioritize accuracy over speed, and provide detailed reasoning for your classifi
         start_time = time.time()
         
         try:
-            # Create agent for specific country
-            agent = await cls.create_agent(country)
+            # Reuse the registry's agent for this country unless one was handed down
+            if agent is None:
+                agent = await agent_registry.get_agent(country)
             
             # Prepare enhanced query with context
-            enhanced_query = f"""Find the most appropriate HS code for this product: "{product_description}"
+            enhanced_query = cls.build_query(product_description, candidates, chapters)
             
-Also provide up to 3 alternative HS codes with confidence scores if there are other potentially suitable classifications.
-
-Provide detailed reasoning for your classification decision."""
+            # Fail fast while the breaker is open instead of queueing more calls
+            if not agent_circuit_breaker.allow_request():
+                processing_time_ms = (time.time() - start_time) * 1000
+                return cls._create_error_result(product_description, processing_time_ms, "Circuit breaker open")
             
-            # Run agent with the query using timeout and retry logic
+            # Run agent with the query using timeout and hedging
             try:
-                result = await asyncio.wait_for(
-                    Runner.run(agent, enhanced_query),
-                    timeout=30.0  # 30 second timeout
-                )
+                tokens = cls.estimate_tokens(enhanced_query, cls.MAX_OUTPUT_TOKENS)
+                try:
+                    # A hedged duplicate only gets the time the primary has left,
+                    # and is only sent once the primary's upstream call is slow
+                    result, phases = await agent_hedger.run(
+                        lambda elapsed_ms: cls._run_agent(
+                            agent, enhanced_query, tokens, cls.TIMEOUT_SECONDS - elapsed_ms / 1000, runner
+                        ),
+                        wait_for_upstream=True
+                    )
+                except asyncio.CancelledError:
+                    agent_circuit_breaker.release()
+                    raise
+                except Exception as e:
+                    agent_circuit_breaker.record_error(e)
+                    raise
+                agent_circuit_breaker.record_success()
                 
                 # Calculate processing time
                 processing_time_ms = (time.time() - start_time) * 1000
                 
-                # Extract structured result
-                if hasattr(result, 'final_output'):
-                    final_output = result.final_output
-                    
-                    # Handle different output types
-                    if isinstance(final_output, HSCodeMatchResult):
-                        # Perfect case - structured output worked
-                        final_output.processing_time_ms = processing_time_ms
-                        final_output.query = product_description
-                        logger.info(f"Structured output received: {final_output.primary_match.hs_code}")
-                        return final_output
-                    elif isinstance(final_output, HSCodeResult):
-                        # Single result - wrap in match result
-                        return HSCodeMatchResult(
-                            primary_match=final_output,
-                            alternative_matches=[],
-                            processing_time_ms=processing_time_ms,
-                            query=product_description
-                        )
-                    else:
-                        # Try to parse text response
-                        logger.warning(f"Unexpected output type: {type(final_output)}, attempting text parsing")
-                        return cls._parse_text_response(str(final_output), product_description, processing_time_ms)
-                else:
-                    logger.warning("No final_output in agent result")
-                    return cls._create_fallback_result(product_description, processing_time_ms)
+                match_result = cls._extract_match_result(result, product_description, processing_time_ms)
+                match_result.run_metrics = cls.build_run_metrics(result, phases, country, processing_time_ms)
+                return match_result
                     
             except asyncio.TimeoutError:
                 processing_time_ms = (time.time() - start_time) * 1000
-                logger.error(f"Agent execution timed out after 30 seconds")
+                logger.error(f"Agent execution timed out after {cls.TIMEOUT_SECONDS} seconds")
                 return cls._create_error_result(product_description, processing_time_ms, "Request timed out")
             except Exception as agent_error:
                 processing_time_ms = (time.time() - start_time) * 1000
                 logger.error(f"Agent execution failed: {str(agent_error)}")
-                return cls._create_error_result(product_description, processing_time_ms, f"Agent error: {str(agent_error)}")
+                return cls._create_error_result(
+                    product_description,
+                    processing_time_ms,
+                    f"Agent error: {str(agent_error)}",
+                    classify_match_error(agent_error)
+                )
                 
         except Exception as e:
             processing_time_ms = (time.time() - start_time) * 1000
             logger.error(f"Error in HS code matching: {str(e)}")
-            return cls._create_error_result(product_description, processing_time_ms, str(e))
+            return cls._create_error_result(product_description, processing_time_ms, str(e), classify_match_error(e))
+    
+    @classmethod
+    def _extract_match_result(
+        cls,
+        result: Any,
+        product_description: str,
+        processing_time_ms: float
+    ) -> HSCodeMatchResult:
+        """Turn an agent run result into a match result"""
+        if hasattr(result, 'final_output'):
+            final_output = result.final_output
+            
+            # Handle different output types
+            if isinstance(final_output, HSCodeMatchResult):
+                # Perfect case - structured output worked
+                final_output.processing_time_ms = processing_time_ms
+                final_output.query = product_description
+                logger.info(f"Structured output received: {final_output.primary_match.hs_code}")
+                return final_output
+            elif isinstance(final_output, HSCodeResult):
+                # Single result - wrap in match result
+                return HSCodeMatchResult(
+                    primary_match=final_output,
+                    alternative_matches=[],
+                    processing_time_ms=processing_time_ms,
+                    query=product_description
+                )
+            else:
+                # Try to parse text response
+                logger.warning(f"Unexpected output type: {type(final_output)}, attempting text parsing")
+                return cls._parse_text_response(str(final_output), product_description, processing_time_ms)
+        else:
+            logger.warning("No final_output in agent result")
+            return cls._create_fallback_result(product_description, processing_time_ms)
+    
+    @classmethod
+    async def _run_agent(
+        cls,
+        agent: Agent,
+        query: str,
+        tokens: int,
+        timeout: float,
+        runner: Optional[Callable[[Agent, str], Awaitable[Any]]] = None,
+        items: int = 1
+    ) -> Tuple[Any, Dict[str, float]]:
+        """
+        Run the agent once within the shared budget and concurrency limit
+        
+        Args:
+            agent: Agent to run
+            query: Prompt for the run
+            tokens: Estimated tokens charged to the shared budget
+            timeout: Seconds the whole run may take, budget and queue waits included
+            runner: Coroutine function run as ``runner(agent, query)``, ``Runner.run`` if None
+            items: Products classified by the run, for the limiter's per-item latency
+        
+        Returns:
+            Tuple of (run result, phase timings in milliseconds)
+        """
+        run = runner or Runner.run
+        phases: Dict[str, float] = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        started = time.monotonic()
+        
+        # The timeout bounds the call end to end, so callers (and the
+        # in-flight lock other workers wait on) never outlast it
+        async with asyncio.timeout_at(deadline) as wait_scope:
+            # Stay within the cluster-wide request and token budget
+            await openai_token_bucket.acquire(tokens)
+            budget_acquired = time.monotonic()
+            phases["budget_wait_ms"] = (budget_acquired - started) * 1000
+            
+            async with openai_concurrency_limiter.slot(items=items):
+                slot_acquired = time.monotonic()
+                phases["queue_wait_ms"] = (slot_acquired - budget_acquired) * 1000
+                # The upstream call gets what is left of the budget as its own
+                # timeout, raised inside the slot so the limiter backs off
+                wait_scope.reschedule(None)
+                mark_upstream_started()
+                result = await asyncio.wait_for(run(agent, query), timeout=deadline - loop.time())
+            
+            phases["agent_ms"] = (time.monotonic() - slot_acquired) * 1000
+        return result, phases
+    
+    @classmethod
+    def build_run_metrics(
+        cls,
+        result: Any,
+        phases: Dict[str, float],
+        country: str,
+        total_ms: float,
+        packed_items: int = 1
+    ) -> HSCodeRunMetrics:
+        """
+        Collect the usage the Agents SDK recorded for a run
+        
+        Args:
+            result: Run result; runs without usage (e.g. the simulator) report zero tokens
+            phases: Phase timings from ``_run_agent``
+            country: Country the run matched for
+            total_ms: Wall time of the whole match call
+            packed_items: Products classified by the run
+            
+        Returns:
+            HSCodeRunMetrics for the run, tagged with the current priority lane
+        """
+        metrics = HSCodeRunMetrics(
+            country=country,
+            lane=current_lane(),
+            packed_items=packed_items,
+            tool_calls=sum(
+                1 for item in getattr(result, "new_items", None) or []
+                if getattr(item, "type", None) == "tool_call_item"
+            ),
+            total_ms=round(total_ms, 1),
+            **{phase: round(ms, 1) for phase, ms in phases.items()}
+        )
+        
+        usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+        if usage is not None:
+            metrics.model_requests = usage.requests
+            metrics.input_tokens = usage.input_tokens
+            metrics.output_tokens = usage.output_tokens
+            metrics.total_tokens = usage.total_tokens
+            metrics.cached_input_tokens = getattr(usage.input_tokens_details, "cached_tokens", 0) or 0
+            metrics.reasoning_tokens = getattr(usage.output_tokens_details, "reasoning_tokens", 0) or 0
+        return metrics
+    
+    @classmethod
+    async def match_hs_codes_packed(
+        cls,
+        product_descriptions: List[str],
+        country: str = "default",
+        agent: Optional[Agent] = None,
+        runner: Optional[Callable[[Agent, str], Awaitable[Any]]] = None
+    ) -> List[Optional[HSCodeMatchResult]]:
+        """
+        Match several product descriptions with a single agent run
+        
+        Args:
+            product_descriptions: Product descriptions to classify together
+            country: Country-specific classification context
+            agent: Prebuilt packed agent, taken from the agent registry if None
+            runner: Coroutine function run as ``runner(agent, query)``, ``Runner.run`` if None
+            
+        Returns:
+            One entry per description; None where the packed output was missing
+            or malformed so the caller can fall back to a per-item call
+        """
+        import time
+        
+        start_time = time.time()
+        missing: List[Optional[HSCodeMatchResult]] = [None] * len(product_descriptions)
+        
+        try:
+            if agent is None:
+                agent = await agent_registry.get_agent(country, packed=True)
+            packed_query = cls.build_packed_query(product_descriptions)
+            if not agent_circuit_breaker.allow_request():
+                return missing
+        except Exception as e:
+            logger.error(f"Packed agent setup failed: {str(e)}")
+            return missing
+        
+        # Packed runs are not hedged: a duplicate would double a whole chunk's cost
+        try:
+            result, phases = await cls._run_agent(
+                agent,
+                packed_query,
+                cls.estimate_tokens(packed_query, cls.PACKED_MAX_OUTPUT_TOKENS),
+                cls.PACKED_TIMEOUT_SECONDS,
+                runner,
+                items=len(product_descriptions)
+            )
+        except asyncio.CancelledError:
+            agent_circuit_breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            agent_circuit_breaker.record_failure()
+            logger.error(f"Packed agent execution timed out after {cls.PACKED_TIMEOUT_SECONDS} seconds")
+            return missing
+        except Exception as e:
+            agent_circuit_breaker.record_error(e)
+            logger.error(f"Packed agent execution failed: {str(e)}")
+            return missing
+        agent_circuit_breaker.record_success()
+        
+        processing_time_ms = (time.time() - start_time) * 1000
+        final_output = getattr(result, 'final_output', None)
+        
+        if not isinstance(final_output, HSCodePackedMatchOutput):
+            logger.warning(f"Unexpected packed output type: {type(final_output)}, falling back to per-item calls")
+            return missing
+        
+        # One run shared by the chunk: every item points at the same metrics
+        run_metrics = cls.build_run_metrics(
+            result, phases, country, processing_time_ms, packed_items=len(product_descriptions)
+        )
+        results = list(missing)
+        for item in final_output.results:
+            # Ignore out-of-range and duplicate indices rather than guessing
+            if item.index >= len(results) or results[item.index] is not None:
+                logger.warning(f"Discarding packed result with invalid or duplicate index {item.index}")
+                continue
+            results[item.index] = HSCodeMatchResult(
+                primary_match=item.primary_match,
+                alternative_matches=item.alternative_matches,
+                processing_time_ms=processing_time_ms,
+                query=product_descriptions[item.index],
+                run_metrics=run_metrics
+            )
+        
+        returned = sum(1 for r in results if r is not None)
+        if returned < len(results):
+            logger.warning(f"Packed output covered {returned}/{len(results)} products")
+        
+        return results
+    
+    @classmethod
+    def estimate_tokens(cls, query: str, max_output_tokens: int) -> int:
+        """Estimate the prompt plus completion tokens of one agent run"""
+        return cls.PROMPT_OVERHEAD_TOKENS + len(query) // cls.CHARS_PER_TOKEN + max_output_tokens
+    
+    @classmethod
+    def build_packed_query(cls, product_descriptions: List[str]) -> str:
+        """Build the agent query for a packed multi-product request"""
+        products = "\n".join(
+            f'{index}. "{description}"' for index, description in enumerate(product_descriptions)
+        )
+        return f"""Find the most appropriate HS code for each of the following {len(product_descriptions)} products.
+
+Return exactly one entry in `results` per product, using the product's number as `index`.
+For each product also provide up to 3 alternative HS codes with confidence scores if there are other potentially suitable classifications, and detailed reasoning for your classification decision.
+
+Products:
+{products}"""
+    
+    @classmethod
+    def build_query(
+        cls,
+        product_description: str,
+        candidates: Optional[List[Any]] = None,
+        chapters: Optional[List[Any]] = None
+    ) -> str:
+        """Build the agent query, optionally listing candidate codes and likely chapters"""
+        query = f"""Find the most appropriate HS code for this product: "{product_description}"
+            
+Also provide up to 3 alternative HS codes with confidence scores if there are other potentially suitable classifications.
+
+Provide detailed reasoning for your classification decision."""
+        
+        if candidates:
+            shortlist = "\n".join(
+                f"- {c.hs_code}: {c.description} (similarity {c.score:.2f})" for c in candidates
+            )
+            query += f"""
+
+Candidate HS codes from the local tariff index (verify with the FileSearchTool before using them):
+{shortlist}"""
+        
+        if chapters:
+            likely = ", ".join(f"{c.chapter} ({c.probability:.0%})" for c in chapters)
+            query += f"""
+
+Likely HS chapters from a local classifier: {likely}. Search these chapters first and only look elsewhere if none of them fits."""
+        
+        return query
     
     @classmethod
     def _create_fallback_result(cls, query: str, processing_time_ms: float) -> HSCodeMatchResult:
@@ -289,7 +690,13 @@ Provide detailed reasoning for your classification decision."""
             return cls._create_fallback_result(query, processing_time_ms)
     
     @classmethod
-    def _create_error_result(cls, query: str, processing_time_ms: float, error_msg: str) -> HSCodeMatchResult:
+    def _create_error_result(
+        cls,
+        query: str,
+        processing_time_ms: float,
+        error_msg: str,
+        error_kind: str = MatchErrorKind.TRANSIENT
+    ) -> HSCodeMatchResult:
         """Create error result when matching fails"""
         return HSCodeMatchResult(
             primary_match=HSCodeResult(
@@ -302,10 +709,79 @@ Provide detailed reasoning for your classification decision."""
             ),
             alternative_matches=[],
             processing_time_ms=processing_time_ms,
-            query=query
+            query=query,
+            error_kind=error_kind
         )
 
 
+class AgentRegistry:
+    """
+    Registry of prebuilt HS code agents
+    
+    Agents (with their FileSearchTool and vector store configuration) are built
+    once per country and output mode and reused for every call. An agent is
+    rebuilt only when the vector store IDs resolved for its country change.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._agents: Dict[Tuple[str, bool], Tuple[Tuple[str, ...], Agent]] = {}
+        self._lock = asyncio.Lock()
+        self._stats = {"builds": 0, "hits": 0}
+    
+    async def get_agent(self, country: str = "default", packed: bool = False) -> Agent:
+        """Get the agent for a country, building it on first use or config change"""
+        key = (country.lower(), packed)
+        vector_store_ids = tuple(OpenAIAgentConfig.resolve_vector_store_ids(country))
+        
+        entry = self._agents.get(key)
+        if entry is not None and entry[0] == vector_store_ids:
+            self._stats["hits"] += 1
+            return entry[1]
+        
+        async with self._lock:
+            entry = self._agents.get(key)
+            if entry is not None and entry[0] == vector_store_ids:
+                self._stats["hits"] += 1
+                return entry[1]
+            
+            agent = await OpenAIAgentConfig.create_agent(country, packed=packed)
+            self._agents[key] = (vector_store_ids, agent)
+            self._stats["builds"] += 1
+            logger.info(f"Built agent for country: {country} (packed={packed}, vector stores: {list(vector_store_ids)})")
+            return agent
+    
+    async def warm(self, countries: Optional[List[str]] = None) -> int:
+        """Eagerly build agents for the given (default: all configured) countries"""
+        countries = countries or OpenAIAgentConfig.get_available_countries()
+        for country in countries:
+            await self.get_agent(country)
+            await self.get_agent(country, packed=True)
+        return len(self._agents)
+    
+    def invalidate(self, country: Optional[str] = None) -> None:
+        """Drop cached agents for a country, or all agents if None"""
+        if country is None:
+            self._agents.clear()
+            return
+        for key in [k for k in self._agents if k[0] == country.lower()]:
+            del self._agents[key]
+    
+    def __len__(self) -> int:
+        return len(self._agents)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get registry size and build/hit counters"""
+        return {
+            "agents": len(self._agents),
+            **self._stats
+        }
+
+
+# Shared agent registry
+agent_registry = AgentRegistry()
+
+
 # Validate OpenAI API key is configured
 if not settings.OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY must be configured for HS code matching")
\ No newline at end of file
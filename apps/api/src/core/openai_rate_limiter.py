@@ -0,0 +1,245 @@
+"""
+Cluster-wide token bucket for OpenAI request and token budgets
+
+All workers and pods draw from the same two buckets in Redis, one for
+requests per minute and one for estimated tokens per minute, before calling
+``Runner.run``. Refill and withdrawal happen in one Lua script, so concurrent
+workers cannot overdraw the account's limits. Without Redis each worker
+falls back to an in-process bucket holding a share of the budget.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class _LocalBucket:
+    """In-process token bucket refilled continuously over one minute"""
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_ms(self, amount: float) -> float:
+        """Milliseconds until ``amount`` tokens are available (0 if they are now)"""
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.capacity / 60000.0)
+
+
+class OpenAITokenBucket:
+    """Requests-per-minute and tokens-per-minute budget shared through Redis"""
+
+    REQUEST_BUCKET_KEY = "xm_port:openai_budget:requests"
+    TOKEN_BUCKET_KEY = "xm_port:openai_budget:tokens"
+    REDIS_RETRY_SECONDS = 30  # Delay before reconnecting after a Redis failure
+    MAX_SLEEP_SECONDS = 1.0  # Re-check at least this often while waiting
+
+    # KEYS[1]: request bucket, KEYS[2]: token bucket
+    # ARGV[1]: requests per minute, ARGV[2]: tokens per minute, ARGV[3]: tokens wanted
+    # Returns 0 when both withdrawals succeeded, otherwise milliseconds to wait
+    ACQUIRE_SCRIPT = """
+    local time = redis.call("TIME")
+    local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+    local function level(key, capacity)
+        local state = redis.call("HMGET", key, "tokens", "ts")
+        local tokens = tonumber(state[1])
+        local ts = tonumber(state[2])
+        if tokens == nil or ts == nil then
+            return capacity
+        end
+        return math.min(capacity, tokens + (now - ts) * capacity / 60000)
+    end
+
+    local rpm = tonumber(ARGV[1])
+    local tpm = tonumber(ARGV[2])
+    local cost = math.min(tonumber(ARGV[3]), tpm)
+    local requests = level(KEYS[1], rpm)
+    local tokens = level(KEYS[2], tpm)
+
+    local wait = 0
+    if requests < 1 then
+        wait = math.max(wait, (1 - requests) * 60000 / rpm)
+    end
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) * 60000 / tpm)
+    end
+    if wait == 0 then
+        requests = requests - 1
+        tokens = tokens - cost
+    end
+
+    redis.call("HSET", KEYS[1], "tokens", tostring(requests), "ts", tostring(now))
+    redis.call("HSET", KEYS[2], "tokens", tostring(tokens), "ts", tostring(now))
+    redis.call("PEXPIRE", KEYS[1], 120000)
+    redis.call("PEXPIRE", KEYS[2], 120000)
+    return math.ceil(wait)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        fallback_share: float = 0.25,
+        enabled: bool = True
+    ):
+        """
+        Initialize the budget
+
+        Args:
+            requests_per_minute: Cluster-wide request budget
+            tokens_per_minute: Cluster-wide token budget
+            fallback_share: Fraction of the budget one worker may use without Redis
+            enabled: Skip all budgeting when False
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.enabled = enabled
+        self._redis = None
+        self._script = None
+        self._redis_retry_at = 0.0
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._local_requests = _LocalBucket(max(1.0, requests_per_minute * fallback_share))
+        self._local_tokens = _LocalBucket(max(1.0, tokens_per_minute * fallback_share))
+        self._local_lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "acquisitions": 0,
+            "waited_acquisitions": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "local_fallback_acquisitions": 0,
+            "tokens_requested": 0,
+        }
+
+    async def _get_redis(self):
+        """Get the Redis client, reconnecting at most every REDIS_RETRY_SECONDS"""
+        if self._redis is not None or time.monotonic() < self._redis_retry_at:
+            return self._redis
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            # Another caller may have connected or failed while we waited
+            if self._redis is not None or time.monotonic() < self._redis_retry_at:
+                return self._redis
+            try:
+                client = redis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_connect_timeout=1,
+                    socket_timeout=1
+                )
+                await client.ping()
+                self._redis = client
+                self._script = client.register_script(self.ACQUIRE_SCRIPT)
+                logger.info("OpenAI token bucket using Redis")
+            except Exception as e:
+                logger.warning(f"OpenAI token bucket falling back to local budget: {str(e)}")
+                self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+        return self._redis
+
+    async def _try_acquire_redis(self, tokens: int) -> Optional[float]:
+        """Withdraw from the shared buckets; None if Redis is unavailable"""
+        client = await self._get_redis()
+        if client is None:
+            return None
+
+        try:
+            wait_ms = await self._script(
+                keys=[self.REQUEST_BUCKET_KEY, self.TOKEN_BUCKET_KEY],
+                args=[self.requests_per_minute, self.tokens_per_minute, tokens]
+            )
+            return float(wait_ms)
+        except Exception as e:
+            logger.warning(f"OpenAI token bucket Redis error, using local budget: {str(e)}")
+            self._redis = None
+            self._script = None
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+            return None
+
+    async def _try_acquire_local(self, tokens: int) -> float:
+        """Withdraw from this worker's fallback buckets"""
+        if self._local_lock is None:
+            self._local_lock = asyncio.Lock()
+
+        async with self._local_lock:
+            self._local_requests.refill()
+            self._local_tokens.refill()
+            cost = min(tokens, self._local_tokens.capacity)
+            wait_ms = max(self._local_requests.wait_ms(1), self._local_tokens.wait_ms(cost))
+            if wait_ms == 0:
+                self._local_requests.tokens -= 1
+                self._local_tokens.tokens -= cost
+            return wait_ms
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until one request and ``tokens`` estimated tokens fit the budget
+
+        Args:
+            tokens: Estimated prompt plus completion tokens of the call
+
+        Returns:
+            Time spent waiting, in milliseconds
+        """
+        if not self.enabled:
+            return 0.0
+
+        start = time.monotonic()
+        while True:
+            wait_ms = await self._try_acquire_redis(tokens)
+            if wait_ms is None:
+                self._stats["local_fallback_acquisitions"] += 1
+                wait_ms = await self._try_acquire_local(tokens)
+            if wait_ms <= 0:
+                break
+            await asyncio.sleep(min(wait_ms / 1000, self.MAX_SLEEP_SECONDS))
+
+        waited_ms = (time.monotonic() - start) * 1000
+        self._stats["acquisitions"] += 1
+        self._stats["tokens_requested"] += tokens
+        if waited_ms >= 1:
+            self._stats["waited_acquisitions"] += 1
+            self._stats["total_wait_ms"] += waited_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited_ms)
+            logger.debug(f"Waited {waited_ms:.0f}ms for OpenAI budget ({tokens} tokens)")
+        return waited_ms
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get budget configuration and wait time metrics"""
+        acquisitions = self._stats["acquisitions"]
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self._redis is not None else "local",
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            **self._stats,
+            "total_wait_ms": round(self._stats["total_wait_ms"], 1),
+            "max_wait_ms": round(self._stats["max_wait_ms"], 1),
+            "avg_wait_ms": round(self._stats["total_wait_ms"] / acquisitions, 1) if acquisitions else 0.0,
+        }
+
+
+# Shared by every agent call in the process
+openai_token_bucket = OpenAITokenBucket(
+    requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE,
+    fallback_share=settings.OPENAI_RATE_LIMIT_FALLBACK_SHARE,
+    enabled=settings.OPENAI_RATE_LIMIT_ENABLED
+)
@@ -0,0 +1,125 @@
+"""
+Priority lanes for OpenAI agent capacity
+
+Every agent call belongs to a lane: interactive API requests, file
+processing, or background work such as cache warming. The lane travels
+with the asyncio context, so a caller sets it once with ``priority_lane``
+and every match, packed chunk and hedge started underneath inherits it.
+The shared concurrency limiter dequeues waiting calls by smooth weighted
+round robin across lanes, so a large upload cannot starve the UI.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+class Lane:
+    """Lane names"""
+    INTERACTIVE = "interactive"
+    FILE_PROCESSING = "file_processing"
+    BACKGROUND = "background"
+
+
+# Dequeue weights: while all lanes have waiters, interactive calls get 8 of
+# every 12 free slots, file processing 3 and background work 1
+LANE_WEIGHTS: Dict[str, int] = {
+    Lane.INTERACTIVE: 8,
+    Lane.FILE_PROCESSING: 3,
+    Lane.BACKGROUND: 1,
+}
+
+# Calls made outside any priority_lane block are treated as interactive
+_current_lane: ContextVar[str] = ContextVar("hs_match_lane", default=Lane.INTERACTIVE)
+
+
+def current_lane() -> str:
+    """Get the lane of the running context"""
+    return _current_lane.get()
+
+
+@contextmanager
+def priority_lane(lane: Optional[str]) -> Iterator[None]:
+    """
+    Run the enclosed block, and tasks it creates, in the given lane
+
+    Args:
+        lane: Lane name; None keeps the current lane
+
+    Raises:
+        ValueError: If the lane is unknown
+    """
+    if lane is None:
+        yield
+        return
+    if lane not in LANE_WEIGHTS:
+        raise ValueError(f"Unknown priority lane: {lane}")
+
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class WeightedLaneQueue:
+    """Per-lane FIFO queues dequeued by smooth weighted round robin"""
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        """
+        Initialize empty queues
+
+        Args:
+            weights: Relative dequeue weight of each lane
+        """
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self._queues: Dict[str, Deque[Any]] = {lane: deque() for lane in self.weights}
+        self._credit: Dict[str, int] = {lane: 0 for lane in self.weights}
+
+    def push(self, lane: str, item: Any) -> None:
+        self._queues[lane].append(item)
+
+    def remove(self, lane: str, item: Any) -> None:
+        try:
+            self._queues[lane].remove(item)
+        except ValueError:
+            pass
+
+    def depth(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def pop(self, eligible: Callable[[str], bool]) -> Optional[Tuple[str, Any]]:
+        """
+        Take the next item from the lanes allowed to proceed
+
+        Each eligible, non-empty lane earns its weight in credit and the
+        richest lane is served and pays the total, which interleaves lanes
+        in proportion to their weights without bursts.
+
+        Args:
+            eligible: Whether a lane may be served right now
+
+        Returns:
+            Tuple of (lane, item), or None if no eligible lane has items
+        """
+        candidates = [lane for lane, queue in self._queues.items() if queue and eligible(lane)]
+        if not candidates:
+            return None
+
+        total = 0
+        for lane in candidates:
+            self._credit[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(candidates, key=lambda lane: self._credit[lane])
+        self._credit[chosen] -= total
+
+        # Lanes that emptied out start afresh next time
+        for lane, queue in self._queues.items():
+            if not queue and lane != chosen:
+                self._credit[lane] = 0
+
+        return chosen, self._queues[chosen].popleft()
@@ -65,6 +65,18 @@ app.include_router(job_data.router, prefix="/api/v1/processing", tags=["job-data
 app.include_router(processing_workflow.router, prefix="/api/v1/processing", tags=["processing-workflow"])
 
 
+@app.on_event("startup")
+async def preload_hs_matching_agents():
+    """Build HS matching agents eagerly when configured"""
+    if settings.OPENAI_AGENTS_EAGER_INIT:
+        from src.services.hs_matching_service import hs_matching_service
+        try:
+            count = await hs_matching_service.preload_agents()
+            logger.info(f"Preloaded {count} HS matching agents")
+        except Exception as e:
+            logger.warning(f"Failed to preload HS matching agents: {str(e)}")
+
+
 @app.get("/")
 async def root():
     """Root endpoint for health check"""
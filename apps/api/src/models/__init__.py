@@ -6,6 +6,7 @@ from src.models.user import User, UserRole, SubscriptionTier
 from src.models.processing_job import ProcessingJob, ProcessingStatus
 from src.models.hs_code import HSCode
 from src.models.product_match import ProductMatch
+from src.models.classification_result import ClassificationResult
 from src.models.billing_transaction import BillingTransaction, BillingTransactionType, BillingTransactionStatus
 
 __all__ = [
@@ -18,6 +19,7 @@ __all__ = [
     "ProcessingStatus",
     "HSCode",
     "ProductMatch",
+    "ClassificationResult",
     "BillingTransaction",
     "BillingTransactionType",
     "BillingTransactionStatus"
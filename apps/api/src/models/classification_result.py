@@ -0,0 +1,30 @@
+"""
+Durable HS code classification results
+"""
+from sqlalchemy import Column, String, Text, DECIMAL, Index, CheckConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import DateTime
+from sqlalchemy.sql import func
+from src.models.base import Base
+
+
+class ClassificationResult(Base):
+    """Persistent classification result, the tier below the Redis cache"""
+    __tablename__ = "classification_results"
+    
+    description_hash = Column(String(16), primary_key=True)  # Hash of the canonical description
+    country = Column(String(50), primary_key=True)
+    vector_store_version = Column(String(12), primary_key=True)
+    canonical_description = Column(Text, nullable=False)
+    hs_code = Column(String(10), nullable=False)
+    confidence = Column(DECIMAL(3,2), nullable=False)
+    result = Column(JSONB, nullable=False)  # Serialized HSCodeMatchResult
+    source = Column(String(20), default="agent", nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint('confidence >= 0 AND confidence <= 1', name='valid_classification_confidence'),
+        Index('ix_classification_results_hs_code', 'hs_code'),
+    )
@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel, Field
 
 # Request models moved here to avoid circular imports
+from ..core.config import settings
 from ..core.openai_config import HSCodeMatchResult
 
 
@@ -86,6 +87,20 @@ class HSCodeBatchMatchRequestAPI(BaseModel):
     )
 
 
+class HSCodeBatchJobRequestAPI(BaseModel):
+    """API request schema for asynchronous large-batch HS code matching"""
+    products: List[HSCodeBatchProductRequest] = Field(
+        ...,
+        min_items=1,
+        max_items=settings.HS_BATCH_JOB_MAX_ITEMS,
+        description="List of products to match, matched in the background"
+    )
+    country: str = Field(
+        default="default",
+        description="Default country code for all products if not specified individually"
+    )
+
+
 class HSCodeSearchRequest(BaseModel):
     """API request schema for HS code search"""
     query: str = Field(
@@ -125,6 +140,38 @@ class HSCodeBatchMatchResponse(BaseModel):
     successful_matches: int = Field(..., description="Number of successful matches")
 
 
+class HSCodeBatchJobStatus(BaseModel):
+    """Progress of an asynchronous batch matching job"""
+    job_id: str = Field(..., description="Batch job identifier")
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    total_products: int = Field(..., description="Number of products submitted")
+    completed_products: int = Field(..., description="Number of products with a result so far")
+    failed_products: int = Field(..., description="Number of completed products that failed to match")
+    created_at: str = Field(..., description="Job creation timestamp")
+    updated_at: str = Field(..., description="Last progress timestamp")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+
+class HSCodeBatchJobResponse(BaseModel):
+    """API response schema for batch job submission, status and cancellation"""
+    success: bool = Field(..., description="Whether the operation was successful")
+    data: HSCodeBatchJobStatus = Field(..., description="Current job status")
+
+
+class HSCodeBatchJobResultItem(BaseModel):
+    """One finished product of a batch job"""
+    index: int = Field(..., description="Position of the product in the submitted list")
+    result: HSCodeMatchResult = Field(..., description="Matching result")
+
+
+class HSCodeBatchJobResultsResponse(BaseModel):
+    """API response schema for a page of batch job results in completion order"""
+    success: bool = Field(..., description="Whether the results were retrieved")
+    job: HSCodeBatchJobStatus = Field(..., description="Current job status")
+    results: List[HSCodeBatchJobResultItem] = Field(..., description="Results finished since the cursor")
+    next_cursor: int = Field(..., description="Cursor to pass to fetch the next page")
+
+
 class HSCodeSearchResult(BaseModel):
     """HS code search result item"""
     hs_code: str = Field(..., description="HS code identifier")
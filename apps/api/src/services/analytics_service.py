@@ -19,6 +19,7 @@ from sqlalchemy import select, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.database import async_session_maker
+from ..core.openai_config import HSCodeRunMetrics
 from ..models.product_match import ProductMatch
 from ..models.processing_job import ProcessingJob
 from ..models.user import User
@@ -72,6 +73,24 @@ class PerformanceMetrics:
 class HSCodeAnalyticsService:
     """Service for tracking and analyzing HS code matching operations"""
     
+    MAX_AGENT_RUN_SAMPLES = 10000
+    
+    # Agent run fields summarized per country and per lane
+    AGENT_RUN_FIELDS = [
+        "model_requests",
+        "tool_calls",
+        "input_tokens",
+        "cached_input_tokens",
+        "output_tokens",
+        "reasoning_tokens",
+        "total_tokens",
+        "tokens_per_item",
+        "budget_wait_ms",
+        "queue_wait_ms",
+        "agent_ms",
+        "total_ms",
+    ]
+    
     def __init__(self):
         """Initialize the analytics service"""
         self._cache_service = None
@@ -79,6 +98,7 @@ class HSCodeAnalyticsService:
             "recent_matches": [],  # Store recent match results for real-time analytics
             "performance_samples": [],  # Store performance samples
             "api_call_timestamps": [],  # Store API call timestamps for rate calculation
+            "agent_runs": [],  # Token usage and phase timings of agent runs
         }
         logger.info("HSCodeAnalyticsService initialized")
     
@@ -166,6 +186,77 @@ class HSCodeAnalyticsService:
         except Exception as e:
             logger.error(f"Failed to record matching operation: {str(e)}")
     
+    def record_agent_run(self, run_metrics: HSCodeRunMetrics) -> None:
+        """
+        Record the token usage and phase timings of one agent run
+        
+        Args:
+            run_metrics: Metrics attached to the run's match result(s); a packed
+                run is recorded once for all of its products
+        """
+        sample = run_metrics.model_dump()
+        sample["timestamp"] = time.time()
+        sample["tokens_per_item"] = run_metrics.total_tokens / max(1, run_metrics.packed_items)
+        
+        agent_runs = self._in_memory_metrics["agent_runs"]
+        agent_runs.append(sample)
+        if len(agent_runs) > self.MAX_AGENT_RUN_SAMPLES:
+            self._in_memory_metrics["agent_runs"] = agent_runs[-self.MAX_AGENT_RUN_SAMPLES:]
+    
+    def get_agent_run_metrics(self, minutes: int = 60) -> Dict[str, Any]:
+        """
+        Get token, tool-call and phase timing distributions of recent agent runs
+        
+        Args:
+            minutes: Number of minutes to analyze
+            
+        Returns:
+            Distributions (avg, p50, p95, max) overall, per country and per lane,
+            plus the share of run time spent in each phase
+        """
+        cutoff_timestamp = time.time() - minutes * 60
+        samples = [s for s in self._in_memory_metrics["agent_runs"] if s["timestamp"] >= cutoff_timestamp]
+        
+        by_country: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        by_lane: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for sample in samples:
+            by_country[sample["country"]].append(sample)
+            by_lane[sample["lane"]].append(sample)
+        
+        return {
+            "overall": self._summarize_agent_runs(samples),
+            "by_country": {country: self._summarize_agent_runs(runs) for country, runs in by_country.items()},
+            "by_lane": {lane: self._summarize_agent_runs(runs) for lane, runs in by_lane.items()},
+        }
+    
+    def _summarize_agent_runs(self, samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summarize a group of agent run samples"""
+        summary: Dict[str, Any] = {
+            "runs": len(samples),
+            "products": sum(s["packed_items"] for s in samples),
+        }
+        if not samples:
+            return summary
+        
+        n = len(samples)
+        for field_name in self.AGENT_RUN_FIELDS:
+            values = sorted(s[field_name] for s in samples)
+            summary[field_name] = {
+                "avg": round(sum(values) / n, 1),
+                "p50": values[int(n * 0.5)],
+                "p95": values[min(n - 1, int(n * 0.95))],
+                "max": values[-1],
+            }
+        
+        # Where the time goes: budget wait, slot wait or the agent itself
+        phase_totals = {phase: sum(s[phase] for s in samples) for phase in ("budget_wait_ms", "queue_wait_ms", "agent_ms")}
+        total = sum(phase_totals.values())
+        summary["phase_share"] = {
+            phase: round(value / total, 3) if total else 0.0
+            for phase, value in phase_totals.items()
+        }
+        return summary
+    
     async def get_matching_metrics(
         self, 
         days: int = 7,
@@ -710,7 +801,8 @@ class HSCodeAnalyticsService:
                 "memory_usage": {
                     "recent_matches_count": len(self._in_memory_metrics["recent_matches"]),
                     "performance_samples_count": len(self._in_memory_metrics["performance_samples"]),
-                    "api_call_timestamps_count": len(self._in_memory_metrics["api_call_timestamps"])
+                    "api_call_timestamps_count": len(self._in_memory_metrics["api_call_timestamps"]),
+                    "agent_runs_count": len(self._in_memory_metrics["agent_runs"])
                 }
             }
             
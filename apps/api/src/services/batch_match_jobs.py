@@ -0,0 +1,525 @@
+"""
+Asynchronous large-batch HS code matching jobs
+
+Batches above ``HSCodeMatchingService.BATCH_SIZE_LIMIT`` are accepted as
+background jobs. A job is split into chunks of at most that size, and each
+chunk runs through ``iter_batch_matches``, so every agent call still goes
+through the shared adaptive concurrency limit and the OpenAI token budget.
+Results are appended in completion order as they finish, which lets
+clients page or stream partial results while the job runs.
+
+Job state and results live in Redis so any worker can answer polls. The
+worker running a job keeps results in memory only once a write to Redis
+fails or Redis is unavailable; from then on that job's later results stay
+local, so the Redis list remains a prefix of the completion order. Local
+copies of finished jobs are pruned whenever jobs are submitted or read. The
+owning worker refreshes a heartbeat on the job, and other workers report a
+job whose heartbeat stopped as failed. A cancel sent to another worker
+moves a queued or running job to "cancelling" with a check-and-set, so it
+never overwrites a final status; the owner checks for it before the job
+starts and at every flush.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from ..core.config import settings
+from ..core.openai_config import HSCodeMatchResult
+from ..core.priority_lanes import Lane, priority_lane
+from .hs_matching_service import hs_matching_service
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..schemas.hs_matching import HSCodeMatchRequest
+
+
+logger = logging.getLogger(__name__)
+
+
+class _JobCancelled(Exception):
+    """Raised inside a running job when another worker requested cancellation"""
+
+
+class BatchMatchJobManager:
+    """Runs large batch matching jobs in the background and serves their results"""
+
+    KEY_PREFIX = "xm_port:batch_job"
+    CHUNK_SIZE = hs_matching_service.BATCH_SIZE_LIMIT
+    CHUNKS_IN_FLIGHT = 2  # Keeps the limiter busy while a chunk waits on its slowest item
+    FLUSH_SIZE = 25  # Results appended per write
+    JOB_TTL_SECONDS = 24 * 3600
+    STREAM_POLL_SECONDS = 1.0
+    REDIS_RETRY_SECONDS = 30
+    HEARTBEAT_SECONDS = 15
+    STALE_SECONDS = 90  # Heartbeat age after which the owning worker is presumed dead
+
+    FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+    # Sets status, error and updated_at (ARGV[1..3]) only while the job is in
+    # one of the statuses ARGV[4..]; returns the status the job ends up with
+    TRANSITION_SCRIPT = """
+    local status = redis.call("hget", KEYS[1], "status")
+    for i = 4, #ARGV do
+        if status == ARGV[i] then
+            redis.call("hset", KEYS[1], "status", ARGV[1], "error", ARGV[2], "updated_at", ARGV[3])
+            return ARGV[1]
+        end
+    end
+    return status
+    """
+
+    def __init__(self, max_items: int, max_running_jobs: int):
+        """
+        Initialize the job manager
+
+        Args:
+            max_items: Largest accepted job
+            max_running_jobs: Jobs matched at once in this worker
+        """
+        self.max_items = max_items
+        self.max_running_jobs = max_running_jobs
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._run_slots: Optional[asyncio.Semaphore] = None
+        self._redis = None
+        self._redis_retry_at = 0.0
+
+    async def _get_redis(self):
+        """Get the Redis client, reconnecting at most every REDIS_RETRY_SECONDS"""
+        if self._redis is not None or time.monotonic() < self._redis_retry_at:
+            return self._redis
+
+        try:
+            client = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=1,
+                socket_timeout=2
+            )
+            await client.ping()
+            self._redis = client
+        except Exception as e:
+            logger.warning(f"Batch jobs running without Redis, results stay on this worker: {str(e)}")
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+        return self._redis
+
+    def _drop_redis(self, error: Exception) -> None:
+        logger.warning(f"Batch job Redis error: {str(error)}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+    def _results_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}:results"
+
+    async def submit(self, user_id: str, requests: List["HSCodeMatchRequest"]) -> Dict[str, Any]:
+        """
+        Accept a batch job and start matching it in the background
+
+        Args:
+            user_id: Owner of the job
+            requests: Products to match, in the order results are indexed
+
+        Returns:
+            Job status
+
+        Raises:
+            ValueError: If the job is empty or too large
+        """
+        if not requests:
+            raise ValueError("Batch job has no products")
+        if len(requests) > self.max_items:
+            raise ValueError(f"Batch job size {len(requests)} exceeds limit of {self.max_items}")
+
+        self._prune_local_jobs()
+        now = datetime.utcnow().isoformat()
+        job_id = uuid.uuid4().hex
+        meta = {
+            "job_id": job_id,
+            "user_id": str(user_id),
+            "status": "queued",
+            "total_products": len(requests),
+            "completed_products": 0,
+            "failed_products": 0,
+            "created_at": now,
+            "updated_at": now,
+            "error": "",
+        }
+        # Results past the first ``in_redis`` are held here once Redis has failed for the job
+        self._jobs[job_id] = {"meta": meta, "results": [], "in_redis": 0, "local_only": False, "finished_at": None}
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.hset(self._job_key(job_id), mapping={**meta, "heartbeat_at": time.time()})
+                    pipe.expire(self._job_key(job_id), self.JOB_TTL_SECONDS)
+                    await pipe.execute()
+            except Exception as e:
+                self._drop_redis(e)
+
+        # The task inherits the lane, so its agent calls queue behind interactive requests
+        with priority_lane(Lane.FILE_PROCESSING):
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id, list(requests)))
+        logger.info(f"Batch job {job_id} queued with {len(requests)} products for user {user_id}")
+        return dict(meta)
+
+    async def _run(self, job_id: str, requests: List["HSCodeMatchRequest"]) -> None:
+        """Match a job chunk by chunk once a run slot is free"""
+        if self._run_slots is None:
+            self._run_slots = asyncio.Semaphore(self.max_running_jobs)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            async with self._run_slots:
+                # Another worker may have requested cancellation while the job was queued
+                if await self._set_status(job_id, "running", only_from=("queued",)) == "cancelling":
+                    raise _JobCancelled()
+                await self._run_chunks(job_id, requests)
+                await self._set_status(job_id, "completed")
+                logger.info(f"Batch job {job_id} completed")
+        except (asyncio.CancelledError, _JobCancelled):
+            await self._set_status(job_id, "cancelled")
+            logger.info(f"Batch job {job_id} cancelled")
+        except Exception as e:
+            await self._set_status(job_id, "failed", error=str(e))
+            logger.error(f"Batch job {job_id} failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            self._tasks.pop(job_id, None)
+            self._jobs[job_id]["finished_at"] = time.monotonic()
+
+    async def _run_chunks(self, job_id: str, requests: List["HSCodeMatchRequest"]) -> None:
+        """Match chunks CHUNKS_IN_FLIGHT at a time; the first error stops every chunk"""
+        starts = iter(range(0, len(requests), self.CHUNK_SIZE))
+
+        async def run_chunks():
+            # Workers share one iterator, so each chunk is taken once
+            for start in starts:
+                await self._run_chunk(job_id, requests[start:start + self.CHUNK_SIZE], start)
+
+        workers = min(self.CHUNKS_IN_FLIGHT, -(-len(requests) // self.CHUNK_SIZE))
+        try:
+            # The group cancels and awaits the other workers when one fails,
+            # so no chunk keeps spending agent budget on a cancelled job
+            async with asyncio.TaskGroup() as group:
+                for _ in range(workers):
+                    group.create_task(run_chunks())
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Show other workers that this worker still owns the job"""
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            client = await self._get_redis()
+            if client is None:
+                continue
+            try:
+                await client.hset(self._job_key(job_id), "heartbeat_at", time.time())
+            except Exception as e:
+                self._drop_redis(e)
+
+    async def _run_chunk(self, job_id: str, requests: List["HSCodeMatchRequest"], offset: int) -> None:
+        """Match one chunk, appending results every FLUSH_SIZE completions"""
+        buffer: List[Tuple[int, HSCodeMatchResult]] = []
+        stream = hs_matching_service.iter_batch_matches(requests)
+        try:
+            async for index, result in stream:
+                buffer.append((offset + index, result))
+                if len(buffer) >= self.FLUSH_SIZE:
+                    await self._append_results(job_id, buffer)
+                    buffer = []
+            await self._append_results(job_id, buffer)
+        finally:
+            await stream.aclose()
+
+    async def _append_results(self, job_id: str, results: List[Tuple[int, HSCodeMatchResult]]) -> None:
+        """Record finished products in Redis, or locally once Redis has failed for the job"""
+        if not results:
+            return
+
+        job = self._jobs[job_id]
+        items = [{"index": index, "result": result.model_dump(mode="json")} for index, result in results]
+        failed = sum(1 for _, result in results if result.error_kind is not None)
+        job["meta"]["completed_products"] += len(items)
+        job["meta"]["failed_products"] += failed
+        job["meta"]["updated_at"] = datetime.utcnow().isoformat()
+
+        client = None if job["local_only"] else await self._get_redis()
+        if client is None:
+            job["local_only"] = True
+            job["results"].extend(items)
+            await self._raise_if_cancelling(job_id)
+            return
+
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.rpush(self._results_key(job_id), *[json.dumps(item) for item in items])
+                pipe.expire(self._results_key(job_id), self.JOB_TTL_SECONDS)
+                pipe.hincrby(self._job_key(job_id), "completed_products", len(items))
+                pipe.hincrby(self._job_key(job_id), "failed_products", failed)
+                pipe.hset(self._job_key(job_id), "updated_at", job["meta"]["updated_at"])
+                pipe.hget(self._job_key(job_id), "status")
+                replies = await pipe.execute()
+        except Exception as e:
+            self._drop_redis(e)
+            job["local_only"] = True
+            job["results"].extend(items)
+            await self._raise_if_cancelling(job_id)
+            return
+        job["in_redis"] += len(items)
+
+        # Cancellation requested through another worker
+        if replies[-1] == "cancelling":
+            raise _JobCancelled()
+
+    async def _raise_if_cancelling(self, job_id: str) -> None:
+        """Stop a job whose results stay local once another worker requested cancellation"""
+        client = await self._get_redis()
+        if client is None:
+            return
+        try:
+            status = await client.hget(self._job_key(job_id), "status")
+        except Exception as e:
+            self._drop_redis(e)
+            return
+        if status == "cancelling":
+            raise _JobCancelled()
+
+    async def _set_status(
+        self,
+        job_id: str,
+        status: str,
+        error: str = "",
+        only_from: Optional[Tuple[str, ...]] = None
+    ) -> Optional[str]:
+        """
+        Record a job's status on this worker and in Redis
+
+        Args:
+            job_id: Batch job identifier
+            status: New status
+            error: Error message for failed jobs
+            only_from: Change the status only while the job is in one of these
+
+        Returns:
+            The job's status in Redis afterwards, or None if Redis is unavailable
+        """
+        updated_at = datetime.utcnow().isoformat()
+        stored = None
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                if only_from is None:
+                    await client.hset(
+                        self._job_key(job_id),
+                        mapping={"status": status, "error": error, "updated_at": updated_at}
+                    )
+                    stored = status
+                else:
+                    stored = await client.eval(
+                        self.TRANSITION_SCRIPT, 1, self._job_key(job_id), status, error, updated_at, *only_from
+                    )
+            except Exception as e:
+                self._drop_redis(e)
+
+        if stored in (None, status):
+            meta = self._jobs[job_id]["meta"]
+            meta["status"] = status
+            meta["error"] = error
+            meta["updated_at"] = updated_at
+        return stored
+
+    async def get_job(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status
+
+        Args:
+            job_id: Batch job identifier
+            user_id: Requesting user; other users' jobs are not visible
+
+        Returns:
+            Job status, or None if unknown, expired or owned by someone else
+        """
+        self._prune_local_jobs()
+        meta = None
+        if job_id in self._jobs:
+            meta = dict(self._jobs[job_id]["meta"])
+        else:
+            client = await self._get_redis()
+            if client is not None:
+                try:
+                    stored = await client.hgetall(self._job_key(job_id))
+                except Exception as e:
+                    self._drop_redis(e)
+                    stored = None
+                if stored:
+                    meta = dict(stored)
+                    for field in ("total_products", "completed_products", "failed_products"):
+                        meta[field] = int(meta.get(field, 0))
+                    heartbeat_at = meta.pop("heartbeat_at", None)
+                    if heartbeat_at:
+                        await self._fail_if_abandoned(job_id, meta, float(heartbeat_at))
+
+        if meta is None or meta.get("user_id") != str(user_id):
+            return None
+        return meta
+
+    async def _fail_if_abandoned(self, job_id: str, meta: Dict[str, Any], heartbeat_at: float) -> None:
+        """Mark a job failed when the worker running it stopped sending heartbeats"""
+        if meta["status"] in self.FINAL_STATUSES or time.time() - heartbeat_at < self.STALE_SECONDS:
+            return
+
+        meta["status"] = "failed"
+        meta["error"] = "The worker running this job stopped"
+        logger.warning(f"Batch job {job_id} abandoned by its worker, marking it failed")
+        client = await self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.hset(self._job_key(job_id), mapping={"status": meta["status"], "error": meta["error"]})
+        except Exception as e:
+            self._drop_redis(e)
+
+    async def get_results(
+        self,
+        job_id: str,
+        user_id: str,
+        cursor: int = 0,
+        limit: int = 1000
+    ) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]], int]]:
+        """
+        Get results finished since a cursor, in completion order
+
+        Args:
+            job_id: Batch job identifier
+            user_id: Requesting user
+            cursor: Number of results already read
+            limit: Maximum results to return
+
+        Returns:
+            Tuple of job status, results and next cursor, or None if the job is not visible
+        """
+        meta = await self.get_job(job_id, user_id)
+        if meta is None:
+            return None
+
+        job = self._jobs.get(job_id)
+        in_redis = job["in_redis"] if job is not None else None
+        items = []
+        if in_redis is None or cursor < in_redis:
+            stop = cursor + limit if in_redis is None else min(cursor + limit, in_redis)
+            items = await self._read_redis_results(job_id, cursor, stop)
+        if job is not None and cursor + len(items) >= in_redis:
+            start = cursor + len(items) - in_redis
+            items += job["results"][start:start + limit - len(items)]
+
+        return meta, items, cursor + len(items)
+
+    async def _read_redis_results(self, job_id: str, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Read results ``start`` to ``stop`` (exclusive) from Redis; empty if it is unavailable"""
+        client = await self._get_redis()
+        if client is None:
+            return []
+        try:
+            raw = await client.lrange(self._results_key(job_id), start, stop - 1)
+        except Exception as e:
+            self._drop_redis(e)
+            return []
+        return [json.loads(value) for value in raw]
+
+    async def iter_results(self, job_id: str, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every result of a job as it finishes, until the job ends
+
+        Args:
+            job_id: Batch job identifier
+            user_id: Requesting user
+        """
+        cursor = 0
+        while True:
+            page = await self.get_results(job_id, user_id, cursor)
+            if page is None:
+                return
+            meta, items, cursor = page
+            for item in items:
+                yield item
+            if not items:
+                if meta["status"] in self.FINAL_STATUSES:
+                    return
+                await asyncio.sleep(self.STREAM_POLL_SECONDS)
+
+    async def cancel(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job; results finished so far are kept
+
+        Args:
+            job_id: Batch job identifier
+            user_id: Requesting user
+
+        Returns:
+            Job status, or None if the job is not visible
+        """
+        meta = await self.get_job(job_id, user_id)
+        if meta is None or meta["status"] in self.FINAL_STATUSES:
+            return meta
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return await self.get_job(job_id, user_id)
+
+        # Running on another worker, which checks for this before it starts and
+        # at its next flush. A job that finished meanwhile keeps its final status.
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                stored = await client.eval(
+                    self.TRANSITION_SCRIPT, 1, self._job_key(job_id),
+                    "cancelling", "", datetime.utcnow().isoformat(), "queued", "running"
+                )
+                if stored is not None:
+                    meta["status"] = stored
+            except Exception as e:
+                self._drop_redis(e)
+        return meta
+
+    def _prune_local_jobs(self) -> None:
+        """Forget local copies of jobs that finished more than JOB_TTL_SECONDS ago"""
+        cutoff = time.monotonic() - self.JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get job counts for health output"""
+        self._prune_local_jobs()
+        statuses = [job["meta"]["status"] for job in self._jobs.values()]
+        return {
+            "running_jobs": statuses.count("running"),
+            "queued_jobs": statuses.count("queued"),
+            "max_running_jobs": self.max_running_jobs,
+            "max_items": self.max_items,
+            "redis_available": self._redis is not None,
+        }
+
+
+# Global batch job manager instance
+batch_match_jobs = BatchMatchJobManager(
+    max_items=settings.HS_BATCH_JOB_MAX_ITEMS,
+    max_running_jobs=settings.HS_BATCH_JOB_MAX_RUNNING
+)
@@ -0,0 +1,124 @@
+"""
+Compact encoding of cached HS code match results
+
+Cached results used to be stored as full ``model_dump_json()`` text, then
+decoded with ``json.loads`` plus ``HSCodeMatchResult(**data)`` on every hit. Most of an entry is agent-written
+reasoning repeated across the primary match and its alternatives, which
+compresses well. Payloads are stored as:
+
+    {...}                 JSON without default fields, below HS_CACHE_COMPRESS_MIN_BYTES
+    1z|<base64 zlib>      the same JSON, compressed, behind a version header
+    1s<epoch>|<payload>   either of the above with a soft expiry time
+
+The Redis pool decodes responses as UTF-8, so payloads stay text. Hits are
+decoded straight from bytes by pydantic-core (``model_validate_json``); in
+pydantic 2 that is faster than ``json.loads`` followed by either validation
+or ``model_construct``. Entries written before the codec are plain JSON and
+are read by the same path, so the format can be rolled out with live data.
+"""
+
+import zlib
+import base64
+from typing import Optional, Tuple, Union
+
+from ..core.config import settings
+from ..core.openai_config import HSCodeMatchResult
+
+
+CODEC_VERSION = "1"
+COMPRESSED_HEADER = f"{CODEC_VERSION}z|"
+SOFT_EXPIRY_PREFIX = f"{CODEC_VERSION}s"
+
+# Cache-hit markers describe one read, not the entry (run metrics are never dumped)
+PER_READ_FIELDS = {"approximate_cache_hit", "cache_similarity"}
+
+
+class CacheCodecError(ValueError):
+    """Raised for cache payloads in an unknown format"""
+
+
+def _pack(data: bytes, compress_min_bytes: Optional[int] = None) -> str:
+    """Compress JSON payloads above the threshold"""
+    if compress_min_bytes is None:
+        compress_min_bytes = settings.HS_CACHE_COMPRESS_MIN_BYTES
+
+    if compress_min_bytes and len(data) >= compress_min_bytes:
+        packed = base64.b64encode(zlib.compress(data)).decode("ascii")
+        # Short or already dense payloads can grow after base64
+        if len(packed) + len(COMPRESSED_HEADER) < len(data):
+            return COMPRESSED_HEADER + packed
+    return data.decode("utf-8")
+
+
+def _unpack(payload: Union[str, bytes]) -> Union[str, bytes]:
+    """Get the JSON text of a payload in any supported format"""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    if payload[:1] == "{":
+        return payload
+    if payload.startswith(COMPRESSED_HEADER):
+        return zlib.decompress(base64.b64decode(payload[len(COMPRESSED_HEADER):]))
+    raise CacheCodecError(f"Unsupported cache payload header: {payload[:8]!r}")
+
+
+def encode_match_result(result: HSCodeMatchResult, compact: Optional[bool] = None) -> str:
+    """
+    Encode a match result for Redis
+
+    Args:
+        result: Match result to cache
+        compact: Use the compact format; defaults to HS_CACHE_COMPACT_CODEC_ENABLED
+
+    Returns:
+        Cache payload
+    """
+    if compact is None:
+        compact = settings.HS_CACHE_COMPACT_CODEC_ENABLED
+    if not compact:
+        return result.model_dump_json()
+    return _pack(result.model_dump_json(exclude=PER_READ_FIELDS, exclude_defaults=True).encode("utf-8"))
+
+
+def decode_match_result(payload: Union[str, bytes]) -> HSCodeMatchResult:
+    """
+    Decode a cached match result in any supported format
+
+    Raises:
+        CacheCodecError: If the payload has an unknown format
+    """
+    return decode_cache_entry(payload)[0]
+
+
+def encode_cache_entry(result: HSCodeMatchResult, soft_expires_at: float) -> str:
+    """
+    Encode a match result together with the time it should be refreshed
+
+    The envelope wraps the payload in whichever format HS_CACHE_COMPACT_CODEC_ENABLED
+    selects, so soft expiry does not depend on the compact codec being enabled.
+
+    Args:
+        result: Match result to cache
+        soft_expires_at: Unix time after which the entry is served stale
+    """
+    return f"{SOFT_EXPIRY_PREFIX}{int(soft_expires_at)}|{encode_match_result(result)}"
+
+
+def decode_cache_entry(payload: Union[str, bytes]) -> Tuple[HSCodeMatchResult, Optional[float]]:
+    """
+    Decode a cached match result and its soft expiry time, if it has one
+
+    Raises:
+        CacheCodecError: If the payload has an unknown format
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+
+    soft_expires_at = None
+    if payload.startswith(SOFT_EXPIRY_PREFIX):
+        header, _, payload = payload.partition("|")
+        try:
+            soft_expires_at = float(header[len(SOFT_EXPIRY_PREFIX):])
+        except ValueError:
+            raise CacheCodecError(f"Invalid soft expiry header: {header!r}")
+    return HSCodeMatchResult.model_validate_json(_unpack(payload)), soft_expires_at
+
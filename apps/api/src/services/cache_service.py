@@ -5,10 +5,17 @@ This service provides caching functionality for frequently matched HS codes
 to improve performance and reduce OpenAI API costs.
 """
 
+import re
 import json
+import math
+import time
+import uuid
+import random
+import asyncio
 import logging
-import hashlib
-from typing import Optional, List, Dict, Any
+from fnmatch import fnmatchcase
+from typing import Optional, List, Dict, Any, Tuple, Set, Callable, Awaitable
+from collections import Counter
 from datetime import timedelta
 
 import redis.asyncio as redis
@@ -16,6 +23,17 @@ from redis.asyncio import Redis
 
 from ..core.config import settings
 from ..core.openai_config import HSCodeMatchResult, HSCodeResult
+from ..core.priority_lanes import Lane, priority_lane
+from .local_cache import LocalTTLCache
+from .cache_codec import (
+    decode_cache_entry,
+    decode_match_result,
+    encode_cache_entry,
+    encode_match_result
+)
+from .description_canonicalizer import canonicalize_description, description_hash
+from .near_duplicate_index import NearDuplicateIndex
+from .classification_store import classification_store
 
 
 logger = logging.getLogger(__name__)
@@ -27,15 +45,57 @@ class CacheService:
     # Cache configuration - Optimized for performance
     DEFAULT_TTL_HOURS = 48  # Increased to 48 hours for better cache hit rate
     FREQUENT_MATCH_TTL_HOURS = 336  # 14 days for frequently accessed matches
-    BATCH_CACHE_TTL_HOURS = 24  # 24 hours for batch results
     HOT_CACHE_TTL_HOURS = 720  # 30 days for very high confidence matches
     
     # Cache keys
     CACHE_KEY_PREFIX = "xm_port:hs_match"
     STATS_KEY_PREFIX = "xm_port:hs_stats"
     WARMING_KEY_PREFIX = "xm_port:hs_warming"
+    INFLIGHT_KEY_PREFIX = "xm_port:hs_inflight"
     
-    # Warming strategies - Extended for better coverage
+    # Resumable data-driven warming: progress checkpoint, the lease of the
+    # worker running it, and warmed keys scored by the time they were warmed
+    WARMING_STATE_KEY = f"{WARMING_KEY_PREFIX}:state"
+    WARMING_LEASE_KEY = f"{WARMING_KEY_PREFIX}:lease"
+    WARMED_KEYS_KEY = f"{WARMING_KEY_PREFIX}:warmed"
+    WARMING_RETENTION = timedelta(days=7)
+    IDLETIME_SLACK_SECONDS = 2  # Redis tracks access times at a one second resolution
+    
+    # Key generations per country, as one hash; bumping a generation moves the
+    # country to fresh keys and leaves the old entries to expire on their TTLs
+    GENERATIONS_KEY = "xm_port:hs_generations"
+    ALL_COUNTRIES = "*"  # Generation field that namespaces every country
+    GENERATION_SEGMENT = re.compile(r"^g\d+\.\d+:")
+    
+    # Live entries as sorted sets of cache keys scored by expiry time, and HS
+    # code popularity as a sorted set, so statistics never walk the keyspace
+    ENTRIES_KEY = f"{STATS_KEY_PREFIX}:entries"
+    POPULAR_HS_CODES_KEY = f"{STATS_KEY_PREFIX}:popular_hs_codes"
+    STATS_TTL = timedelta(days=30)
+    
+    # Incremental invalidation
+    SCAN_COUNT = 1000
+    UNLINK_BATCH_SIZE = 500
+    
+    # Pub/sub channel used to drop L1 entries in every worker
+    INVALIDATION_CHANNEL = "xm_port:hs_cache_invalidate"
+    
+    # Stale-while-revalidate
+    MIN_RECOMPUTE_SECONDS = 1.0  # Floor for the recompute time that scales early refreshes
+    
+    # Cross-worker in-flight locks
+    INFLIGHT_LOCK_TTL_SECONDS = 35  # Slightly above the agent timeout
+    INFLIGHT_POLL_INTERVAL_SECONDS = 0.25
+    
+    # Deletes the lock only if this worker still owns it
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+    
+    # Seed list the cache warmer falls back to when there is no match history
     COMMON_PRODUCTS = [
         "wheat flour",
         "cotton fabric",
@@ -63,6 +123,45 @@ class CacheService:
         """Initialize Redis connection"""
         self._redis: Optional[Redis] = None
         self._connection_pool = None
+        self._lock_tokens: Dict[str, str] = {}
+        
+        # In-process L1 in front of Redis (L2)
+        self._local_cache = LocalTTLCache(max_entries=settings.HS_CACHE_L1_MAX_ENTRIES)
+        self._l2_stats = {"hits": 0, "misses": 0}
+        
+        # Near-duplicate lookups for descriptions that miss the exact key
+        self._near_duplicates: Optional[NearDuplicateIndex] = None
+        if settings.HS_CACHE_NEAR_DUP_ENABLED:
+            self._near_duplicates = NearDuplicateIndex(
+                threshold=settings.HS_CACHE_NEAR_DUP_THRESHOLD,
+                max_entries=settings.HS_CACHE_NEAR_DUP_MAX_ENTRIES
+            )
+        self._approximate_hits = 0
+        
+        # Durable Postgres store below Redis (L3)
+        self._classification_store = classification_store
+        self._pubsub = None
+        
+        # Warming checkpoint while Redis is unavailable
+        self._warming_state: Optional[Dict[str, Any]] = None
+        
+        # Local copy of the key generations in Redis
+        self._generations: Dict[str, int] = {}
+        self._generations_loaded_at = 0.0
+        
+        # Background refreshes of stale entries, registered by the matching service
+        self._refresh_handler: Optional[Callable[[str, str], Awaitable[HSCodeMatchResult]]] = None
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._refresh_stats = {
+            "stale_hits": 0,
+            "early_refreshes": 0,
+            "refreshes_started": 0,
+            "refreshes_completed": 0,
+            "refreshes_failed": 0,
+            "refreshes_skipped": 0
+        }
+        self._invalidation_task: Optional[asyncio.Task] = None
         
     async def initialize(self) -> bool:
         """Initialize Redis connection with fallback handling"""
@@ -90,6 +189,9 @@ class CacheService:
             # Test connection
             await self._redis.ping()
             logger.info("Redis cache service initialized successfully")
+            
+            # Listen for L1 invalidations published by other workers
+            await self._start_invalidation_listener()
             return True
             
         except Exception as e:
@@ -99,29 +201,132 @@ class CacheService:
     
     async def close(self):
         """Close Redis connection and cleanup resources"""
+        await self._classification_store.flush()
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
+        if self._pubsub:
+            try:
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing invalidation subscription: {str(e)}")
+            self._pubsub = None
         if self._redis:
             await self._redis.close()
         if self._connection_pool:
             await self._connection_pool.disconnect()
         logger.info("Redis cache service closed")
     
+    async def _start_invalidation_listener(self):
+        """Subscribe to the invalidation channel and start the listener task"""
+        try:
+            self._pubsub = self._redis.pubsub()
+            await self._pubsub.subscribe(self.INVALIDATION_CHANNEL)
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+        except Exception as e:
+            logger.warning(f"L1 cache invalidation listener unavailable: {str(e)}")
+            self._pubsub = None
+    
+    async def _listen_for_invalidations(self):
+        """Apply invalidation patterns published by any worker to the local L1"""
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                # Generation bumps are published as patterns too
+                self._generations_loaded_at = 0.0
+                removed = self._local_cache.invalidate_pattern(message["data"])
+                if self._near_duplicates is not None:
+                    self._near_duplicates.invalidate_pattern(message["data"])
+                logger.debug(f"Dropped {removed} L1 entries for pattern: {message['data']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Without the listener the L1 could serve invalidated entries
+            logger.error(f"L1 cache invalidation listener stopped: {str(e)}")
+            self._local_cache.clear()
+        finally:
+            self._invalidation_task = None
+    
+    def _generation_namespace(self, country: str) -> str:
+        """Key segment for the country's current generation; empty until one is bumped"""
+        all_generation = self._generations.get(self.ALL_COUNTRIES, 0)
+        country_generation = self._generations.get(country, 0)
+        if not all_generation and not country_generation:
+            return ""
+        return f"g{all_generation}.{country_generation}:"
+    
     def _generate_cache_key(self, product_description: str, country: str = "default") -> str:
         """Generate cache key for product description"""
-        # Create hash of description for consistent key generation
-        description_hash = hashlib.sha256(
-            f"{product_description.lower().strip()}:{country}".encode()
-        ).hexdigest()[:16]
-        
-        return f"{self.CACHE_KEY_PREFIX}:{country}:{description_hash}"
+        # Hash the canonical form so that reordered, re-cased or transliterated
+        # spellings of the same description share a key
+        namespace = self._generation_namespace(country)
+        return f"{self.CACHE_KEY_PREFIX}:{country}:{namespace}{description_hash(product_description, country)}"
     
-    def _generate_batch_cache_key(self, request_hash: str) -> str:
-        """Generate cache key for batch requests"""
-        return f"{self.CACHE_KEY_PREFIX}:batch:{request_hash}"
+    def _generate_negative_key(self, product_description: str, country: str = "default") -> str:
+        """Generate cache key for a failed match, under the country's match keys"""
+        namespace = self._generation_namespace(country)
+        return f"{self.CACHE_KEY_PREFIX}:{country}:{namespace}negative:{description_hash(product_description, country)}"
     
     def _generate_stats_key(self, metric: str) -> str:
         """Generate cache key for statistics"""
         return f"{self.STATS_KEY_PREFIX}:{metric}"
     
+    async def _refresh_generations(self):
+        """Reload key generations from Redis once the local copy is older than the refresh interval"""
+        if not self._redis:
+            return
+        if time.monotonic() - self._generations_loaded_at < settings.HS_CACHE_GENERATION_REFRESH_SECONDS:
+            return
+        
+        try:
+            generations = await self._redis.hgetall(self.GENERATIONS_KEY)
+            self._generations = {field: int(value) for field, value in generations.items()}
+        except Exception as e:
+            logger.error(f"Error loading cache generations: {str(e)}")
+        # Also after a failure, so that lookups don't all wait on a struggling Redis
+        self._generations_loaded_at = time.monotonic()
+    
+    async def get_cache_generations(self) -> Dict[str, int]:
+        """Get the current key generation of every bumped country ("*" for all countries)"""
+        await self._refresh_generations()
+        return dict(self._generations)
+    
+    async def bump_cache_generation(self, country: Optional[str] = None) -> int:
+        """
+        Invalidate every cached match of a country, or of all countries, at once
+        
+        Keys embed the generation, so bumping it moves lookups to fresh keys
+        without touching the old entries, which expire on their own TTLs.
+        Workers drop their L1 entries and reload generations through the
+        invalidation channel. Durable rows are deleted, as they would
+        otherwise be promoted into the new generation.
+        
+        Args:
+            country: Country to invalidate, every country if None
+            
+        Returns:
+            The new generation
+        """
+        field = country or self.ALL_COUNTRIES
+        if self._redis:
+            # Fails loudly: a bump only other workers can't see is no bump
+            generation = await self._redis.hincrby(self.GENERATIONS_KEY, field, 1)
+        else:
+            generation = self._generations.get(field, 0) + 1
+        self._generations[field] = generation
+        
+        pattern = f"{self.CACHE_KEY_PREFIX}:{country}:*" if country else f"{self.CACHE_KEY_PREFIX}:*"
+        self._local_cache.invalidate_pattern(pattern)
+        if self._near_duplicates is not None:
+            self._near_duplicates.invalidate_pattern(pattern)
+        await self._classification_store.invalidate(country or "*", "*")
+        if self._redis:
+            await self._publish_invalidation(pattern)
+        
+        logger.info(f"Bumped cache generation of {country or 'all countries'} to {generation}")
+        return generation
+    
     async def get_cached_match(
         self, 
         product_description: str, 
@@ -135,33 +340,109 @@ class CacheService:
             country: Country code for the match
             
         Returns:
-            HSCodeMatchResult if found in cache, None otherwise
+            HSCodeMatchResult if found in cache, None otherwise. Results served
+            for a near-duplicate description have ``approximate_cache_hit`` set.
         """
+        await self._refresh_generations()
+        canonical = canonicalize_description(product_description)
+        cache_key = self._generate_cache_key(product_description, country)
+        
+        result = await self._get_by_cache_key(cache_key, canonical, country, product_description=product_description)
+        if result is None:
+            result = (await self._get_from_store([(product_description, country)]))[0]
+        if result is not None:
+            logger.debug(f"Cache hit for product: {product_description[:50]}...")
+            return result
+        
+        result = await self._get_near_duplicate_match(canonical, country)
+        if result is not None:
+            logger.debug(f"Approximate cache hit for product: {product_description[:50]}... "
+                        f"(similarity {result.cache_similarity})")
+            return result
+        
+        logger.debug(f"Cache miss for product: {product_description[:50]}...")
+        return None
+    
+    async def _get_by_cache_key(
+        self,
+        cache_key: str,
+        canonical: str,
+        country: str,
+        record_stats: bool = True,
+        product_description: Optional[str] = None
+    ) -> Optional[HSCodeMatchResult]:
+        """Look up a cache key in the L1, then in Redis; stale hits are refreshed if the description is given"""
+        # L1 first: no round trip and no parse, and still served while Redis is down
+        local_result = self._local_cache.get(cache_key, record_stats=record_stats)
+        if local_result is not None:
+            return local_result.model_copy()
+        
         if not self._redis:
             return None
             
         try:
-            cache_key = self._generate_cache_key(product_description, country)
             cached_data = await self._redis.get(cache_key)
             
             if cached_data:
-                # Update access statistics
-                await self._update_access_stats(cache_key)
+                if record_stats:
+                    self._l2_stats["hits"] += 1
+                    
+                    # Update access statistics
+                    await self._update_access_stats(cache_key)
                 
                 # Deserialize and return result
-                data = json.loads(cached_data)
-                result = HSCodeMatchResult(**data)
+                result, soft_expires_at = decode_cache_entry(cached_data)
+                fresh_seconds = self._revalidate(cache_key, product_description, country, result, soft_expires_at)
+                
+                # Promote into L1 for subsequent lookups, until the entry goes stale
+                self._local_cache.set(cache_key, result, fresh_seconds)
+                if self._near_duplicates is not None and record_stats:
+                    self._near_duplicates.add(canonical, country, cache_key)
                 
-                logger.debug(f"Cache hit for product: {product_description[:50]}...")
-                return result
+                return result.model_copy()
             
-            logger.debug(f"Cache miss for product: {product_description[:50]}...")
+            if record_stats:
+                self._l2_stats["misses"] += 1
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving from cache: {str(e)}")
             return None
     
+    async def _get_from_store(self, items: List[Tuple[str, str]]) -> List[Optional[HSCodeMatchResult]]:
+        """Look up L1/L2 misses in the durable store and promote hits into L1 and Redis"""
+        found = await self._classification_store.get_many(items)
+        if not found:
+            return [None] * len(items)
+        
+        results = [found.get((description_hash(description, country), country)) for description, country in items]
+        await self._write_results([
+            (description, country, result)
+            for (description, country), result in zip(items, results) if result is not None
+        ])
+        return [result.model_copy() if result is not None else None for result in results]
+    
+    async def _get_near_duplicate_match(self, canonical: str, country: str) -> Optional[HSCodeMatchResult]:
+        """Serve the cached result of a near-duplicate description, marked as approximate"""
+        if self._near_duplicates is None:
+            return None
+        
+        match = self._near_duplicates.query(canonical, country)
+        if match is None:
+            return None
+        
+        match_key, similarity = match
+        result = await self._get_by_cache_key(match_key, canonical, country, record_stats=False)
+        if result is None:
+            # The cached entry expired or was invalidated
+            self._near_duplicates.remove(match_key)
+            return None
+        
+        self._approximate_hits += 1
+        result.approximate_cache_hit = True
+        result.cache_similarity = round(similarity, 3)
+        return result
+    
     async def cache_match_result(
         self,
         product_description: str,
@@ -179,25 +460,38 @@ class CacheService:
             ttl_hours: Custom TTL in hours, uses default if None
             
         Returns:
-            True if successfully cached, False otherwise
+            True if successfully cached in Redis, False otherwise
         """
-        if not self._redis:
-            return False
-            
+        await self._refresh_generations()
         try:
             cache_key = self._generate_cache_key(product_description, country)
             
-            # Serialize result to JSON
-            cache_data = result.model_dump_json()
-            
             # Set TTL based on confidence and usage patterns
-            ttl = timedelta(hours=ttl_hours or self._determine_ttl(result))
+            soft_ttl, ttl = self._entry_ttls(result, ttl_hours)
+            
+            # The L1 copy is kept even when Redis is unavailable
+            self._local_cache.set(cache_key, result.model_copy(), soft_ttl.total_seconds())
+            if self._near_duplicates is not None:
+                self._near_duplicates.add(canonicalize_description(product_description), country, cache_key)
+            
+            # Persisted to the durable store in the background
+            self._classification_store.enqueue([(product_description, country, result)])
+        except Exception as e:
+            logger.error(f"Error caching result: {str(e)}")
+            return False
+        
+        if not self._redis:
+            return False
+            
+        try:
+            # Serialize result
+            cache_data = self._encode_entry(result, soft_ttl)
             
             # Store in Redis
             await self._redis.setex(cache_key, ttl, cache_data)
             
             # Update caching statistics
-            await self._update_cache_stats(cache_key, result)
+            await self._update_cache_stats(cache_key, ttl, result)
             
             logger.debug(f"Cached result for product: {product_description[:50]}... "
                         f"(TTL: {ttl.total_seconds()}s)")
@@ -207,114 +501,425 @@ class CacheService:
             logger.error(f"Error caching result: {str(e)}")
             return False
     
-    async def get_cached_batch_match(self, request_hash: str) -> Optional[List[HSCodeMatchResult]]:
-        """Retrieve cached batch match results"""
-        if not self._redis:
-            return None
-            
-        try:
-            cache_key = self._generate_batch_cache_key(request_hash)
-            cached_data = await self._redis.get(cache_key)
+    async def get_cached_matches_bulk(
+        self,
+        items: List[Tuple[str, str]]
+    ) -> List[Optional[HSCodeMatchResult]]:
+        """
+        Retrieve cached HS code match results for many descriptions at once
+        
+        L1 hits are served locally, every remaining key is fetched with a
+        single MGET and hit statistics are updated in one pipeline. Items still
+        missing are looked up in the durable store in one query per country,
+        then go through the near-duplicate lookup.
+        
+        Args:
+            items: (product description, country) pairs
             
-            if cached_data:
-                data = json.loads(cached_data)
-                results = [HSCodeMatchResult(**item) for item in data]
+        Returns:
+            One HSCodeMatchResult or None per item, in input order
+        """
+        await self._refresh_generations()
+        results: List[Optional[HSCodeMatchResult]] = [None] * len(items)
+        canonicals = [canonicalize_description(description) for description, _ in items]
+        cache_keys = [self._generate_cache_key(description, country) for description, country in items]
+        
+        remote_indices = []
+        for i, cache_key in enumerate(cache_keys):
+            local_result = self._local_cache.get(cache_key)
+            if local_result is not None:
+                results[i] = local_result.model_copy()
+            else:
+                remote_indices.append(i)
+        
+        if remote_indices and self._redis:
+            try:
+                values = await self._redis.mget([cache_keys[i] for i in remote_indices])
+                
+                hits = 0
+                for i, cached_data in zip(remote_indices, values):
+                    if not cached_data:
+                        continue
+                    try:
+                        result, soft_expires_at = decode_cache_entry(cached_data)
+                    except Exception as e:
+                        logger.error(f"Error decoding cached result: {str(e)}")
+                        continue
+                    
+                    hits += 1
+                    fresh_seconds = self._revalidate(cache_keys[i], items[i][0], items[i][1], result, soft_expires_at)
+                    self._local_cache.set(cache_keys[i], result, fresh_seconds)
+                    if self._near_duplicates is not None:
+                        self._near_duplicates.add(canonicals[i], items[i][1], cache_keys[i])
+                    results[i] = result.model_copy()
                 
-                logger.debug(f"Batch cache hit for hash: {request_hash}")
-                return results
+                self._l2_stats["hits"] += hits
+                self._l2_stats["misses"] += len(remote_indices) - hits
+                if hits:
+                    await self._update_access_stats_bulk(hits)
+                
+            except Exception as e:
+                logger.error(f"Error retrieving bulk matches from cache: {str(e)}")
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            stored = await self._get_from_store([items[i] for i in missing])
+            for i, result in zip(missing, stored):
+                results[i] = result
+        
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = await self._get_near_duplicate_match(canonicals[i], items[i][1])
+        
+        logger.debug(f"Bulk cache lookup: {sum(1 for r in results if r is not None)}/{len(items)} hits")
+        return results
+    
+    async def cache_match_results_bulk(
+        self,
+        entries: List[Tuple[str, str, HSCodeMatchResult]],
+        ttl_hours: Optional[int] = None
+    ) -> int:
+        """
+        Cache many HS code match results in one pipeline
+        
+        Args:
+            entries: (product description, country, result) triples
+            ttl_hours: Custom TTL in hours, determined per result if None
             
-            return None
+        Returns:
+            Number of results written to Redis
+        """
+        await self._refresh_generations()
+        # Persisted to the durable store in the background
+        self._classification_store.enqueue(entries)
+        return await self._write_results(entries, ttl_hours)
+    
+    async def _write_results(
+        self,
+        entries: List[Tuple[str, str, HSCodeMatchResult]],
+        ttl_hours: Optional[int] = None
+    ) -> int:
+        """Write results to L1, the near-duplicate index and Redis (one pipeline)"""
+        prepared = []
+        for description, country, result in entries:
+            try:
+                cache_key = self._generate_cache_key(description, country)
+                soft_ttl, ttl = self._entry_ttls(result, ttl_hours)
+                self._local_cache.set(cache_key, result.model_copy(), soft_ttl.total_seconds())
+                if self._near_duplicates is not None:
+                    self._near_duplicates.add(canonicalize_description(description), country, cache_key)
+                prepared.append((cache_key, ttl, self._encode_entry(result, soft_ttl), result))
+            except Exception as e:
+                logger.error(f"Error caching result: {str(e)}")
+        
+        if not self._redis or not prepared:
+            return 0
+        
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for cache_key, ttl, cache_data, _ in prepared:
+                    pipe.setex(cache_key, ttl, cache_data)
+                self._queue_entry_tracking(pipe, self.ENTRIES_KEY, [(cache_key, ttl) for cache_key, ttl, _, _ in prepared])
+                self._queue_cache_stats(pipe, [result for _, _, _, result in prepared])
+                await pipe.execute()
+            
+            logger.debug(f"Cached {len(prepared)} results in one pipeline")
+            return len(prepared)
             
         except Exception as e:
-            logger.error(f"Error retrieving batch cache: {str(e)}")
-            return None
+            logger.error(f"Error caching bulk results: {str(e)}")
+            return 0
     
-    async def cache_batch_results(
+    async def get_negative_matches_bulk(
         self,
-        request_hash: str,
-        results: List[HSCodeMatchResult]
+        items: List[Tuple[str, str]]
+    ) -> List[Optional[HSCodeMatchResult]]:
+        """
+        Retrieve negatively cached error results for many descriptions at once
+        
+        Args:
+            items: (product description, country) pairs
+            
+        Returns:
+            One error result or None per item, in input order
+        """
+        if not settings.HS_NEGATIVE_CACHE_ENABLED or not items:
+            return [None] * len(items)
+        
+        await self._refresh_generations()
+        # Negative entries stay out of the L1 hit statistics
+        keys = [self._generate_negative_key(description, country) for description, country in items]
+        results: List[Optional[HSCodeMatchResult]] = [
+            self._local_cache.get(key, record_stats=False) for key in keys
+        ]
+        remote_indices = [i for i, result in enumerate(results) if result is None]
+        
+        if remote_indices and self._redis:
+            try:
+                values = await self._redis.mget([keys[i] for i in remote_indices])
+                for i, cached_data in zip(remote_indices, values):
+                    if cached_data:
+                        results[i] = decode_match_result(cached_data)
+            except Exception as e:
+                logger.error(f"Error retrieving negative cache entries: {str(e)}")
+        
+        return [result.model_copy() if result is not None else None for result in results]
+    
+    async def get_negative_match(
+        self,
+        product_description: str,
+        country: str = "default"
+    ) -> Optional[HSCodeMatchResult]:
+        """Retrieve the negatively cached error result for a description"""
+        return (await self.get_negative_matches_bulk([(product_description, country)]))[0]
+    
+    async def cache_negative_result(
+        self,
+        product_description: str,
+        result: HSCodeMatchResult,
+        country: str = "default"
     ) -> bool:
-        """Cache batch match results"""
+        """
+        Remember a deterministic match failure for a short TTL
+        
+        Repeats of the description are answered with the same error result
+        instead of another agent call that would fail the same way.
+        
+        Args:
+            product_description: Product description
+            result: Error result to cache
+            country: Country code
+            
+        Returns:
+            True if successfully cached in Redis, False otherwise
+        """
+        if not settings.HS_NEGATIVE_CACHE_ENABLED:
+            return False
+        
+        await self._refresh_generations()
+        cache_key = self._generate_negative_key(product_description, country)
+        ttl_seconds = settings.HS_NEGATIVE_CACHE_TTL_SECONDS
+        self._local_cache.set(cache_key, result.model_copy(), ttl_seconds)
+        
         if not self._redis:
             return False
-            
+        
         try:
-            cache_key = self._generate_batch_cache_key(request_hash)
-            
-            # Serialize results
-            cache_data = json.dumps([result.model_dump() for result in results])
+            await self._redis.setex(cache_key, ttl_seconds, encode_match_result(result))
+            logger.debug(f"Negatively cached failed match for product: {product_description[:50]}... "
+                        f"(TTL: {ttl_seconds}s)")
+            return True
+        except Exception as e:
+            logger.error(f"Error caching negative result: {str(e)}")
+            return False
+    
+    def _generate_inflight_key(self, product_description: str, country: str = "default") -> str:
+        """Generate key for the cross-worker in-flight lock of a description"""
+        return self._generate_cache_key(product_description, country).replace(
+            self.CACHE_KEY_PREFIX, self.INFLIGHT_KEY_PREFIX, 1
+        )
+    
+    async def acquire_inflight_lock(self, product_description: str, country: str = "default") -> bool:
+        """
+        Try to become the worker that matches a description
+        
+        Args:
+            product_description: Product description being matched
+            country: Country code
             
-            # Cache with shorter TTL for batch results
-            ttl = timedelta(hours=self.BATCH_CACHE_TTL_HOURS)
-            await self._redis.setex(cache_key, ttl, cache_data)
+        Returns:
+            False if another worker already holds the lock, True otherwise
+            (including when Redis is unavailable, so callers just proceed)
+        """
+        if not self._redis:
+            return True
+        
+        try:
+            lock_key = self._generate_inflight_key(product_description, country)
+            token = uuid.uuid4().hex
+            acquired = await self._redis.set(
+                lock_key, token, nx=True, ex=self.INFLIGHT_LOCK_TTL_SECONDS
+            )
+            if acquired:
+                self._lock_tokens[lock_key] = token
+                return True
+            return False
             
-            logger.debug(f"Cached batch results for hash: {request_hash}")
+        except Exception as e:
+            logger.error(f"Error acquiring in-flight lock: {str(e)}")
             return True
+    
+    async def release_inflight_lock(self, product_description: str, country: str = "default") -> None:
+        """Release an in-flight lock held by this worker"""
+        lock_key = self._generate_inflight_key(product_description, country)
+        token = self._lock_tokens.pop(lock_key, None)
+        if not self._redis or token is None:
+            return
+        
+        try:
+            await self._redis.eval(self.RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Error releasing in-flight lock: {str(e)}")
+    
+    async def wait_for_cached_match(
+        self,
+        product_description: str,
+        country: str = "default",
+        timeout_seconds: float = INFLIGHT_LOCK_TTL_SECONDS
+    ) -> Optional[HSCodeMatchResult]:
+        """
+        Wait for another worker's in-flight match to land in the cache
+        
+        Polls until the result is cached, the lock disappears or the timeout
+        expires. Returns None if no result became available.
+        """
+        if not self._redis:
+            return None
+        
+        lock_key = self._generate_inflight_key(product_description, country)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.INFLIGHT_POLL_INTERVAL_SECONDS)
+                result = await self.get_cached_match(product_description, country)
+                if result:
+                    return result
+                if not await self._redis.exists(lock_key):
+                    # Lock released without a cached result (the other worker failed)
+                    return None
+        except Exception as e:
+            logger.error(f"Error waiting for in-flight match: {str(e)}")
+        
+        return None
+    
+    async def acquire_warming_lease(self, owner: str, lease_seconds: int) -> bool:
+        """
+        Become, or stay, the only worker running data-driven warming
+        
+        Args:
+            owner: Identifier of the warming run
+            lease_seconds: How long the lease lasts without being renewed
             
+        Returns:
+            False if another run holds the lease, True otherwise (including
+            when Redis is unavailable)
+        """
+        if not self._redis:
+            return True
+        
+        try:
+            if await self._redis.set(self.WARMING_LEASE_KEY, owner, nx=True, ex=lease_seconds):
+                return True
+            if await self._redis.get(self.WARMING_LEASE_KEY) == owner:
+                await self._redis.expire(self.WARMING_LEASE_KEY, lease_seconds)
+                return True
+            return False
         except Exception as e:
-            logger.error(f"Error caching batch results: {str(e)}")
+            logger.error(f"Error acquiring warming lease: {str(e)}")
             return False
     
-    async def warm_cache_with_common_products(self, hs_matching_service) -> Dict[str, Any]:
+    async def release_warming_lease(self, owner: str) -> None:
+        """Release the warming lease if this run still holds it"""
+        if not self._redis:
+            return
+        try:
+            await self._redis.eval(self.RELEASE_LOCK_SCRIPT, 1, self.WARMING_LEASE_KEY, owner)
+        except Exception as e:
+            logger.error(f"Error releasing warming lease: {str(e)}")
+    
+    async def load_warming_state(self) -> Optional[Dict[str, Any]]:
+        """Get the checkpoint of the last warming run"""
+        if not self._redis:
+            return self._warming_state
+        try:
+            data = await self._redis.get(self.WARMING_STATE_KEY)
+            return json.loads(data) if data else None
+        except Exception as e:
+            logger.error(f"Error loading warming state: {str(e)}")
+            return None
+    
+    async def save_warming_state(self, state: Dict[str, Any]) -> None:
+        """Checkpoint a warming run, so that another worker or restart can resume it"""
+        self._warming_state = state
+        if not self._redis:
+            return
+        try:
+            await self._redis.setex(self.WARMING_STATE_KEY, self.WARMING_RETENTION, json.dumps(state))
+        except Exception as e:
+            logger.error(f"Error saving warming state: {str(e)}")
+    
+    async def track_warmed_keys(self, items: List[Tuple[str, str]]) -> None:
         """
-        Warm cache with common product descriptions
+        Remember entries written by warming, to report later whether they were read
+        
+        The warming worker's L1 copies are dropped, so that its own later
+        hits go through Redis and are counted too.
         
         Args:
-            hs_matching_service: Instance of HSCodeMatchingService
-            
+            items: (product description, country) pairs that were warmed
+        """
+        if not items:
+            return
+        
+        await self._refresh_generations()
+        cache_keys = [self._generate_cache_key(description, country) for description, country in items]
+        for cache_key in cache_keys:
+            self._local_cache.delete(cache_key)
+        if not self._redis:
+            return
+        
+        now = time.time()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.WARMED_KEYS_KEY, {cache_key: now for cache_key in cache_keys})
+                pipe.zremrangebyscore(self.WARMED_KEYS_KEY, "-inf", now - self.WARMING_RETENTION.total_seconds())
+                pipe.expire(self.WARMED_KEYS_KEY, self.WARMING_RETENTION)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error tracking warmed keys: {str(e)}")
+    
+    async def get_warmed_key_hits(self) -> Dict[str, Any]:
+        """
+        Count warmed entries that were read after they were warmed
+        
+        An entry was read if Redis last accessed it after warming wrote it,
+        taken from OBJECT IDLETIME at report time, so cache hits pay nothing
+        for the tracking.
+        
         Returns:
-            Dictionary with warming results and statistics
+            Dictionary with warmed, hit and expired counts and the hit rate
         """
         if not self._redis:
-            return {"error": "Redis not available", "warmed": 0}
-        
-        warming_results = {
-            "total_products": len(self.COMMON_PRODUCTS),
-            "successfully_warmed": 0,
-            "already_cached": 0,
-            "failed": 0,
-            "errors": []
-        }
+            return {"available": False, "reason": "Redis not available"}
         
-        logger.info(f"Starting cache warming with {len(self.COMMON_PRODUCTS)} common products")
+        try:
+            warmed = await self._redis.zrange(self.WARMED_KEYS_KEY, 0, -1, withscores=True)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for cache_key, _ in warmed:
+                    pipe.object("idletime", cache_key)
+                idle_times = await pipe.execute() if warmed else []
+        except Exception as e:
+            # OBJECT IDLETIME is refused under the LFU eviction policies
+            logger.error(f"Error reading warmed key access times: {str(e)}")
+            return {"available": False, "reason": str(e)}
         
-        for product in self.COMMON_PRODUCTS:
-            try:
-                # Check if already cached
-                cached_result = await self.get_cached_match(product)
-                
-                if cached_result:
-                    warming_results["already_cached"] += 1
-                    continue
-                
-                # Match and cache the product
-                match_result = await hs_matching_service.match_single_product(
-                    product_description=product,
-                    country="default",
-                    include_alternatives=True,
-                    confidence_threshold=0.5
-                )
-                
-                # Cache with longer TTL for warming
-                success = await self.cache_match_result(
-                    product_description=product,
-                    result=match_result,
-                    ttl_hours=self.FREQUENT_MATCH_TTL_HOURS
-                )
-                
-                if success:
-                    warming_results["successfully_warmed"] += 1
-                else:
-                    warming_results["failed"] += 1
-                    
-            except Exception as e:
-                error_msg = f"Failed to warm cache for '{product}': {str(e)}"
-                logger.error(error_msg)
-                warming_results["failed"] += 1
-                warming_results["errors"].append(error_msg)
+        now = time.time()
+        hit, expired = 0, 0
+        for (_, warmed_at), idle_seconds in zip(warmed, idle_times):
+            if idle_seconds is None:
+                expired += 1
+            elif idle_seconds < now - warmed_at - self.IDLETIME_SLACK_SECONDS:
+                hit += 1
         
-        logger.info(f"Cache warming completed: {warming_results}")
-        return warming_results
+        return {
+            "available": True,
+            "warmed_keys": len(warmed),
+            "hit_keys": hit,
+            "expired_keys": expired,
+            "hit_rate_percent": round(hit / len(warmed) * 100, 2) if warmed else 0.0
+        }
     
     async def invalidate_cache_by_pattern(self, pattern: str) -> int:
         """
@@ -326,61 +931,255 @@ class CacheService:
         Returns:
             Number of keys deleted
         """
+        # Drop matching L1 entries locally right away, then in other workers via pub/sub
+        self._local_cache.invalidate_pattern(pattern)
+        if self._near_duplicates is not None:
+            self._near_duplicates.invalidate_pattern(pattern)
+        
+        # Durable rows would otherwise bring invalidated results back
+        store_patterns = self._get_store_patterns(pattern)
+        if store_patterns is not None:
+            removed = await self._classification_store.invalidate(*store_patterns)
+            logger.info(f"Removed {removed} stored classifications matching pattern: {pattern}")
+        
         if not self._redis:
             return 0
             
         try:
-            # Find matching keys
-            keys = await self._redis.keys(pattern)
+            await self._publish_invalidation(pattern)
             
-            if keys:
-                # Delete all matching keys
-                deleted_count = await self._redis.delete(*keys)
-                logger.info(f"Invalidated {deleted_count} cache entries matching pattern: {pattern}")
-                return deleted_count
+            # SCAN in pages and UNLINK in batches: KEYS and DEL on a large
+            # keyspace would block Redis for every worker
+            deleted_count = 0
+            batch: List[str] = []
+            async for key in self._redis.scan_iter(match=pattern, count=self.SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= self.UNLINK_BATCH_SIZE:
+                    deleted_count += await self._unlink_keys(batch)
+                    batch = []
+            if batch:
+                deleted_count += await self._unlink_keys(batch)
             
-            return 0
+            if deleted_count:
+                logger.info(f"Invalidated {deleted_count} cache entries matching pattern: {pattern}")
+            return deleted_count
             
         except Exception as e:
             logger.error(f"Error invalidating cache: {str(e)}")
             return 0
     
+    async def _unlink_keys(self, keys: List[str]) -> int:
+        """Unlink a batch of keys and drop them from the live entry sets"""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.unlink(*keys)
+            pipe.zrem(self.ENTRIES_KEY, *keys)
+            unlinked, _ = await pipe.execute()
+        return unlinked
+    
+    def _get_store_patterns(self, pattern: str) -> Optional[Tuple[str, str]]:
+        """Map a Redis key pattern to (country, description hash) globs for the durable store"""
+        prefix = f"{self.CACHE_KEY_PREFIX}:"
+        if pattern.startswith(prefix):
+            country, _, hash_pattern = pattern[len(prefix):].partition(":")
+            if country == "batch":
+                return None
+            # Durable rows are not namespaced by generation
+            hash_pattern = self.GENERATION_SEGMENT.sub("", hash_pattern)
+            return country or "*", hash_pattern or "*"
+        # Broader patterns such as "xm_port:*" cover every match key
+        if fnmatchcase(f"{prefix}country:hash", pattern):
+            return "*", "*"
+        return None
+    
+    async def _publish_invalidation(self, pattern: str):
+        """Tell every worker to drop L1 entries matching a pattern"""
+        try:
+            await self._redis.publish(self.INVALIDATION_CHANNEL, pattern)
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {str(e)}")
+    
+    def _get_tier_statistics(self) -> Dict[str, Any]:
+        """Get L1 and L2 hit rates observed by this worker"""
+        l1_stats = self._local_cache.get_statistics()
+        l2_total = self._l2_stats["hits"] + self._l2_stats["misses"]
+        lookups = l1_stats["hits"] + l1_stats["misses"]
+        return {
+            "l1_cache": {
+                **l1_stats,
+                "invalidation_listener_active": self._invalidation_task is not None
+            },
+            "l2_cache": {
+                **self._l2_stats,
+                "hit_rate_percent": round(self._l2_stats["hits"] / l2_total * 100, 2) if l2_total else 0.0
+            },
+            "combined_hit_rate_percent": round(
+                (l1_stats["hits"] + self._l2_stats["hits"]) / lookups * 100, 2
+            ) if lookups else 0.0,
+            "near_duplicate": {
+                **(self._near_duplicates.get_statistics() if self._near_duplicates else {"enabled": False}),
+                "approximate_hits": self._approximate_hits,
+                # Extra hit rate on top of exact L1/L2 hits
+                "approximate_hit_rate_percent": round(self._approximate_hits / lookups * 100, 2) if lookups else 0.0
+            },
+            "l3_store": self._classification_store.get_statistics(),
+            "refresh_ahead": self._get_refresh_statistics()
+        }
+    
+    def _get_refresh_statistics(self) -> Dict[str, Any]:
+        """Get how often stale-while-revalidate kept callers off the agent"""
+        stats = self._refresh_stats
+        refreshed = stats["stale_hits"] + stats["early_refreshes"]
+        return {
+            **stats,
+            "in_progress": len(self._refreshing),
+            # Share of refreshes that replaced the entry before it went stale
+            "ahead_of_expiry_percent": round(stats["early_refreshes"] / refreshed * 100, 2) if refreshed else 0.0,
+            "success_rate_percent": round(
+                stats["refreshes_completed"] / stats["refreshes_started"] * 100, 2
+            ) if stats["refreshes_started"] else 0.0
+        }
+    
     async def get_cache_statistics(self) -> Dict[str, Any]:
         """Get comprehensive cache statistics"""
         if not self._redis:
-            return {"error": "Redis not available"}
+            return {"error": "Redis not available", **self._get_tier_statistics()}
         
         try:
             # Get Redis info
             redis_info = await self._redis.info()
             
-            # Get HS code cache statistics
-            cache_keys = await self._redis.keys(f"{self.CACHE_KEY_PREFIX}:*")
-            batch_keys = await self._redis.keys(f"{self.CACHE_KEY_PREFIX}:batch:*")
-            
-            # Get hit/miss statistics
-            hit_count = await self._redis.get(self._generate_stats_key("hits")) or "0"
-            miss_count = await self._redis.get(self._generate_stats_key("misses")) or "0"
+            # Live entries are the members not yet past their expiry score
+            now = time.time()
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.zcount(self.ENTRIES_KEY, now, "+inf")
+                pipe.get(self._generate_stats_key("hits"))
+                pipe.get(self._generate_stats_key("misses"))
+                cache_entries, hit_count, miss_count = await pipe.execute()
+            hit_count = hit_count or "0"
+            miss_count = miss_count or "0"
             
             total_requests = int(hit_count) + int(miss_count)
             hit_ratio = (int(hit_count) / total_requests * 100) if total_requests > 0 else 0
             
             return {
                 "redis_status": "connected",
-                "total_cache_entries": len(cache_keys),
-                "batch_cache_entries": len(batch_keys),
+                "total_cache_entries": cache_entries,
                 "cache_hits": int(hit_count),
                 "cache_misses": int(miss_count),
                 "hit_ratio_percent": round(hit_ratio, 2),
                 "memory_usage_mb": round(redis_info.get("used_memory", 0) / (1024 * 1024), 2),
                 "connected_clients": redis_info.get("connected_clients", 0),
-                "commands_processed": redis_info.get("total_commands_processed", 0)
+                "commands_processed": redis_info.get("total_commands_processed", 0),
+                "generations": dict(self._generations),
+                **self._get_tier_statistics()
             }
             
         except Exception as e:
             logger.error(f"Error getting cache statistics: {str(e)}")
             return {"error": str(e)}
     
+    def _entry_ttls(self, result: HSCodeMatchResult, ttl_hours: Optional[int] = None) -> Tuple[timedelta, timedelta]:
+        """
+        Get the soft and hard TTL of a new entry
+        
+        TTLs are shortened by a random share so that entries written together,
+        e.g. by cache warming, don't all expire at once. With stale-while-
+        revalidate the hard TTL extends past the soft one by a grace period.
+        
+        Returns:
+            Tuple of (soft TTL, hard TTL in Redis)
+        """
+        seconds = (ttl_hours or self._determine_ttl(result)) * 3600
+        soft_ttl = timedelta(seconds=seconds * (1 - random.random() * settings.HS_CACHE_TTL_JITTER))
+        if not settings.HS_CACHE_STALE_WHILE_REVALIDATE:
+            return soft_ttl, soft_ttl
+        return soft_ttl, soft_ttl * (1 + settings.HS_CACHE_STALE_GRACE_SHARE)
+    
+    def _encode_entry(self, result: HSCodeMatchResult, soft_ttl: timedelta) -> str:
+        """Serialize a result, with its soft expiry time when stale-while-revalidate is on"""
+        if not settings.HS_CACHE_STALE_WHILE_REVALIDATE:
+            return encode_match_result(result)
+        return encode_cache_entry(result, time.time() + soft_ttl.total_seconds())
+    
+    def _revalidate(
+        self,
+        cache_key: str,
+        product_description: Optional[str],
+        country: str,
+        result: HSCodeMatchResult,
+        soft_expires_at: Optional[float]
+    ) -> float:
+        """
+        Schedule a background refresh of a Redis hit that is stale or about to be
+        
+        Before the soft expiry, a refresh starts early with a probability that
+        grows as expiry nears and with the time the result took to compute
+        (XFetch), so hot entries are usually replaced before anyone sees them
+        stale. Entries without a soft expiry only expire in Redis.
+        
+        Returns:
+            Seconds the entry stays fresh, 0 if it is stale
+        """
+        if soft_expires_at is None:
+            return self._determine_ttl(result) * 3600
+        
+        remaining = soft_expires_at - time.time()
+        if remaining <= 0:
+            self._refresh_stats["stale_hits"] += 1
+            self._schedule_refresh(cache_key, product_description, country)
+            return 0.0
+        
+        recompute_seconds = max(result.processing_time_ms / 1000, self.MIN_RECOMPUTE_SECONDS)
+        early = recompute_seconds * settings.HS_CACHE_REFRESH_AHEAD_BETA * -math.log(1.0 - random.random())
+        if early >= remaining and self._schedule_refresh(cache_key, product_description, country):
+            self._refresh_stats["early_refreshes"] += 1
+        return remaining
+    
+    def set_refresh_handler(self, handler: Callable[[str, str], Awaitable[HSCodeMatchResult]]):
+        """
+        Register how stale entries are recomputed
+        
+        Args:
+            handler: Coroutine function taking (product description, country)
+                that matches the description and caches the result
+        """
+        self._refresh_handler = handler
+    
+    def _schedule_refresh(self, cache_key: str, product_description: Optional[str], country: str) -> bool:
+        """Start a background refresh unless this worker is already refreshing the entry"""
+        if self._refresh_handler is None or product_description is None or cache_key in self._refreshing:
+            return False
+        
+        self._refreshing.add(cache_key)
+        task = asyncio.create_task(self._refresh_entry(cache_key, product_description, country))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        return True
+    
+    async def _refresh_entry(self, cache_key: str, product_description: str, country: str):
+        """Recompute an entry as background work, once across workers"""
+        try:
+            # The in-flight lock keeps other workers from refreshing the same entry
+            if not await self.acquire_inflight_lock(product_description, country):
+                self._refresh_stats["refreshes_skipped"] += 1
+                return
+            
+            self._refresh_stats["refreshes_started"] += 1
+            try:
+                with priority_lane(Lane.BACKGROUND):
+                    result = await self._refresh_handler(product_description, country)
+                if result is None or result.error_kind is not None:
+                    self._refresh_stats["refreshes_failed"] += 1
+                else:
+                    self._refresh_stats["refreshes_completed"] += 1
+            finally:
+                await self.release_inflight_lock(product_description, country)
+        except Exception as e:
+            self._refresh_stats["refreshes_failed"] += 1
+            logger.warning(f"Background refresh failed for product: {product_description[:50]}...: {str(e)}")
+        finally:
+            self._refreshing.discard(cache_key)
+    
     def _determine_ttl(self, result: HSCodeMatchResult) -> int:
         """Determine appropriate TTL based on result confidence and other factors"""
         confidence = result.primary_match.confidence
@@ -407,19 +1206,52 @@ class CacheService:
         except Exception as e:
             logger.error(f"Error updating access stats: {str(e)}")
     
-    async def _update_cache_stats(self, cache_key: str, result: HSCodeMatchResult):
-        """Update caching statistics"""
+    async def _update_access_stats_bulk(self, hits: int):
+        """Add several cache hits to the access statistics in one pipeline"""
         try:
-            # Track confidence distribution
-            confidence_bucket = self._get_confidence_bucket(result.primary_match.confidence)
-            confidence_key = self._generate_stats_key(f"confidence:{confidence_bucket}")
-            await self._redis.incr(confidence_key)
-            await self._redis.expire(confidence_key, timedelta(days=30))
+            stats_key = self._generate_stats_key("hits")
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.incrby(stats_key, hits)
+                pipe.expire(stats_key, timedelta(days=30))
+                await pipe.execute()
             
-            # Track HS code popularity
-            hs_code_key = self._generate_stats_key(f"hs_code:{result.primary_match.hs_code}")
-            await self._redis.incr(hs_code_key)
-            await self._redis.expire(hs_code_key, timedelta(days=30))
+        except Exception as e:
+            logger.error(f"Error updating access stats: {str(e)}")
+    
+    def _queue_cache_stats(self, pipe, results: List[HSCodeMatchResult]):
+        """Queue aggregated confidence counters and HS code popularity for cached results on a pipeline"""
+        confidence_counts = Counter()
+        hs_code_counts = Counter()
+        for result in results:
+            confidence_bucket = self._get_confidence_bucket(result.primary_match.confidence)
+            confidence_counts[self._generate_stats_key(f"confidence:{confidence_bucket}")] += 1
+            hs_code_counts[result.primary_match.hs_code] += 1
+        
+        for stats_key, count in confidence_counts.items():
+            pipe.incrby(stats_key, count)
+            pipe.expire(stats_key, self.STATS_TTL)
+        
+        for hs_code, count in hs_code_counts.items():
+            pipe.zincrby(self.POPULAR_HS_CODES_KEY, count, hs_code)
+        if hs_code_counts:
+            pipe.expire(self.POPULAR_HS_CODES_KEY, self.STATS_TTL)
+    
+    def _queue_entry_tracking(self, pipe, entries_key: str, entries: List[Tuple[str, timedelta]]):
+        """Queue live entry tracking for written cache keys on a pipeline"""
+        if not entries:
+            return
+        now = time.time()
+        pipe.zadd(entries_key, {cache_key: now + ttl.total_seconds() for cache_key, ttl in entries})
+        # Members whose entry has expired are trimmed as writes go by
+        pipe.zremrangebyscore(entries_key, "-inf", now)
+    
+    async def _update_cache_stats(self, cache_key: str, ttl: timedelta, result: HSCodeMatchResult):
+        """Update caching statistics and live entry tracking in one pipeline"""
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                self._queue_entry_tracking(pipe, self.ENTRIES_KEY, [(cache_key, ttl)])
+                self._queue_cache_stats(pipe, [result])
+                await pipe.execute()
             
         except Exception as e:
             logger.error(f"Error updating cache stats: {str(e)}")
@@ -459,27 +1291,12 @@ class CacheService:
             return []
         
         try:
-            # Get all HS code stats
-            pattern = f"{self.STATS_KEY_PREFIX}:hs_code:*"
-            keys = await self._redis.keys(pattern)
-            
-            if not keys:
-                return []
-            
-            # Get counts for all keys
-            results = []
-            for key in keys:
-                count = await self._redis.get(key)
-                if count:
-                    hs_code = key.split(":")[-1]
-                    results.append({
-                        "hs_code": hs_code,
-                        "access_count": int(count)
-                    })
-            
-            # Sort by access count and return top entries
-            results.sort(key=lambda x: x["access_count"], reverse=True)
-            return results[:limit]
+            # O(log n + limit) read of the popularity sorted set
+            top_codes = await self._redis.zrevrange(self.POPULAR_HS_CODES_KEY, 0, limit - 1, withscores=True)
+            return [
+                {"hs_code": hs_code, "access_count": int(count)}
+                for hs_code, count in top_codes
+            ]
             
         except Exception as e:
             logger.error(f"Error getting top cached products: {str(e)}")
@@ -515,18 +1332,60 @@ class NoOpCacheService:
     async def cache_match_result(self, product_description: str, result: HSCodeMatchResult, country: str = "default", ttl_hours: Optional[int] = None) -> bool:
         return False
     
-    async def get_cached_batch_match(self, request_hash: str) -> Optional[List[HSCodeMatchResult]]:
+    async def get_cached_matches_bulk(self, items: List[Tuple[str, str]]) -> List[Optional[HSCodeMatchResult]]:
+        return [None] * len(items)
+    
+    async def cache_match_results_bulk(self, entries: List[Tuple[str, str, HSCodeMatchResult]], ttl_hours: Optional[int] = None) -> int:
+        return 0
+    
+    async def get_negative_matches_bulk(self, items: List[Tuple[str, str]]) -> List[Optional[HSCodeMatchResult]]:
+        return [None] * len(items)
+    
+    async def get_negative_match(self, product_description: str, country: str = "default") -> Optional[HSCodeMatchResult]:
         return None
     
-    async def cache_batch_results(self, request_hash: str, results: List[HSCodeMatchResult]) -> bool:
+    async def cache_negative_result(self, product_description: str, result: HSCodeMatchResult, country: str = "default") -> bool:
         return False
     
-    async def warm_cache_with_common_products(self, hs_matching_service) -> Dict[str, Any]:
-        return {"error": "Cache not available", "warmed": 0}
+    async def acquire_inflight_lock(self, product_description: str, country: str = "default") -> bool:
+        return True
+    
+    async def release_inflight_lock(self, product_description: str, country: str = "default") -> None:
+        pass
+    
+    async def wait_for_cached_match(self, product_description: str, country: str = "default", timeout_seconds: float = 0) -> Optional[HSCodeMatchResult]:
+        return None
     
     async def invalidate_cache_by_pattern(self, pattern: str) -> int:
         return 0
     
+    async def get_cache_generations(self) -> Dict[str, int]:
+        return {}
+    
+    def set_refresh_handler(self, handler) -> None:
+        pass
+    
+    async def acquire_warming_lease(self, owner: str, lease_seconds: int) -> bool:
+        return False
+    
+    async def release_warming_lease(self, owner: str) -> None:
+        pass
+    
+    async def load_warming_state(self) -> Optional[Dict[str, Any]]:
+        return None
+    
+    async def save_warming_state(self, state: Dict[str, Any]) -> None:
+        pass
+    
+    async def track_warmed_keys(self, items: List[Tuple[str, str]]) -> None:
+        pass
+    
+    async def get_warmed_key_hits(self) -> Dict[str, Any]:
+        return {"available": False, "reason": "Cache not available"}
+    
+    async def bump_cache_generation(self, country: Optional[str] = None) -> int:
+        return 0
+    
     async def get_cache_statistics(self) -> Dict[str, Any]:
         return {"error": "Cache not available"}
     
@@ -0,0 +1,290 @@
+"""
+Cache warming from historical product matches
+
+Warming used to match a fixed list of generic strings such as "wheat flour",
+which real invoices rarely contain verbatim. The warmer mines the most
+frequent descriptions per country from ``product_matches`` instead, weighted
+by recency, merges spellings that share a canonical form, and matches only
+the ones missing from the cache, a bounded number at a time.
+
+Progress is checkpointed in Redis after every chunk, so a run interrupted by
+a restart or deploy resumes where it stopped, and a lease keeps two workers
+from warming at once. Warmed keys are recorded so that a later report can
+tell how many of them were actually read.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..core.priority_lanes import Lane, priority_lane
+from .description_canonicalizer import canonicalize_description
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """Resumable warming of the most frequent past descriptions"""
+
+    CHUNK_SIZE = 50  # Descriptions looked up and checkpointed together
+    LEASE_SECONDS = 600  # Lease of a run that stopped renewing it
+    MINED_ROWS_FACTOR = 4  # Raw descriptions mined per warmed one, as spellings merge
+
+    # Recency weight of a match halves every half-life; a NULL half-life counts every match once
+    MINE_SQL = text(
+        "WITH weighted AS ("
+        "SELECT pm.product_description, pj.country_schema AS country, "
+        "SUM(COALESCE(POWER(0.5, EXTRACT(EPOCH FROM now() - pm.created_at) / NULLIF(:half_life_seconds, 0)), 1)) AS weight "
+        "FROM product_matches pm "
+        "JOIN processing_jobs pj ON pj.id = pm.job_id "
+        "WHERE pm.created_at >= now() - make_interval(days => :lookback_days) "
+        "GROUP BY pm.product_description, pj.country_schema"
+        "), ranked AS ("
+        "SELECT product_description, country, weight, "
+        "ROW_NUMBER() OVER (PARTITION BY country ORDER BY weight DESC) AS position "
+        "FROM weighted"
+        ") "
+        "SELECT product_description, country, weight FROM ranked WHERE position <= :row_limit"
+    )
+
+    def __init__(
+        self,
+        top_per_country: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        """
+        Initialize the warmer
+
+        Args:
+            top_per_country: Descriptions warmed per country, defaults to HS_CACHE_WARM_TOP_PER_COUNTRY
+            concurrency: Descriptions matched at once, defaults to HS_CACHE_WARM_CONCURRENCY
+        """
+        self.top_per_country = top_per_country or settings.HS_CACHE_WARM_TOP_PER_COUNTRY
+        self.concurrency = max(1, concurrency or settings.HS_CACHE_WARM_CONCURRENCY)
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    def start_in_background(self, warming: Coroutine[Any, Any, Dict[str, Any]]) -> asyncio.Task:
+        """
+        Run a warming call as a task held until it ends, logging its failure
+
+        Args:
+            warming: Warming coroutine, such as HSCodeMatchingService.warm_cache()
+
+        Returns:
+            The started task
+        """
+        task = asyncio.create_task(warming)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(self._log_background_failure)
+        return task
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background cache warming failed: {str(task.exception())}")
+
+    async def mine_descriptions(
+        self,
+        clean_description: Optional[Callable[[str], str]] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Get the most frequent recent descriptions per country
+
+        Args:
+            clean_description: Cleaning applied before matching, as done for cache keys
+
+        Returns:
+            (description, country) pairs, most frequent first within each country
+        """
+        params = {
+            "half_life_seconds": settings.HS_CACHE_WARM_HALF_LIFE_DAYS * 86400,
+            "lookback_days": settings.HS_CACHE_WARM_LOOKBACK_DAYS,
+            "row_limit": self.top_per_country * self.MINED_ROWS_FACTOR
+        }
+        async with async_session_maker() as session:
+            rows = (await session.execute(self.MINE_SQL, params)).all()
+
+        return self._rank_descriptions(rows, clean_description)
+
+    def _rank_descriptions(
+        self,
+        rows: List[Any],
+        clean_description: Optional[Callable[[str], str]] = None
+    ) -> List[Tuple[str, str]]:
+        """Merge spellings with the same canonical form and keep the top ones per country"""
+        weights: Dict[Tuple[str, str], float] = {}
+        spellings: Dict[Tuple[str, str], Tuple[float, str]] = {}
+
+        for row in rows:
+            description = clean_description(row.product_description) if clean_description else row.product_description
+            canonical = canonicalize_description(description)
+            if not canonical:
+                continue
+
+            key = (canonical, row.country)
+            weight = float(row.weight)
+            weights[key] = weights.get(key, 0.0) + weight
+            # The most frequent spelling is matched for the whole group
+            if key not in spellings or weight > spellings[key][0]:
+                spellings[key] = (weight, description)
+
+        per_country: Dict[str, List[Tuple[float, str]]] = {}
+        for (canonical, country), weight in weights.items():
+            per_country.setdefault(country, []).append((weight, spellings[(canonical, country)][1]))
+
+        ranked = []
+        for country, descriptions in sorted(per_country.items()):
+            descriptions.sort(key=lambda item: item[0], reverse=True)
+            ranked.extend((description, country) for _, description in descriptions[:self.top_per_country])
+        return ranked
+
+    async def warm(
+        self,
+        hs_matching_service,
+        cache_service,
+        clean_description: Optional[Callable[[str], str]] = None,
+        resume: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Warm the cache with the most frequent past descriptions
+
+        Args:
+            hs_matching_service: Instance of HSCodeMatchingService
+            cache_service: Cache service to warm
+            clean_description: Cleaning applied before matching, as done for cache keys
+            resume: Continue an interrupted run instead of starting over
+
+        Returns:
+            Dictionary with the run's progress and counts
+        """
+        run_id = uuid.uuid4().hex
+        if not await cache_service.acquire_warming_lease(run_id, self.LEASE_SECONDS):
+            return {"status": "already_running"}
+
+        try:
+            state = await cache_service.load_warming_state() if resume else None
+            if state and state.get("status") == "running":
+                logger.info(f"Resuming cache warming run {state['run_id']} at {state['position']}/{len(state['candidates'])}")
+                state["resumed"] = True
+            else:
+                state = await self._new_state(cache_service, clean_description)
+
+            candidates = state["candidates"]
+            while state["position"] < len(candidates):
+                chunk = [tuple(item) for item in candidates[state["position"]:state["position"] + self.CHUNK_SIZE]]
+                await self._warm_chunk(hs_matching_service, cache_service, chunk, state)
+
+                state["position"] += len(chunk)
+                await cache_service.save_warming_state(state)
+                if not await cache_service.acquire_warming_lease(run_id, self.LEASE_SECONDS):
+                    logger.warning(f"Cache warming run {state['run_id']} lost its lease, stopping")
+                    return self._summary(state)
+
+            state["status"] = "completed"
+            state["finished_at"] = time.time()
+            await cache_service.save_warming_state(state)
+            logger.info(f"Cache warming completed: {self._summary(state)}")
+            return self._summary(state)
+        finally:
+            await cache_service.release_warming_lease(run_id)
+
+    async def _new_state(
+        self,
+        cache_service,
+        clean_description: Optional[Callable[[str], str]] = None
+    ) -> Dict[str, Any]:
+        """Mine the descriptions of a new run, falling back to the common products"""
+        source = "product_matches"
+        try:
+            candidates = await self.mine_descriptions(clean_description)
+        except Exception as e:
+            logger.warning(f"Mining product matches for cache warming failed: {str(e)}")
+            candidates = []
+
+        if not candidates:
+            source = "common_products"
+            candidates = [(product, "default") for product in cache_service.COMMON_PRODUCTS]
+
+        return {
+            "run_id": uuid.uuid4().hex,
+            "status": "running",
+            "source": source,
+            "candidates": [list(item) for item in candidates],
+            "position": 0,
+            "already_cached": 0,
+            "warmed": 0,
+            "failed": 0,
+            "resumed": False,
+            "started_at": time.time()
+        }
+
+    async def _warm_chunk(
+        self,
+        hs_matching_service,
+        cache_service,
+        chunk: List[Tuple[str, str]],
+        state: Dict[str, Any]
+    ) -> None:
+        """Match the descriptions of a chunk that miss the cache"""
+        cached = await cache_service.get_cached_matches_bulk(chunk)
+        misses = [item for item, result in zip(chunk, cached) if result is None]
+        state["already_cached"] += len(chunk) - len(misses)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm_one(description: str, country: str) -> bool:
+            async with semaphore:
+                try:
+                    # Warming must not take agent capacity from user requests
+                    with priority_lane(Lane.BACKGROUND):
+                        result = await hs_matching_service.match_single_product(
+                            product_description=description,
+                            country=country,
+                            include_alternatives=True,
+                            confidence_threshold=0.5
+                        )
+                    return result.error_kind is None
+                except Exception as e:
+                    logger.error(f"Failed to warm cache for '{description[:50]}': {str(e)}")
+                    return False
+
+        outcomes = await asyncio.gather(*(warm_one(description, country) for description, country in misses))
+        warmed = [item for item, success in zip(misses, outcomes) if success]
+        state["warmed"] += len(warmed)
+        state["failed"] += len(misses) - len(warmed)
+        await cache_service.track_warmed_keys(warmed)
+
+    async def report(self, cache_service) -> Dict[str, Any]:
+        """
+        Get the progress of the last run and how many warmed keys were read since
+
+        Args:
+            cache_service: Cache service that was warmed
+
+        Returns:
+            Dictionary with the last run and the hits on warmed keys
+        """
+        state = await cache_service.load_warming_state()
+        return {
+            "last_run": self._summary(state) if state else None,
+            "warmed_key_hits": await cache_service.get_warmed_key_hits()
+        }
+
+    def _summary(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run state without its candidate list"""
+        summary = {key: value for key, value in state.items() if key != "candidates"}
+        summary["total"] = len(state["candidates"])
+        return summary
+
+
+# Global warmer instance
+cache_warmer = CacheWarmer()
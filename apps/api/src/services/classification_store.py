@@ -0,0 +1,356 @@
+"""
+Durable Postgres store for HS code classification results
+
+The tier below the Redis cache: rows in ``classification_results`` are keyed
+by (description hash, country, vector store version), so they survive Redis
+expiry and flushes and stop matching once a country's vector stores change.
+Reads are one ``= ANY(:hashes)`` query per country; writes are buffered and
+flushed in the background so cache misses never wait on Postgres.
+"""
+
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text, func
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..core.openai_config import OpenAIAgentConfig, HSCodeMatchResult, HSCodeResult
+from ..models.classification_result import ClassificationResult
+from .description_canonicalizer import canonicalize_description, description_hash
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ClassificationStore:
+    """Postgres-backed L3 for classification results with write-behind"""
+
+    WRITE_BATCH_SIZE = 200  # Rows per INSERT ... ON CONFLICT statement
+    FLUSH_INTERVAL_SECONDS = 2.0  # Longest time a result waits in the write buffer
+    MAX_PENDING_WRITES = 10000  # Results beyond this are dropped, not queued
+    BACKFILL_BATCH_SIZE = 1000
+    RETRY_SECONDS = 30  # Reads are skipped this long after a database failure
+
+    # Codes produced by failed matches, never persisted
+    ERROR_CODES = {"ERROR", "000000000"}
+
+    LOOKUP_SQL = text(
+        "SELECT description_hash, result FROM classification_results "
+        "WHERE country = :country AND vector_store_version = :version "
+        "AND description_hash = ANY(:hashes)"
+    ).columns(result=JSONB)
+
+    # Best row per description first: confirmed by a user, then most confident, then newest
+    BACKFILL_SQL = text(
+        "SELECT pm.product_description, pm.matched_hs_code, pm.confidence_score, "
+        "pm.alternative_hs_codes, pm.vector_store_reasoning, pj.country_schema, "
+        "hc.description AS code_description, hc.chapter, hc.section "
+        "FROM product_matches pm "
+        "JOIN processing_jobs pj ON pj.id = pm.job_id "
+        "LEFT JOIN hs_codes hc ON hc.code = pm.matched_hs_code AND hc.country = pj.country_schema "
+        "WHERE pm.confidence_score > 0 AND pm.matched_hs_code <> ALL(:error_codes) "
+        "ORDER BY pm.user_confirmed DESC, pm.confidence_score DESC, pm.created_at DESC"
+    )
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the store
+
+        Args:
+            enabled: Skip every read and write when False
+        """
+        self.enabled = enabled
+        self._pending: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self._retry_at = 0.0
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "read_errors": 0,
+            "writes": 0,
+            "write_errors": 0,
+            "dropped_writes": 0,
+        }
+
+    def is_persistable(self, result: HSCodeMatchResult) -> bool:
+        """Only real classifications are stored: no errors or approximate hits"""
+        return (
+            result.primary_match.hs_code not in self.ERROR_CODES
+            and result.primary_match.confidence > 0
+            and not result.approximate_cache_hit
+        )
+
+    async def get_many(self, items: List[Tuple[str, str]]) -> Dict[Tuple[str, str], HSCodeMatchResult]:
+        """
+        Look up many descriptions, one query per country
+
+        Args:
+            items: (product description, country) pairs
+
+        Returns:
+            Results found, keyed by (description hash, country)
+        """
+        if not self.enabled or not items or time.monotonic() < self._retry_at:
+            return {}
+
+        hashes_by_country: Dict[str, List[str]] = {}
+        for description, country in items:
+            hashes_by_country.setdefault(country, []).append(description_hash(description, country))
+
+        found: Dict[Tuple[str, str], HSCodeMatchResult] = {}
+        self._stats["lookups"] += len(items)
+        try:
+            async with async_session_maker() as session:
+                for country, hashes in hashes_by_country.items():
+                    rows = await session.execute(self.LOOKUP_SQL, {
+                        "country": country,
+                        "version": OpenAIAgentConfig.get_vector_store_version(country),
+                        "hashes": list(set(hashes)),
+                    })
+                    for row in rows.fetchall():
+                        try:
+                            found[(row.description_hash, country)] = HSCodeMatchResult.model_validate(row.result)
+                        except Exception as e:
+                            logger.warning(f"Skipping unreadable classification result: {str(e)}")
+        except Exception as e:
+            self._stats["read_errors"] += 1
+            self._retry_at = time.monotonic() + self.RETRY_SECONDS
+            logger.warning(f"Classification store lookup failed: {str(e)}")
+            return {}
+
+        self._stats["hits"] += len(found)
+        return found
+
+    def enqueue(self, entries: List[Tuple[str, str, HSCodeMatchResult]], source: str = "agent") -> int:
+        """
+        Buffer results for the background writer
+
+        Args:
+            entries: (product description, country, result) triples
+            source: Where the results came from, stored with the row
+
+        Returns:
+            Number of results buffered
+        """
+        if not self.enabled:
+            return 0
+
+        queued = 0
+        for description, country, result in entries:
+            if not self.is_persistable(result):
+                continue
+            row = self._build_row(description, country, result, source)
+            key = (row["description_hash"], row["country"], row["vector_store_version"])
+            if key not in self._pending and len(self._pending) >= self.MAX_PENDING_WRITES:
+                self._stats["dropped_writes"] += 1
+                continue
+            self._pending[key] = row
+            queued += 1
+
+        if queued:
+            self._schedule_flush()
+        return queued
+
+    def _build_row(self, description: str, country: str, result: HSCodeMatchResult, source: str) -> Dict[str, Any]:
+        return {
+            "description_hash": description_hash(description, country),
+            "country": country,
+            "vector_store_version": OpenAIAgentConfig.get_vector_store_version(country),
+            "canonical_description": canonicalize_description(description),
+            "hs_code": result.primary_match.hs_code[:10],
+            "confidence": Decimal(str(round(result.primary_match.confidence, 2))),
+            "result": result.model_dump(mode="json", exclude={"approximate_cache_hit", "cache_similarity"}),
+            "source": source,
+        }
+
+    def _schedule_flush(self) -> None:
+        """Start the background writer, or wake it up once a full batch is waiting"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_now = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_later())
+        elif len(self._pending) >= self.WRITE_BATCH_SIZE:
+            self._flush_now.set()
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._flush_now.wait(), timeout=self.FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._flush_now.clear()
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write every buffered result with upserts
+
+        Returns:
+            Number of rows written
+        """
+        if not self._pending:
+            return 0
+
+        rows = list(self._pending.values())
+        self._pending.clear()
+        try:
+            async with async_session_maker() as session:
+                for offset in range(0, len(rows), self.WRITE_BATCH_SIZE):
+                    statement = pg_insert(ClassificationResult).values(rows[offset:offset + self.WRITE_BATCH_SIZE])
+                    statement = statement.on_conflict_do_update(
+                        index_elements=["description_hash", "country", "vector_store_version"],
+                        set_={
+                            "canonical_description": statement.excluded.canonical_description,
+                            "hs_code": statement.excluded.hs_code,
+                            "confidence": statement.excluded.confidence,
+                            "result": statement.excluded.result,
+                            "source": statement.excluded.source,
+                            "updated_at": func.now(),
+                        }
+                    )
+                    await session.execute(statement)
+                await session.commit()
+        except Exception as e:
+            self._stats["write_errors"] += len(rows)
+            self._retry_at = time.monotonic() + self.RETRY_SECONDS
+            logger.warning(f"Classification store write of {len(rows)} rows failed: {str(e)}")
+            return 0
+
+        self._stats["writes"] += len(rows)
+        logger.debug(f"Wrote {len(rows)} classification results")
+        return len(rows)
+
+    async def invalidate(self, country_pattern: str = "*", hash_pattern: str = "*") -> int:
+        """
+        Delete stored results whose country and description hash match glob patterns
+
+        Returns:
+            Number of rows deleted
+        """
+        if not self.enabled:
+            return 0
+
+        # Buffered writes for invalidated keys must not land afterwards
+        self._pending = {
+            key: row for key, row in self._pending.items()
+            if not (fnmatchcase(key[1], country_pattern) and fnmatchcase(key[0], hash_pattern))
+        }
+
+        conditions, params = [], {}
+        for column, pattern in (("country", country_pattern), ("description_hash", hash_pattern)):
+            if pattern != "*":
+                conditions.append(f"{column} SIMILAR TO :{column}")
+                params[column] = _glob_to_similar(pattern)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        try:
+            async with async_session_maker() as session:
+                deleted = await session.execute(text(f"DELETE FROM classification_results{where}"), params)
+                await session.commit()
+                return deleted.rowcount or 0
+        except Exception as e:
+            logger.warning(f"Classification store invalidation failed: {str(e)}")
+            return 0
+
+    async def backfill_from_product_matches(
+        self,
+        clean_description: Optional[Callable[[str], str]] = None,
+        country: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Seed the store from existing ``product_matches`` rows
+
+        The best row per (description, country) wins: user-confirmed first,
+        then the most confident. Rows are keyed under the job's country schema
+        unless ``country`` is given.
+
+        Args:
+            clean_description: Cleaning applied before hashing, as done for cache keys
+            country: Country to store every row under
+
+        Returns:
+            Dictionary with scanned, stored and skipped counts
+        """
+        if not self.enabled:
+            return {"status": "disabled", "stored": 0}
+
+        scanned, stored = 0, 0
+        seen = set()
+        batch: List[Tuple[str, str, HSCodeMatchResult]] = []
+
+        async with async_session_maker() as session:
+            result = await session.stream(self.BACKFILL_SQL, {"error_codes": list(self.ERROR_CODES)})
+            async for row in result:
+                scanned += 1
+                description = clean_description(row.product_description) if clean_description else row.product_description
+                row_country = country or row.country_schema
+                key = description_hash(description, row_country)
+                if key in seen or not description.strip():
+                    continue
+                seen.add(key)
+
+                batch.append((description, row_country, self._result_from_product_match(row, description)))
+                if len(batch) >= self.BACKFILL_BATCH_SIZE:
+                    stored += self.enqueue(batch, source="backfill")
+                    await self.flush()
+                    batch = []
+
+        if batch:
+            stored += self.enqueue(batch, source="backfill")
+            await self.flush()
+
+        logger.info(f"Classification store backfill: {stored} results from {scanned} product matches")
+        return {"status": "success", "scanned": scanned, "stored": stored, "skipped": scanned - stored}
+
+    def _result_from_product_match(self, row: Any, description: str) -> HSCodeMatchResult:
+        """Rebuild a match result from a stored product match"""
+        hs_code = row.matched_hs_code
+
+        def code_result(code: str, confidence: float, reasoning: str) -> HSCodeResult:
+            same_code = code == hs_code
+            return HSCodeResult(
+                hs_code=code,
+                code_description=(row.code_description if same_code else None) or "",
+                confidence=confidence,
+                chapter=(row.chapter if same_code else None) or code[:2],
+                section=(row.section if same_code else None) or "",
+                reasoning=reasoning
+            )
+
+        return HSCodeMatchResult(
+            primary_match=code_result(hs_code, float(row.confidence_score), row.vector_store_reasoning or ""),
+            alternative_matches=[
+                code_result(code, 0.0, "Alternative from a previous match")
+                for code in (row.alternative_hs_codes or [])[:3]
+            ],
+            processing_time_ms=0.0,
+            query=description
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get lookup, write and buffer counters"""
+        lookups = self._stats["lookups"]
+        return {
+            "enabled": self.enabled,
+            **self._stats,
+            "hit_rate_percent": round(self._stats["hits"] / lookups * 100, 2) if lookups else 0.0,
+            "pending_writes": len(self._pending),
+        }
+
+
+def _glob_to_similar(pattern: str) -> str:
+    """Translate a Redis-style glob (``*``, ``?``, ``[...]``) to a SIMILAR TO pattern"""
+    special = {"*": "%", "?": "_"}
+    escaped = "%_|+(){}\\"
+    return "".join(special.get(ch) or (f"\\{ch}" if ch in escaped else ch) for ch in pattern)
+
+
+# Global store instance
+classification_store = ClassificationStore(enabled=settings.HS_CACHE_L3_ENABLED)
@@ -0,0 +1,123 @@
+"""
+Canonical form of product descriptions for cache keys
+
+Descriptions that differ only in case, word order, number and unit spelling
+or Cyrillic/Latin script map to the same canonical string, so that e.g.
+"Cotton fabric, 100%" and "100 % cotton fabric" share one cache entry.
+The canonical form is only used for keys; the agent still sees the original
+description.
+"""
+
+import re
+import hashlib
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from typing import List, Set
+
+
+# Phonetic transliteration for words written entirely in Cyrillic
+# (Russian plus the extra Turkmen Cyrillic letters)
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e",
+    "ж": "zh", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "",
+    "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ә": "a", "җ": "j", "ң": "n", "ө": "o", "ү": "u",
+}
+
+# Look-alike letters for words mixing both scripts, e.g. a Cyrillic "с" typed
+# inside "cotton"; these must map to the Latin letter they imitate
+CYRILLIC_HOMOGLYPHS = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i",
+}
+
+# Unit spellings (after transliteration) mapped to one symbol; only applied
+# to the word right after a number, so "t" or "meters" on their own are kept
+UNIT_ALIASES = {
+    "%": "%", "percent": "%", "pct": "%", "protsent": "%", "prots": "%",
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilogram": "kg", "kilograms": "kg", "kilogramm": "kg",
+    "g": "g", "gr": "g", "gram": "g", "grams": "g", "gramm": "g",
+    "t": "t", "ton": "t", "tons": "t", "tonne": "t", "tonnes": "t", "tonna": "t",
+    "l": "l", "lt": "l", "ltr": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l", "litr": "l",
+    "ml": "ml", "millilitre": "ml", "milliliter": "ml",
+    "mm": "mm", "cm": "cm", "sm": "cm", "m": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m", "metr": "m",
+    "pcs": "pcs", "pc": "pcs", "piece": "pcs", "pieces": "pcs", "sht": "pcs",
+}
+
+_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)?|%|[^\W\d_]+")
+_CYRILLIC_PATTERN = re.compile(r"[Ѐ-ӿ]")
+_LATIN_PATTERN = re.compile(r"[a-z]")
+
+
+def _transliterate_word(word: str) -> str:
+    """Bring a word written in Cyrillic, or mixing scripts, to Latin letters"""
+    if not _CYRILLIC_PATTERN.search(word):
+        return word
+    table = CYRILLIC_HOMOGLYPHS if _LATIN_PATTERN.search(word) else {}
+    return "".join(table.get(ch) or CYRILLIC_TO_LATIN.get(ch, ch) for ch in word)
+
+
+def _normalize_number(token: str) -> str:
+    """Use a dot as decimal separator and drop redundant zeros ("1,50" -> "1.5")"""
+    try:
+        value = Decimal(token.replace(",", "."))
+    except InvalidOperation:
+        return token
+    normalized = format(value.normalize(), "f")
+    return normalized.rstrip("0").rstrip(".") if "." in normalized else normalized
+
+
+def canonical_tokens(description: str) -> List[str]:
+    """
+    Split a description into normalized tokens, numbers joined to their units
+
+    Args:
+        description: Raw or cleaned product description
+
+    Returns:
+        Tokens in their original order
+    """
+    text = unicodedata.normalize("NFKC", description).casefold()
+    words = [_transliterate_word(word) for word in _TOKEN_PATTERN.findall(text)]
+
+    tokens: List[str] = []
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word[0].isdigit():
+            number = _normalize_number(word)
+            unit = UNIT_ALIASES.get(words[i + 1]) if i + 1 < len(words) else None
+            if unit:
+                tokens.append(f"{number}{unit}")
+                i += 2
+                continue
+            tokens.append(number)
+        else:
+            tokens.append(word)
+        i += 1
+    return tokens
+
+
+def canonicalize_description(description: str) -> str:
+    """
+    Get the canonical form of a description used for cache keys
+
+    Case folded, transliterated, numbers and units normalized and the
+    distinct tokens sorted, so word order and repetition do not matter.
+    """
+    tokens = canonical_tokens(description)
+    if not tokens:
+        return " ".join(description.casefold().split())
+    return " ".join(sorted(set(tokens)))
+
+
+def numeric_tokens(canonical: str) -> Set[str]:
+    """Tokens carrying a number, which near-duplicate matches must share exactly"""
+    return {token for token in canonical.split() if any(ch.isdigit() for ch in token)}
+
+
+def description_hash(description: str, country: str = "default") -> str:
+    """Short hash of a description's canonical form, shared by every cache tier"""
+    return hashlib.sha256(f"{canonicalize_description(description)}:{country}".encode()).hexdigest()[:16]
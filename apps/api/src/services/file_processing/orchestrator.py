@@ -6,7 +6,7 @@ import logging
 from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, UploadFile
@@ -15,6 +15,7 @@ from src.models.processing_job import ProcessingJob, ProcessingStatus
 from src.models.product_match import ProductMatch
 from src.models.user import User
 from src.schemas.hs_matching import HSCodeMatchRequest
+from src.core.priority_lanes import Lane, priority_lane
 from src.services.hs_matching_service import hs_matching_service
 from src.services.xml_generation import XMLGenerationService, CountrySchema
 
@@ -34,12 +35,22 @@ except ImportError:
     class DummyWSManager:
         async def send_job_update(self, *args, **kwargs):
             pass
+        
+        async def send_hs_matching_update(self, *args, **kwargs):
+            pass
     ws_manager = DummyWSManager()
 
 
 class FileProcessingOrchestrator:
     """Main orchestrator that coordinates all file processing services"""
     
+    # ProductMatch rows are committed in chunks while matching results stream in
+    PRODUCT_MATCH_FLUSH_SIZE = 25
+    
+    # Share of the overall job progress covered by HS code matching
+    HS_MATCHING_PROGRESS_START = 50
+    HS_MATCHING_PROGRESS_END = 75
+    
     def __init__(self, db: Session):
         self.db = db
         
@@ -283,63 +294,54 @@ class FileProcessingOrchestrator:
             
             logger.info(f"Processing {len(match_requests)} products for HS code matching")
             
-            # Batch process HS code matching
-            try:
-                matching_results = await hs_matching_service.match_batch_products(
-                    requests=match_requests,
-                    max_concurrent=5  # Conservative concurrency for file processing
-                )
-            except Exception as e:
-                error_messages.append(f"HS code matching service failed: {str(e)}")
-                # Update job status to failed
-                self.job_management_service.update_job_status(
-                    processing_job, ProcessingStatus.FAILED, f"HS code matching failed: {str(e)}"
-                )
-                return created_matches, error_messages
+            # Stream results as they complete: rows are committed in chunks and
+            # progress is reported per product instead of after the slowest one
+            matches_by_row: List[Optional[ProductMatch]] = [None] * len(products_data)
+            progress = {"processed": 0, "high_confidence": 0, "requires_review": 0, "total_confidence": 0.0}
+            pending_rows = 0
+            saving = False
             
-            # Create ProductMatch records for each successful result
-            for i, (product_data, match_result) in enumerate(zip(products_data, matching_results)):
+            # Agent calls for uploads queue behind interactive requests
+            with priority_lane(Lane.FILE_PROCESSING):
+                stream = hs_matching_service.iter_batch_matches(match_requests)
                 try:
-                    # Extract numeric values with proper conversion
-                    quantity = Decimal(str(product_data.get('quantity', 0)).replace(',', ''))
-                    value = Decimal(str(product_data.get('value', 0)).replace(',', ''))
-                    
-                    # Determine if manual review is required
-                    requires_review = hs_matching_service.should_require_manual_review(
-                        match_result.primary_match.confidence
-                    )
+                    async for i, match_result in stream:
+                        try:
+                            product_match = self._create_product_match(processing_job, products_data[i], match_result)
+                            self.db.add(product_match)
+                            matches_by_row[i] = product_match
+                            pending_rows += 1
+                        except Exception as e:
+                            product_match = None
+                            error_msg = f"Failed to create ProductMatch for row {i+1}: {str(e)}"
+                            logger.error(error_msg)
+                            error_messages.append(error_msg)
                     
-                    # Extract alternative HS codes
-                    alternatives = []
-                    if match_result.alternative_matches:
-                        alternatives = [alt.hs_code for alt in match_result.alternative_matches]
-                    
-                    # Create ProductMatch record
-                    product_match = ProductMatch(
-                        job_id=processing_job.id,
-                        product_description=product_data.get('product_description', ''),
-                        quantity=quantity,
-                        unit_of_measure=product_data.get('unit', ''),
-                        value=value,
-                        origin_country=product_data.get('origin_country', '')[:3].upper(),  # Ensure 3-char country code
-                        matched_hs_code=match_result.primary_match.hs_code,
-                        confidence_score=Decimal(str(match_result.primary_match.confidence)),
-                        alternative_hs_codes=alternatives if alternatives else None,
-                        vector_store_reasoning=match_result.primary_match.reasoning,
-                        requires_manual_review=requires_review,
-                        user_confirmed=False
-                    )
-                    
-                    self.db.add(product_match)
-                    created_matches.append(product_match)
+                        if pending_rows >= self.PRODUCT_MATCH_FLUSH_SIZE:
+                            saving = True
+                            self.db.commit()
+                            saving = False
+                            pending_rows = 0
                     
+                        await self._send_matching_progress(
+                            processing_job, len(match_requests), match_result, product_match, progress
+                        )
                 except Exception as e:
-                    error_msg = f"Failed to create ProductMatch for row {i+1}: {str(e)}"
-                    logger.error(error_msg)
-                    error_messages.append(error_msg)
-                    continue
+                    if saving:
+                        return created_matches, self._fail_product_match_save(processing_job, e, error_messages)
+                    error_messages.append(f"HS code matching service failed: {str(e)}")
+                    # Update job status to failed; rows flushed so far stay on the job
+                    self.job_management_service.update_job_status(
+                        processing_job, ProcessingStatus.FAILED, f"HS code matching failed: {str(e)}"
+                    )
+                    return created_matches, error_messages
+                finally:
+                    await stream.aclose()
+            
+            # Keep file row order for the XML regardless of completion order
+            created_matches = [match for match in matches_by_row if match is not None]
             
-            # Commit all ProductMatch records and update job status
+            # Commit the remaining ProductMatch records and update job status
             try:
                 self.db.commit()
                 
@@ -368,15 +370,7 @@ class FileProcessingOrchestrator:
                 logger.info(f"Created {len(created_matches)} ProductMatch records with {len(error_messages)} errors")
                 
             except Exception as e:
-                self.db.rollback()
-                error_msg = f"Failed to save ProductMatch records: {str(e)}"
-                logger.error(error_msg)
-                error_messages.append(error_msg)
-                
-                # Update job status to failed
-                self.job_management_service.update_job_status(
-                    processing_job, ProcessingStatus.FAILED, error_msg
-                )
+                self._fail_product_match_save(processing_job, e, error_messages)
             
             return created_matches, error_messages
             
@@ -391,6 +385,101 @@ class FileProcessingOrchestrator:
             
             return created_matches, error_messages
 
+    def _create_product_match(
+        self,
+        processing_job: ProcessingJob,
+        product_data: Dict[str, Any],
+        match_result
+    ) -> ProductMatch:
+        """Build the ProductMatch record for one matched product row"""
+        # Extract numeric values with proper conversion
+        quantity = Decimal(str(product_data.get('quantity', 0)).replace(',', ''))
+        value = Decimal(str(product_data.get('value', 0)).replace(',', ''))
+        
+        # Determine if manual review is required
+        requires_review = hs_matching_service.should_require_manual_review(
+            match_result.primary_match.confidence
+        )
+        
+        # Extract alternative HS codes
+        alternatives = []
+        if match_result.alternative_matches:
+            alternatives = [alt.hs_code for alt in match_result.alternative_matches]
+        
+        return ProductMatch(
+            job_id=processing_job.id,
+            product_description=product_data.get('product_description', ''),
+            quantity=quantity,
+            unit_of_measure=product_data.get('unit', ''),
+            value=value,
+            origin_country=product_data.get('origin_country', '')[:3].upper(),  # Ensure 3-char country code
+            matched_hs_code=match_result.primary_match.hs_code,
+            confidence_score=Decimal(str(match_result.primary_match.confidence)),
+            alternative_hs_codes=alternatives if alternatives else None,
+            vector_store_reasoning=match_result.primary_match.reasoning,
+            requires_manual_review=requires_review,
+            user_confirmed=False
+        )
+    
+    def _fail_product_match_save(
+        self,
+        processing_job: ProcessingJob,
+        error: Exception,
+        error_messages: List[str]
+    ) -> List[str]:
+        """Roll back a failed ProductMatch commit and mark the job as failed"""
+        self.db.rollback()
+        error_msg = f"Failed to save ProductMatch records: {str(error)}"
+        logger.error(error_msg)
+        error_messages.append(error_msg)
+        
+        # Update job status to failed
+        self.job_management_service.update_job_status(
+            processing_job, ProcessingStatus.FAILED, error_msg
+        )
+        return error_messages
+    
+    async def _send_matching_progress(
+        self,
+        processing_job: ProcessingJob,
+        total_products: int,
+        match_result,
+        product_match: Optional[ProductMatch],
+        progress: Dict[str, Any]
+    ) -> None:
+        """Report one more matched product over the WebSocket"""
+        progress["processed"] += 1
+        confidence = match_result.primary_match.confidence
+        progress["total_confidence"] += confidence
+        if confidence >= hs_matching_service.HIGH_CONFIDENCE_THRESHOLD:
+            progress["high_confidence"] += 1
+        if product_match is not None and product_match.requires_manual_review:
+            progress["requires_review"] += 1
+        
+        processed = progress["processed"]
+        await ws_manager.send_hs_matching_update(
+            job_id=str(processing_job.id),
+            user_id=str(processing_job.user_id),
+            status="processing",
+            data={
+                "totalProducts": total_products,
+                "processedProducts": processed,
+                "highConfidenceMatches": progress["high_confidence"],
+                "averageConfidence": round(progress["total_confidence"] / processed, 3),
+                "requiresReview": progress["requires_review"]
+            }
+        )
+        
+        # Overall job progress moves through the matching stage's share
+        span = self.HS_MATCHING_PROGRESS_END - self.HS_MATCHING_PROGRESS_START
+        job_progress = self.HS_MATCHING_PROGRESS_START + span * processed // max(1, total_products)
+        previous = self.HS_MATCHING_PROGRESS_START + span * (processed - 1) // max(1, total_products)
+        if job_progress > previous:
+            await self._send_progress_update(
+                processing_job.id, processing_job.user_id, "HS_MATCHING", job_progress,
+                f"Matched {processed} of {total_products} products..."
+            )
+    
     async def complete_job_after_hs_matching(self, job_id: str, user: User, hs_matches: List[dict], processing_errors: List[str] = None):
         """Delegate to job management service"""
         return await self.job_management_service.complete_job_after_hs_matching(
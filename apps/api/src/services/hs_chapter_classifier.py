@@ -0,0 +1,312 @@
+"""
+Local HS chapter classifier
+
+A multinomial naive Bayes model over hashed word, word-pair and character
+n-grams predicts the HS chapter of a product description in microseconds.
+It is trained from the descriptions of active ``hs_codes`` rows and from
+user-confirmed ``product_matches``. Predictions narrow the agent query to
+the likely chapters and, when a vector index candidate agrees with a very
+confident prediction, let the match skip the agent.
+"""
+
+import time
+import zlib
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from ..core.database import async_session_maker
+from ..models.hs_code import HSCode
+from ..models.product_match import ProductMatch
+from .description_canonicalizer import canonical_tokens
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChapterPrediction:
+    """Predicted HS chapter with its posterior probability"""
+    chapter: str
+    section: str
+    probability: float
+
+
+@dataclass
+class _ChapterModel:
+    """Trained weights; replaced as a whole so predictions never see a partial model"""
+    weights: np.ndarray  # (N_FEATURES, chapters) log P(feature | chapter)
+    log_priors: np.ndarray
+    chapters: List[str]
+    sections: Dict[str, str]
+    training_size: int
+    trained_at: float
+
+
+class HSChapterClassifier:
+    """Hashed n-gram naive Bayes classifier from descriptions to HS chapters"""
+
+    N_FEATURES = 2 ** 15
+    SMOOTHING = 0.1
+    CHAR_NGRAM = 4
+    HOLDOUT_PERCENT = 10  # Share of confirmed matches held out to measure accuracy
+    MAX_LIKELY_CHAPTERS = 3
+
+    def __init__(self):
+        """Initialize an untrained classifier"""
+        self._model: Optional[_ChapterModel] = None
+        self._train_lock = asyncio.Lock()
+        self._evaluation: Dict[str, Any] = {}
+        self._stats = {
+            "predictions": 0,
+            "total_predict_time_ms": 0.0,
+        }
+
+    def is_ready(self) -> bool:
+        """Check whether a model has been trained"""
+        return self._model is not None
+
+    def _features(self, description: str) -> np.ndarray:
+        """Hash the word, word-pair and character n-grams of a description"""
+        tokens = canonical_tokens(description)
+        grams = [f"w:{token}" for token in tokens]
+        grams.extend(f"b:{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        for token in tokens:
+            padded = f"#{token}#"
+            grams.extend(
+                f"c:{padded[i:i + self.CHAR_NGRAM]}" for i in range(len(padded) - self.CHAR_NGRAM + 1)
+            )
+        return np.fromiter(
+            (zlib.crc32(gram.encode()) % self.N_FEATURES for gram in grams),
+            dtype=np.int64,
+            count=len(grams)
+        )
+
+    def fit(
+        self,
+        descriptions: Sequence[str],
+        chapters: Sequence[str],
+        sections: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Train the classifier, replacing any previous model
+
+        Args:
+            descriptions: Training descriptions
+            chapters: Two-digit HS chapter of each description
+            sections: Optional chapter to section mapping reported with predictions
+
+        Returns:
+            Number of training examples used
+        """
+        labels = sorted(set(chapters))
+        if not labels:
+            self._model = None
+            return 0
+
+        label_index = {chapter: i for i, chapter in enumerate(labels)}
+        class_counts = np.zeros(len(labels), dtype=np.float64)
+        feature_rows, label_cols = [], []
+        for description, chapter in zip(descriptions, chapters):
+            features = self._features(description)
+            if not len(features):
+                continue
+            column = label_index[chapter]
+            class_counts[column] += 1
+            feature_rows.append(features)
+            label_cols.append(np.full(len(features), column))
+
+        counts = np.zeros((self.N_FEATURES, len(labels)), dtype=np.float64)
+        if feature_rows:
+            np.add.at(counts, (np.concatenate(feature_rows), np.concatenate(label_cols)), 1.0)
+
+        # Laplace-smoothed log likelihoods; a prediction sums one row per feature
+        counts += self.SMOOTHING
+        weights = np.log(counts / counts.sum(axis=0, keepdims=True)).astype(np.float32)
+        log_priors = np.log((class_counts + 1.0) / (class_counts.sum() + len(labels))).astype(np.float32)
+
+        training_size = int(class_counts.sum())
+        self._model = _ChapterModel(
+            weights=np.ascontiguousarray(weights),
+            log_priors=log_priors,
+            chapters=labels,
+            sections=dict(sections or {}),
+            training_size=training_size,
+            trained_at=time.time()
+        )
+        return training_size
+
+    def predict(self, description: str, top_k: int = 3) -> List[ChapterPrediction]:
+        """
+        Predict the most likely chapters of a description
+
+        Args:
+            description: Product description
+            top_k: Number of chapters to return
+
+        Returns:
+            Chapters with their probabilities, most likely first; empty when untrained
+        """
+        model = self._model
+        if model is None:
+            return []
+
+        start_time = time.perf_counter()
+        features = self._features(description)
+        if not len(features):
+            return []
+
+        scores = model.weights[features].sum(axis=0) + model.log_priors
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        top = np.argsort(-probabilities)[:top_k]
+
+        self._stats["predictions"] += 1
+        self._stats["total_predict_time_ms"] += (time.perf_counter() - start_time) * 1000
+
+        return [
+            ChapterPrediction(
+                chapter=model.chapters[i],
+                section=model.sections.get(model.chapters[i], ""),
+                probability=float(probabilities[i])
+            )
+            for i in top
+        ]
+
+    def likely_chapters(self, description: str, confidence: float) -> List[ChapterPrediction]:
+        """
+        Get the fewest chapters whose probabilities add up to the confidence
+
+        Args:
+            description: Product description
+            confidence: Cumulative probability the chapters must cover
+
+        Returns:
+            Up to MAX_LIKELY_CHAPTERS chapters; empty when no such set exists
+        """
+        predictions = self.predict(description, top_k=self.MAX_LIKELY_CHAPTERS)
+        covered = 0.0
+        for count, prediction in enumerate(predictions, start=1):
+            covered += prediction.probability
+            if covered >= confidence:
+                return predictions[:count]
+        return []
+
+    def evaluate(self, descriptions: Sequence[str], chapters: Sequence[str]) -> Dict[str, Any]:
+        """
+        Measure accuracy and prediction latency on labelled descriptions
+
+        Args:
+            descriptions: Held-out descriptions
+            chapters: Their true chapters
+
+        Returns:
+            Dictionary with top-1 and top-3 accuracy and latency percentiles
+        """
+        if not descriptions or self._model is None:
+            return {"examples": 0}
+
+        top1 = top3 = 0
+        timings = []
+        for description, chapter in zip(descriptions, chapters):
+            start_time = time.perf_counter()
+            predictions = self.predict(description, top_k=3)
+            timings.append((time.perf_counter() - start_time) * 1_000_000)
+            predicted = [p.chapter for p in predictions]
+            top1 += bool(predicted) and predicted[0] == chapter
+            top3 += chapter in predicted
+
+        latencies = np.asarray(timings)
+        return {
+            "examples": len(timings),
+            "accuracy": round(top1 / len(timings), 4),
+            "top3_accuracy": round(top3 / len(timings), 4),
+            "p50_latency_us": round(float(np.percentile(latencies, 50)), 1),
+            "p99_latency_us": round(float(np.percentile(latencies, 99)), 1),
+        }
+
+    async def train(self) -> Dict[str, Any]:
+        """
+        Train from active hs_codes and user-confirmed product matches
+
+        A deterministic share of the confirmed matches is held out to
+        report accuracy, then the model is refit on everything.
+
+        Returns:
+            Dictionary with training sizes and the held-out evaluation
+        """
+        async with self._train_lock:
+            async with async_session_maker() as session:
+                code_rows = (await session.execute(
+                    select(HSCode.description, HSCode.chapter, HSCode.section).where(HSCode.is_active == True)
+                )).fetchall()
+                match_rows = (await session.execute(
+                    select(ProductMatch.product_description, ProductMatch.matched_hs_code).where(
+                        ProductMatch.user_confirmed == True
+                    )
+                )).fetchall()
+
+            sections = {row.chapter: row.section for row in code_rows}
+            descriptions = [row.description for row in code_rows]
+            chapters = [row.chapter for row in code_rows]
+
+            # Only confirmed codes of a known chapter teach the model anything
+            confirmed = [
+                (row.product_description, row.matched_hs_code[:2])
+                for row in match_rows
+                if row.matched_hs_code and row.matched_hs_code[:2] in sections
+            ]
+            held_out, training = [], []
+            for example in confirmed:
+                in_holdout = zlib.crc32(example[0].encode()) % 100 < self.HOLDOUT_PERCENT
+                (held_out if in_holdout else training).append(example)
+
+            evaluation: Dict[str, Any] = {"examples": 0}
+            if held_out:
+                await asyncio.to_thread(
+                    self.fit,
+                    descriptions + [d for d, _ in training],
+                    chapters + [c for _, c in training],
+                    sections
+                )
+                evaluation = self.evaluate([d for d, _ in held_out], [c for _, c in held_out])
+
+            trained = await asyncio.to_thread(
+                self.fit,
+                descriptions + [d for d, _ in confirmed],
+                chapters + [c for _, c in confirmed],
+                sections
+            )
+            self._evaluation = evaluation
+
+        logger.info(f"HS chapter classifier trained on {trained} examples, held-out evaluation: {evaluation}")
+        return {
+            "status": "success",
+            "hs_code_examples": len(code_rows),
+            "confirmed_match_examples": len(confirmed),
+            "chapters": len(self._model.chapters) if self._model else 0,
+            "held_out_evaluation": evaluation,
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get model size, held-out accuracy and prediction statistics"""
+        model = self._model
+        predictions = self._stats["predictions"]
+        return {
+            "trained": model is not None,
+            "chapters": len(model.chapters) if model else 0,
+            "training_size": model.training_size if model else 0,
+            "trained_at": model.trained_at if model else None,
+            "held_out_evaluation": self._evaluation,
+            "predictions": predictions,
+            "avg_predict_time_ms": round(self._stats["total_predict_time_ms"] / predictions, 4) if predictions else 0.0
+        }
+
+
+# Create singleton instance
+hs_chapter_classifier = HSChapterClassifier()
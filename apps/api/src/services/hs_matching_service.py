@@ -8,20 +8,38 @@ using OpenAI's Vector Store and semantic search capabilities with Redis caching.
 import asyncio
 import time
 import logging
-import hashlib
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Set, AsyncIterator
 from decimal import Decimal
-from functools import lru_cache
+from functools import lru_cache, partial
 from collections import deque
 from datetime import datetime, timedelta
 from agents import Agent, FileSearchTool, Runner
 
 from pydantic import BaseModel, Field
 
-from ..core.openai_config import OpenAIAgentConfig, HSCodeResult, HSCodeMatchResult
+from ..core.config import settings
+from ..core.openai_config import (
+    OpenAIAgentConfig,
+    HSCodeResult,
+    HSCodeMatchResult,
+    MatchErrorKind,
+    agent_registry,
+    classify_match_error
+)
+from ..core.adaptive_concurrency import openai_concurrency_limiter
+from ..core.openai_rate_limiter import openai_token_bucket
+from ..core.agent_resilience import agent_circuit_breaker, agent_hedger
+from ..core.priority_lanes import Lane, priority_lane
 from ..schemas.processing import ProductData
 from .cache_service import get_cache_service, noop_cache_service
 from .analytics_service import analytics_service
+from .hs_vector_index import hs_vector_index
+from .hs_chapter_classifier import hs_chapter_classifier
+from .matcher_backends import create_matcher_backend
+from .classification_store import classification_store
+from .cache_warmer import cache_warmer
+from .request_coalescing import SingleFlight
+from .description_canonicalizer import canonicalize_description
 
 # Import request models from schemas to avoid circular imports
 from typing import TYPE_CHECKING
@@ -43,9 +61,8 @@ class HSCodeMatchingService:
     TIMEOUT_SECONDS = 20  # Reduced from 30 for faster failures
     
     # Performance optimization settings
-    MAX_CONCURRENT_REQUESTS = 10  # Connection pool size
     REQUEST_QUEUE_SIZE = 200  # Max queued requests
-    PERFORMANCE_TARGET_MS = 2000  # 2 second target
+    PERFORMANCE_TARGET_MS = settings.HS_MATCH_LATENCY_TARGET_MS  # 2 second target
     
     # Confidence thresholds
     HIGH_CONFIDENCE_THRESHOLD = 0.95
@@ -57,15 +74,31 @@ class HSCodeMatchingService:
         self.agent_config = OpenAIAgentConfig()
         self._agents_cache: Dict[str, Any] = {}
         self._cache_service = None
+        self._vector_index = hs_vector_index
+        self._chapter_classifier = hs_chapter_classifier
+        self._single_flight = SingleFlight()
+        self._matcher_backend = create_matcher_backend(
+            settings.HS_MATCHER_BACKEND, self.agent_config, self._get_or_create_agent
+        )
         
-        # Performance optimization: Connection pooling and request queuing
-        self._request_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        # Performance optimization: process-wide adaptive concurrency and request queuing
+        self._concurrency_limiter = openai_concurrency_limiter
         self._request_queue = deque(maxlen=self.REQUEST_QUEUE_SIZE)
         self._performance_metrics = {
             "total_requests": 0,
             "cache_hits": 0,
             "avg_response_time_ms": 0,
-            "requests_under_target": 0
+            "requests_under_target": 0,
+            "vector_index_hits": 0,
+            "chapter_classifier_hits": 0,
+            "batch_rows": 0,
+            "batch_unique_rows": 0,
+            "packed_calls": 0,
+            "packed_items": 0,
+            "packed_fallbacks": 0,
+            "circuit_open_fallbacks": 0,
+            "circuit_open_failures": 0,
+            "negative_cache_hits": 0
         }
         
         # Async initialization tracking
@@ -81,6 +114,7 @@ class HSCodeMatchingService:
                 if self._cache_service is None:  # Double-check pattern
                     try:
                         self._cache_service = await get_cache_service()
+                        self._cache_service.set_refresh_handler(self._refresh_cached_match)
                         # Pre-warm cache on first initialization
                         if not self._initialized:
                             asyncio.create_task(self._background_cache_warming())
@@ -99,12 +133,22 @@ class HSCodeMatchingService:
         except Exception as e:
             logger.warning(f"Background cache warming failed: {str(e)}")
     
-    async def _get_or_create_agent(self, country: str = "default"):
-        """Get or create an agent for the specified country with caching"""
-        if country not in self._agents_cache:
-            self._agents_cache[country] = await self.agent_config.create_agent(country)
-            logger.info(f"Created new agent for country: {country}")
-        return self._agents_cache[country]
+    async def _get_or_create_agent(self, country: str = "default", packed: bool = False):
+        """Get the shared registry agent for the specified country with caching"""
+        agent = await agent_registry.get_agent(country, packed=packed)
+        cache_key = f"{country}:packed" if packed else country
+        if self._agents_cache.get(cache_key) is not agent:
+            # First use, or the registry rebuilt it after a vector store change
+            self._agents_cache[cache_key] = agent
+            logger.info(f"Using agent for country: {cache_key}")
+        return agent
+    
+    async def preload_agents(self) -> int:
+        """Build agents for every configured country ahead of the first request"""
+        for country in self.agent_config.get_available_countries():
+            await self._get_or_create_agent(country)
+            await self._get_or_create_agent(country, packed=True)
+        return len(self._agents_cache)
     
     async def match_single_product(
         self, 
@@ -133,8 +177,7 @@ class HSCodeMatchingService:
         start_time = time.time()
         
         # Validate input
-        if not product_description or len(product_description.strip()) < 5:
-            raise ValueError("Product description must be at least 5 characters long")
+        self._validate_product_description(product_description)
         
         # Clean and prepare the description
         cleaned_description = self._clean_product_description(product_description)
@@ -152,30 +195,36 @@ class HSCodeMatchingService:
         
         # Cache miss - proceed with OpenAI matching
         logger.debug(f"Cache miss for product: {product_description[:50]}... Querying OpenAI")
-        
-        # Get or create agent for country
-        agent = await self._get_or_create_agent(country)
-        
-        # Build search query with context
-        search_query = self._build_search_query(cleaned_description, include_alternatives)
+        return await self._match_cache_miss(
+            product_description, cleaned_description, country, cache_service, start_time
+        )
+    
+    async def _match_cache_miss(
+        self,
+        product_description: str,
+        cleaned_description: str,
+        country: str,
+        cache_service,
+        start_time: float
+    ) -> HSCodeMatchResult:
+        """Match a description already known to miss the cache and record analytics"""
+        # Descriptions that recently failed deterministically fail again without an agent call
+        negative_result = await cache_service.get_negative_match(cleaned_description, country)
+        if negative_result is not None:
+            self._performance_metrics["negative_cache_hits"] += 1
+            logger.info(f"Negative cache hit for product: {product_description[:50]}...")
+            return negative_result
         
         try:
-            # Use the enhanced OpenAI Agents SDK matching
-            processed_result = await self.agent_config.match_hs_code(cleaned_description, country)
+            # Identical in-flight requests share a single computation
+            processed_result = await self._single_flight.do(
+                (canonicalize_description(cleaned_description), country),
+                lambda: self._match_and_cache(cleaned_description, country, cache_service, start_time)
+            )
             
             # Update processing time if needed
             processing_time = processed_result.processing_time_ms
             
-            # Cache the result for future use
-            cache_success = await cache_service.cache_match_result(
-                product_description=cleaned_description,
-                result=processed_result,
-                country=country
-            )
-            
-            if cache_success:
-                logger.debug(f"Cached result for product: {product_description[:50]}...")
-            
             logger.info(f"Successfully matched HS code for product: {product_description[:50]}... "
                        f"(Primary: {processed_result.primary_match.hs_code}, "
                        f"Confidence: {processed_result.primary_match.confidence:.3f}, "
@@ -190,7 +239,7 @@ class HSCodeMatchingService:
                     processing_time_ms=processing_time,
                     success=True,
                     country=country,
-                    cache_hit=cached_result is not None
+                    cache_hit=False
                 )
             except Exception as analytics_error:
                 logger.warning(f"Failed to record analytics: {str(analytics_error)}")
@@ -218,6 +267,136 @@ class HSCodeMatchingService:
             
             raise
     
+    async def _match_and_cache(
+        self,
+        cleaned_description: str,
+        country: str,
+        cache_service,
+        start_time: float
+    ) -> HSCodeMatchResult:
+        """Match a cache miss and cache the result; runs once per in-flight key"""
+        # Across workers, a short Redis lock lets other processes wait for the
+        # leader's cached result instead of re-querying OpenAI
+        if settings.HS_MATCH_CROSS_WORKER_COALESCING:
+            acquired = await cache_service.acquire_inflight_lock(cleaned_description, country)
+            if not acquired:
+                cached_result = await cache_service.wait_for_cached_match(
+                    cleaned_description, country, timeout_seconds=self.TIMEOUT_SECONDS
+                )
+                if cached_result:
+                    self._single_flight.record_cross_worker_coalesced()
+                    return cached_result
+        
+        try:
+            return await self._compute_and_cache(cleaned_description, country, cache_service, start_time)
+        finally:
+            await cache_service.release_inflight_lock(cleaned_description, country)
+    
+    async def _compute_and_cache(
+        self,
+        cleaned_description: str,
+        country: str,
+        cache_service,
+        start_time: float
+    ) -> HSCodeMatchResult:
+        """Match a description without consulting the cache and cache the result"""
+        # Consult the local vector index first: confident hits skip the agent,
+        # otherwise the shortlist is handed to the agent as context
+        candidates = await self._get_vector_candidates(cleaned_description, country)
+        chapters = self._get_likely_chapters(cleaned_description)
+        if candidates and candidates[0].score >= settings.HS_VECTOR_INDEX_SKIP_THRESHOLD:
+            processed_result = self._vector_index.build_match_result(
+                candidates, cleaned_description, (time.time() - start_time) * 1000
+            )
+            self._performance_metrics["vector_index_hits"] += 1
+        elif self._chapter_confirms_candidate(chapters, candidates):
+            # A very confident chapter prediction agrees with the best shortlist
+            # candidate, which is trusted at a lower similarity than on its own
+            processed_result = self._vector_index.build_match_result(
+                candidates, cleaned_description, (time.time() - start_time) * 1000
+            )
+            self._performance_metrics["chapter_classifier_hits"] += 1
+        elif agent_circuit_breaker.is_open:
+            # Agent calls are failing: answer from the local index shortlist
+            # without caching it, or fail fast when there is none
+            if not candidates:
+                self._performance_metrics["circuit_open_failures"] += 1
+                raise ConnectionError("OpenAI agent unavailable (circuit breaker open)")
+            self._performance_metrics["circuit_open_fallbacks"] += 1
+            return self._vector_index.build_match_result(
+                candidates, cleaned_description, (time.time() - start_time) * 1000
+            )
+        else:
+            # Classify with the configured matcher backend
+            processed_result = await self._matcher_backend.match(
+                cleaned_description, country, candidates=candidates, chapters=chapters
+            )
+            if processed_result.run_metrics is not None:
+                analytics_service.record_agent_run(processed_result.run_metrics)
+            if not self._matcher_backend.cache_results:
+                return processed_result
+        
+        # Failed matches are never cached as results: transient ones are
+        # retried next time, deterministic ones are remembered briefly
+        if processed_result.error_kind is not None:
+            if processed_result.error_kind == MatchErrorKind.DETERMINISTIC:
+                await cache_service.cache_negative_result(cleaned_description, processed_result, country)
+            return processed_result
+        
+        # Cache the result for future use
+        cache_success = await cache_service.cache_match_result(
+            product_description=cleaned_description,
+            result=processed_result,
+            country=country
+        )
+        
+        if cache_success:
+            logger.debug(f"Cached result for product: {cleaned_description[:50]}...")
+        
+        return processed_result
+    
+    async def _refresh_cached_match(self, cleaned_description: str, country: str) -> Optional[HSCodeMatchResult]:
+        """Recompute a stale cache entry; called by the cache service in the background"""
+        if agent_circuit_breaker.is_open:
+            # The stale entry keeps being served until the agent recovers
+            return None
+        cache_service = await self._get_cache_service()
+        # Shares the computation with a concurrent miss for the same key
+        return await self._single_flight.do(
+            (canonicalize_description(cleaned_description), country),
+            lambda: self._compute_and_cache(cleaned_description, country, cache_service, time.time())
+        )
+    
+    def _get_likely_chapters(self, description: str) -> list:
+        """Get the likely HS chapters from the local classifier, empty when unavailable"""
+        if not settings.HS_CHAPTER_CLASSIFIER_ENABLED or not self._chapter_classifier.is_ready():
+            return []
+        
+        return self._chapter_classifier.likely_chapters(
+            description, settings.HS_CHAPTER_CLASSIFIER_HINT_CONFIDENCE
+        )
+    
+    def _chapter_confirms_candidate(self, chapters: list, candidates: list) -> bool:
+        """Check whether a confident chapter prediction agrees with the best candidate"""
+        return bool(
+            chapters and candidates
+            and chapters[0].probability >= settings.HS_CHAPTER_CLASSIFIER_SKIP_CONFIDENCE
+            and candidates[0].chapter == chapters[0].chapter
+            and candidates[0].score >= settings.HS_CHAPTER_CLASSIFIER_AGREEMENT_SCORE
+        )
+    
+    async def _get_vector_candidates(self, description: str, country: str) -> list:
+        """Get a candidate shortlist from the local vector index, empty when unavailable"""
+        if not settings.HS_VECTOR_INDEX_ENABLED or not self._vector_index.is_ready(country):
+            return []
+        
+        try:
+            shortlists = await self._vector_index.search_descriptions([description], country)
+            return shortlists[0] if shortlists else []
+        except Exception as e:
+            logger.warning(f"Vector index lookup failed, falling back to agent only: {str(e)}")
+            return []
+    
     async def match_batch_products(
         self,
         requests: List["HSCodeMatchRequest"],
@@ -228,95 +407,337 @@ class HSCodeMatchingService:
         
         Args:
             requests: List of HS code match requests
-            max_concurrent: Maximum number of concurrent API calls
+            max_concurrent: Optional per-batch cap on concurrent matches; agent
+                calls are always bounded by the shared adaptive limiter
             
         Returns:
             List[HSCodeMatchResult]: List of matching results
             
+        Raises:
+            ValueError: If batch size exceeds limits
+        """
+        processed_results: List[Optional[HSCodeMatchResult]] = [None] * len(requests)
+        try:
+            async for index, result in self.iter_batch_matches(requests, max_concurrent):
+                processed_results[index] = result
+            return processed_results
+            
+        except Exception as e:
+            logger.error(f"Batch matching failed: {str(e)}")
+            raise
+    
+    async def iter_batch_matches(
+        self,
+        requests: List["HSCodeMatchRequest"],
+        max_concurrent: int = None
+    ) -> AsyncIterator[Tuple[int, HSCodeMatchResult]]:
+        """
+        Match multiple products, yielding each result as soon as it is ready
+        
+        Cache hits come first, then agent results in completion order. Rows
+        sharing a description are yielded together once it is matched, and
+        failed rows are yielded as error results.
+        
+        Args:
+            requests: List of HS code match requests
+            max_concurrent: Optional per-batch cap on concurrent matches; agent
+                calls are always bounded by the shared adaptive limiter
+            
+        Yields:
+            Tuple of (row index in ``requests``, matching result)
+            
         Raises:
             ValueError: If batch size exceeds limits
         """
         if len(requests) > self.BATCH_SIZE_LIMIT:
             raise ValueError(f"Batch size {len(requests)} exceeds limit of {self.BATCH_SIZE_LIMIT}")
         
-        # Optimize concurrency based on batch size
+        # Collapse rows that are identical after cleaning: each unique
+        # description is matched once and fanned back out to its rows
+        unique_requests, row_to_unique = self._deduplicate_requests(requests)
+        dedup_ratio = 1 - len(unique_requests) / len(requests) if requests else 0.0
+        rows_by_unique: List[List[int]] = [[] for _ in unique_requests]
+        for row, unique_index in enumerate(row_to_unique):
+            rows_by_unique[unique_index].append(row)
+        
+        # Agent calls are throttled by the shared adaptive limiter; a batch
+        # only adds its own cap when the caller asks for one
         if max_concurrent is None:
-            max_concurrent = min(self.MAX_CONCURRENT_REQUESTS, max(5, len(requests) // 10))
+            max_concurrent = max(1, len(unique_requests))
         
-        logger.info(f"Starting batch matching for {len(requests)} products with {max_concurrent} concurrent workers")
+        logger.info(f"Starting batch matching for {len(requests)} products "
+                   f"({len(unique_requests)} unique, dedup ratio {dedup_ratio:.2f}) "
+                   f"with concurrency limit {self._concurrency_limiter.limit}")
         
         # Get cache service
         cache_service = await self._get_cache_service()
         
-        # Generate batch hash for caching
-        batch_hash = self._generate_batch_hash(requests)
-        
-        # Check for cached batch result
-        cached_batch = await cache_service.get_cached_batch_match(batch_hash)
-        if cached_batch and len(cached_batch) == len(requests):
-            logger.info(f"Batch cache hit for {len(requests)} products")
-            self._update_performance_metrics(0, len(requests), True)
-            return cached_batch
-        
-        # Batch cache miss - process individual requests with caching
-        logger.debug(f"Batch cache miss - processing {len(requests)} individual requests")
+        # Resolve every cache hit in one round trip before dispatching misses.
+        # Batches are composed from the per-item entries, so a repeated file,
+        # in any row order, and the overlapping rows of a different one all hit
+        cleaned = [self._clean_product_description(r.product_description) for r in unique_requests]
+        cached = await cache_service.get_cached_matches_bulk(
+            [(description, request.country) for description, request in zip(cleaned, unique_requests)]
+        )
+        cache_hits = sum(1 for hit in cached if hit is not None)
+        logger.debug(f"Bulk cache lookup: {cache_hits} of {len(unique_requests)} unique products cached")
         
         # Create semaphore to limit concurrent requests
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def match_with_semaphore(request: "HSCodeMatchRequest") -> HSCodeMatchResult:
-            async with semaphore:
-                return await self.match_single_product(
-                    product_description=request.product_description,
-                    country=request.country,
-                    include_alternatives=request.include_alternatives,
-                    confidence_threshold=request.confidence_threshold
+        async def match_with_semaphore(index: int) -> List[Tuple[int, Any]]:
+            request = unique_requests[index]
+            try:
+                self._validate_product_description(request.product_description)
+                async with semaphore:
+                    result = await self._match_cache_miss(
+                        request.product_description, cleaned[index], request.country, cache_service, time.time()
+                    )
+                return [(index, result)]
+            except Exception as e:
+                return [(index, e)]
+        
+        processed_results: List[Optional[HSCodeMatchResult]] = [None] * len(requests)
+        total_time = 0.0
+        
+        def fan_out(unique_index: int, result: Any) -> List[Tuple[int, HSCodeMatchResult]]:
+            nonlocal total_time
+            if isinstance(result, Exception):
+                logger.error(f"Failed to match product at index {unique_index}: {str(result)}")
+                result = self._create_error_result(
+                    unique_requests[unique_index].product_description, str(result), classify_match_error(result)
                 )
+            else:
+                total_time += result.processing_time_ms
+            # Duplicates get their own copy
+            rows = [
+                (row, result if n == 0 else result.model_copy())
+                for n, row in enumerate(rows_by_unique[unique_index])
+            ]
+            for row, row_result in rows:
+                processed_results[row] = row_result
+            return rows
+        
+        # Cache hits are ready now; misses run as tasks yielded in completion order
+        misses = []
+        for index, hit in enumerate(cached):
+            if hit is not None:
+                for row_result in fan_out(index, hit):
+                    yield row_result
+            else:
+                misses.append(index)
+        
+        # Recent deterministic failures are answered from the negative cache
+        negative = await cache_service.get_negative_matches_bulk(
+            [(cleaned[i], unique_requests[i].country) for i in misses]
+        )
+        remaining = []
+        for index, negative_result in zip(misses, negative):
+            if negative_result is not None:
+                self._performance_metrics["negative_cache_hits"] += 1
+                for row_result in fan_out(index, negative_result):
+                    yield row_result
+            else:
+                remaining.append(index)
+        misses = remaining
+        
+        if settings.HS_MATCH_PACKED_CHUNK_SIZE > 1:
+            tasks, per_item = await self._start_packed_chunks(unique_requests, cleaned, misses, cache_service, semaphore)
+            tasks.update(asyncio.ensure_future(match_with_semaphore(i)) for i in per_item)
+        else:
+            tasks = {asyncio.ensure_future(match_with_semaphore(i)) for i in misses}
         
-        # Execute all matches concurrently
+        packed_fallbacks = 0
         try:
-            results = await asyncio.gather(
-                *[match_with_semaphore(req) for req in requests],
-                return_exceptions=True
-            )
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for index, result in task.result():
+                        if result is None:
+                            # Missing from a packed output: retry on the per-item path
+                            packed_fallbacks += 1
+                            tasks.add(asyncio.ensure_future(match_with_semaphore(index)))
+                            continue
+                        for row_result in fan_out(index, result):
+                            yield row_result
+        finally:
+            # The consumer stopped early or the batch failed
+            for task in tasks:
+                task.cancel()
+        
+        self._performance_metrics["batch_rows"] += len(requests)
+        self._performance_metrics["batch_unique_rows"] += len(unique_requests)
+        self._performance_metrics["packed_fallbacks"] += packed_fallbacks
+        
+        # Update performance metrics
+        avg_time = total_time / len(unique_requests) if unique_requests else 0
+        self._update_performance_metrics(avg_time, len(processed_results), cache_hits == len(unique_requests))
+        
+        logger.info(f"Completed batch matching: {len(processed_results)} results "
+                   f"({len(unique_requests)} matched, {packed_fallbacks} packed fallbacks), "
+                   f"avg time: {avg_time:.0f}ms")
+    
+    async def _start_packed_chunks(
+        self,
+        requests: List["HSCodeMatchRequest"],
+        cleaned: List[str],
+        misses: List[int],
+        cache_service,
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[Set["asyncio.Future"], List[int]]:
+        """
+        Start one packed agent run per chunk of N cache misses
+        
+        Packed items lead their single-flight key and hold their cross-worker
+        in-flight lock like per-item calls do, so identical descriptions in
+        concurrent requests wait for the packed result. Misses another caller
+        is already matching, and invalid descriptions, are left to the
+        per-item path, which coalesces or rejects them. Packed outputs never
+        hold error results: missing items fall back to the per-item path,
+        which negatively caches deterministic failures.
+        
+        Each task resolves to (index, result) pairs for its chunk, with None
+        for items missing from (or malformed in) the packed output so the
+        caller can fall back to the regular per-item path.
+        
+        Returns:
+            Tuple of (chunk tasks, indices to match on the per-item path)
+        """
+        chunk_size = settings.HS_MATCH_PACKED_CHUNK_SIZE
+        per_item: List[int] = []
+        claims: Dict[int, Tuple[Tuple[str, str], asyncio.Future]] = {}
+        for i in misses:
+            if len(requests[i].product_description.strip()) < 5:
+                per_item.append(i)
+                continue
+            key = (canonicalize_description(cleaned[i]), requests[i].country)
+            future = self._single_flight.claim(key)
+            if future is None:
+                per_item.append(i)
+            else:
+                claims[i] = (key, future)
+        
+        if settings.HS_MATCH_CROSS_WORKER_COALESCING and claims:
+            indices = list(claims)
+            try:
+                acquired = await asyncio.gather(*(
+                    cache_service.acquire_inflight_lock(cleaned[i], requests[i].country) for i in indices
+                ))
+            except BaseException:
+                for i in indices:
+                    self._single_flight.settle(*claims[i], None)
+                    asyncio.ensure_future(cache_service.release_inflight_lock(cleaned[i], requests[i].country))
+                raise
+            for i, locked in zip(indices, acquired):
+                if not locked:
+                    # Another worker is matching it: wait for its result per item
+                    self._single_flight.settle(*claims.pop(i), None)
+                    per_item.append(i)
+        
+        misses_by_country: Dict[str, List[int]] = {}
+        for i in claims:
+            misses_by_country.setdefault(requests[i].country, []).append(i)
+        
+        async def run_chunk(country: str, indices: List[int]) -> List[Tuple[int, Optional[HSCodeMatchResult]]]:
+            packed: List[Optional[HSCodeMatchResult]] = [None] * len(indices)
+            try:
+                try:
+                    async with semaphore:
+                        packed = await self._matcher_backend.match_packed([cleaned[i] for i in indices], country)
+                    self._performance_metrics["packed_calls"] += 1
+                    
+                    matched = [(i, result) for i, result in zip(indices, packed) if result is not None]
+                    if matched and matched[0][1].run_metrics is not None:
+                        # The chunk's items share one run's metrics
+                        analytics_service.record_agent_run(matched[0][1].run_metrics)
+                    if self._matcher_backend.cache_results:
+                        await cache_service.cache_match_results_bulk(
+                            [(cleaned[i], country, result) for i, result in matched]
+                        )
+                except Exception as e:
+                    logger.warning(f"Packed chunk failed, falling back to per-item calls: {str(e)}")
+                    packed = [None] * len(indices)
+                    return [(i, None) for i in indices]
+            finally:
+                # Waiters get the packed result, or match missing items themselves
+                for i, result in zip(indices, packed):
+                    self._single_flight.settle(*claims[i], result)
+                await asyncio.gather(*(cache_service.release_inflight_lock(cleaned[i], country) for i in indices))
             
-            # Process results and handle exceptions
-            processed_results = []
-            total_time = 0
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"Failed to match product at index {i}: {str(result)}")
-                    # Create error result
-                    error_result = self._create_error_result(
-                        requests[i].product_description,
-                        str(result)
+            for i, result in matched:
+                self._performance_metrics["packed_items"] += 1
+                try:
+                    await analytics_service.record_matching_operation(
+                        product_description=cleaned[i],
+                        hs_code=result.primary_match.hs_code,
+                        confidence_score=result.primary_match.confidence,
+                        processing_time_ms=result.processing_time_ms,
+                        success=True,
+                        country=country,
+                        cache_hit=False
                     )
-                    processed_results.append(error_result)
-                else:
-                    processed_results.append(result)
-                    total_time += result.processing_time_ms
-            
-            # Update performance metrics
-            avg_time = total_time / len(processed_results) if processed_results else 0
-            self._update_performance_metrics(avg_time, len(processed_results), False)
-            
-            # Cache the batch results if all successful
-            successful_results = [r for r in processed_results if r.primary_match.hs_code != "ERROR"]
-            if len(successful_results) == len(processed_results):
-                cache_success = await cache_service.cache_batch_results(batch_hash, processed_results)
-                if cache_success:
-                    logger.debug(f"Cached batch results for {len(processed_results)} products")
-            
-            logger.info(f"Completed batch matching: {len(processed_results)} results, avg time: {avg_time:.0f}ms")
-            return processed_results
-            
-        except Exception as e:
-            logger.error(f"Batch matching failed: {str(e)}")
-            raise
+                except Exception as analytics_error:
+                    logger.warning(f"Failed to record analytics: {str(analytics_error)}")
+            return list(zip(indices, packed))
+        
+        chunks = [
+            (country, indices[offset:offset + chunk_size])
+            for country, indices in misses_by_country.items()
+            for offset in range(0, len(indices), chunk_size)
+        ]
+        logger.info(f"Packed matching: {len(chunks)} agent runs for {sum(len(c[1]) for c in chunks)} misses, "
+                   f"{len(per_item)} left to per-item calls")
+        
+        def abandon(indices: List[int], country: str, task: "asyncio.Future") -> None:
+            # A chunk cancelled before it started never reaches its finally block
+            if any(not claims[i][1].done() for i in indices):
+                for i in indices:
+                    self._single_flight.settle(*claims[i], None)
+                asyncio.ensure_future(asyncio.gather(*(
+                    cache_service.release_inflight_lock(cleaned[i], country) for i in indices
+                ), return_exceptions=True))
+        
+        tasks = set()
+        for country, indices in chunks:
+            task = asyncio.ensure_future(run_chunk(country, indices))
+            task.add_done_callback(partial(abandon, indices, country))
+            tasks.add(task)
+        return tasks, per_item
+    
+    def _deduplicate_requests(
+        self,
+        requests: List["HSCodeMatchRequest"]
+    ) -> Tuple[List["HSCodeMatchRequest"], List[int]]:
+        """
+        Collapse requests whose cleaned descriptions share a canonical form
+        
+        Returns:
+            Tuple of (unique requests, index into unique requests for each row)
+        """
+        unique_requests = []
+        row_to_unique = []
+        key_to_index: Dict[Tuple[str, str], int] = {}
+        
+        for request in requests:
+            key = (
+                canonicalize_description(self._clean_product_description(request.product_description)),
+                request.country
+            )
+            if key not in key_to_index:
+                key_to_index[key] = len(unique_requests)
+                unique_requests.append(request)
+            row_to_unique.append(key_to_index[key])
+        
+        return unique_requests, row_to_unique
     
     # Note: _execute_with_retry method removed as retry logic is now handled 
     # by the OpenAIAgentConfig.match_hs_code method
     
+    def _validate_product_description(self, description: str) -> None:
+        """Reject descriptions too short to classify"""
+        if not description or len(description.strip()) < 5:
+            raise ValueError("Product description must be at least 5 characters long")
+    
     def _clean_product_description(self, description: str) -> str:
         """Clean and normalize product description for better matching"""
         # Remove extra whitespace and normalize
@@ -343,7 +764,12 @@ class HSCodeMatchingService:
     # Note: _process_matching_result method removed as structured output 
     # is now handled directly by OpenAIAgentConfig.match_hs_code method
     
-    def _create_error_result(self, product_description: str, error_message: str) -> HSCodeMatchResult:
+    def _create_error_result(
+        self,
+        product_description: str,
+        error_message: str,
+        error_kind: str = MatchErrorKind.TRANSIENT
+    ) -> HSCodeMatchResult:
         """Create an error result for failed matches"""
         error_result = HSCodeResult(
             hs_code="ERROR",
@@ -358,7 +784,8 @@ class HSCodeMatchingService:
             primary_match=error_result,
             alternative_matches=[],
             processing_time_ms=0.0,
-            query=product_description
+            query=product_description,
+            error_kind=error_kind
         )
     
     def get_confidence_level_description(self, confidence: float) -> str:
@@ -376,25 +803,13 @@ class HSCodeMatchingService:
         """Determine if match requires manual review based on confidence"""
         return confidence < self.MEDIUM_CONFIDENCE_THRESHOLD
     
-    def _generate_batch_hash(self, requests: List["HSCodeMatchRequest"]) -> str:
-        """Generate deterministic hash for batch requests for caching"""
-        # Create sorted string representation of requests for consistent hashing
-        request_strings = []
-        for req in requests:
-            req_str = f"{req.product_description}:{req.country}:{req.confidence_threshold}:{req.include_alternatives}"
-            request_strings.append(req_str)
-        
-        # Sort to ensure consistent hash regardless of order
-        request_strings.sort()
-        combined_string = "|".join(request_strings)
-        
-        # Generate hash
-        return hashlib.sha256(combined_string.encode()).hexdigest()[:16]
-    
-    async def warm_cache(self) -> Dict[str, Any]:
+    async def warm_cache(self, resume: bool = True) -> Dict[str, Any]:
         """
-        Warm cache with common product descriptions
+        Warm cache with the most frequent descriptions of past product matches
         
+        Args:
+            resume: Continue an interrupted warming run instead of starting over
+            
         Returns:
             Dictionary with warming results and statistics
         """
@@ -403,7 +818,21 @@ class HSCodeMatchingService:
         if not await cache_service.is_available():
             return {"error": "Cache service not available", "warmed": 0}
         
-        return await cache_service.warm_cache_with_common_products(self)
+        # Warming must not take agent capacity from user requests
+        with priority_lane(Lane.BACKGROUND):
+            return await cache_warmer.warm(
+                self, cache_service, clean_description=self._clean_product_description, resume=resume
+            )
+    
+    async def get_warming_report(self) -> Dict[str, Any]:
+        """
+        Get the last cache warming run and how many of its keys were hit since
+        
+        Returns:
+            Dictionary with the warming run and warmed key hits
+        """
+        cache_service = await self._get_cache_service()
+        return await cache_warmer.report(cache_service)
     
     async def invalidate_cache(self, pattern: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -417,10 +846,8 @@ class HSCodeMatchingService:
         """
         cache_service = await self._get_cache_service()
         
-        if not await cache_service.is_available():
-            return {"error": "Cache service not available", "invalidated": 0}
-        
         # Default pattern for all HS code cache entries
+        # (runs without Redis too, so that the in-process L1 is cleared)
         if pattern is None:
             pattern = f"xm_port:hs_match:*"
         
@@ -432,6 +859,68 @@ class HSCodeMatchingService:
             "status": "success"
         }
     
+    async def bump_cache_generation(self, country: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Invalidate all cached matches of a country, or of every country, at once
+        
+        Used after the tariff vector stores change: no keys are scanned or
+        deleted, old entries simply stop being read and expire.
+        
+        Args:
+            country: Country to invalidate, every country if None
+            
+        Returns:
+            Dictionary with the new generation
+        """
+        cache_service = await self._get_cache_service()
+        generation = await cache_service.bump_cache_generation(country)
+        
+        return {
+            "country": country or "all",
+            "generation": generation,
+            "generations": await cache_service.get_cache_generations(),
+            "status": "success"
+        }
+    
+    async def backfill_classification_store(self, country: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Seed the durable classification store from existing product matches
+        
+        Args:
+            country: Country to store every result under, each job's country schema if None
+            
+        Returns:
+            Dictionary with backfill counts
+        """
+        return await classification_store.backfill_from_product_matches(
+            clean_description=self._clean_product_description, country=country
+        )
+    
+    async def refresh_vector_index(self, country: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rebuild the local HS code vector index from the database
+        
+        Args:
+            country: Country to rebuild, all configured countries if None
+            
+        Returns:
+            Dictionary with rebuild results
+        """
+        result = await self._vector_index.rebuild(country)
+        logger.info(f"HS vector index refreshed: {result}")
+        return result
+    
+    async def train_chapter_classifier(self) -> Dict[str, Any]:
+        """
+        Retrain the local HS chapter classifier from the database
+        
+        Returns:
+            Dictionary with training sizes and held-out accuracy
+        """
+        result = await self._chapter_classifier.train()
+        logger.info(f"HS chapter classifier retrained: {result}")
+        return result
+    
     async def get_cache_statistics(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
         cache_service = await self._get_cache_service()
@@ -448,7 +937,7 @@ class HSCodeMatchingService:
             # Test OpenAI connection with simple query
             start_time = time.time()
             test_result = await asyncio.wait_for(
-                self.agent_config.match_hs_code("apple", "default"),
+                self._matcher_backend.match("apple", "default"),
                 timeout=10.0
             )
             
@@ -458,22 +947,32 @@ class HSCodeMatchingService:
             performance_metrics = self._calculate_performance_summary()
             
             return {
-                "status": "healthy",
+                "status": "degraded" if agent_circuit_breaker.is_open else "healthy",
                 "openai_response_time_ms": round(response_time, 2),
                 "available_countries": self.agent_config.get_available_countries(),
                 "agent_cache_size": len(self._agents_cache),
+                "agent_registry": agent_registry.get_statistics(),
                 "request_queue_size": len(self._request_queue),
-                "active_connections": self.MAX_CONCURRENT_REQUESTS - self._request_semaphore._value,
+                "active_connections": self._concurrency_limiter.in_flight,
+                "concurrency": self._concurrency_limiter.get_statistics(),
+                "openai_rate_budget": openai_token_bucket.get_statistics(),
+                "circuit_breaker": agent_circuit_breaker.get_statistics(),
+                "hedging": agent_hedger.get_statistics(),
+                "matcher_backend": self._matcher_backend.get_statistics(),
                 "cache_service": {
                     "available": cache_available,
                     "statistics": cache_stats
                 },
                 "performance": performance_metrics,
+                "vector_index": self._vector_index.get_statistics(),
+                "chapter_classifier": self._chapter_classifier.get_statistics(),
+                "request_coalescing": self._single_flight.get_statistics(),
                 "configuration": {
                     "max_retry_attempts": self.MAX_RETRY_ATTEMPTS,
                     "timeout_seconds": self.TIMEOUT_SECONDS,
                     "batch_size_limit": self.BATCH_SIZE_LIMIT,
-                    "max_concurrent_requests": self.MAX_CONCURRENT_REQUESTS,
+                    "max_concurrent_requests": self._concurrency_limiter.limit,
+                    "packed_chunk_size": settings.HS_MATCH_PACKED_CHUNK_SIZE,
                     "performance_target_ms": self.PERFORMANCE_TARGET_MS,
                     "confidence_thresholds": {
                         "high": self.HIGH_CONFIDENCE_THRESHOLD,
@@ -541,6 +1040,17 @@ class HSCodeMatchingService:
             "target_achievement_rate": round(
                 self._performance_metrics["requests_under_target"] / total * 100, 2
             ),
+            "vector_index_hits": self._performance_metrics["vector_index_hits"],
+            "chapter_classifier_hits": self._performance_metrics["chapter_classifier_hits"],
+            "batch_dedup_ratio": round(
+                1 - self._performance_metrics["batch_unique_rows"] / self._performance_metrics["batch_rows"], 4
+            ) if self._performance_metrics["batch_rows"] else 0.0,
+            "packed_calls": self._performance_metrics["packed_calls"],
+            "packed_items": self._performance_metrics["packed_items"],
+            "packed_fallbacks": self._performance_metrics["packed_fallbacks"],
+            "circuit_open_fallbacks": self._performance_metrics["circuit_open_fallbacks"],
+            "circuit_open_failures": self._performance_metrics["circuit_open_failures"],
+            "negative_cache_hits": self._performance_metrics["negative_cache_hits"],
             "performance_target_ms": self.PERFORMANCE_TARGET_MS
         }
     
@@ -557,12 +1067,18 @@ class HSCodeMatchingService:
         logger.info("Starting performance optimization tasks...")
         results["cache_warming"] = await self.warm_cache()
         
-        # 2. Pre-create agents for known countries
-        for country in self.agent_config.get_available_countries():
-            await self._get_or_create_agent(country)
-        results["agents_preloaded"] = len(self._agents_cache)
+        # 2. Rebuild the local vector index when enabled
+        if settings.HS_VECTOR_INDEX_ENABLED:
+            try:
+                results["vector_index"] = await self.refresh_vector_index()
+            except Exception as e:
+                logger.warning(f"Vector index rebuild failed: {str(e)}")
+                results["vector_index"] = {"error": str(e)}
+        
+        # 3. Pre-create agents for known countries
+        results["agents_preloaded"] = await self.preload_agents()
         
-        # 3. Clear old request queue entries
+        # 4. Clear old request queue entries
         current_time = time.time()
         old_requests = []
         while self._request_queue and (current_time - self._request_queue[0][1]) > 300:
@@ -0,0 +1,326 @@
+"""
+In-process nearest-neighbour index for HS codes
+
+This service loads the active HS codes of each country together with their
+stored embeddings (``hs_codes.embedding``) into a contiguous float32 matrix
+and answers batched top-k cosine similarity queries locally. The resulting
+shortlist is used to skip the OpenAI agent on confident matches, or passed to
+the agent as context otherwise.
+"""
+
+import asyncio
+import time
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..core.openai_config import HSCodeResult, HSCodeMatchResult
+from ..models.hs_code import HSCode
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VectorCandidate:
+    """Single HS code candidate returned by the vector index"""
+    hs_code: str
+    description: str
+    chapter: str
+    section: str
+    score: float
+
+
+@dataclass
+class _CountryIndex:
+    """Normalised embedding matrix and row metadata for one country"""
+    matrix: np.ndarray
+    codes: List[str]
+    descriptions: List[str]
+    chapters: List[str]
+    sections: List[str]
+    built_at: float
+
+
+class HSCodeVectorIndex:
+    """Local cosine-similarity index over HS code embeddings"""
+
+    # Service country names mapped to the ISO codes stored in hs_codes.country
+    COUNTRY_CODES = {
+        "turkmenistan": "TKM",
+        "default": "TKM",
+    }
+
+    EMBEDDING_BATCH_SIZE = 100
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self._indexes: Dict[str, _CountryIndex] = {}
+        self._rebuild_lock = asyncio.Lock()
+        self._openai_client = None
+        self._stats = {
+            "searches": 0,
+            "queries": 0,
+            "total_search_time_ms": 0.0,
+        }
+
+    def _resolve_country_code(self, country: str) -> str:
+        """Map a service country name to the code stored in hs_codes"""
+        country = (country or "default").lower()
+        return self.COUNTRY_CODES.get(country, country.upper()[:3])
+
+    def is_ready(self, country: str = "default") -> bool:
+        """Check whether an index is loaded for the given country"""
+        return self._resolve_country_code(country) in self._indexes
+
+    def load_country(
+        self,
+        country: str,
+        codes: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        descriptions: Optional[Sequence[str]] = None,
+        chapters: Optional[Sequence[str]] = None,
+        sections: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Build the in-memory index for a country from raw embeddings
+
+        Args:
+            country: Service country name or ISO country code
+            codes: HS codes, one per embedding row
+            embeddings: Embedding vectors, all of the same dimension
+            descriptions: Optional HS code descriptions
+            chapters: Optional HS chapters
+            sections: Optional HS sections
+
+        Returns:
+            Number of rows loaded into the index
+        """
+        country_code = self._resolve_country_code(country)
+
+        if len(codes) == 0:
+            self._indexes.pop(country_code, None)
+            return 0
+
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2 or matrix.shape[0] != len(codes):
+            raise ValueError("Embeddings must form a 2D matrix with one row per HS code")
+
+        # Normalise rows once so that search is a single matrix product
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        count = len(codes)
+        self._indexes[country_code] = _CountryIndex(
+            matrix=matrix,
+            codes=list(codes),
+            descriptions=list(descriptions) if descriptions is not None else [""] * count,
+            chapters=list(chapters) if chapters is not None else [code[:2] for code in codes],
+            sections=list(sections) if sections is not None else [""] * count,
+            built_at=time.time()
+        )
+
+        logger.info(f"Loaded HS vector index for {country_code}: {count} codes, dimension {matrix.shape[1]}")
+        return count
+
+    async def rebuild(self, country: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rebuild the index from active hs_codes rows that have embeddings
+
+        Args:
+            country: Country to rebuild, rebuilds every configured country if None
+
+        Returns:
+            Dictionary with the number of codes loaded per country
+        """
+        if country is None:
+            country_codes = sorted(set(self.COUNTRY_CODES.values()))
+        else:
+            country_codes = [self._resolve_country_code(country)]
+
+        results: Dict[str, Any] = {}
+        async with self._rebuild_lock:
+            async with async_session_maker() as session:
+                for country_code in country_codes:
+                    rows = await session.execute(
+                        select(
+                            HSCode.code,
+                            HSCode.description,
+                            HSCode.chapter,
+                            HSCode.section,
+                            HSCode.embedding
+                        ).where(
+                            HSCode.country == country_code,
+                            HSCode.is_active == True,
+                            HSCode.embedding.isnot(None)
+                        )
+                    )
+
+                    codes, descriptions, chapters, sections, embeddings = [], [], [], [], []
+                    dimension = None
+                    skipped = 0
+                    for row in rows.fetchall():
+                        embedding = row.embedding
+                        if not embedding:
+                            continue
+                        if dimension is None:
+                            dimension = len(embedding)
+                        if len(embedding) != dimension:
+                            skipped += 1
+                            continue
+                        codes.append(row.code)
+                        descriptions.append(row.description)
+                        chapters.append(row.chapter)
+                        sections.append(row.section)
+                        embeddings.append(embedding)
+
+                    if skipped:
+                        logger.warning(f"Skipped {skipped} HS codes with mismatched embedding dimension for {country_code}")
+
+                    results[country_code] = self.load_country(
+                        country_code, codes, embeddings, descriptions, chapters, sections
+                    )
+
+        return {"status": "success", "loaded": results}
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        country: str = "default",
+        top_k: Optional[int] = None
+    ) -> List[List[VectorCandidate]]:
+        """
+        Batched top-k cosine search
+
+        Args:
+            query_vectors: Matrix of query embeddings, one row per query
+            country: Country whose index to search
+            top_k: Number of candidates per query
+
+        Returns:
+            One list of candidates per query, best match first
+        """
+        index = self._indexes.get(self._resolve_country_code(country))
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if index is None:
+            return [[] for _ in range(queries.shape[0])]
+
+        start_time = time.perf_counter()
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        scores = queries @ index.matrix.T
+        k = min(top_k or settings.HS_VECTOR_INDEX_TOP_K, scores.shape[1])
+
+        # argpartition keeps this O(n) per query; only the k winners get sorted
+        if k < scores.shape[1]:
+            top_indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top_indices = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+
+        results = []
+        for row, candidate_indices in enumerate(top_indices):
+            row_scores = scores[row, candidate_indices]
+            order = candidate_indices[np.argsort(-row_scores)]
+            results.append([
+                VectorCandidate(
+                    hs_code=index.codes[i],
+                    description=index.descriptions[i],
+                    chapter=index.chapters[i],
+                    section=index.sections[i],
+                    score=float(scores[row, i])
+                )
+                for i in order
+            ])
+
+        self._stats["searches"] += 1
+        self._stats["queries"] += queries.shape[0]
+        self._stats["total_search_time_ms"] += (time.perf_counter() - start_time) * 1000
+
+        return results
+
+    async def embed_descriptions(self, descriptions: List[str]) -> np.ndarray:
+        """Embed product descriptions with the configured OpenAI embedding model"""
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+        vectors = []
+        for offset in range(0, len(descriptions), self.EMBEDDING_BATCH_SIZE):
+            chunk = descriptions[offset:offset + self.EMBEDDING_BATCH_SIZE]
+            response = await self._openai_client.embeddings.create(
+                model=settings.OPENAI_EMBEDDING_MODEL,
+                input=chunk
+            )
+            vectors.extend(item.embedding for item in response.data)
+
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def search_descriptions(
+        self,
+        descriptions: List[str],
+        country: str = "default",
+        top_k: Optional[int] = None
+    ) -> List[List[VectorCandidate]]:
+        """Embed descriptions and return their candidate shortlists"""
+        if not descriptions or not self.is_ready(country):
+            return [[] for _ in descriptions]
+
+        query_vectors = await self.embed_descriptions(descriptions)
+        return self.search(query_vectors, country, top_k)
+
+    def build_match_result(
+        self,
+        candidates: List[VectorCandidate],
+        query: str,
+        processing_time_ms: float
+    ) -> HSCodeMatchResult:
+        """Convert a confident shortlist into a match result without the agent"""
+        def to_result(candidate: VectorCandidate) -> HSCodeResult:
+            return HSCodeResult(
+                hs_code=candidate.hs_code,
+                code_description=candidate.description,
+                confidence=min(max(candidate.score, 0.0), 1.0),
+                chapter=candidate.chapter,
+                section=candidate.section,
+                reasoning=f"Matched from local HS code index (cosine similarity {candidate.score:.3f})"
+            )
+
+        return HSCodeMatchResult(
+            primary_match=to_result(candidates[0]),
+            alternative_matches=[to_result(c) for c in candidates[1:4]],
+            processing_time_ms=processing_time_ms,
+            query=query
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get index size and search statistics"""
+        searches = self._stats["searches"]
+        return {
+            "countries": {
+                code: {
+                    "codes": len(index.codes),
+                    "dimension": int(index.matrix.shape[1]),
+                    "built_at": index.built_at
+                }
+                for code, index in self._indexes.items()
+            },
+            "searches": searches,
+            "queries": self._stats["queries"],
+            "avg_search_time_ms": round(self._stats["total_search_time_ms"] / searches, 3) if searches else 0.0
+        }
+
+
+# Create singleton instance
+hs_vector_index = HSCodeVectorIndex()
@@ -0,0 +1,110 @@
+"""
+In-process L1 cache for HS code matching
+
+A bounded LRU cache with per-entry TTLs that sits in front of Redis. Hot
+lookups are served from process memory without a network round trip or a
+JSON parse, and the cache keeps serving when Redis is unreachable.
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional, Tuple
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LocalTTLCache:
+    """Bounded LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of entries before least recently used ones are evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        """Get a live entry and mark it as recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            if record_stats:
+                self._stats["misses"] += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            if record_stats:
+                self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if record_stats:
+            self._stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Store an entry, evicting the least recently used ones when full"""
+        if self.max_entries <= 0 or ttl_seconds <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def delete(self, key: str) -> bool:
+        """Remove a single entry"""
+        return self._entries.pop(key, None) is not None
+
+    def invalidate_pattern(self, pattern: str) -> int:
+        """
+        Remove entries whose keys match a Redis-style glob pattern
+
+        Args:
+            pattern: Glob pattern, e.g. ``xm_port:hs_match:*``
+
+        Returns:
+            Number of entries removed
+        """
+        keys = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in keys:
+            del self._entries[key]
+        self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        """Remove every entry"""
+        count = len(self._entries)
+        self._entries.clear()
+        self._stats["invalidations"] += count
+        return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get size, hit rate and eviction counters"""
+        total = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            **self._stats,
+            "hit_rate_percent": round(self._stats["hits"] / total * 100, 2) if total else 0.0,
+        }
@@ -0,0 +1,298 @@
+"""
+Matcher backends for HS code matching
+
+``HSCodeMatchingService`` hands every product that misses the cache to a
+``MatcherBackend``. The OpenAI backend runs the Agents SDK agents. The
+simulator backend answers offline with deterministic results after a
+configurable latency, and can inject errors and bursts of 429 responses.
+Both backends go through the same token budget, adaptive concurrency
+limit, hedging and circuit breaker, so the rest of the pipeline can be
+load tested without network access. Simulated results are never written
+to the Redis cache or the durable classification store.
+"""
+
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
+
+from ..core.config import settings
+from ..core.openai_config import (
+    OpenAIAgentConfig,
+    HSCodeResult,
+    HSCodeMatchResult,
+    HSCodePackedMatchItem,
+    HSCodePackedMatchOutput
+)
+from .description_canonicalizer import canonicalize_description
+
+
+logger = logging.getLogger(__name__)
+
+
+class MatcherBackend(Protocol):
+    """Classifies product descriptions that missed every cache tier"""
+
+    name: str
+    cache_results: bool  # Whether results may be written to the cache tiers
+
+    async def match(
+        self,
+        product_description: str,
+        country: str = "default",
+        candidates: Optional[List[Any]] = None,
+        chapters: Optional[List[Any]] = None
+    ) -> HSCodeMatchResult:
+        """Match one description; failures come back as error results"""
+        ...
+
+    async def match_packed(
+        self,
+        product_descriptions: List[str],
+        country: str = "default"
+    ) -> List[Optional[HSCodeMatchResult]]:
+        """Match several descriptions in one call; None where an item is missing"""
+        ...
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get backend statistics for health output"""
+        ...
+
+
+class OpenAIAgentBackend:
+    """Matches through the OpenAI Agents SDK with the shared agent registry"""
+
+    name = "openai"
+    cache_results = True
+
+    def __init__(self, agent_config: OpenAIAgentConfig, get_agent: Callable[..., Awaitable[Any]]):
+        """
+        Initialize the backend
+
+        Args:
+            agent_config: Agent configuration whose match methods are called
+            get_agent: Coroutine function returning the agent for ``(country, packed=False)``
+        """
+        self.agent_config = agent_config
+        self._get_agent = get_agent
+
+    async def match(
+        self,
+        product_description: str,
+        country: str = "default",
+        candidates: Optional[List[Any]] = None,
+        chapters: Optional[List[Any]] = None
+    ) -> HSCodeMatchResult:
+        agent = await self._get_agent(country)
+        return await self.agent_config.match_hs_code(
+            product_description, country, candidates=candidates, agent=agent, chapters=chapters
+        )
+
+    async def match_packed(
+        self,
+        product_descriptions: List[str],
+        country: str = "default"
+    ) -> List[Optional[HSCodeMatchResult]]:
+        agent = await self._get_agent(country, packed=True)
+        return await self.agent_config.match_hs_codes_packed(product_descriptions, country, agent=agent)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class SimulatedBackendError(Exception):
+    """Injected failure of a simulated agent call"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class SimulationProfile:
+    """Latency and failure behaviour of the simulator backend"""
+    latency_median_ms: float = 1500.0
+    latency_sigma: float = 0.5  # Log-normal shape; larger values give a heavier tail
+    error_rate: float = 0.0
+    rate_limit_every_seconds: float = 0.0  # Start of a 429 burst every N seconds; 0 disables bursts
+    rate_limit_burst_seconds: float = 2.0
+    rate_limit_latency_ms: float = 50.0  # 429s come back fast
+    seed: int = 0
+
+    @classmethod
+    def from_settings(cls) -> "SimulationProfile":
+        return cls(
+            latency_median_ms=settings.HS_SIMULATOR_LATENCY_MEDIAN_MS,
+            latency_sigma=settings.HS_SIMULATOR_LATENCY_SIGMA,
+            error_rate=settings.HS_SIMULATOR_ERROR_RATE,
+            rate_limit_every_seconds=settings.HS_SIMULATOR_RATE_LIMIT_EVERY_SECONDS,
+            rate_limit_burst_seconds=settings.HS_SIMULATOR_RATE_LIMIT_BURST_SECONDS,
+            seed=settings.HS_SIMULATOR_SEED
+        )
+
+
+class _SimulatedAgent:
+    """Stand-in passed where the Agents SDK expects an agent"""
+    name = "HS Code Simulator"
+
+
+class SimulatedMatcherBackend:
+    """Offline backend with deterministic results and configurable latency and failures"""
+
+    name = "simulator"
+    # Fake codes must not reach caches and stores shared with real traffic
+    cache_results = False
+
+    def __init__(self, profile: Optional[SimulationProfile] = None):
+        """
+        Initialize the simulator
+
+        Args:
+            profile: Latency and failure behaviour, read from settings if None
+        """
+        self.profile = profile or SimulationProfile.from_settings()
+        self._rng = random.Random(self.profile.seed)
+        self._agent = _SimulatedAgent()
+        self._started_at = time.monotonic()
+        self._stats = {
+            "calls": 0,
+            "items": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "total_latency_ms": 0.0,
+        }
+
+    async def match(
+        self,
+        product_description: str,
+        country: str = "default",
+        candidates: Optional[List[Any]] = None,
+        chapters: Optional[List[Any]] = None
+    ) -> HSCodeMatchResult:
+        return await OpenAIAgentConfig.match_hs_code(
+            product_description,
+            country,
+            candidates=candidates,
+            agent=self._agent,
+            chapters=chapters,
+            runner=partial(self._run, [product_description], False)
+        )
+
+    async def match_packed(
+        self,
+        product_descriptions: List[str],
+        country: str = "default"
+    ) -> List[Optional[HSCodeMatchResult]]:
+        return await OpenAIAgentConfig.match_hs_codes_packed(
+            product_descriptions,
+            country,
+            agent=self._agent,
+            runner=partial(self._run, list(product_descriptions), True)
+        )
+
+    def in_rate_limit_burst(self) -> bool:
+        """Check whether calls made now get 429 responses"""
+        every = self.profile.rate_limit_every_seconds
+        if every <= 0:
+            return False
+        return (time.monotonic() - self._started_at) % every < self.profile.rate_limit_burst_seconds
+
+    async def _run(self, descriptions: List[str], packed: bool, agent: Any, query: str) -> Any:
+        """Simulated ``Runner.run``: wait, maybe fail, then return a structured output"""
+        self._stats["calls"] += 1
+        self._stats["items"] += len(descriptions)
+
+        if self.in_rate_limit_burst():
+            self._stats["rate_limited"] += 1
+            await asyncio.sleep(self.profile.rate_limit_latency_ms / 1000)
+            raise SimulatedBackendError("429 Too Many Requests (simulated)", status_code=429)
+
+        # Packed calls take longer, though far less than one call per item
+        latency_ms = self.profile.latency_median_ms * self._rng.lognormvariate(0.0, self.profile.latency_sigma)
+        if packed:
+            latency_ms *= 1 + 0.1 * (len(descriptions) - 1)
+        failed = self._rng.random() < self.profile.error_rate
+        self._stats["total_latency_ms"] += latency_ms
+        await asyncio.sleep(latency_ms / 1000)
+
+        if failed:
+            self._stats["errors"] += 1
+            raise SimulatedBackendError("Simulated agent failure")
+
+        if packed:
+            final_output = HSCodePackedMatchOutput(results=[
+                HSCodePackedMatchItem(index=index, **self.simulated_match(description))
+                for index, description in enumerate(descriptions)
+            ])
+        else:
+            final_output = HSCodeMatchResult(
+                processing_time_ms=latency_ms,
+                query=descriptions[0],
+                **self.simulated_match(descriptions[0])
+            )
+        return _SimulatedRunResult(final_output)
+
+    @staticmethod
+    def simulated_match(description: str) -> Dict[str, Any]:
+        """Deterministic primary and alternative matches for a description"""
+        digest = hashlib.sha256(canonicalize_description(description).encode()).digest()
+
+        def code_result(offset: int, confidence: float) -> HSCodeResult:
+            value = int.from_bytes(digest[offset:offset + 8], "big")
+            chapter = f"{value % 97 + 1:02d}"
+            return HSCodeResult(
+                hs_code=f"{chapter}{value // 97 % 10 ** 8:08d}",
+                code_description=f"Simulated HS code for chapter {chapter}",
+                confidence=confidence,
+                chapter=chapter,
+                section="",
+                reasoning="Deterministic simulator output"
+            )
+
+        confidence = 0.6 + digest[0] / 255 * 0.39
+        return {
+            "primary_match": code_result(0, round(confidence, 2)),
+            "alternative_matches": [code_result(8, round(confidence / 2, 2))],
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        calls = self._stats["calls"]
+        return {
+            "backend": self.name,
+            **self._stats,
+            "avg_latency_ms": round(self._stats["total_latency_ms"] / calls, 1) if calls else 0.0,
+            "in_rate_limit_burst": self.in_rate_limit_burst(),
+        }
+
+
+class _SimulatedRunResult:
+    """Result object shaped like the Agents SDK's run result"""
+
+    def __init__(self, final_output: Any):
+        self.final_output = final_output
+
+
+def create_matcher_backend(
+    backend: str,
+    agent_config: OpenAIAgentConfig,
+    get_agent: Callable[..., Awaitable[Any]]
+) -> MatcherBackend:
+    """
+    Create the configured matcher backend
+
+    Args:
+        backend: "openai" or "simulator"
+        agent_config: Agent configuration used by the OpenAI backend
+        get_agent: Agent lookup used by the OpenAI backend
+
+    Returns:
+        Matcher backend instance
+    """
+    if backend == "simulator":
+        logger.warning("HS matching is using the offline simulator backend")
+        return SimulatedMatcherBackend()
+    return OpenAIAgentBackend(agent_config, get_agent)
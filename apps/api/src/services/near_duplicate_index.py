@@ -0,0 +1,198 @@
+"""
+MinHash near-duplicate index over cached product descriptions
+
+Maps canonical descriptions to the cache keys of their results so that a
+description that is almost, but not exactly, the same as a cached one
+("cotton fabrik 100%" vs "cotton fabric 100%") can reuse that result.
+Candidates come from LSH banding over MinHash signatures of character
+shingles; a match also requires identical numeric tokens, since quantities
+and percentages can change the classification.
+"""
+
+import zlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .description_canonicalizer import numeric_tokens
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Mersenne prime modulus of the (a*x + b) mod p hash family
+_PRIME = np.uint64((1 << 61) - 1)
+_LOW_29 = np.uint64((1 << 29) - 1)
+_LOW_32 = np.uint64((1 << 32) - 1)
+
+
+def _reduce(values: np.ndarray) -> np.ndarray:
+    """Reduce values below 2**64 modulo 2**61 - 1"""
+    values = (values & _PRIME) + (values >> np.uint64(61))
+    return np.where(values >= _PRIME, values - _PRIME, values)
+
+
+def _mul_mod(a: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Compute a * x mod 2**61 - 1 without overflowing uint64
+
+    ``a`` is below 2**61 and ``x`` below 2**32. ``a`` is split into its high
+    29 and low 32 bits; the high part times 2**32 wraps around by 2**61 = 1.
+    """
+    high = (a >> np.uint64(32)) * x
+    low = (a & _LOW_32) * x
+    shifted = ((high & _LOW_29) << np.uint64(32)) | (high >> np.uint64(29))
+    return _reduce(_reduce(low) + shifted)
+
+
+@dataclass
+class _IndexEntry:
+    """Signature of one cached description"""
+    country: str
+    signature: np.ndarray
+    numbers: FrozenSet[str]
+    band_keys: List[Tuple[str, int, bytes]]
+
+
+class NearDuplicateIndex:
+    """In-process MinHash/LSH index from descriptions to cache keys"""
+
+    NUM_PERMUTATIONS = 64
+    BANDS = 16  # 4 rows per band: pairs above ~0.5 Jaccard become candidates
+    SHINGLE_SIZE = 3
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 50000, seed: int = 1):
+        """
+        Initialize the index
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity for a near-duplicate
+            max_entries: Maximum number of indexed descriptions (oldest dropped first)
+            seed: Seed for the hash permutations, identical across workers
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, self.NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, self.NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+        self._rows = self.NUM_PERMUTATIONS // self.BANDS
+
+        self._entries: "OrderedDict[str, _IndexEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        self._stats = {"lookups": 0, "candidates_checked": 0, "matches": 0}
+
+    def _shingles(self, canonical: str) -> np.ndarray:
+        """Hash the padded character shingles of every token"""
+        shingles = set()
+        for token in canonical.split():
+            padded = f" {token} "
+            for i in range(max(1, len(padded) - self.SHINGLE_SIZE + 1)):
+                shingles.add(padded[i:i + self.SHINGLE_SIZE])
+        return np.fromiter(
+            (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+
+    def signature(self, canonical: str) -> np.ndarray:
+        """Compute the MinHash signature of a canonical description"""
+        hashes = self._shingles(canonical)[None, :]
+        # Universal hashing (a*x + b) mod p, one independent (a, b) per permutation
+        permuted = _reduce(_mul_mod(self._a, hashes) + self._b)
+        return permuted.min(axis=1)
+
+    def _band_keys(self, country: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        return [
+            (country, band, signature[band * self._rows:(band + 1) * self._rows].tobytes())
+            for band in range(self.BANDS)
+        ]
+
+    def add(self, canonical: str, country: str, cache_key: str) -> None:
+        """Index a cached description under its cache key"""
+        if self.max_entries <= 0 or not canonical.strip():
+            return
+
+        self.remove(cache_key)
+        signature = self.signature(canonical)
+        entry = _IndexEntry(
+            country=country,
+            signature=signature,
+            numbers=frozenset(numeric_tokens(canonical)),
+            band_keys=self._band_keys(country, signature)
+        )
+        self._entries[cache_key] = entry
+        for band_key in entry.band_keys:
+            self._buckets.setdefault(band_key, set()).add(cache_key)
+
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, cache_key: str) -> bool:
+        """Drop a description from the index"""
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return False
+        for band_key in entry.band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(cache_key)
+                if not bucket:
+                    del self._buckets[band_key]
+        return True
+
+    def invalidate_pattern(self, pattern: str) -> int:
+        """Drop every entry whose cache key matches a Redis-style glob pattern"""
+        keys = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in keys:
+            self.remove(key)
+        return len(keys)
+
+    def query(self, canonical: str, country: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar indexed description
+
+        Args:
+            canonical: Canonical description to look up
+            country: Only entries for the same country are considered
+
+        Returns:
+            Tuple of (cache key, estimated similarity) above the threshold, or None
+        """
+        self._stats["lookups"] += 1
+        if not self._entries or not canonical.strip():
+            return None
+
+        signature = self.signature(canonical)
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(country, signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        if not candidates:
+            return None
+
+        numbers = frozenset(numeric_tokens(canonical))
+        best: Optional[Tuple[str, float]] = None
+        for cache_key in candidates:
+            entry = self._entries[cache_key]
+            if entry.numbers != numbers:
+                continue
+            self._stats["candidates_checked"] += 1
+            similarity = float(np.mean(entry.signature == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (cache_key, similarity)
+
+        if best:
+            self._stats["matches"] += 1
+        return best
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get index size and lookup counters"""
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            **self._stats,
+        }
@@ -0,0 +1,135 @@
+"""
+Single-flight request coalescing for HS code matching
+
+Concurrent callers asking for the same (cleaned description, country) share
+one in-flight computation: the first caller runs it and every duplicate
+awaits the same future instead of issuing its own OpenAI request. If the
+first caller is cancelled (e.g. its batch was aborted), a waiting duplicate
+takes over and runs the computation itself. Packed calls that compute many
+keys at once lead them with ``claim`` and ``settle``.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution"""
+
+    def __init__(self):
+        """Initialize the in-flight registry and counters"""
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {
+            "leader_calls": 0,
+            "coalesced_calls": 0,
+            "cross_worker_coalesced": 0,
+            "leader_cancellations": 0,
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once per key among concurrent callers
+
+        Args:
+            key: Coalescing key, e.g. (cleaned description, country)
+            fn: Zero-argument coroutine factory doing the actual work
+
+        Returns:
+            The result of ``fn``, shared by every concurrent caller
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                return await self._lead(key, fn)
+
+            self._stats["coalesced_calls"] += 1
+            logger.debug(f"Coalesced in-flight request for key: {key}")
+            try:
+                # Shield so that a cancelled follower does not cancel the leader
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leader was cancelled: take over instead of failing
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    logger.debug(f"Leader cancelled, retrying in-flight request for key: {key}")
+                    continue
+                raise
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` as the leader for a key and share its outcome"""
+        future = self.claim(key)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Followers see a cancelled future and retry rather than fail
+            self._stats["leader_cancellations"] += 1
+            self.settle(key, future, None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark as retrieved so an unobserved failure does not log a warning
+            future.exception()
+            self.settle(key, future, None)
+            raise
+        else:
+            self.settle(key, future, result)
+            return result
+
+    def claim(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        Lead a key whose result is computed outside ``do``, e.g. by a packed call
+
+        Args:
+            key: Coalescing key, e.g. (cleaned description, country)
+
+        Returns:
+            Future to pass to ``settle``, or None if the key is already in flight
+        """
+        if key in self._inflight:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._stats["leader_calls"] += 1
+        return future
+
+    def settle(self, key: Hashable, future: asyncio.Future, result: Optional[Any]) -> None:
+        """
+        Hand a claimed key's result to its followers
+
+        Args:
+            key: Key passed to ``claim``
+            future: Future returned by ``claim``
+            result: Shared result; None lets followers compute it themselves
+        """
+        if not future.done():
+            if result is None:
+                future.cancel()
+            else:
+                future.set_result(result)
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def record_cross_worker_coalesced(self) -> None:
+        """Count a request answered by another worker's in-flight call"""
+        self._stats["cross_worker_coalesced"] += 1
+
+    @property
+    def inflight_count(self) -> int:
+        """Number of keys currently being computed"""
+        return len(self._inflight)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        leaders = self._stats["leader_calls"]
+        coalesced = self._stats["coalesced_calls"]
+        total = leaders + coalesced
+        return {
+            **self._stats,
+            "inflight": self.inflight_count,
+            "coalesced_rate": round(coalesced / total * 100, 2) if total else 0.0,
+        }
@@ -0,0 +1,69 @@
+"""
+Simulation of the adaptive concurrency limiter against an overloaded backend
+
+The simulated backend serves up to CAPACITY calls at BASE_LATENCY_SECONDS;
+beyond that, latency grows with the number of in-flight calls. The AIMD
+limiter should settle near capacity and keep per-call latency close to the
+target, where a fixed high limit overloads the backend.
+"""
+
+import asyncio
+import statistics
+import time
+
+import pytest
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+
+
+CAPACITY = 8
+BASE_LATENCY_SECONDS = 0.02
+LATENCY_TARGET_MS = 40
+CALLS = 300
+
+
+async def run_simulation(limiter: AdaptiveConcurrencyLimiter) -> dict:
+    in_flight = 0
+    latencies = []
+
+    async def call():
+        nonlocal in_flight
+        async with limiter.slot():
+            in_flight += 1
+            overload = max(1.0, in_flight / CAPACITY)
+            start = time.perf_counter()
+            await asyncio.sleep(BASE_LATENCY_SECONDS * overload ** 2)
+            latencies.append((time.perf_counter() - start) * 1000)
+            in_flight -= 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call() for _ in range(CALLS)])
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed_s": elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+        "final_limit": limiter.limit,
+    }
+
+
+class TestAdaptiveConcurrencyPerformance:
+    """Compare a fixed high limit with the adaptive limiter"""
+
+    @pytest.mark.asyncio
+    async def test_adaptive_limit_tracks_backend_capacity(self):
+        fixed = await run_simulation(
+            AdaptiveConcurrencyLimiter(initial_limit=40, min_limit=40, max_limit=40, latency_target_ms=1e9)
+        )
+        adaptive_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=40, min_limit=1, max_limit=40, latency_target_ms=LATENCY_TARGET_MS
+        )
+        adaptive_limiter.DECREASE_COOLDOWN_SECONDS = BASE_LATENCY_SECONDS
+        adaptive = await run_simulation(adaptive_limiter)
+
+        print(f"\nFixed(40): p50 {fixed['p50_ms']:.0f}ms, p95 {fixed['p95_ms']:.0f}ms, {fixed['elapsed_s']:.2f}s")
+        print(f"Adaptive: p50 {adaptive['p50_ms']:.0f}ms, p95 {adaptive['p95_ms']:.0f}ms, "
+              f"{adaptive['elapsed_s']:.2f}s, final limit {adaptive['final_limit']}")
+
+        assert adaptive["final_limit"] < 40
+        assert adaptive["p50_ms"] < fixed["p50_ms"]
@@ -0,0 +1,41 @@
+"""
+Performance benchmark for agent reuse
+
+Compares building a fresh Agent (FileSearchTool, model settings, vector
+store resolution) for every match against fetching it from the registry.
+"""
+
+import time
+
+import pytest
+
+from src.core.openai_config import AgentRegistry, OpenAIAgentConfig
+
+
+ITERATIONS = 500
+
+
+class TestAgentRegistryPerformance:
+    """Benchmark per-call agent construction vs registry lookups"""
+
+    @pytest.mark.asyncio
+    async def test_registry_lookup_vs_create_per_call(self):
+        """Registry lookups are much cheaper than rebuilding agents"""
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await OpenAIAgentConfig.create_agent("turkmenistan")
+        create_elapsed = time.perf_counter() - start
+
+        registry = AgentRegistry()
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await registry.get_agent("turkmenistan")
+        registry_elapsed = time.perf_counter() - start
+
+        create_us = create_elapsed / ITERATIONS * 1_000_000
+        registry_us = registry_elapsed / ITERATIONS * 1_000_000
+        print(f"\ncreate_agent per call: {create_us:.1f}us, registry lookup: {registry_us:.1f}us "
+              f"({create_elapsed / registry_elapsed:.1f}x)")
+
+        assert registry.get_statistics()["builds"] == 1
+        assert registry_elapsed < create_elapsed
@@ -0,0 +1,85 @@
+"""
+Benchmark of the compact cache codec against the previous JSON payloads
+
+Compares the bytes stored per Redis entry and the decode time per cache hit
+for a realistic match result: a primary match and three alternatives, each
+with agent-written reasoning. Redis adds the same per-key overhead to both
+formats, so the difference in payload bytes is the difference in memory.
+"""
+
+import json
+import time
+from unittest.mock import patch
+
+from src.core.openai_config import HSCodeMatchResult, HSCodeResult
+from src.services.cache_codec import decode_match_result, encode_match_result
+
+
+DECODES = 1000
+ROUNDS = 5
+
+REASONING = (
+    "The product is a woven fabric containing at least 85% cotton by weight and weighing not more "
+    "than 200 g/m2. Chapter 52 covers cotton; heading 5208 covers such fabrics, and the plain weave "
+    "and unbleached state place it in subheading 5208.11. Chapter notes exclude coated fabrics of 5903."
+)
+
+
+def make_result(i: int = 0) -> HSCodeMatchResult:
+    matches = [
+        HSCodeResult(
+            hs_code=f"52081{j}{i % 10}000",
+            code_description="Woven fabrics of cotton, containing 85% or more by weight of cotton, unbleached, plain weave",
+            confidence=0.9 - j * 0.15,
+            chapter="52",
+            section="XI",
+            reasoning=REASONING
+        )
+        for j in range(4)
+    ]
+    return HSCodeMatchResult(
+        primary_match=matches[0],
+        alternative_matches=matches[1:],
+        processing_time_ms=2314.7,
+        query=f"unbleached plain weave cotton fabric 150 g/m2 lot {i}"
+    )
+
+
+def time_per_call_us(function, payload, repeats: int = DECODES) -> float:
+    """Best of several rounds, to keep scheduler noise out of the comparison"""
+    rounds = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            function(payload)
+        rounds.append((time.perf_counter() - start) / repeats * 1e6)
+    return min(rounds)
+
+
+def legacy_decode(payload: str) -> HSCodeMatchResult:
+    """Read path before the codec: json.loads plus full validation"""
+    return HSCodeMatchResult(**json.loads(payload))
+
+
+class TestCacheCodecPerformance:
+    """Benchmark memory per entry and decode time per hit"""
+
+    def test_single_entry(self):
+        """Compressed entries are a quarter of the size and decode at about the cost of the old path"""
+        result = make_result()
+        legacy = result.model_dump_json()
+        compact = encode_match_result(result, compact=True)
+        with patch("src.services.cache_codec.settings.HS_CACHE_COMPRESS_MIN_BYTES", 0):
+            uncompressed = encode_match_result(result, compact=True)
+
+        legacy_us = time_per_call_us(legacy_decode, legacy)
+        compact_us = time_per_call_us(decode_match_result, compact)
+        uncompressed_us = time_per_call_us(decode_match_result, uncompressed)
+        print(f"\nEntry: JSON {len(legacy.encode())} B / {legacy_us:.1f}us per hit, "
+              f"compact {len(compact.encode())} B / {compact_us:.1f}us per hit, "
+              f"uncompressed {len(uncompressed.encode())} B / {uncompressed_us:.1f}us per hit")
+
+        assert len(compact.encode()) < len(legacy.encode()) * 0.3
+        # Decompression takes back most of what parsing in pydantic-core saves
+        assert compact_us < legacy_us * 1.25
+        assert uncompressed_us < legacy_us
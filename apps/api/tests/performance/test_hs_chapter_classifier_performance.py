@@ -0,0 +1,91 @@
+"""
+Performance benchmark for the local HS chapter classifier
+
+Trains on a synthetic tariff (one vocabulary per chapter plus shared filler
+words) and reports accuracy and per-prediction latency on held-out product
+descriptions that are shorter, noisier and partly misspelled.
+"""
+
+import time
+import random
+import statistics
+
+import pytest
+
+from src.services.hs_chapter_classifier import HSChapterClassifier
+
+
+CHAPTERS = [f"{i:02d}" for i in range(1, 98) if i != 77]  # Chapter 77 is reserved
+CODES_PER_CHAPTER = 120  # ~11,500 codes, roughly a national tariff at 10-digit level
+WORDS_PER_CHAPTER = 40
+HELD_OUT_PER_CHAPTER = 20
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice("aeiou") + word[position + 1:]
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    """Synthetic training codes and held-out confirmed matches"""
+    rng = random.Random(42)
+    shared = [make_word(rng) for _ in range(200)]
+    vocabularies = {chapter: [make_word(rng) for _ in range(WORDS_PER_CHAPTER)] for chapter in CHAPTERS}
+
+    training, held_out = [], []
+    for chapter, vocabulary in vocabularies.items():
+        for _ in range(CODES_PER_CHAPTER):
+            words = rng.sample(vocabulary, 6) + rng.sample(shared, 3)
+            training.append((" ".join(words), chapter))
+        for _ in range(HELD_OUT_PER_CHAPTER):
+            words = [misspell(word, rng) if rng.random() < 0.2 else word for word in rng.sample(vocabulary, 3)]
+            words += rng.sample(shared, 2)
+            rng.shuffle(words)
+            held_out.append((" ".join(words), chapter))
+    return training, held_out
+
+
+@pytest.fixture(scope="module")
+def trained_classifier(dataset):
+    training, _ = dataset
+    classifier = HSChapterClassifier()
+    start = time.perf_counter()
+    classifier.fit([d for d, _ in training], [c for _, c in training])
+    print(f"\nChapter classifier trained on {len(training)} codes in {time.perf_counter() - start:.2f}s")
+    return classifier
+
+
+class TestChapterClassifierPerformance:
+    """Benchmark held-out accuracy and prediction latency"""
+
+    def test_held_out_accuracy_and_latency(self, trained_classifier, dataset):
+        """Held-out descriptions land in the right chapter within microseconds"""
+        _, held_out = dataset
+        report = trained_classifier.evaluate([d for d, _ in held_out], [c for _, c in held_out])
+
+        print(f"\nChapter classifier on {report['examples']} held-out matches: "
+              f"accuracy {report['accuracy']:.3f}, top-3 {report['top3_accuracy']:.3f}, "
+              f"p50 {report['p50_latency_us']:.0f}us, p99 {report['p99_latency_us']:.0f}us")
+        assert report["accuracy"] > 0.9
+        assert report["top3_accuracy"] > 0.95
+        assert report["p50_latency_us"] < 1000  # Generous bound for shared CI runners
+
+    def test_prediction_against_agent_latency(self, trained_classifier, dataset):
+        """A prediction costs a tiny fraction of one agent round trip"""
+        _, held_out = dataset
+        descriptions = [d for d, _ in held_out[:500]]
+
+        timings = []
+        for description in descriptions:
+            start = time.perf_counter()
+            trained_classifier.likely_chapters(description, confidence=0.9)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        median_ms = statistics.median(timings)
+        print(f"\nlikely_chapters: median {median_ms:.3f}ms, max {max(timings):.3f}ms over {len(timings)} descriptions")
+        assert median_ms < 2.0  # Agent calls take seconds
@@ -0,0 +1,90 @@
+"""
+End-to-end pipeline benchmark against the offline simulator backend
+
+Runs batches through HSCodeMatchingService with the simulator in place of
+the OpenAI agents, so the adaptive limiter, token budget, hedging and
+circuit breaker are all exercised without network access.
+"""
+
+import time
+import statistics
+from unittest.mock import patch
+
+import pytest
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from src.core.agent_resilience import CircuitBreaker, RequestHedger
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.schemas.hs_matching import HSCodeMatchRequest
+from src.services.matcher_backends import SimulatedMatcherBackend, SimulationProfile
+from src.services.cache_service import noop_cache_service
+
+
+BATCHES = 3
+PRODUCTS_PER_BATCH = 100
+
+
+@pytest.fixture
+def simulated_service():
+    """Matching service wired to a fresh simulator and fresh shared controls"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20, max_limit=100, latency_target_ms=200)
+    with patch("src.core.openai_config.openai_concurrency_limiter", limiter), \
+         patch("src.core.openai_config.agent_circuit_breaker", CircuitBreaker(min_calls=1000)), \
+         patch("src.core.openai_config.agent_hedger", RequestHedger(min_delay_ms=50)), \
+         patch("src.core.openai_config.openai_token_bucket.enabled", False):
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        service._concurrency_limiter = limiter
+        yield service
+
+
+def make_batches():
+    return [
+        [
+            HSCodeMatchRequest(product_description=f"simulated product {batch} {i}")
+            for i in range(PRODUCTS_PER_BATCH)
+        ]
+        for batch in range(BATCHES)
+    ]
+
+
+class TestSimulatedPipelinePerformance:
+    """Benchmark batch matching with simulated agent latency and failures"""
+
+    @pytest.mark.asyncio
+    async def test_batch_throughput_with_errors(self, simulated_service):
+        """Batches finish in a few simulated round trips; injected errors surface as error results"""
+        simulated_service._matcher_backend = SimulatedMatcherBackend(
+            SimulationProfile(latency_median_ms=20.0, latency_sigma=0.6, error_rate=0.02, seed=7)
+        )
+
+        timings = []
+        errors = 0
+        for batch in make_batches():
+            start = time.perf_counter()
+            results = await simulated_service.match_batch_products(batch)
+            timings.append(time.perf_counter() - start)
+            errors += sum(1 for r in results if r.primary_match.confidence == 0.0)
+
+        products = BATCHES * PRODUCTS_PER_BATCH
+        throughput = products / sum(timings)
+        backend_stats = simulated_service._matcher_backend.get_statistics()
+        print(f"\nSimulated pipeline: {throughput:.0f} products/s, median batch {statistics.median(timings) * 1000:.0f}ms, "
+              f"{errors} error results, {backend_stats['calls']} backend calls, "
+              f"limit {simulated_service._concurrency_limiter.limit}")
+
+        assert errors < products * 0.1
+        assert throughput > 100  # Serial calls at 20ms would manage 50 per second
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_burst_shrinks_limit(self, simulated_service):
+        """A 429 burst halves the adaptive limit instead of hammering the backend"""
+        simulated_service._matcher_backend = SimulatedMatcherBackend(
+            SimulationProfile(latency_median_ms=5.0, rate_limit_every_seconds=60, rate_limit_burst_seconds=60)
+        )
+        initial_limit = simulated_service._concurrency_limiter.limit
+
+        results = await simulated_service.match_batch_products(make_batches()[0][:20])
+
+        assert all(r.primary_match.confidence == 0.0 for r in results)
+        assert simulated_service._concurrency_limiter.limit < initial_limit
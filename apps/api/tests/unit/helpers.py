@@ -0,0 +1,53 @@
+"""Shared builders and fakes for the unit tests."""
+
+from typing import Any, List, Optional, Sequence
+from unittest.mock import AsyncMock
+
+from src.core.openai_config import HSCodeMatchResult, HSCodeResult, MatchErrorKind
+
+
+def make_result(
+    code: str = "5208110000",
+    confidence: float = 0.9,
+    query: str = "test",
+    processing_time_ms: float = 10.0,
+    reasoning: str = "Test",
+    alternative_codes: Sequence[str] = (),
+    error_kind: Optional[MatchErrorKind] = None
+) -> HSCodeMatchResult:
+    """Build a match result; alternatives copy the primary match at half its confidence."""
+    match = HSCodeResult(
+        hs_code=code,
+        code_description="Test code",
+        confidence=confidence,
+        chapter=code[:2],
+        section="XI",
+        reasoning=reasoning
+    )
+    return HSCodeMatchResult(
+        primary_match=match,
+        alternative_matches=[
+            match.model_copy(update={"hs_code": alternative, "confidence": confidence / 2})
+            for alternative in alternative_codes
+        ],
+        processing_time_ms=processing_time_ms,
+        query=query,
+        error_kind=error_kind
+    )
+
+
+class FakePipeline:
+    """Records queued commands as (name, args) and returns canned results on execute."""
+
+    def __init__(self, results: Optional[List[Any]] = None):
+        self.commands = []
+        self.execute = AsyncMock(return_value=results or [])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args))
@@ -0,0 +1,120 @@
+"""Unit tests for the adaptive (AIMD) concurrency limiter."""
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter, is_rate_limit_error
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test limit adjustments and slot accounting."""
+
+    @pytest.mark.asyncio
+    async def test_in_flight_never_exceeds_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[call() for _ in range(12)])
+
+        assert peak == 3
+        assert limiter.in_flight == 0
+        assert limiter.get_statistics()["waits"] > 0
+
+    @pytest.mark.asyncio
+    async def test_fast_calls_grow_limit_additively(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=10, latency_target_ms=1000)
+        limiter._in_flight = 2  # Saturated
+
+        for _ in range(4):
+            limiter._record_latency(100)
+
+        assert limiter.limit == 3
+
+    @pytest.mark.asyncio
+    async def test_idle_limit_does_not_grow(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=5, latency_target_ms=1000)
+
+        for _ in range(20):
+            limiter._record_latency(100)
+
+        assert limiter.limit == 5
+
+    @pytest.mark.asyncio
+    async def test_timeout_halves_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+
+        with pytest.raises(asyncio.TimeoutError):
+            async with limiter.slot():
+                raise asyncio.TimeoutError()
+
+        assert limiter.limit == 5
+        assert limiter.get_statistics()["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_halves_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        error = RuntimeError("Too Many Requests")
+        error.status_code = 429
+
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise error
+
+        assert limiter.limit == 4
+        assert limiter.get_statistics()["rate_limited"] == 1
+
+    @pytest.mark.asyncio
+    async def test_other_errors_keep_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+        with pytest.raises(ValueError):
+            async with limiter.slot():
+                raise ValueError("bad output")
+
+        assert limiter.limit == 8
+
+    @pytest.mark.asyncio
+    async def test_burst_of_failures_decreases_once(self):
+        """The cooldown stops a burst of timeouts collapsing the limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16)
+
+        for _ in range(5):
+            limiter._decrease(0.5, "timeout")
+
+        assert limiter.limit == 8
+
+    @pytest.mark.asyncio
+    async def test_slow_calls_back_off(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, latency_target_ms=1000)
+
+        limiter._record_latency(1500)
+
+        assert limiter.limit == 9
+
+    @pytest.mark.asyncio
+    async def test_rising_latency_backs_off(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, latency_target_ms=10000)
+        for _ in range(limiter.WARMUP_SAMPLES):
+            limiter._record_latency(200)
+
+        for _ in range(5):
+            limiter._record_latency(900)
+
+        assert limiter.limit < 10
+
+    @pytest.mark.asyncio
+    async def test_never_below_min_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=2)
+        limiter._decrease(0.5, "timeout")
+        assert limiter.limit == 2
+
+    def test_rate_limit_detection(self):
+        assert is_rate_limit_error(MagicMock(status_code=429))
+        assert not is_rate_limit_error(ValueError("boom"))
@@ -0,0 +1,107 @@
+"""Unit tests for the per-country agent registry."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents import Runner
+
+from src.core.openai_config import AgentRegistry, OpenAIAgentConfig, HSCodeMatchResult, HSCodeResult
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+
+
+def vector_store_config(default_ids):
+    return {"default": default_ids, "turkmenistan": default_ids}
+
+
+class TestAgentRegistry:
+    """Test agent reuse and rebuilds."""
+
+    @pytest.mark.asyncio
+    async def test_agent_is_built_once_and_reused(self):
+        """Repeated lookups return the same agent instance."""
+        registry = AgentRegistry()
+
+        first = await registry.get_agent("default")
+        second = await registry.get_agent("DEFAULT")
+
+        assert first is second
+        assert registry.get_statistics() == {"agents": 1, "builds": 1, "hits": 1}
+
+    @pytest.mark.asyncio
+    async def test_packed_and_single_agents_are_separate(self):
+        """Packed agents have their own structured output type."""
+        registry = AgentRegistry()
+
+        single = await registry.get_agent("default")
+        packed = await registry.get_agent("default", packed=True)
+
+        assert single is not packed
+        assert len(registry) == 2
+
+    @pytest.mark.asyncio
+    async def test_rebuild_when_vector_store_ids_change(self):
+        """A changed vector store configuration yields a fresh agent."""
+        registry = AgentRegistry()
+
+        with patch.object(OpenAIAgentConfig, "get_vector_store_config", return_value=vector_store_config(["vs_old"])):
+            old_agent = await registry.get_agent("turkmenistan")
+        with patch.object(OpenAIAgentConfig, "get_vector_store_config", return_value=vector_store_config(["vs_new"])):
+            new_agent = await registry.get_agent("turkmenistan")
+
+        assert old_agent is not new_agent
+        assert registry.get_statistics()["builds"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_country(self):
+        """Invalidation drops only the given country's agents."""
+        registry = AgentRegistry()
+        await registry.warm(["default", "turkmenistan"])
+        assert len(registry) == 4
+
+        registry.invalidate("turkmenistan")
+
+        assert len(registry) == 2
+
+
+class TestAgentReuse:
+    """Test that matching calls reuse registry agents."""
+
+    @pytest.mark.asyncio
+    async def test_match_hs_code_does_not_build_agent_per_call(self):
+        """Consecutive matches share the registry agent."""
+        output = MagicMock()
+        output.final_output = HSCodeMatchResult(
+            primary_match=HSCodeResult(
+                hs_code="5208110000",
+                code_description="Woven fabrics of cotton",
+                confidence=0.9,
+                chapter="52",
+                section="XI",
+                reasoning="Test"
+            ),
+            processing_time_ms=0,
+            query=""
+        )
+
+        with patch.object(Runner, "run", AsyncMock(return_value=output)) as mock_run, \
+             patch.object(OpenAIAgentConfig, "create_agent", wraps=OpenAIAgentConfig.create_agent) as mock_create:
+            await OpenAIAgentConfig.match_hs_code("cotton fabric", "unlisted-country")
+            await OpenAIAgentConfig.match_hs_code("steel pipes", "unlisted-country")
+
+        assert mock_create.call_count == 1
+        agents_used = [call.args[0] for call in mock_run.await_args_list]
+        assert agents_used[0] is agents_used[1]
+
+    @pytest.mark.asyncio
+    async def test_service_hands_cached_agent_down(self):
+        """The matching service passes its cached agent to match_hs_code."""
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(side_effect=RuntimeError("stop"))) as mock_match:
+            with pytest.raises(RuntimeError):
+                await service.match_single_product("cotton fabric")
+
+        agent = mock_match.await_args.kwargs["agent"]
+        assert agent is service._agents_cache["default"]
@@ -0,0 +1,340 @@
+"""Unit tests for agent call hedging and the circuit breaker."""
+
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from agents import ModelBehaviorError
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from src.core.agent_resilience import CircuitBreaker, RequestHedger, mark_upstream_started
+from src.core.openai_config import OpenAIAgentConfig, HSCodeMatchResult, HSCodeResult
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+
+
+def status_error(status_code: int) -> Exception:
+    error = RuntimeError(f"HTTP {status_code}")
+    error.status_code = status_code
+    return error
+
+
+def _warm_hedger(hedger: RequestHedger, latency_ms: float) -> None:
+    for _ in range(RequestHedger.MIN_SAMPLES):
+        hedger.record_latency(latency_ms)
+
+
+class TestRequestHedger:
+    """Test hedge delay, winner selection and statistics."""
+
+    @pytest.mark.asyncio
+    async def test_no_hedging_without_enough_samples(self):
+        hedger = RequestHedger(min_delay_ms=0)
+        attempts = []
+
+        async def attempt(elapsed_ms):
+            attempts.append(elapsed_ms)
+            await asyncio.sleep(0.02)
+            return "primary"
+
+        assert await hedger.run(attempt) == "primary"
+        assert attempts == [0.0]
+        assert hedger.get_statistics()["hedges"] == 0
+
+    @pytest.mark.asyncio
+    async def test_delay_follows_quantile_within_bounds(self):
+        hedger = RequestHedger(quantile=0.95, min_delay_ms=10, max_delay_ms=500)
+        for latency in range(1, 101):
+            hedger.record_latency(latency)
+        assert hedger.hedge_delay_ms() == 96
+
+        hedger.max_delay_ms = 50
+        assert hedger.hedge_delay_ms() == 50
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_hedge_wins(self):
+        hedger = RequestHedger(min_delay_ms=10, max_delay_ms=10)
+        _warm_hedger(hedger, 10)
+        primary_cancelled = asyncio.Event()
+
+        async def attempt(elapsed_ms):
+            if elapsed_ms == 0:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    primary_cancelled.set()
+                    raise
+                return "primary"
+            return "hedge"
+
+        start = time.monotonic()
+        assert await hedger.run(attempt) == "hedge"
+        assert time.monotonic() - start < 1
+        await asyncio.wait_for(primary_cancelled.wait(), timeout=1)
+
+        stats = hedger.get_statistics()
+        assert stats["hedges"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["hedge_win_rate_percent"] == 100.0
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        hedger = RequestHedger(min_delay_ms=200, max_delay_ms=200)
+        _warm_hedger(hedger, 200)
+        attempt = AsyncMock(return_value="primary")
+
+        assert await hedger.run(attempt) == "primary"
+        attempt.assert_awaited_once_with(0.0)
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        hedger = RequestHedger(min_delay_ms=10, max_delay_ms=10)
+        _warm_hedger(hedger, 10)
+
+        async def attempt(elapsed_ms):
+            if elapsed_ms == 0:
+                await asyncio.sleep(0.05)
+                raise RuntimeError("primary failed")
+            await asyncio.sleep(0.1)
+            return "hedge"
+
+        assert await hedger.run(attempt) == "hedge"
+
+    @pytest.mark.asyncio
+    async def test_error_raised_when_all_attempts_fail(self):
+        hedger = RequestHedger(min_delay_ms=10, max_delay_ms=10)
+        _warm_hedger(hedger, 10)
+
+        async def attempt(elapsed_ms):
+            await asyncio.sleep(0.03)
+            raise RuntimeError(f"failed at {elapsed_ms}")
+
+        with pytest.raises(RuntimeError, match="failed at 0"):
+            await hedger.run(attempt)
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_is_neither_hedged_nor_timed(self):
+        hedger = RequestHedger(min_delay_ms=20, max_delay_ms=20)
+        _warm_hedger(hedger, 20)
+        attempts = []
+
+        async def attempt(elapsed_ms):
+            attempts.append(elapsed_ms)
+            await asyncio.sleep(0.1)  # Queued for a budget or concurrency slot
+            mark_upstream_started()
+            await asyncio.sleep(0.005)
+            return "primary"
+
+        assert await hedger.run(attempt, wait_for_upstream=True) == "primary"
+        assert attempts == [0.0]
+        assert hedger._latencies[-1] < 50
+
+    @pytest.mark.asyncio
+    async def test_slow_upstream_is_hedged_with_the_remaining_time(self):
+        hedger = RequestHedger(min_delay_ms=20, max_delay_ms=20)
+        _warm_hedger(hedger, 20)
+        attempts = []
+
+        async def attempt(elapsed_ms):
+            attempts.append(elapsed_ms)
+            if elapsed_ms == 0:
+                await asyncio.sleep(0.05)
+                mark_upstream_started()
+                await asyncio.sleep(5)
+            return "hedge"
+
+        assert await hedger.run(attempt, wait_for_upstream=True) == "hedge"
+        # The hedge is charged the primary's queue wait as well as the delay
+        assert attempts[1] >= 70
+
+
+class TestCircuitBreaker:
+    """Test state transitions of the breaker."""
+
+    def test_opens_when_failure_rate_exceeds_threshold(self):
+        breaker = CircuitBreaker(failure_rate_threshold=0.5, min_calls=4)
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED  # Below min_calls
+
+        breaker.record_failure()
+        assert breaker.is_open
+        assert not breaker.allow_request()
+        assert breaker.get_statistics()["rejected_calls"] == 1
+        assert breaker.get_statistics()["times_opened"] == 1
+
+    def test_half_open_probe_closes_on_success(self):
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # Only one probe at a time
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+    def test_half_open_probe_failure_reopens(self):
+        breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+        breaker.record_failure()
+        breaker._opened_at -= 60
+
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.is_open
+        assert breaker.get_statistics()["times_opened"] == 2
+
+    @pytest.mark.parametrize("error,counted", [
+        (asyncio.TimeoutError(), True),
+        (ConnectionError("reset"), True),
+        (status_error(429), True),
+        (status_error(502), True),
+        (status_error(422), False),
+        (ModelBehaviorError("invalid output"), False),
+    ])
+    def test_only_upstream_errors_count(self, error, counted):
+        breaker = CircuitBreaker(min_calls=1)
+
+        breaker.record_error(error)
+
+        assert breaker.is_open is counted
+
+    def test_uncounted_error_frees_half_open_probe(self):
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0)
+        breaker.record_failure()
+        assert breaker.allow_request()
+
+        breaker.record_error(ModelBehaviorError("invalid output"))
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+    def test_release_frees_cancelled_probe(self):
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+
+        assert breaker.allow_request()
+        breaker.release()
+        assert breaker.allow_request()
+
+
+class TestResilientMatching:
+    """Test the breaker and hedger around agent calls."""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_fails_fast_without_agent_call(self):
+        breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+        breaker.record_failure()
+        run = AsyncMock()
+
+        with patch("src.core.openai_config.agent_circuit_breaker", breaker), \
+             patch("src.core.openai_config.Runner.run", run):
+            result = await OpenAIAgentConfig.match_hs_code("cotton t-shirt", agent=object())
+
+        assert result.primary_match.hs_code == "000000000"
+        run.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_agent_errors_are_recorded_by_breaker(self):
+        breaker = CircuitBreaker(min_calls=2)
+        hedger = RequestHedger(enabled=False)
+
+        with patch("src.core.openai_config.agent_circuit_breaker", breaker), \
+             patch("src.core.openai_config.agent_hedger", hedger), \
+             patch("src.core.openai_config.openai_token_bucket.enabled", False), \
+             patch("src.core.openai_config.Runner.run", AsyncMock(side_effect=status_error(503))):
+            for _ in range(2):
+                await OpenAIAgentConfig.match_hs_code("cotton t-shirt", agent=object())
+
+        assert breaker.is_open
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [ModelBehaviorError("invalid output"), status_error(400), ValueError("bad row")])
+    async def test_input_and_output_errors_do_not_open_breaker(self, error):
+        breaker = CircuitBreaker(min_calls=2)
+        hedger = RequestHedger(enabled=False)
+
+        with patch("src.core.openai_config.agent_circuit_breaker", breaker), \
+             patch("src.core.openai_config.agent_hedger", hedger), \
+             patch("src.core.openai_config.openai_token_bucket.enabled", False), \
+             patch("src.core.openai_config.Runner.run", AsyncMock(side_effect=error)):
+            for _ in range(5):
+                await OpenAIAgentConfig.match_hs_code("cotton t-shirt", agent=object())
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.failure_rate == 0.0
+
+    @pytest.mark.asyncio
+    async def test_timeout_covers_budget_and_queue_waits(self):
+        async def stuck_budget(tokens):
+            await asyncio.sleep(5)
+
+        run = AsyncMock()
+        with patch("src.core.openai_config.openai_token_bucket.acquire", stuck_budget):
+            start = time.monotonic()
+            with pytest.raises(asyncio.TimeoutError):
+                await OpenAIAgentConfig._run_agent(object(), "query", 100, 0.05, run)
+
+        assert time.monotonic() - start < 1
+        run.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_upstream_timeout_backs_off_concurrency_limit(self):
+        """A run timing out inside its slot is seen by the limiter as a timeout."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+
+        async def slow_run(agent, query):
+            await asyncio.sleep(5)
+
+        with patch("src.core.openai_config.openai_concurrency_limiter", limiter), \
+             patch("src.core.openai_config.openai_token_bucket.enabled", False), \
+             patch("src.core.openai_config.Runner.run", slow_run):
+            with pytest.raises(asyncio.TimeoutError):
+                await OpenAIAgentConfig._run_agent(object(), "query", 100, 0.05)
+
+        assert limiter.limit == 5
+        assert limiter.get_statistics()["timeouts"] == 1
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_service_uses_vector_shortlist_while_breaker_open(self):
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+        breaker.record_failure()
+        fallback = HSCodeMatchResult(
+            primary_match=HSCodeResult(
+                hs_code="610910000", code_description="T-shirts", confidence=0.6,
+                chapter="61", section="XI", reasoning="index"
+            ),
+            processing_time_ms=1.0,
+            query="cotton t-shirt"
+        )
+        service._get_vector_candidates = AsyncMock(return_value=[SimpleNamespace(score=0.6)])
+        match_hs_code = AsyncMock()
+
+        with patch("src.services.hs_matching_service.agent_circuit_breaker", breaker), \
+             patch.object(service._vector_index, "build_match_result", return_value=fallback), \
+             patch.object(service.agent_config, "match_hs_code", match_hs_code):
+            result = await service.match_single_product("cotton t-shirt", "default")
+
+        assert result.primary_match.hs_code == "610910000"
+        match_hs_code.assert_not_awaited()
+        assert service._performance_metrics["circuit_open_fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_service_fails_fast_without_shortlist(self):
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+        breaker.record_failure()
+        service._get_vector_candidates = AsyncMock(return_value=[])
+
+        with patch("src.services.hs_matching_service.agent_circuit_breaker", breaker):
+            with pytest.raises(ConnectionError):
+                await service.match_single_product("cotton t-shirt", "default")
+
+        assert service._performance_metrics["circuit_open_failures"] == 1
@@ -0,0 +1,149 @@
+"""Unit tests for per-run token, tool-call and phase timing accounting."""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from src.core.openai_config import (
+    OpenAIAgentConfig,
+    HSCodeMatchResult,
+    HSCodeResult,
+    HSCodePackedMatchItem,
+    HSCodePackedMatchOutput,
+    HSCodeRunMetrics
+)
+from src.core.priority_lanes import Lane, priority_lane
+from src.services.analytics_service import HSCodeAnalyticsService
+
+
+def make_output(description: str = "cotton fabric") -> HSCodeMatchResult:
+    return HSCodeMatchResult(
+        primary_match=HSCodeResult(
+            hs_code="5208110000",
+            code_description="Woven fabrics of cotton",
+            confidence=0.9,
+            chapter="52",
+            section="XI",
+            reasoning="Cotton fabric"
+        ),
+        alternative_matches=[],
+        processing_time_ms=0.0,
+        query=description
+    )
+
+
+def make_run(final_output, tool_calls: int = 1, delay: float = 0.0):
+    """Runner returning a result shaped like the Agents SDK's RunResult."""
+    usage = SimpleNamespace(
+        requests=2,
+        input_tokens=1200,
+        input_tokens_details=SimpleNamespace(cached_tokens=800),
+        output_tokens=150,
+        output_tokens_details=SimpleNamespace(reasoning_tokens=40),
+        total_tokens=1350
+    )
+    items = [SimpleNamespace(type="tool_call_item")] * tool_calls + [SimpleNamespace(type="message_output_item")]
+
+    async def run(agent, query):
+        await asyncio.sleep(delay)
+        return SimpleNamespace(final_output=final_output, new_items=items, context_wrapper=SimpleNamespace(usage=usage))
+
+    return run
+
+
+@pytest.fixture(autouse=True)
+def isolated_controls():
+    with patch("src.core.openai_config.agent_hedger.enabled", False), \
+         patch("src.core.openai_config.openai_token_bucket.enabled", False):
+        yield
+
+
+class TestRunMetrics:
+    """Test the metrics attached to match results."""
+
+    @pytest.mark.asyncio
+    async def test_usage_and_tool_calls_are_captured(self):
+        result = await OpenAIAgentConfig.match_hs_code(
+            "cotton fabric", "turkmenistan", agent=object(), runner=make_run(make_output(), tool_calls=2)
+        )
+
+        metrics = result.run_metrics
+        assert metrics.country == "turkmenistan"
+        assert metrics.lane == Lane.INTERACTIVE
+        assert metrics.model_requests == 2
+        assert metrics.tool_calls == 2
+        assert (metrics.input_tokens, metrics.cached_input_tokens) == (1200, 800)
+        assert (metrics.output_tokens, metrics.reasoning_tokens, metrics.total_tokens) == (150, 40, 1350)
+        # Metadata only: never serialized into caches or API responses
+        assert "run_metrics" not in result.model_dump_json()
+
+    @pytest.mark.asyncio
+    async def test_phase_timings(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        with patch("src.core.openai_config.openai_concurrency_limiter", limiter):
+            first, second = await asyncio.gather(
+                OpenAIAgentConfig.match_hs_code("cotton fabric", agent=object(), runner=make_run(make_output(), delay=0.05)),
+                OpenAIAgentConfig.match_hs_code("steel pipes", agent=object(), runner=make_run(make_output(), delay=0.05))
+            )
+
+        assert first.run_metrics.agent_ms >= 45
+        # The second call waited for the only slot
+        assert second.run_metrics.queue_wait_ms >= 45
+        assert second.run_metrics.total_ms >= second.run_metrics.queue_wait_ms + second.run_metrics.agent_ms - 1
+
+    @pytest.mark.asyncio
+    async def test_lane_is_taken_from_context(self):
+        with priority_lane(Lane.FILE_PROCESSING):
+            result = await OpenAIAgentConfig.match_hs_code("cotton fabric", agent=object(), runner=make_run(make_output()))
+
+        assert result.run_metrics.lane == Lane.FILE_PROCESSING
+
+    @pytest.mark.asyncio
+    async def test_packed_items_share_one_run(self):
+        output = HSCodePackedMatchOutput(results=[
+            HSCodePackedMatchItem(index=i, primary_match=make_output().primary_match) for i in range(3)
+        ])
+
+        results = await OpenAIAgentConfig.match_hs_codes_packed(
+            ["a product", "b product", "c product"], agent=object(), runner=make_run(output)
+        )
+
+        assert all(r.run_metrics is results[0].run_metrics for r in results)
+        assert results[0].run_metrics.packed_items == 3
+
+
+class TestAgentRunAnalytics:
+    """Test aggregation of run metrics in the analytics service."""
+
+    def test_distributions_per_country_and_lane(self):
+        analytics = HSCodeAnalyticsService()
+        for i in range(10):
+            analytics.record_agent_run(HSCodeRunMetrics(
+                country="turkmenistan" if i < 6 else "default",
+                lane=Lane.INTERACTIVE if i % 2 else Lane.FILE_PROCESSING,
+                total_tokens=1000 + i * 100,
+                queue_wait_ms=100.0,
+                agent_ms=300.0
+            ))
+        analytics.record_agent_run(HSCodeRunMetrics(packed_items=10, total_tokens=5000, agent_ms=400.0))
+
+        report = analytics.get_agent_run_metrics(minutes=5)
+
+        assert report["overall"]["runs"] == 11
+        assert report["overall"]["products"] == 20
+        assert report["by_country"]["turkmenistan"]["runs"] == 6
+        assert report["by_country"]["turkmenistan"]["total_tokens"]["max"] == 1500
+        assert report["by_lane"][Lane.FILE_PROCESSING]["runs"] == 5
+        # Packed runs are judged per product
+        assert report["by_country"]["default"]["tokens_per_item"]["p50"] <= 1900
+        assert report["by_lane"][Lane.FILE_PROCESSING]["phase_share"] == {
+            "budget_wait_ms": 0.0, "queue_wait_ms": 0.25, "agent_ms": 0.75
+        }
+
+    def test_empty_window(self):
+        report = HSCodeAnalyticsService().get_agent_run_metrics()
+
+        assert report["overall"] == {"runs": 0, "products": 0}
+        assert report["by_country"] == {}
@@ -0,0 +1,66 @@
+"""Unit tests for intra-batch deduplication in match_batch_products."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.schemas.hs_matching import HSCodeMatchRequest
+from helpers import make_result
+
+
+@pytest.fixture
+def hs_service():
+    service = HSCodeMatchingService()
+    service._cache_service = noop_cache_service
+    return service
+
+
+class TestBatchDeduplication:
+    """Test collapsing and fanning out of repeated rows."""
+
+    def test_deduplicate_requests(self, hs_service):
+        """Rows equal after cleaning share one unique request."""
+        requests = [
+            HSCodeMatchRequest(product_description="Cotton fabric"),
+            HSCodeMatchRequest(product_description="  cotton   fabric "),
+            HSCodeMatchRequest(product_description="steel pipes"),
+            HSCodeMatchRequest(product_description="various cotton fabric"),
+            HSCodeMatchRequest(product_description="cotton fabric", country="turkmenistan"),
+        ]
+
+        unique, row_to_unique = hs_service._deduplicate_requests(requests)
+
+        assert len(unique) == 3
+        assert row_to_unique == [0, 0, 1, 0, 2]
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_each_unique_description_once(self, hs_service):
+        """Repeated invoice lines cost one match and keep row order."""
+        descriptions = ["cotton fabric", "steel pipes", "Cotton Fabric", "cotton fabric", "wheat flour"]
+        requests = [HSCodeMatchRequest(product_description=d) for d in descriptions]
+
+        async def fake_match(description, country, candidates=None, agent=None, chapters=None):
+            return make_result(f"code:{description.lower()}", query=description.lower())
+
+        with patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(side_effect=fake_match)) as mock_agent:
+            results = await hs_service.match_batch_products(requests)
+
+        assert mock_agent.await_count == 3
+        assert [r.primary_match.hs_code for r in results] == [
+            "code:cotton fabric", "code:steel pipes", "code:cotton fabric", "code:cotton fabric", "code:wheat flour"
+        ]
+        # Fanned-out duplicates are independent copies
+        assert results[0] is not results[2]
+        assert hs_service._calculate_performance_summary()["batch_dedup_ratio"] == pytest.approx(0.4)
+
+    @pytest.mark.asyncio
+    async def test_duplicate_failures_fan_out_as_errors(self, hs_service):
+        """A failing unique description yields an error row for every duplicate."""
+        requests = [HSCodeMatchRequest(product_description="bad product line") for _ in range(3)]
+
+        with patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(side_effect=RuntimeError("boom"))) as mock_agent:
+            results = await hs_service.match_batch_products(requests)
+
+        assert mock_agent.await_count == 1
+        assert [r.primary_match.hs_code for r in results] == ["ERROR"] * 3
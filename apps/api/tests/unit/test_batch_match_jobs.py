@@ -0,0 +1,381 @@
+"""Unit tests for asynchronous large-batch matching jobs."""
+
+import time
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.batch_match_jobs import BatchMatchJobManager
+from src.services.hs_matching_service import hs_matching_service
+from src.schemas.hs_matching import HSCodeMatchRequest
+from src.core.openai_config import MatchErrorKind
+from helpers import make_result
+
+
+def make_requests(count: int):
+    return [HSCodeMatchRequest(product_description=f"product {i}") for i in range(count)]
+
+
+class FakeRedis:
+    """Keeps job hashes and result lists in memory; writes fail while ``fail_writes`` is set."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.fail_writes = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        self.hashes.setdefault(key, {}).update(mapping or {field: value})
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field] = int(values.get(field, 0)) + amount
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    async def eval(self, script, numkeys, key, status, error, updated_at, *only_from):
+        # Mirrors BatchMatchJobManager.TRANSITION_SCRIPT
+        values = self.hashes.get(key, {})
+        if values.get("status") in only_from:
+            values.update(status=status, error=error, updated_at=updated_at)
+            return status
+        return values.get("status")
+
+
+class FakePipeline:
+    """Queues commands and runs them against the FakeRedis on execute."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((getattr(self.client, name), args, kwargs))
+
+    async def execute(self):
+        if self.client.fail_writes:
+            raise ConnectionError("Redis down")
+        return [await command(*args, **kwargs) for command, args, kwargs in self.commands]
+
+
+async def complete_all(requests):
+    for i, request in enumerate(requests):
+        yield i, make_result(query=request.product_description)
+
+
+@pytest.fixture
+def manager():
+    manager = BatchMatchJobManager(max_items=1000, max_running_jobs=1)
+    with patch.object(manager, "_get_redis", AsyncMock(return_value=None)):
+        yield manager
+
+
+async def wait_for_status(manager, job_id, status, user_id="user-1"):
+    for _ in range(200):
+        job = await manager.get_job(job_id, user_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job never reached {status}")
+
+
+class TestBatchMatchJobs:
+    """Test job chunking, progress, visibility and cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_large_job_is_chunked_under_batch_limit(self, manager):
+        chunk_sizes = []
+
+        async def fake_stream(requests):
+            chunk_sizes.append(len(requests))
+            for i, request in enumerate(requests):
+                if request.product_description == "product 7":
+                    yield i, make_result(
+                        "000000000", confidence=0.0, query="product 7", error_kind=MatchErrorKind.TRANSIENT
+                    )
+                else:
+                    yield i, make_result(query=request.product_description)
+
+        with patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(250))
+            assert job["status"] == "queued"
+            job = await wait_for_status(manager, job["job_id"], "completed")
+
+        assert sorted(chunk_sizes) == [50, 100, 100]
+        assert job["completed_products"] == 250
+        assert job["failed_products"] == 1
+
+        _, results, cursor = await manager.get_results(job["job_id"], "user-1", cursor=0, limit=1000)
+        assert cursor == 250
+        assert sorted(item["index"] for item in results) == list(range(250))
+        by_index = {item["index"]: item["result"] for item in results}
+        assert by_index[42]["query"] == "product 42"
+
+    @pytest.mark.asyncio
+    async def test_partial_results_are_readable_while_running(self, manager):
+        release = asyncio.Event()
+
+        async def fake_stream(requests):
+            for i, request in enumerate(requests):
+                if i == manager.FLUSH_SIZE:
+                    await release.wait()
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(40))
+            await asyncio.sleep(0.05)
+
+            status, results, cursor = await manager.get_results(job["job_id"], "user-1")
+            assert status["status"] == "running"
+            assert cursor == len(results) == manager.FLUSH_SIZE
+
+            release.set()
+            streamed = [item async for item in manager.iter_results(job["job_id"], "user-1")]
+
+        assert len(streamed) == 40
+
+    @pytest.mark.asyncio
+    async def test_cancel_keeps_finished_results(self, manager):
+        async def fake_stream(requests):
+            for i, request in enumerate(requests):
+                if i == manager.FLUSH_SIZE:
+                    await asyncio.sleep(10)
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(40))
+            await asyncio.sleep(0.05)
+            cancelled = await manager.cancel(job["job_id"], "user-1")
+
+        assert cancelled["status"] == "cancelled"
+        assert cancelled["completed_products"] == manager.FLUSH_SIZE
+
+    @pytest.mark.asyncio
+    async def test_jobs_are_private_to_their_owner(self, manager):
+        async def fake_stream(requests):
+            for i, request in enumerate(requests):
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(3))
+
+            assert await manager.get_job(job["job_id"], "user-2") is None
+            assert await manager.get_results(job["job_id"], "user-2") is None
+            assert await manager.cancel(job["job_id"], "user-2") is None
+            await wait_for_status(manager, job["job_id"], "completed")
+
+    @pytest.mark.asyncio
+    async def test_job_size_limit(self, manager):
+        with pytest.raises(ValueError):
+            await manager.submit("user-1", make_requests(1001))
+
+        with pytest.raises(ValueError):
+            await manager.submit("user-1", [])
+
+    @pytest.mark.asyncio
+    async def test_failing_chunk_stops_the_other_chunks(self, manager):
+        stopped = asyncio.Event()
+
+        async def fake_stream(requests):
+            if requests[0].product_description == "product 0":
+                await asyncio.sleep(0.01)
+                raise RuntimeError("chunk failed")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+            yield
+
+        with patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(200))
+            job = await wait_for_status(manager, job["job_id"], "failed")
+
+        # The sibling chunk was cancelled before the job reported its final status
+        assert stopped.is_set()
+        assert "chunk failed" in job["error"]
+
+    @pytest.mark.asyncio
+    async def test_job_abandoned_by_its_worker_ends_as_failed(self, manager):
+        client = AsyncMock()
+        client.hgetall.return_value = {
+            "job_id": "job-1",
+            "user_id": "user-1",
+            "status": "running",
+            "total_products": "10",
+            "completed_products": "4",
+            "failed_products": "0",
+            "error": "",
+            "heartbeat_at": str(time.time() - manager.STALE_SECONDS - 1)
+        }
+        client.lrange.return_value = []
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)):
+            streamed = [item async for item in manager.iter_results("job-1", "user-1")]
+            job = await manager.get_job("job-1", "user-1")
+
+        assert streamed == []
+        assert job["status"] == "failed"
+        assert "heartbeat_at" not in job
+        client.hset.assert_awaited_with(
+            manager._job_key("job-1"),
+            mapping={"status": "failed", "error": job["error"]}
+        )
+
+
+class TestLocalResults:
+    """Test which results a worker keeps in memory."""
+
+    @pytest.mark.asyncio
+    async def test_results_in_redis_are_not_kept_locally(self, manager):
+        client = FakeRedis()
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(hs_matching_service, "iter_batch_matches", complete_all):
+            job = await manager.submit("user-1", make_requests(40))
+            await wait_for_status(manager, job["job_id"], "completed")
+            _, results, cursor = await manager.get_results(job["job_id"], "user-1")
+
+        assert manager._jobs[job["job_id"]]["results"] == []
+        assert len(client.lists[manager._results_key(job["job_id"])]) == 40
+        assert cursor == 40
+        assert sorted(item["index"] for item in results) == list(range(40))
+
+    @pytest.mark.asyncio
+    async def test_results_stay_local_once_redis_fails(self, manager):
+        client = FakeRedis()
+
+        async def fail_after_first_flush(requests):
+            for i, request in enumerate(requests):
+                if i == manager.FLUSH_SIZE:
+                    client.fail_writes = True
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(hs_matching_service, "iter_batch_matches", fail_after_first_flush):
+            job = await manager.submit("user-1", make_requests(40))
+            await wait_for_status(manager, job["job_id"], "completed")
+            client.fail_writes = False
+
+            # Pages cross from the Redis list into the local copy
+            first = await manager.get_results(job["job_id"], "user-1", cursor=0, limit=30)
+            second = await manager.get_results(job["job_id"], "user-1", cursor=first[2], limit=30)
+
+        assert len(client.lists[manager._results_key(job["job_id"])]) == manager.FLUSH_SIZE
+        assert len(manager._jobs[job["job_id"]]["results"]) == 40 - manager.FLUSH_SIZE
+        assert second[2] == 40
+        assert [item["index"] for item in first[1] + second[1]] == list(range(40))
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_are_pruned_on_read(self, manager):
+        with patch.object(hs_matching_service, "iter_batch_matches", complete_all):
+            job = await manager.submit("user-1", make_requests(3))
+            await wait_for_status(manager, job["job_id"], "completed")
+
+        with patch.object(manager, "JOB_TTL_SECONDS", 0):
+            manager.get_statistics()
+
+        assert job["job_id"] not in manager._jobs
+
+
+class TestCrossWorkerCancellation:
+    """Test cancelling a job through a worker that is not running it."""
+
+    @pytest.fixture
+    def other_worker(self):
+        return BatchMatchJobManager(max_items=1000, max_running_jobs=1)
+
+    @pytest.mark.asyncio
+    async def test_cancel_racing_completion_keeps_final_status(self, manager, other_worker):
+        client = FakeRedis()
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(other_worker, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(hs_matching_service, "iter_batch_matches", complete_all):
+            job = await manager.submit("user-1", make_requests(3))
+            running = await other_worker.get_job(job["job_id"], "user-1")
+            await wait_for_status(manager, job["job_id"], "completed")
+
+            # The cancel read the job while it was running; it completes before the write
+            with patch.object(other_worker, "get_job", AsyncMock(return_value=dict(running, status="running"))):
+                cancelled = await other_worker.cancel(job["job_id"], "user-1")
+
+        assert cancelled["status"] == "completed"
+        assert client.hashes[manager._job_key(job["job_id"])]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_job_cancelled_while_queued_never_starts(self, manager, other_worker):
+        client = FakeRedis()
+        release = asyncio.Event()
+        started = []
+
+        async def blocking_stream(requests):
+            started.append(requests[0].product_description)
+            await release.wait()
+            for i, request in enumerate(requests):
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(other_worker, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(hs_matching_service, "iter_batch_matches", blocking_stream):
+            first = await manager.submit("user-1", make_requests(3))
+            queued = await manager.submit("user-1", make_requests(3))
+            await asyncio.sleep(0.01)
+
+            assert (await other_worker.cancel(queued["job_id"], "user-1"))["status"] == "cancelling"
+            release.set()
+            await wait_for_status(manager, first["job_id"], "completed")
+            job = await wait_for_status(manager, queued["job_id"], "cancelled")
+
+        assert started == ["product 0"]
+        assert job["completed_products"] == 0
+
+    @pytest.mark.asyncio
+    async def test_local_only_job_sees_cancellation(self, manager, other_worker):
+        client = FakeRedis()
+        cancel_requested = asyncio.Event()
+
+        async def fake_stream(requests):
+            for i, request in enumerate(requests):
+                if i == 0:
+                    client.fail_writes = True
+                if i == manager.FLUSH_SIZE:
+                    # The first flush failed, so this job keeps its results locally
+                    await cancel_requested.wait()
+                yield i, make_result(query=request.product_description)
+
+        with patch.object(manager, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(other_worker, "_get_redis", AsyncMock(return_value=client)), \
+             patch.object(hs_matching_service, "iter_batch_matches", fake_stream):
+            job = await manager.submit("user-1", make_requests(60))
+            await asyncio.sleep(0.01)
+            assert manager._jobs[job["job_id"]]["local_only"]
+            client.fail_writes = False
+
+            await other_worker.cancel(job["job_id"], "user-1")
+            cancel_requested.set()
+            job = await wait_for_status(manager, job["job_id"], "cancelled")
+
+        assert job["completed_products"] == 2 * manager.FLUSH_SIZE
@@ -0,0 +1,178 @@
+"""Unit tests for bulk cache lookups and writes used by batch matching."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.cache_service import CacheService
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.schemas.hs_matching import HSCodeMatchRequest
+from helpers import FakePipeline, make_result
+
+
+@pytest.fixture
+def redis_service():
+    service = CacheService()
+    service._redis = AsyncMock()
+    service._pipelines = []
+
+    def pipeline(transaction=True):
+        pipe = FakePipeline()
+        service._pipelines.append(pipe)
+        return pipe
+
+    service._redis.pipeline = MagicMock(side_effect=pipeline)
+    return service
+
+
+class TestBulkCacheOperations:
+    """Test get_cached_matches_bulk and cache_match_results_bulk."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_uses_one_mget(self, redis_service):
+        """L2 hits and misses are resolved with a single MGET."""
+        redis_service._redis.mget.return_value = [make_result("5208110000").model_dump_json(), None]
+
+        results = await redis_service.get_cached_matches_bulk([
+            ("cotton fabric", "default"),
+            ("steel pipes", "default"),
+        ])
+
+        redis_service._redis.mget.assert_awaited_once()
+        redis_service._redis.get.assert_not_called()
+        assert results[0].primary_match.hs_code == "5208110000"
+        assert results[1] is None
+
+        # Hit statistics are written in one pipeline instead of INCR/EXPIRE per hit
+        redis_service._redis.incr.assert_not_called()
+        assert redis_service._pipelines[0].commands[0] == ("incrby", (redis_service._generate_stats_key("hits"), 1))
+
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_skips_l1_hits(self, redis_service):
+        """Keys already in the L1 are not fetched from Redis."""
+        redis_service._redis.mget.return_value = [None]
+        redis_service._local_cache.set(redis_service._generate_cache_key("cotton fabric"), make_result("5208110000"), 60)
+
+        results = await redis_service.get_cached_matches_bulk([
+            ("cotton fabric", "default"),
+            ("steel pipes", "default"),
+        ])
+
+        assert results[0].primary_match.hs_code == "5208110000"
+        assert redis_service._redis.mget.await_args.args[0] == [redis_service._generate_cache_key("steel pipes")]
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_is_one_pipeline(self, redis_service):
+        """SETEX and aggregated stat counters share one pipeline."""
+        written = await redis_service.cache_match_results_bulk([
+            ("cotton fabric", "default", make_result("5208110000")),
+            ("cotton yarn", "default", make_result("5208110000")),
+        ])
+
+        assert written == 2
+        assert len(redis_service._pipelines) == 1
+        commands = redis_service._pipelines[0].commands
+        assert [name for name, _ in commands].count("setex") == 2
+        assert ("zincrby", (CacheService.POPULAR_HS_CODES_KEY, 2, "5208110000")) in commands
+        # Both keys tracked as live entries in the same round trip
+        zadd = next(args for name, args in commands if name == "zadd")
+        assert zadd[0] == CacheService.ENTRIES_KEY and len(zadd[1]) == 2
+        redis_service._pipelines[0].execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_fills_l1_without_redis(self):
+        service = CacheService()
+
+        assert await service.cache_match_results_bulk([("cotton fabric", "default", make_result("5208110000"))]) == 0
+        assert (await service.get_cached_matches_bulk([("cotton fabric", "default")]))[0] is not None
+
+
+class TestKeyspaceStatistics:
+    """Test that statistics read counters and sorted sets instead of walking keys."""
+
+    @pytest.mark.asyncio
+    async def test_entry_tracking_trims_expired_members(self, redis_service):
+        with patch("src.services.cache_service.time.time", return_value=1000.0), \
+             patch("src.services.cache_service.random.random", return_value=0.0), \
+             patch("src.services.cache_service.settings.HS_CACHE_STALE_WHILE_REVALIDATE", True):
+            await redis_service.cache_match_results_bulk([("cotton fabric", "default", make_result("5208110000"))])
+
+        commands = dict(redis_service._pipelines[0].commands)
+        cache_key = redis_service._generate_cache_key("cotton fabric")
+        # Tracked until the hard expiry, past the stale grace period
+        ttl_seconds = redis_service._determine_ttl(make_result("5208110000")) * 3600 * 1.1
+        assert commands["zadd"] == (CacheService.ENTRIES_KEY, {cache_key: pytest.approx(1000.0 + ttl_seconds)})
+        assert commands["zremrangebyscore"] == (CacheService.ENTRIES_KEY, "-inf", 1000.0)
+
+    @pytest.mark.asyncio
+    async def test_statistics_count_live_entries(self, redis_service):
+        redis_service._redis.info.return_value = {"used_memory": 0}
+        pipe = FakePipeline()
+        pipe.execute = AsyncMock(return_value=[12, "9", "1"])  # Entries, hits, misses
+        redis_service._redis.pipeline = MagicMock(return_value=pipe)
+
+        stats = await redis_service.get_cache_statistics()
+
+        assert stats["total_cache_entries"] == 12
+        assert "batch_cache_entries" not in stats
+        assert stats["hit_ratio_percent"] == 90.0
+        redis_service._redis.keys.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_top_products_read_sorted_set(self, redis_service):
+        redis_service._redis.zrevrange.return_value = [("5208110000", 7.0)]
+
+        top = await redis_service.get_top_cached_products(limit=5)
+
+        assert top == [{"hs_code": "5208110000", "access_count": 7}]
+        redis_service._redis.zrevrange.assert_awaited_once_with(CacheService.POPULAR_HS_CODES_KEY, 0, 4, withscores=True)
+
+
+class TestBatchBulkLookup:
+    """Test that batch matching resolves cache hits up front."""
+
+    @pytest.mark.asyncio
+    async def test_batch_dispatches_only_misses(self):
+        service = HSCodeMatchingService()
+        cache = CacheService()
+        cache.get_cached_matches_bulk = AsyncMock(return_value=[make_result("5208110000"), None])
+        cache.get_cached_match = AsyncMock(return_value=None)
+        service._cache_service = cache
+
+        requests = [
+            HSCodeMatchRequest(product_description="cotton fabric"),
+            HSCodeMatchRequest(product_description="steel pipes"),
+        ]
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(return_value=make_result("7304190000"))) as mock_agent:
+            results = await service.match_batch_products(requests)
+
+        cache.get_cached_matches_bulk.assert_awaited_once()
+        cache.get_cached_match.assert_not_called()
+        assert mock_agent.await_count == 1
+        assert [r.primary_match.hs_code for r in results] == ["5208110000", "7304190000"]
+
+    @pytest.mark.asyncio
+    async def test_reordered_and_overlapping_batches_reuse_item_entries(self):
+        service = HSCodeMatchingService()
+        cache = CacheService()
+        cache._classification_store = MagicMock()
+        cache._classification_store.get_many = AsyncMock(return_value={})
+        service._cache_service = cache
+        codes = {"cotton fabric": "5208110000", "steel pipes": "7304190000", "wheat flour": "1101000000"}
+
+        async def match(description, *args, **kwargs):
+            return make_result(codes[description])
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(side_effect=match)) as mock_agent:
+            await service.match_batch_products([
+                HSCodeMatchRequest(product_description="cotton fabric"),
+                HSCodeMatchRequest(product_description="steel pipes"),
+            ])
+            results = await service.match_batch_products([
+                HSCodeMatchRequest(product_description="wheat flour"),
+                HSCodeMatchRequest(product_description="steel pipes"),
+                HSCodeMatchRequest(product_description="cotton fabric"),
+            ])
+
+        # Only the new row reaches the agent, and hits come back in row order
+        assert mock_agent.await_count == 3
+        assert [r.primary_match.hs_code for r in results] == ["1101000000", "7304190000", "5208110000"]
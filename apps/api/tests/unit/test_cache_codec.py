@@ -0,0 +1,67 @@
+"""Unit tests for the compact cache encoding of match results."""
+
+import pytest
+from functools import partial
+
+from src.core.openai_config import MatchErrorKind
+from src.services.cache_codec import CacheCodecError, decode_match_result, encode_match_result
+from helpers import make_result
+
+
+# Non-ASCII query and an alternative, as real cache entries have
+sample_result = partial(
+    make_result,
+    reasoning="Woven cotton fabric of chapter 52",
+    query="хлопковая ткань",
+    processing_time_ms=812.5,
+    alternative_codes=("5208120000",)
+)
+
+
+class TestCacheCodec:
+    """Test encoding and decoding of cache payloads."""
+
+    def test_round_trip(self):
+        result = sample_result()
+
+        payload = encode_match_result(result, compact=True)
+        decoded = decode_match_result(payload)
+
+        # Short entries stay plain JSON that any release can read
+        assert payload.startswith("{")
+        assert decoded == result
+        assert decoded.model_dump_json() == result.model_dump_json()
+
+    def test_long_payloads_are_compressed(self):
+        result = sample_result(reasoning="Cotton fabric, plain weave, unbleached, weighing not more than 100 g/m2. " * 10)
+
+        payload = encode_match_result(result, compact=True)
+
+        assert payload.startswith("1z|")
+        assert len(payload) < len(result.model_dump_json()) / 3
+        assert decode_match_result(payload) == result
+
+    def test_per_read_fields_are_not_stored(self):
+        result = sample_result()
+        result.approximate_cache_hit = True
+        result.cache_similarity = 0.93
+        error = sample_result().model_copy(update={"error_kind": MatchErrorKind.DETERMINISTIC})
+
+        decoded = decode_match_result(encode_match_result(result, compact=True))
+
+        assert decoded.approximate_cache_hit is False
+        assert decoded.cache_similarity is None
+        assert decode_match_result(encode_match_result(error, compact=True)).error_kind == MatchErrorKind.DETERMINISTIC
+
+    def test_legacy_json_is_still_read(self):
+        result = sample_result()
+
+        assert decode_match_result(result.model_dump_json()) == result
+        # Writers fall back to JSON while the compact codec is disabled
+        assert encode_match_result(result, compact=False) == result.model_dump_json()
+
+    def test_unknown_version_is_rejected(self):
+        with pytest.raises(CacheCodecError):
+            decode_match_result("9|[]")
+        with pytest.raises(CacheCodecError):
+            decode_match_result("garbage")
@@ -0,0 +1,125 @@
+"""Unit tests for generation-namespaced cache keys."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.cache_service import CacheService
+from helpers import make_result
+
+
+@pytest.fixture
+def cache():
+    """Cache service without Redis and with the durable store mocked out"""
+    cache = CacheService()
+    cache._classification_store = MagicMock()
+    cache._classification_store.get_many = AsyncMock(return_value={})
+    cache._classification_store.invalidate = AsyncMock(return_value=0)
+    return cache
+
+
+@pytest.fixture
+def redis_cache(cache):
+    cache._redis = AsyncMock()
+    cache._redis.hgetall.return_value = {}
+    return cache
+
+
+class TestGenerationKeys:
+    """Test how generations namespace the keys."""
+
+    def test_keys_are_unchanged_before_the_first_bump(self, cache):
+        key = cache._generate_cache_key("cotton fabric", "turkmenistan")
+
+        assert key.count(":") == 3
+
+    @pytest.mark.asyncio
+    async def test_country_bump_moves_only_that_country(self, cache):
+        turkmen_key = cache._generate_cache_key("cotton fabric", "turkmenistan")
+        default_key = cache._generate_cache_key("cotton fabric", "default")
+
+        assert await cache.bump_cache_generation("turkmenistan") == 1
+
+        assert cache._generate_cache_key("cotton fabric", "turkmenistan") == turkmen_key.replace(
+            "turkmenistan:", "turkmenistan:g0.1:"
+        )
+        assert cache._generate_cache_key("cotton fabric", "default") == default_key
+        assert cache._generate_negative_key("cotton fabric", "turkmenistan").startswith(
+            "xm_port:hs_match:turkmenistan:g0.1:negative:"
+        )
+
+    @pytest.mark.asyncio
+    async def test_global_bump_moves_every_country(self, cache):
+        default_key = cache._generate_cache_key("cotton fabric", "default")
+
+        await cache.bump_cache_generation()
+
+        assert cache._generate_cache_key("cotton fabric", "default") != default_key
+        assert ":g1.0:" in cache._generate_cache_key("cotton fabric", "default")
+
+    @pytest.mark.asyncio
+    async def test_bump_hides_cached_entries(self, cache):
+        await cache.cache_match_result("cotton fabric", make_result(), "turkmenistan")
+        await cache.cache_match_result("cotton fabric", make_result(), "default")
+
+        await cache.bump_cache_generation("turkmenistan")
+
+        assert await cache.get_cached_match("cotton fabric", "turkmenistan") is None
+        assert await cache.get_cached_match("cotton fabric", "default") is not None
+        cache._classification_store.invalidate.assert_awaited_once_with("turkmenistan", "*")
+
+    def test_store_patterns_ignore_the_generation(self, cache):
+        assert cache._get_store_patterns("xm_port:hs_match:default:g2.1:abc*") == ("default", "abc*")
+
+
+class TestGenerationsInRedis:
+    """Test sharing generations between workers through Redis."""
+
+    @pytest.mark.asyncio
+    async def test_generations_are_read_once_per_interval(self, redis_cache):
+        redis_cache._redis.hgetall.return_value = {"turkmenistan": "3", "*": "1"}
+
+        await redis_cache.get_cached_matches_bulk([("cotton fabric", "turkmenistan")])
+        await redis_cache.get_cached_match("steel pipes", "turkmenistan")
+
+        redis_cache._redis.hgetall.assert_awaited_once_with(CacheService.GENERATIONS_KEY)
+        assert ":g1.3:" in redis_cache._redis.mget.await_args.args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_bump_is_shared_and_published(self, redis_cache):
+        redis_cache._redis.hincrby.return_value = 4
+
+        assert await redis_cache.bump_cache_generation("turkmenistan") == 4
+
+        redis_cache._redis.hincrby.assert_awaited_once_with(CacheService.GENERATIONS_KEY, "turkmenistan", 1)
+        redis_cache._redis.publish.assert_awaited_once_with(
+            CacheService.INVALIDATION_CHANNEL, "xm_port:hs_match:turkmenistan:*"
+        )
+        # Nothing is scanned or deleted
+        redis_cache._redis.scan_iter.assert_not_called()
+        redis_cache._redis.unlink.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_published_bump_forces_a_reload(self, redis_cache):
+        await redis_cache.get_cache_generations()
+        redis_cache._redis.hgetall.return_value = {"default": "2"}
+        messages = [{"type": "message", "data": "xm_port:hs_match:default:*"}]
+
+        async def listen():
+            for message in messages:
+                yield message
+
+        redis_cache._pubsub = MagicMock()
+        redis_cache._pubsub.listen = listen
+        await redis_cache._listen_for_invalidations()
+
+        assert await redis_cache.get_cache_generations() == {"default": 2}
+        assert redis_cache._redis.hgetall.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_keeps_the_last_generations(self, redis_cache):
+        redis_cache._redis.hgetall.return_value = {"default": "2"}
+        await redis_cache.get_cache_generations()
+        redis_cache._redis.hgetall.side_effect = ConnectionError("down")
+
+        with patch("src.services.cache_service.settings.HS_CACHE_GENERATION_REFRESH_SECONDS", 0):
+            assert await redis_cache.get_cache_generations() == {"default": 2}
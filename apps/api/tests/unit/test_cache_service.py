@@ -6,12 +6,18 @@ Tests for Redis-based caching functionality for HS code matching.
 
 import pytest
 import asyncio
-import json
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import timedelta
 
 from src.services.cache_service import CacheService, NoOpCacheService, cache_service
+from src.services.cache_codec import decode_match_result
 from src.core.openai_config import HSCodeMatchResult, HSCodeResult
+from helpers import FakePipeline
+
+
+async def scan_results(*keys):
+    for key in keys:
+        yield key
 
 
 class TestCacheService:
@@ -148,54 +154,24 @@ class TestCacheService:
         assert isinstance(ttl, timedelta)
         
         # Verify cached data can be deserialized
-        deserialized = HSCodeMatchResult.model_validate_json(cached_data)
+        deserialized = decode_match_result(cached_data)
         assert deserialized.primary_match.hs_code == "8471.30.00"
     
-    async def test_batch_caching(self, cache_service_instance, mock_redis):
-        """Test batch result caching and retrieval"""
-        # Test data
-        batch_hash = "test_hash_123"
-        sample_results = [
-            HSCodeMatchResult(
-                primary_match=HSCodeResult(
-                    hs_code="8471.30.00",
-                    code_description="Computer hardware",
-                    confidence=0.9,
-                    chapter="84",
-                    section="XVI",
-                    reasoning="Test reasoning"
-                ),
-                alternative_matches=[],
-                processing_time_ms=1000.0,
-                query="laptop"
-            )
-        ]
-        
-        # Test caching
-        mock_redis.setex.return_value = True
-        cache_result = await cache_service_instance.cache_batch_results(batch_hash, sample_results)
-        assert cache_result is True
-        
-        # Test retrieval
-        cached_data = json.dumps([result.model_dump() for result in sample_results])
-        mock_redis.get.return_value = cached_data
-        
-        retrieved_results = await cache_service_instance.get_cached_batch_match(batch_hash)
-        
-        assert retrieved_results is not None
-        assert len(retrieved_results) == 1
-        assert retrieved_results[0].primary_match.hs_code == "8471.30.00"
-    
     async def test_cache_invalidation(self, cache_service_instance, mock_redis):
         """Test cache invalidation by pattern"""
-        mock_redis.keys.return_value = ["key1", "key2", "key3"]
-        mock_redis.delete.return_value = 3
+        mock_redis.scan_iter = MagicMock(return_value=scan_results("key1", "key2", "key3"))
+        pipelines = [FakePipeline([2, 2]), FakePipeline([1, 1])]
+        mock_redis.pipeline = MagicMock(side_effect=pipelines)
+        cache_service_instance.UNLINK_BATCH_SIZE = 2
         
         result = await cache_service_instance.invalidate_cache_by_pattern("test:*")
         
         assert result == 3
-        mock_redis.keys.assert_called_once_with("test:*")
-        mock_redis.delete.assert_called_once_with("key1", "key2", "key3")
+        mock_redis.scan_iter.assert_called_once_with(match="test:*", count=CacheService.SCAN_COUNT)
+        mock_redis.keys.assert_not_called()
+        assert pipelines[0].commands[0] == ("unlink", ("key1", "key2"))
+        assert pipelines[0].commands[1:] == [("zrem", (CacheService.ENTRIES_KEY, "key1", "key2"))]
+        assert pipelines[1].commands[0] == ("unlink", ("key3",))
     
     async def test_cache_statistics(self, cache_service_instance, mock_redis):
         """Test cache statistics retrieval"""
@@ -205,17 +181,17 @@ class TestCacheService:
             "connected_clients": 3,
             "total_commands_processed": 1000
         }
-        mock_redis.keys.side_effect = [
-            ["cache:1", "cache:2", "cache:3"],  # Regular cache entries
-            ["batch:1", "batch:2"]              # Batch cache entries
-        ]
-        mock_redis.get.side_effect = ["150", "50"]  # hits, misses
+        # Live entry counts, hits, misses
+        pipeline = FakePipeline([3, "150", "50"])
+        mock_redis.pipeline = MagicMock(return_value=pipeline)
         
         stats = await cache_service_instance.get_cache_statistics()
         
+        mock_redis.keys.assert_not_called()
+        assert pipeline.commands[0][0] == "zcount"
+        
         assert stats["redis_status"] == "connected"
         assert stats["total_cache_entries"] == 3
-        assert stats["batch_cache_entries"] == 2
         assert stats["cache_hits"] == 150
         assert stats["cache_misses"] == 50
         assert stats["hit_ratio_percent"] == 75.0
@@ -332,8 +308,6 @@ class TestNoOpCacheService:
         # Test cache operations
         assert await service.get_cached_match("test") is None
         assert await service.cache_match_result("test", MagicMock(), "default") is False
-        assert await service.get_cached_batch_match("hash") is None
-        assert await service.cache_batch_results("hash", []) is False
         
         # Test maintenance operations
         assert await service.invalidate_cache_by_pattern("*") == 0
@@ -343,10 +317,6 @@ class TestNoOpCacheService:
         stats = await service.get_cache_statistics()
         assert "error" in stats
         
-        # Test warming
-        warming_result = await service.warm_cache_with_common_products(MagicMock())
-        assert warming_result["warmed"] == 0
-        
         # Test top products
         top_products = await service.get_top_cached_products()
         assert top_products == []
@@ -361,97 +331,15 @@ class TestNoOpCacheService:
 class TestCacheIntegration:
     """Integration tests for cache service"""
     
-    @pytest.fixture
-    def mock_hs_matching_service(self):
-        """Mock HS matching service for cache warming"""
-        service = AsyncMock()
-        service.match_single_product.return_value = HSCodeMatchResult(
-            primary_match=HSCodeResult(
-                hs_code="8471.30.00",
-                code_description="Computer hardware",
-                confidence=0.9,
-                chapter="84",
-                section="XVI",
-                reasoning="Test match"
-            ),
-            alternative_matches=[],
-            processing_time_ms=1000.0,
-            query="test product"
-        )
-        return service
-    
-    async def test_cache_warming_success(self, cache_service_instance, mock_redis, mock_hs_matching_service):
-        """Test successful cache warming"""
-        # Mock cache operations
-        mock_redis.get.return_value = None  # No existing cache
-        mock_redis.setex.return_value = True
-        mock_redis.incr.return_value = 1
-        mock_redis.expire.return_value = True
-        
-        # Test warming
-        result = await cache_service_instance.warm_cache_with_common_products(mock_hs_matching_service)
-        
-        assert result["total_products"] > 0
-        assert result["successfully_warmed"] > 0
-        assert result["failed"] == 0
-        
-        # Verify service was called for each product
-        assert mock_hs_matching_service.match_single_product.call_count == result["total_products"]
-    
-    async def test_cache_warming_with_existing_cache(self, cache_service_instance, mock_redis, mock_hs_matching_service):
-        """Test cache warming when some products are already cached"""
-        # Mock some products already cached
-        def mock_get_side_effect(key):
-            if "wheat" in key or "cotton" in key:
-                return json.dumps({
-                    "primary_match": {
-                        "hs_code": "1001.90.00",
-                        "code_description": "Wheat",
-                        "confidence": 0.9,
-                        "chapter": "10",
-                        "section": "II",
-                        "reasoning": "Cached result"
-                    },
-                    "alternative_matches": [],
-                    "processing_time_ms": 0.0,
-                    "query": "wheat"
-                })
-            return None
-        
-        mock_redis.get.side_effect = mock_get_side_effect
-        mock_redis.setex.return_value = True
-        mock_redis.incr.return_value = 1
-        mock_redis.expire.return_value = True
-        
-        result = await cache_service_instance.warm_cache_with_common_products(mock_hs_matching_service)
-        
-        assert result["already_cached"] >= 2  # wheat and cotton
-        assert result["successfully_warmed"] > 0
-        assert result["total_products"] == result["already_cached"] + result["successfully_warmed"] + result["failed"]
-    
     async def test_top_cached_products(self, cache_service_instance, mock_redis):
         """Test retrieving top cached products"""
-        # Mock Redis keys and get operations
-        mock_redis.keys.return_value = [
-            "xm_port:hs_stats:hs_code:8471.30.00",
-            "xm_port:hs_stats:hs_code:1001.90.00",
-            "xm_port:hs_stats:hs_code:5208.11.00"
-        ]
-        
-        # Mock access counts
-        def mock_get_side_effect(key):
-            if "8471.30.00" in key:
-                return "150"
-            elif "1001.90.00" in key:
-                return "75"
-            elif "5208.11.00" in key:
-                return "25"
-            return "0"
-        
-        mock_redis.get.side_effect = mock_get_side_effect
+        # Popularity is read from one sorted set instead of a GET per key
+        mock_redis.zrevrange.return_value = [("8471.30.00", 150.0), ("1001.90.00", 75.0)]
         
         top_products = await cache_service_instance.get_top_cached_products(limit=2)
         
+        mock_redis.zrevrange.assert_awaited_once_with(CacheService.POPULAR_HS_CODES_KEY, 0, 1, withscores=True)
+        mock_redis.keys.assert_not_called()
         assert len(top_products) == 2
         assert top_products[0]["hs_code"] == "8471.30.00"
         assert top_products[0]["access_count"] == 150
@@ -500,8 +388,6 @@ class TestCacheServiceErrorScenarios:
         # All operations should return safe defaults
         assert await service.get_cached_match("test") is None
         assert await service.cache_match_result("test", MagicMock()) is False
-        assert await service.get_cached_batch_match("hash") is None
-        assert await service.cache_batch_results("hash", []) is False
         assert await service.invalidate_cache_by_pattern("*") == 0
         assert await service.is_available() is False
     
@@ -0,0 +1,248 @@
+"""Unit tests for data-driven, resumable cache warming."""
+
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.openai_config import MatchErrorKind
+from src.core.priority_lanes import Lane, current_lane
+from src.services.cache_service import CacheService
+from src.services.cache_warmer import CacheWarmer, cache_warmer
+from src.api.v1.hs_matching import warm_cache
+from helpers import FakePipeline, make_result
+
+
+def row(description: str, country: str, weight: float) -> SimpleNamespace:
+    return SimpleNamespace(product_description=description, country=country, weight=weight)
+
+
+@pytest.fixture
+def cache_service():
+    """Cache service double that keeps the warming checkpoint in memory"""
+    service = AsyncMock()
+    service.COMMON_PRODUCTS = CacheService.COMMON_PRODUCTS
+    service.acquire_warming_lease.return_value = True
+    service.load_warming_state.return_value = None
+    service.get_cached_matches_bulk.side_effect = lambda items: [None] * len(items)
+    return service
+
+
+@pytest.fixture
+def matcher():
+    matcher = MagicMock()
+    matcher.match_single_product = AsyncMock(return_value=make_result())
+    return matcher
+
+
+def mined(*items):
+    return patch.object(CacheWarmer, "mine_descriptions", AsyncMock(return_value=list(items)))
+
+
+class TestMining:
+    """Test ranking of past descriptions."""
+
+    def test_spellings_are_merged_and_ranked_by_weight(self):
+        warmer = CacheWarmer(top_per_country=2)
+        rows = [
+            row("Cotton fabric", "turkmenistan", 3.0),
+            row("fabric, cotton", "turkmenistan", 2.0),
+            row("steel pipes", "turkmenistan", 4.0),
+            row("wheat flour", "turkmenistan", 1.0),
+            row("wheat flour", "default", 0.5),
+            row("   ", "default", 9.0)
+        ]
+
+        ranked = warmer._rank_descriptions(rows, clean_description=str.strip)
+
+        # The merged spellings outweigh the single most frequent description
+        assert ranked == [
+            ("wheat flour", "default"),
+            ("Cotton fabric", "turkmenistan"),
+            ("steel pipes", "turkmenistan")
+        ]
+
+    @pytest.mark.asyncio
+    async def test_recency_settings_reach_the_query(self):
+        session = AsyncMock()
+        session.execute.return_value.all = MagicMock(return_value=[row("steel pipes", "default", 1.0)])
+        session_maker = MagicMock()
+        session_maker.return_value.__aenter__.return_value = session
+
+        with patch("src.services.cache_warmer.async_session_maker", session_maker), \
+                patch("src.services.cache_warmer.settings.HS_CACHE_WARM_HALF_LIFE_DAYS", 0):
+            ranked = await CacheWarmer(top_per_country=10).mine_descriptions()
+
+        params = session.execute.await_args.args[1]
+        assert params["half_life_seconds"] == 0
+        assert params["row_limit"] == 10 * CacheWarmer.MINED_ROWS_FACTOR
+        assert ranked == [("steel pipes", "default")]
+
+
+class TestWarming:
+    """Test warming runs."""
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_matched_and_tracked(self, cache_service, matcher):
+        cache_service.get_cached_matches_bulk.side_effect = lambda items: [
+            make_result() if description == "cotton fabric" else None for description, _ in items
+        ]
+        matcher.match_single_product.side_effect = lambda product_description, **kwargs: make_result(
+            error_kind=MatchErrorKind.DETERMINISTIC if product_description == "unknown part" else None
+        )
+
+        with mined(("cotton fabric", "default"), ("steel pipes", "default"), ("unknown part", "default")):
+            result = await CacheWarmer().warm(matcher, cache_service)
+
+        assert result["status"] == "completed"
+        assert (result["already_cached"], result["warmed"], result["failed"]) == (1, 1, 1)
+        assert matcher.match_single_product.await_count == 2
+        cache_service.track_warmed_keys.assert_awaited_once_with([("steel pipes", "default")])
+        cache_service.release_warming_lease.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_and_runs_in_background_lane(self, cache_service, matcher):
+        running, peak, lanes = 0, 0, set()
+
+        async def match(**kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            lanes.add(current_lane())
+            await asyncio.sleep(0.01)
+            running -= 1
+            return make_result()
+
+        matcher.match_single_product.side_effect = match
+        with mined(*[(f"product {i}", "default") for i in range(12)]):
+            result = await CacheWarmer(concurrency=3).warm(matcher, cache_service)
+
+        assert result["warmed"] == 12
+        assert peak == 3
+        assert lanes == {Lane.BACKGROUND}
+
+    @pytest.mark.asyncio
+    async def test_interrupted_run_resumes_from_its_checkpoint(self, cache_service, matcher):
+        cache_service.load_warming_state.return_value = {
+            "run_id": "previous",
+            "status": "running",
+            "source": "product_matches",
+            "candidates": [[f"product {i}", "default"] for i in range(CacheWarmer.CHUNK_SIZE + 5)],
+            "position": CacheWarmer.CHUNK_SIZE,
+            "already_cached": 0,
+            "warmed": CacheWarmer.CHUNK_SIZE,
+            "failed": 0,
+            "resumed": False,
+            "started_at": time.time()
+        }
+
+        with mined() as mine:
+            result = await CacheWarmer().warm(matcher, cache_service)
+
+        mine.assert_not_called()
+        assert result["run_id"] == "previous"
+        assert result["resumed"] is True
+        assert result["warmed"] == CacheWarmer.CHUNK_SIZE + 5
+        assert matcher.match_single_product.await_count == 5
+        assert cache_service.save_warming_state.await_args.args[0]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_is_saved_after_every_chunk(self, cache_service, matcher):
+        checkpoints = []
+        cache_service.save_warming_state.side_effect = lambda state: checkpoints.append(dict(state))
+
+        with mined(*[(f"product {i}", "default") for i in range(CacheWarmer.CHUNK_SIZE * 2)]):
+            await CacheWarmer().warm(matcher, cache_service)
+
+        assert [(state["position"], state["status"]) for state in checkpoints] == [
+            (CacheWarmer.CHUNK_SIZE, "running"),
+            (CacheWarmer.CHUNK_SIZE * 2, "running"),
+            (CacheWarmer.CHUNK_SIZE * 2, "completed")
+        ]
+
+    @pytest.mark.asyncio
+    async def test_second_run_waits_for_the_lease(self, cache_service, matcher):
+        cache_service.acquire_warming_lease.return_value = False
+
+        result = await CacheWarmer().warm(matcher, cache_service)
+
+        assert result == {"status": "already_running"}
+        matcher.match_single_product.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_common_products_are_warmed_without_history(self, cache_service, matcher):
+        with patch.object(CacheWarmer, "mine_descriptions", AsyncMock(side_effect=ConnectionError("db down"))):
+            result = await CacheWarmer().warm(matcher, cache_service)
+
+        assert result["source"] == "common_products"
+        assert result["total"] == len(CacheService.COMMON_PRODUCTS)
+
+
+class TestWarmedKeyHits:
+    """Test the report of warmed keys read since warming."""
+
+    @pytest.mark.asyncio
+    async def test_hits_are_counted_from_idle_times(self):
+        cache = CacheService()
+        cache._redis = AsyncMock()
+        now = time.time()
+        cache._redis.zrange.return_value = [("read", now - 600), ("unread", now - 600), ("gone", now - 600)]
+        pipe = FakePipeline(results=[60, 599, None])
+        cache._redis.pipeline = MagicMock(return_value=pipe)
+
+        report = await cache.get_warmed_key_hits()
+
+        assert [command for command, _ in pipe.commands] == ["object"] * 3
+        assert report["hit_keys"] == 1
+        assert report["expired_keys"] == 1
+        assert report["hit_rate_percent"] == pytest.approx(33.33)
+
+    @pytest.mark.asyncio
+    async def test_tracking_drops_local_copies(self):
+        cache = CacheService()
+        cache._classification_store = MagicMock()
+        cache_key = cache._generate_cache_key("steel pipes", "default")
+        cache._local_cache.set(cache_key, make_result(), 60)
+
+        await cache.track_warmed_keys([("steel pipes", "default")])
+
+        assert cache._local_cache.get(cache_key) is None
+
+
+class TestBackgroundWarming:
+    """Test warming started by the API without waiting for it."""
+
+    @pytest.mark.asyncio
+    async def test_background_run_is_held_until_it_ends(self):
+        release = asyncio.Event()
+
+        async def slow_warm(resume=True):
+            await release.wait()
+            return {"status": "completed"}
+
+        with patch("src.api.v1.hs_matching.hs_matching_service.warm_cache", slow_warm):
+            response = await warm_cache(resume=True, background=True, current_user=MagicMock())
+
+        assert response.success is True
+        assert response.details == {"status": "started"}
+        (task,) = cache_warmer._background_tasks
+        release.set()
+        assert await task == {"status": "completed"}
+        assert not cache_warmer._background_tasks
+
+    @pytest.mark.asyncio
+    async def test_background_failure_is_logged(self):
+        async def failing_warm(resume=True):
+            raise ConnectionError("Redis down")
+
+        with patch("src.api.v1.hs_matching.hs_matching_service.warm_cache", failing_warm), \
+             patch("src.services.cache_warmer.logger") as mock_logger:
+            await warm_cache(resume=False, background=True, current_user=MagicMock())
+            (task,) = cache_warmer._background_tasks
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        mock_logger.error.assert_called_once()
+        assert "Redis down" in mock_logger.error.call_args.args[0]
+        assert not cache_warmer._background_tasks
@@ -0,0 +1,144 @@
+"""Unit tests for canonical cache keys and near-duplicate cache hits."""
+
+import pytest
+from unittest.mock import patch
+
+from src.services.description_canonicalizer import canonicalize_description, numeric_tokens
+from src.services.near_duplicate_index import NearDuplicateIndex
+from src.services.cache_service import CacheService
+from src.core.openai_config import HSCodeMatchResult, HSCodeResult
+
+
+@pytest.fixture
+def match_result():
+    return HSCodeMatchResult(
+        primary_match=HSCodeResult(
+            hs_code="5208110000",
+            code_description="Woven fabrics of cotton",
+            confidence=0.9,
+            chapter="52",
+            section="XI",
+            reasoning="Cotton fabric"
+        ),
+        alternative_matches=[],
+        processing_time_ms=50.0,
+        query="cotton fabric 100%"
+    )
+
+
+class TestCanonicalization:
+    """Test the canonical form used for cache keys."""
+
+    @pytest.mark.parametrize("first,second", [
+        ("Cotton fabric, 100%", "100 % cotton fabric"),
+        ("cotton fabric 100 percent", "100% Cotton Fabric"),
+        ("хлопковая ткань 1,50 кг", "Хлопковая ткань 1.5 kg"),
+        ("steel pipes 10 шт", "10 pcs steel pipes"),
+    ])
+    def test_equivalent_spellings_share_canonical_form(self, first, second):
+        assert canonicalize_description(first) == canonicalize_description(second)
+
+    def test_mixed_script_homoglyphs(self):
+        """A Cyrillic look-alike inside a Latin word is read as Latin."""
+        assert canonicalize_description("сotton fabric") == canonicalize_description("cotton fabric")
+
+    def test_numbers_are_kept_distinct(self):
+        assert canonicalize_description("cotton 100%") != canonicalize_description("cotton 50%")
+        assert numeric_tokens(canonicalize_description("cotton fabric 100 % 2 kg")) == {"100%", "2kg"}
+
+    def test_units_are_only_normalized_after_numbers(self):
+        """A unit word on its own is an ordinary word ("t shirt", "meters")."""
+        assert canonicalize_description("cable 10 meters") == canonicalize_description("10 m cable")
+        assert canonicalize_description("t shirt") == "shirt t"
+        assert canonicalize_description("meters") != canonicalize_description("m")
+
+    def test_reordered_descriptions_share_cache_key(self):
+        service = CacheService()
+        assert service._generate_cache_key("Cotton fabric, 100%") == service._generate_cache_key("100% cotton fabric")
+
+
+class TestNearDuplicateIndex:
+    """Test MinHash lookups."""
+
+    def test_finds_near_duplicate(self):
+        index = NearDuplicateIndex(threshold=0.6)
+        index.add(canonicalize_description("organic cotton woven fabric 100%"), "default", "key:1")
+
+        match = index.query(canonicalize_description("organic coton woven fabric 100%"), "default")
+
+        assert match is not None
+        assert match[0] == "key:1"
+        assert match[1] >= 0.6
+
+    def test_requires_same_numbers_and_country(self):
+        index = NearDuplicateIndex(threshold=0.5)
+        index.add(canonicalize_description("organic cotton woven fabric 100%"), "default", "key:1")
+
+        assert index.query(canonicalize_description("organic cotton woven fabric 50%"), "default") is None
+        assert index.query(canonicalize_description("organic cotton woven fabric 100%"), "turkmenistan") is None
+
+    def test_unrelated_description_misses(self):
+        index = NearDuplicateIndex(threshold=0.9)
+        index.add(canonicalize_description("organic cotton woven fabric"), "default", "key:1")
+
+        assert index.query(canonicalize_description("seamless steel pipes"), "default") is None
+
+    @pytest.mark.parametrize("cached,queried", [
+        ("frozen beef boneless", "fresh beef boneless"),
+        ("sugar refined", "sugar unrefined"),
+        ("cotton with dye", "cotton without dye"),
+        ("steel screws", "steel nuts"),
+    ])
+    def test_different_products_score_below_threshold(self, cached, queried):
+        """Estimates follow the shingle overlap instead of collapsing to 0 or 1."""
+        index = NearDuplicateIndex(threshold=0.9)
+        index.add(canonicalize_description(cached), "default", "key:1")
+
+        similarity = (index.signature(canonicalize_description(cached))
+                      == index.signature(canonicalize_description(queried))).mean()
+
+        assert 0.2 < similarity < 0.9
+        assert index.query(canonicalize_description(queried), "default") is None
+
+    def test_bounded_size_and_invalidation(self):
+        index = NearDuplicateIndex(max_entries=2)
+        for i, text in enumerate(["cotton fabric", "steel pipes", "wheat flour"]):
+            index.add(text, "default", f"xm_port:hs_match:default:{i}")
+
+        assert len(index) == 2
+        assert index.invalidate_pattern("xm_port:hs_match:default:*") == 2
+        assert len(index) == 0
+
+
+class TestApproximateCacheHits:
+    """Test near-duplicate hits served by CacheService."""
+
+    @pytest.mark.asyncio
+    async def test_near_duplicate_served_as_approximate_hit(self, match_result):
+        with patch("src.services.cache_service.settings.HS_CACHE_NEAR_DUP_ENABLED", True):
+            service = CacheService()
+        service._redis = None
+        service._near_duplicates.threshold = 0.6
+        await service.cache_match_result("organic cotton woven fabric 100%", match_result)
+
+        exact = await service.get_cached_match("100% woven organic cotton fabric")
+        approximate = await service.get_cached_match("organic coton woven fabric 100%")
+
+        assert exact.approximate_cache_hit is False
+        assert approximate.approximate_cache_hit is True
+        assert approximate.primary_match.hs_code == "5208110000"
+        assert approximate.cache_similarity >= 0.6
+
+        stats = service._get_tier_statistics()["near_duplicate"]
+        assert stats["approximate_hits"] == 1
+        assert stats["approximate_hit_rate_percent"] == 50.0
+
+    def test_disabled_by_default(self):
+        assert CacheService()._near_duplicates is None
+
+    @pytest.mark.asyncio
+    async def test_approximate_flag_is_not_in_agent_schema(self):
+        """The agent's structured output never sets cache markers."""
+        properties = HSCodeMatchResult.model_json_schema()["properties"]
+        assert "approximate_cache_hit" not in properties
+        assert "cache_similarity" not in properties
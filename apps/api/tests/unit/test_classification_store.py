@@ -0,0 +1,177 @@
+"""Unit tests for the durable Postgres classification store (L3)."""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.openai_config import OpenAIAgentConfig
+from src.services.cache_service import CacheService
+from src.services.classification_store import ClassificationStore, _glob_to_similar
+from src.services.description_canonicalizer import description_hash
+from helpers import make_result
+
+
+class FakeSession:
+    """Async session returning canned rows and recording statements."""
+
+    def __init__(self, rows=None, error=None):
+        self.rows = rows or []
+        self.error = error
+        self.statements = []
+        self.commit = AsyncMock()
+
+    async def __aenter__(self):
+        if self.error:
+            raise self.error
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        result = MagicMock()
+        result.fetchall.return_value = self.rows
+        return result
+
+
+@pytest.fixture
+def store():
+    return ClassificationStore(enabled=True)
+
+
+class TestClassificationStoreWrites:
+    """Test write-behind buffering and flushing."""
+
+    @pytest.mark.asyncio
+    async def test_only_real_classifications_are_buffered(self, store):
+        approximate = make_result("5208110000")
+        approximate.approximate_cache_hit = True
+
+        queued = store.enqueue([
+            ("cotton fabric", "default", make_result("5208110000")),
+            ("Fabric cotton", "default", make_result("5208120000")),  # Same canonical key
+            ("broken", "default", make_result("000000000", confidence=0.0)),
+            ("near duplicate", "default", approximate),
+        ])
+
+        assert queued == 2
+        assert store.get_statistics()["pending_writes"] == 1
+        store._flush_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_flush_upserts_buffered_rows(self, store):
+        session = FakeSession()
+        store.enqueue([(f"product {i}", "default", make_result("5208110000")) for i in range(3)])
+        store._flush_task.cancel()
+
+        with patch("src.services.classification_store.async_session_maker", return_value=session):
+            written = await store.flush()
+
+        assert written == 3
+        assert len(session.statements) == 1
+        session.commit.assert_awaited_once()
+        assert store.get_statistics()["writes"] == 3
+        assert store.get_statistics()["pending_writes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_counts_errors(self, store):
+        store.enqueue([("cotton fabric", "default", make_result("5208110000"))])
+        store._flush_task.cancel()
+
+        with patch("src.services.classification_store.async_session_maker",
+                   return_value=FakeSession(error=ConnectionError("db down"))):
+            assert await store.flush() == 0
+
+        assert store.get_statistics()["write_errors"] == 1
+
+
+class TestClassificationStoreReads:
+    """Test bulk lookups."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_uses_one_query_per_country(self, store):
+        stored = make_result("5208110000")
+        key = description_hash("cotton fabric", "default")
+        session = FakeSession(rows=[SimpleNamespace(description_hash=key, result=stored.model_dump(mode="json"))])
+
+        with patch("src.services.classification_store.async_session_maker", return_value=session):
+            found = await store.get_many([
+                ("cotton fabric", "default"),
+                ("steel pipes", "default"),
+                ("cotton fabric", "default"),
+            ])
+
+        assert len(session.statements) == 1
+        params = session.statements[0][1]
+        assert sorted(params["hashes"]) == sorted({key, description_hash("steel pipes", "default")})
+        assert params["version"] == OpenAIAgentConfig.get_vector_store_version("default")
+        assert found[(key, "default")].primary_match.hs_code == "5208110000"
+
+    @pytest.mark.asyncio
+    async def test_read_failure_backs_off(self, store):
+        failing = MagicMock(return_value=FakeSession(error=ConnectionError("db down")))
+
+        with patch("src.services.classification_store.async_session_maker", failing):
+            assert await store.get_many([("cotton fabric", "default")]) == {}
+            assert await store.get_many([("cotton fabric", "default")]) == {}
+
+        assert failing.call_count == 1
+        assert store.get_statistics()["read_errors"] == 1
+
+    def test_glob_translation(self):
+        assert _glob_to_similar("default") == "default"
+        assert _glob_to_similar("ab*") == "ab%"
+        assert _glob_to_similar("a_b?") == "a\\_b_"
+
+
+class TestCacheServiceL3:
+    """Test the store as the tier below L1 and Redis."""
+
+    @pytest.mark.asyncio
+    async def test_store_hit_is_promoted_to_l1(self):
+        service = CacheService()
+        stored = make_result("5208110000")
+        key = (description_hash("cotton fabric", "default"), "default")
+        get_many = AsyncMock(return_value={key: stored})
+
+        with patch.object(service._classification_store, "get_many", get_many):
+            first = await service.get_cached_match("cotton fabric", "default")
+            second = await service.get_cached_match("cotton fabric", "default")
+
+        assert first.primary_match.hs_code == second.primary_match.hs_code == "5208110000"
+        get_many.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_falls_through_to_store(self):
+        service = CacheService()
+        stored = make_result("7304190000")
+        key = (description_hash("steel pipes", "default"), "default")
+        get_many = AsyncMock(return_value={key: stored})
+
+        with patch.object(service._classification_store, "get_many", get_many):
+            results = await service.get_cached_matches_bulk([("cotton fabric", "default"), ("steel pipes", "default")])
+
+        assert results[0] is None
+        assert results[1].primary_match.hs_code == "7304190000"
+        get_many.assert_awaited_once_with([("cotton fabric", "default"), ("steel pipes", "default")])
+
+    @pytest.mark.asyncio
+    async def test_cached_results_are_written_behind(self):
+        service = CacheService()
+        enqueue = MagicMock(return_value=1)
+
+        with patch.object(service._classification_store, "enqueue", enqueue):
+            await service.cache_match_result("cotton fabric", make_result("5208110000"), "default")
+
+        enqueue.assert_called_once()
+        assert enqueue.call_args.args[0][0][:2] == ("cotton fabric", "default")
+
+    def test_store_patterns_follow_cache_key_patterns(self):
+        service = CacheService()
+
+        assert service._get_store_patterns("xm_port:hs_match:*") == ("*", "*")
+        assert service._get_store_patterns("xm_port:hs_match:default:*") == ("default", "*")
+        assert service._get_store_patterns("xm_port:hs_match:batch:*") is None
+        assert service._get_store_patterns("xm_port:*") == ("*", "*")
+        assert service._get_store_patterns("xm_port:hs_stats:*") is None
@@ -0,0 +1,118 @@
+"""Unit tests for the local HS chapter classifier."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.hs_chapter_classifier import HSChapterClassifier
+from src.services.hs_vector_index import HSCodeVectorIndex, VectorCandidate
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.core.openai_config import OpenAIAgentConfig
+
+
+TRAINING = [
+    ("Woven fabrics of cotton, bleached", "52"),
+    ("Cotton yarn, single, combed fibres", "52"),
+    ("Denim fabric of cotton", "52"),
+    ("Seamless steel pipes for oil drilling", "73"),
+    ("Welded tubes and pipes of iron or steel", "73"),
+    ("Steel screws and bolts", "73"),
+    ("Durum wheat for sowing", "10"),
+    ("Wheat and meslin grain", "10"),
+    ("Barley and oats grain", "10"),
+]
+
+
+@pytest.fixture
+def classifier():
+    """Create a classifier trained on three chapters."""
+    classifier = HSChapterClassifier()
+    classifier.fit(
+        [description for description, _ in TRAINING],
+        [chapter for _, chapter in TRAINING],
+        sections={"52": "XI", "73": "XV", "10": "II"}
+    )
+    return classifier
+
+
+class TestHSChapterClassifier:
+    """Test training, prediction and evaluation."""
+
+    def test_untrained_classifier_predicts_nothing(self):
+        classifier = HSChapterClassifier()
+
+        assert not classifier.is_ready()
+        assert classifier.predict("cotton fabric") == []
+
+    def test_predicts_chapter_with_section(self, classifier):
+        predictions = classifier.predict("bleached cotton denim", top_k=3)
+
+        assert predictions[0].chapter == "52"
+        assert predictions[0].section == "XI"
+        assert sum(p.probability for p in predictions) == pytest.approx(1.0, abs=1e-5)
+        assert predictions[0].probability > predictions[1].probability
+
+    def test_handles_unseen_script_and_word_order(self, classifier):
+        """Descriptions go through the canonical tokenizer, so Cyrillic spellings still match."""
+        assert classifier.predict("трубы стальные steel")[0].chapter == "73"
+
+    def test_likely_chapters_cover_confidence(self, classifier):
+        likely = classifier.likely_chapters("wheat grain", confidence=0.5)
+
+        assert [p.chapter for p in likely] == ["10"]
+        assert classifier.likely_chapters("wheat grain", confidence=1.01) == []
+
+    def test_evaluate_reports_accuracy_and_latency(self, classifier):
+        report = classifier.evaluate(["cotton denim", "steel tubes", "oats"], ["52", "73", "10"])
+
+        assert report["examples"] == 3
+        assert report["accuracy"] == 1.0
+        assert report["top3_accuracy"] == 1.0
+        assert report["p50_latency_us"] > 0
+
+    def test_query_names_likely_chapters(self, classifier):
+        query = OpenAIAgentConfig.build_query("cotton denim", chapters=classifier.predict("cotton denim", top_k=1))
+
+        assert "Likely HS chapters from a local classifier: 52" in query
+
+
+class TestChapterClassifierMatching:
+    """Test how the matching service uses chapter predictions."""
+
+    @pytest.fixture
+    def hs_service(self, classifier):
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        service._vector_index = HSCodeVectorIndex()
+        service._chapter_classifier = classifier
+        return service
+
+    @pytest.mark.asyncio
+    async def test_agreeing_candidate_skips_agent(self, hs_service):
+        """A confident chapter plus an agreeing candidate below the index threshold skips the agent."""
+        candidates = [VectorCandidate("5208110000", "Cotton fabric", "52", "XI", 0.88)]
+        with patch("src.services.hs_matching_service.settings.HS_VECTOR_INDEX_ENABLED", True), \
+             patch("src.services.hs_matching_service.settings.HS_CHAPTER_CLASSIFIER_ENABLED", True), \
+             patch("src.services.hs_matching_service.settings.HS_CHAPTER_CLASSIFIER_SKIP_CONFIDENCE", 0.5), \
+             patch.object(hs_service._vector_index, "is_ready", return_value=True), \
+             patch.object(hs_service._vector_index, "search_descriptions", AsyncMock(return_value=[candidates])), \
+             patch.object(hs_service.agent_config, "match_hs_code", AsyncMock()) as mock_agent:
+            result = await hs_service.match_single_product("bleached cotton denim fabric")
+
+        assert result.primary_match.hs_code == "5208110000"
+        mock_agent.assert_not_called()
+        assert hs_service._performance_metrics["chapter_classifier_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disagreeing_candidate_goes_to_agent_with_hint(self, hs_service):
+        candidates = [VectorCandidate("7304190000", "Steel pipes", "73", "XV", 0.88)]
+        agent_result = HSCodeVectorIndex().build_match_result(candidates, "cotton denim", 100.0)
+        with patch("src.services.hs_matching_service.settings.HS_VECTOR_INDEX_ENABLED", True), \
+             patch("src.services.hs_matching_service.settings.HS_CHAPTER_CLASSIFIER_ENABLED", True), \
+             patch("src.services.hs_matching_service.settings.HS_CHAPTER_CLASSIFIER_HINT_CONFIDENCE", 0.5), \
+             patch.object(hs_service._vector_index, "is_ready", return_value=True), \
+             patch.object(hs_service._vector_index, "search_descriptions", AsyncMock(return_value=[candidates])), \
+             patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(return_value=agent_result)) as mock_agent:
+            await hs_service.match_single_product("bleached cotton denim fabric")
+
+        assert mock_agent.call_args.kwargs["chapters"][0].chapter == "52"
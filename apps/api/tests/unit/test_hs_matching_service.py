@@ -415,8 +415,7 @@ class TestCacheIntegration:
         cache_service.is_available.return_value = True
         cache_service.get_cached_match.return_value = None  # Default to cache miss
         cache_service.cache_match_result.return_value = True
-        cache_service.get_cached_batch_match.return_value = None
-        cache_service.cache_batch_results.return_value = True
+        cache_service.get_cached_matches_bulk.side_effect = lambda items: [None] * len(items)
         return cache_service
     
     @patch('src.services.hs_matching_service.get_cache_service')
@@ -468,7 +467,7 @@ class TestCacheIntegration:
     
     @patch('src.services.hs_matching_service.get_cache_service')
     async def test_batch_cache_hit(self, mock_get_cache_service, hs_service, mock_hs_code_result):
-        """Test batch cache hit scenario."""
+        """Test a batch composed entirely from per-item cache entries."""
         # Setup cache service mock
         mock_cache_service = AsyncMock()
         cached_results = [
@@ -479,7 +478,7 @@ class TestCacheIntegration:
                 query=f"product {i}"
             ) for i in range(3)
         ]
-        mock_cache_service.get_cached_batch_match.return_value = cached_results
+        mock_cache_service.get_cached_matches_bulk.return_value = cached_results
         mock_get_cache_service.return_value = mock_cache_service
         
         requests = [HSCodeMatchRequest(product_description=f"product {i}") for i in range(3)]
@@ -488,7 +487,7 @@ class TestCacheIntegration:
         # Should return cached results
         assert len(results) == 3
         assert results == cached_results
-        mock_cache_service.get_cached_batch_match.assert_called_once()
+        mock_cache_service.get_cached_matches_bulk.assert_called_once()
     
     @patch('src.services.hs_matching_service.get_cache_service')
     @patch('src.services.hs_matching_service.Runner.run')
@@ -496,10 +495,10 @@ class TestCacheIntegration:
         """Test batch cache miss with subsequent individual caching."""
         # Setup cache service mock
         mock_cache_service = AsyncMock()
-        mock_cache_service.get_cached_batch_match.return_value = None  # Batch cache miss
-        mock_cache_service.get_cached_match.return_value = None  # Individual cache miss
+        mock_cache_service.get_cached_matches_bulk.return_value = [None, None]  # Individual cache misses
+        mock_cache_service.get_negative_matches_bulk.return_value = [None, None]
+        mock_cache_service.get_cached_match.return_value = None
         mock_cache_service.cache_match_result.return_value = True
-        mock_cache_service.cache_batch_results.return_value = True
         mock_get_cache_service.return_value = mock_cache_service
         
         # Setup OpenAI mock
@@ -508,11 +507,11 @@ class TestCacheIntegration:
         requests = [HSCodeMatchRequest(product_description=f"product {i}") for i in range(2)]
         results = await hs_service.match_batch_products(requests)
         
-        # Should call OpenAI for each product and cache results
+        # Should call OpenAI for each product and cache each result on its own
         assert len(results) == 2
         assert mock_runner.call_count == 2
-        mock_cache_service.get_cached_batch_match.assert_called_once()
-        mock_cache_service.cache_batch_results.assert_called_once()
+        mock_cache_service.get_cached_matches_bulk.assert_called_once()
+        assert mock_cache_service.cache_match_result.call_count == 2
     
     @patch('src.services.hs_matching_service.get_cache_service')
     async def test_cache_service_unavailable_fallback(self, mock_get_cache_service, hs_service):
@@ -530,46 +529,30 @@ class TestCacheIntegration:
         assert await cache_service.get_cached_match("test") is None
         assert await cache_service.cache_match_result("test", MagicMock()) is False
     
-    async def test_batch_hash_generation(self, hs_service):
-        """Test batch hash generation for consistent caching."""
-        requests1 = [
-            HSCodeMatchRequest(product_description="laptop", country="default", confidence_threshold=0.7),
-            HSCodeMatchRequest(product_description="mouse", country="default", confidence_threshold=0.8)
-        ]
-        
-        requests2 = [
-            HSCodeMatchRequest(product_description="mouse", country="default", confidence_threshold=0.8),
-            HSCodeMatchRequest(product_description="laptop", country="default", confidence_threshold=0.7)
-        ]
-        
-        # Different order should produce same hash
-        hash1 = hs_service._generate_batch_hash(requests1)
-        hash2 = hs_service._generate_batch_hash(requests2)
-        
-        assert hash1 == hash2
-        assert len(hash1) == 16  # Should be 16 character hash
-    
+    @patch('src.services.hs_matching_service.cache_warmer.warm')
     @patch('src.services.hs_matching_service.get_cache_service')
-    async def test_cache_warming(self, mock_get_cache_service, hs_service):
+    async def test_cache_warming(self, mock_get_cache_service, mock_warm, hs_service):
         """Test cache warming functionality."""
         mock_cache_service = AsyncMock()
         mock_cache_service.is_available.return_value = True
-        mock_cache_service.warm_cache_with_common_products.return_value = {
-            "total_products": 10,
-            "successfully_warmed": 8,
+        mock_warm.return_value = {
+            "status": "completed",
+            "total": 10,
+            "warmed": 8,
             "already_cached": 1,
-            "failed": 1,
-            "errors": ["Error with one product"]
+            "failed": 1
         }
         mock_get_cache_service.return_value = mock_cache_service
         
         result = await hs_service.warm_cache()
         
-        assert result["total_products"] == 10
-        assert result["successfully_warmed"] == 8
+        assert result["total"] == 10
+        assert result["warmed"] == 8
         assert result["already_cached"] == 1
         assert result["failed"] == 1
-        mock_cache_service.warm_cache_with_common_products.assert_called_once_with(hs_service)
+        mock_warm.assert_called_once_with(
+            hs_service, mock_cache_service, clean_description=hs_service._clean_product_description, resume=True
+        )
     
     @patch('src.services.hs_matching_service.get_cache_service')
     async def test_cache_invalidation(self, mock_get_cache_service, hs_service):
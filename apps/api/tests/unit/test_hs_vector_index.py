@@ -0,0 +1,107 @@
+"""Unit tests for the local HS code vector index."""
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, patch
+
+from src.services.hs_vector_index import HSCodeVectorIndex, VectorCandidate
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.core.openai_config import HSCodeMatchResult
+
+
+@pytest.fixture
+def vector_index():
+    """Create an index loaded with three orthogonal-ish HS code vectors."""
+    index = HSCodeVectorIndex()
+    index.load_country(
+        "turkmenistan",
+        codes=["5208110000", "7304190000", "1001990000"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.1, 0.0, 3.0]],
+        descriptions=["Cotton fabric", "Steel pipes", "Wheat"],
+        chapters=["52", "73", "10"],
+        sections=["XI", "XV", "II"]
+    )
+    return index
+
+
+class TestHSCodeVectorIndex:
+    """Test index construction and search."""
+
+    def test_load_normalises_rows(self, vector_index):
+        """Rows are stored as a contiguous, unit-length float32 matrix."""
+        matrix = vector_index._indexes["TKM"].matrix
+        assert matrix.dtype == np.float32
+        assert matrix.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-6)
+
+    def test_default_and_turkmenistan_share_index(self, vector_index):
+        """Service country names resolve to the ISO code stored in hs_codes."""
+        assert vector_index.is_ready("default")
+        assert vector_index.is_ready("turkmenistan")
+        assert not vector_index.is_ready("kazakhstan")
+
+    def test_batched_top_k_search(self, vector_index):
+        """Each query row gets its own ranked shortlist."""
+        results = vector_index.search(np.array([[0.0, 5.0, 0.0], [1.0, 0.0, 0.05]]), "default", top_k=2)
+
+        assert len(results) == 2
+        assert [c.hs_code for c in results[0]] == ["7304190000", "5208110000"]
+        assert results[0][0].score == pytest.approx(1.0)
+        assert results[1][0].hs_code == "5208110000"
+        assert len(results[1]) == 2
+
+    def test_search_unknown_country_returns_empty(self, vector_index):
+        """Searching a country without an index yields empty shortlists."""
+        assert vector_index.search(np.ones((2, 3)), "kazakhstan") == [[], []]
+
+    def test_load_rejects_mismatched_rows(self):
+        """Embeddings must have one row per code."""
+        with pytest.raises(ValueError):
+            HSCodeVectorIndex().load_country("default", ["0101"], [[1.0], [2.0]])
+
+    def test_build_match_result(self, vector_index):
+        """Confident shortlists convert into a full match result."""
+        candidates = vector_index.search(np.array([1.0, 0.0, 0.0]), "default")[0]
+        result = vector_index.build_match_result(candidates, "cotton fabric", 0.4)
+
+        assert result.primary_match.hs_code == "5208110000"
+        assert result.primary_match.confidence == pytest.approx(1.0)
+        assert len(result.alternative_matches) == 2
+        assert result.query == "cotton fabric"
+
+
+class TestVectorIndexMatching:
+    """Test how the matching service uses the vector index."""
+
+    @pytest.fixture
+    def hs_service(self, vector_index):
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        service._vector_index = vector_index
+        return service
+
+    @pytest.mark.asyncio
+    async def test_confident_hit_skips_agent(self, hs_service, vector_index):
+        """A top score above the threshold never reaches the agent."""
+        candidates = [VectorCandidate("5208110000", "Cotton fabric", "52", "XI", 0.97)]
+        with patch("src.services.hs_matching_service.settings.HS_VECTOR_INDEX_ENABLED", True), \
+             patch.object(vector_index, "search_descriptions", AsyncMock(return_value=[candidates])), \
+             patch.object(hs_service.agent_config, "match_hs_code", AsyncMock()) as mock_agent:
+            result = await hs_service.match_single_product("cotton fabric 100%")
+
+        assert result.primary_match.hs_code == "5208110000"
+        mock_agent.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_low_score_passes_shortlist_to_agent(self, hs_service, vector_index):
+        """Below the threshold the shortlist is forwarded as agent context."""
+        candidates = [VectorCandidate("5208110000", "Cotton fabric", "52", "XI", 0.5)]
+        agent_result = vector_index.build_match_result(candidates, "cotton blend", 100.0)
+        with patch("src.services.hs_matching_service.settings.HS_VECTOR_INDEX_ENABLED", True), \
+             patch.object(vector_index, "search_descriptions", AsyncMock(return_value=[candidates])), \
+             patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(return_value=agent_result)) as mock_agent:
+            result = await hs_service.match_single_product("cotton blend fabric")
+
+        assert isinstance(result, HSCodeMatchResult)
+        assert mock_agent.call_args.kwargs["candidates"] == candidates
@@ -0,0 +1,149 @@
+"""Unit tests for the in-process L1 cache and two-tier lookups."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.local_cache import LocalTTLCache
+from src.services.cache_service import CacheService
+from src.core.openai_config import HSCodeMatchResult, HSCodeResult
+
+
+@pytest.fixture
+def match_result():
+    return HSCodeMatchResult(
+        primary_match=HSCodeResult(
+            hs_code="5208110000",
+            code_description="Woven fabrics of cotton",
+            confidence=0.9,
+            chapter="52",
+            section="XI",
+            reasoning="Cotton fabric"
+        ),
+        alternative_matches=[],
+        processing_time_ms=50.0,
+        query="cotton fabric"
+    )
+
+
+class TestLocalTTLCache:
+    """Test LRU eviction, expiry and pattern invalidation."""
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        cache = LocalTTLCache(max_entries=2)
+        cache.set("a", 1, 60)
+        cache.set("b", 2, 60)
+        cache.get("a")
+        cache.set("c", 3, 60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get_statistics()["evictions"] == 1
+
+    def test_entries_expire(self):
+        """Entries are dropped once their TTL has passed."""
+        cache = LocalTTLCache()
+        with patch("src.services.local_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1, 10)
+        with patch("src.services.local_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+        stats = cache.get_statistics()
+        assert stats["expirations"] == 1
+        assert stats["entries"] == 0
+
+    def test_invalidate_pattern(self):
+        """Redis glob patterns select the entries to drop."""
+        cache = LocalTTLCache()
+        cache.set("xm_port:hs_match:default:aaa", 1, 60)
+        cache.set("xm_port:hs_match:turkmenistan:bbb", 2, 60)
+
+        assert cache.invalidate_pattern("xm_port:hs_match:default:*") == 1
+        assert cache.get("xm_port:hs_match:turkmenistan:bbb") == 2
+
+    def test_zero_size_disables_cache(self):
+        """max_entries=0 stores nothing."""
+        cache = LocalTTLCache(max_entries=0)
+        cache.set("a", 1, 60)
+        assert len(cache) == 0
+
+
+class TestTwoTierCache:
+    """Test CacheService with an L1 in front of Redis."""
+
+    @pytest.mark.asyncio
+    async def test_l2_hit_is_promoted_to_l1(self, match_result):
+        """The second lookup is served without touching Redis."""
+        service = CacheService()
+        service._redis = AsyncMock()
+        service._redis.get.return_value = match_result.model_dump_json()
+
+        first = await service.get_cached_match("cotton fabric")
+        second = await service.get_cached_match("cotton fabric")
+
+        assert first.primary_match.hs_code == second.primary_match.hs_code == "5208110000"
+        service._redis.get.assert_awaited_once()
+        service._redis.incr.assert_awaited_once()
+
+        stats = service._get_tier_statistics()
+        assert stats["l1_cache"]["hits"] == 1
+        assert stats["l2_cache"]["hits"] == 1
+        assert stats["combined_hit_rate_percent"] == 100.0
+
+    @pytest.mark.asyncio
+    async def test_l1_serves_when_redis_is_down(self, match_result):
+        """Results cached in-process keep being served without Redis."""
+        service = CacheService()
+        service._redis = None
+
+        assert await service.cache_match_result("cotton fabric", match_result) is False
+        result = await service.get_cached_match("cotton fabric")
+
+        assert result.primary_match.hs_code == "5208110000"
+        assert "l1_cache" in await service.get_cache_statistics()
+
+    @pytest.mark.asyncio
+    async def test_l1_ttl_follows_determine_ttl(self, match_result):
+        """L1 entries expire with the soft TTL of the Redis write, jitter included."""
+        service = CacheService()
+        service._redis = None
+
+        with patch.object(service._local_cache, "set") as mock_set:
+            await service.cache_match_result("cotton fabric", match_result)
+
+        ttl_seconds = service._determine_ttl(match_result) * 3600
+        assert ttl_seconds * 0.9 <= mock_set.call_args.args[2] <= ttl_seconds
+
+    @pytest.mark.asyncio
+    async def test_invalidation_is_published(self, match_result):
+        """Invalidating clears the local L1 and notifies other workers."""
+        service = CacheService()
+        service._redis = AsyncMock()
+        service._redis.keys.return_value = []
+        await service.cache_match_result("cotton fabric", match_result)
+
+        await service.clear_all_cache()
+
+        service._redis.publish.assert_awaited_once_with(
+            CacheService.INVALIDATION_CHANNEL, f"{CacheService.CACHE_KEY_PREFIX}:*"
+        )
+        assert len(service._local_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_listener_applies_remote_invalidations(self, match_result):
+        """Patterns received over pub/sub drop matching L1 entries."""
+        service = CacheService()
+        service._redis = None
+        await service.cache_match_result("cotton fabric", match_result)
+
+        async def listen():
+            yield {"type": "subscribe", "data": 1}
+            yield {"type": "message", "data": f"{CacheService.CACHE_KEY_PREFIX}:default:*"}
+
+        service._pubsub = AsyncMock()
+        service._pubsub.listen = listen
+        await service._listen_for_invalidations()
+
+        assert await service.get_cached_match("cotton fabric") is None
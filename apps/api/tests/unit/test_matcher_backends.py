@@ -0,0 +1,122 @@
+"""Unit tests for the matcher backends and the offline simulator."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from src.core.agent_resilience import CircuitBreaker, RequestHedger
+from src.services.matcher_backends import (
+    OpenAIAgentBackend,
+    SimulatedMatcherBackend,
+    SimulationProfile,
+    create_matcher_backend
+)
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.schemas.hs_matching import HSCodeMatchRequest
+
+
+FAST = SimulationProfile(latency_median_ms=1.0, latency_sigma=0.1)
+
+
+@pytest.fixture(autouse=True)
+def isolated_resilience():
+    """Keep simulated failures out of the process-wide breaker and budget."""
+    with patch("src.core.openai_config.agent_circuit_breaker", CircuitBreaker(min_calls=1000)) as breaker, \
+         patch("src.core.openai_config.agent_hedger", RequestHedger(enabled=False)), \
+         patch("src.core.openai_config.openai_token_bucket.enabled", False):
+        yield breaker
+
+
+class TestSimulatedMatcherBackend:
+    """Test deterministic outputs and injected failures."""
+
+    @pytest.mark.asyncio
+    async def test_outputs_are_deterministic(self):
+        first = await SimulatedMatcherBackend(FAST).match("cotton fabric 100%")
+        second = await SimulatedMatcherBackend(FAST).match("100 % Cotton Fabric")
+        other = await SimulatedMatcherBackend(FAST).match("steel pipes")
+
+        assert first.primary_match.hs_code == second.primary_match.hs_code
+        assert first.primary_match.hs_code != other.primary_match.hs_code
+        assert len(first.primary_match.hs_code) == 10
+        assert first.primary_match.hs_code[:2] == first.primary_match.chapter
+        assert 0.6 <= first.primary_match.confidence < 1.0
+
+    @pytest.mark.asyncio
+    async def test_packed_calls_cover_every_item(self):
+        backend = SimulatedMatcherBackend(FAST)
+        descriptions = ["cotton fabric", "steel pipes", "wheat flour"]
+
+        results = await backend.match_packed(descriptions)
+
+        assert [r.query for r in results] == descriptions
+        single = await backend.match("steel pipes")
+        assert results[1].primary_match.hs_code == single.primary_match.hs_code
+        assert backend.get_statistics()["items"] == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_become_error_results(self, isolated_resilience):
+        backend = SimulatedMatcherBackend(SimulationProfile(latency_median_ms=1.0, error_rate=1.0))
+
+        result = await backend.match("cotton fabric")
+
+        assert result.primary_match.confidence == 0.0
+        assert backend.get_statistics()["errors"] == 1
+        assert isolated_resilience.failure_rate == 1.0
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_bursts_back_off_the_limiter(self):
+        """Simulated 429s reach the adaptive limiter like real ones."""
+        profile = SimulationProfile(latency_median_ms=1.0, rate_limit_every_seconds=60, rate_limit_burst_seconds=60)
+        backend = SimulatedMatcherBackend(profile)
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+        with patch("src.core.openai_config.openai_concurrency_limiter", limiter):
+            result = await backend.match("cotton fabric")
+
+        assert result.primary_match.confidence == 0.0
+        assert backend.get_statistics()["rate_limited"] == 1
+        assert limiter.get_statistics()["rate_limited"] == 1
+        assert limiter.limit == 4
+
+
+class TestBackendSelection:
+    """Test how the matching service picks its backend."""
+
+    def test_factory(self):
+        agent_config = MagicMock()
+        assert isinstance(create_matcher_backend("openai", agent_config, AsyncMock()), OpenAIAgentBackend)
+        assert isinstance(create_matcher_backend("simulator", agent_config, AsyncMock()), SimulatedMatcherBackend)
+
+    @pytest.mark.asyncio
+    async def test_service_matches_through_simulator(self):
+        with patch("src.services.hs_matching_service.settings.HS_MATCHER_BACKEND", "simulator"):
+            service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        service._matcher_backend.profile = FAST
+
+        with patch("src.core.openai_config.Runner.run", AsyncMock(side_effect=AssertionError("network"))):
+            result = await service.match_single_product("cotton fabric")
+
+        assert result.primary_match.hs_code == SimulatedMatcherBackend.simulated_match("cotton fabric")["primary_match"].hs_code
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 3])
+    async def test_simulated_results_are_not_cached(self, chunk_size):
+        """Fake codes never reach Redis or the durable classification store."""
+        with patch("src.services.hs_matching_service.settings.HS_MATCHER_BACKEND", "simulator"):
+            service = HSCodeMatchingService()
+        cache = MagicMock(wraps=noop_cache_service)
+        service._cache_service = cache
+        service._matcher_backend.profile = FAST
+        requests = [HSCodeMatchRequest(product_description=d) for d in ["cotton fabric", "steel pipes", "wheat flour"]]
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", chunk_size):
+            results = await service.match_batch_products(requests)
+
+        assert all(r.primary_match.confidence > 0 for r in results)
+        cache.cache_match_result.assert_not_called()
+        cache.cache_match_results_bulk.assert_not_called()
+        cache.cache_negative_result.assert_not_called()
+
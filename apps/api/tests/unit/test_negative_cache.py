@@ -0,0 +1,164 @@
+"""Unit tests for error classification and short-TTL negative caching."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from agents import ModelBehaviorError
+
+from src.core.openai_config import (
+    OpenAIAgentConfig,
+    HSCodeMatchResult,
+    HSCodeResult,
+    MatchErrorKind,
+    classify_match_error
+)
+from src.services.cache_service import CacheService
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.schemas.hs_matching import HSCodeMatchRequest
+
+
+def make_error(kind: str) -> HSCodeMatchResult:
+    return OpenAIAgentConfig._create_error_result("cotton fabric", 5.0, "Agent error: rejected", kind)
+
+
+def status_error(status_code: int) -> Exception:
+    error = RuntimeError(f"HTTP {status_code}")
+    error.status_code = status_code
+    return error
+
+
+@pytest.fixture
+def cache():
+    """Cache service without Redis: negative entries live in the L1 only."""
+    cache = CacheService()
+    cache.get_cached_match = AsyncMock(return_value=None)
+    cache.get_cached_matches_bulk = AsyncMock(side_effect=lambda items: [None] * len(items))
+    cache.cache_match_result = AsyncMock(return_value=True)
+    return cache
+
+
+@pytest.fixture
+def service(cache):
+    service = HSCodeMatchingService()
+    service._cache_service = cache
+    return service
+
+
+class TestErrorClassification:
+    """Test which failures may be negatively cached."""
+
+    def test_retryable_failures_are_transient(self):
+        assert classify_match_error(asyncio.TimeoutError()) == MatchErrorKind.TRANSIENT
+        assert classify_match_error(ConnectionError("reset")) == MatchErrorKind.TRANSIENT
+        assert classify_match_error(status_error(429)) == MatchErrorKind.TRANSIENT
+        assert classify_match_error(status_error(503)) == MatchErrorKind.TRANSIENT
+        # Bad credentials are not the description's fault
+        assert classify_match_error(status_error(401)) == MatchErrorKind.TRANSIENT
+
+    def test_input_failures_are_deterministic(self):
+        assert classify_match_error(status_error(400)) == MatchErrorKind.DETERMINISTIC
+        assert classify_match_error(ModelBehaviorError("invalid output")) == MatchErrorKind.DETERMINISTIC
+
+    @pytest.mark.asyncio
+    async def test_agent_errors_carry_their_kind(self):
+        with patch("src.core.openai_config.agent_hedger.enabled", False), \
+             patch("src.core.openai_config.openai_token_bucket.enabled", False):
+            rejected = await OpenAIAgentConfig.match_hs_code(
+                "cotton fabric", agent=object(), runner=AsyncMock(side_effect=status_error(400))
+            )
+            throttled = await OpenAIAgentConfig.match_hs_code(
+                "cotton fabric", agent=object(), runner=AsyncMock(side_effect=status_error(429))
+            )
+
+        assert rejected.error_kind == MatchErrorKind.DETERMINISTIC
+        assert throttled.error_kind == MatchErrorKind.TRANSIENT
+
+
+class TestNegativeCache:
+    """Test how failed matches are cached by the matching service."""
+
+    @pytest.mark.asyncio
+    async def test_deterministic_failures_are_served_from_negative_cache(self, service, cache):
+        agent = AsyncMock(return_value=make_error(MatchErrorKind.DETERMINISTIC))
+
+        with patch.object(service.agent_config, "match_hs_code", agent):
+            first = await service.match_single_product("cotton fabric")
+            second = await service.match_single_product("Cotton  fabric")
+
+        assert agent.await_count == 1
+        assert second.error_kind == MatchErrorKind.DETERMINISTIC
+        assert first.primary_match.hs_code == second.primary_match.hs_code
+        assert service._performance_metrics["negative_cache_hits"] == 1
+        # Never stored as a regular match
+        cache.cache_match_result.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_are_not_cached(self, service, cache):
+        agent = AsyncMock(return_value=make_error(MatchErrorKind.TRANSIENT))
+
+        with patch.object(service.agent_config, "match_hs_code", agent):
+            await service.match_single_product("cotton fabric")
+            await service.match_single_product("cotton fabric")
+
+        assert agent.await_count == 2
+        assert await cache.get_negative_match("cotton fabric") is None
+        cache.cache_match_result.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_negative_entries_expire(self, cache):
+        with patch("src.services.cache_service.settings.HS_NEGATIVE_CACHE_TTL_SECONDS", 0.05):
+            await cache.cache_negative_result("cotton fabric", make_error(MatchErrorKind.DETERMINISTIC))
+        assert await cache.get_negative_match("cotton fabric") is not None
+
+        await asyncio.sleep(0.06)
+
+        assert await cache.get_negative_match("cotton fabric") is None
+
+    @pytest.mark.asyncio
+    async def test_batches_skip_negatively_cached_rows(self, service, cache):
+        await cache.cache_negative_result("cotton fabric", make_error(MatchErrorKind.DETERMINISTIC))
+        match = HSCodeMatchResult(
+            primary_match=HSCodeResult(
+                hs_code="7304190000",
+                code_description="Steel pipes",
+                confidence=0.9,
+                chapter="73",
+                section="XV",
+                reasoning="Steel pipes"
+            ),
+            alternative_matches=[],
+            processing_time_ms=10.0,
+            query="steel pipes"
+        )
+        requests = [
+            HSCodeMatchRequest(product_description="cotton fabric"),
+            HSCodeMatchRequest(product_description="steel pipes")
+        ]
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", 1), \
+             patch.object(service.agent_config, "match_hs_code", AsyncMock(return_value=match)) as agent:
+            results = await service.match_batch_products(requests)
+
+        assert agent.await_count == 1
+        assert results[0].error_kind == MatchErrorKind.DETERMINISTIC
+        assert results[1].primary_match.hs_code == "7304190000"
+        assert service._performance_metrics["negative_cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_round_trip(self):
+        cache = CacheService()
+        cache._redis = AsyncMock()
+        error = make_error(MatchErrorKind.DETERMINISTIC)
+
+        await cache.cache_negative_result("cotton fabric", error)
+        key, ttl, payload = cache._redis.setex.call_args.args
+        assert ":negative:" in key and key.startswith(CacheService.CACHE_KEY_PREFIX)
+        assert ttl == 300
+
+        cache._local_cache.clear()
+        cache._redis.mget.return_value = [payload, None]
+        results = await cache.get_negative_matches_bulk([("cotton fabric", "default"), ("steel pipes", "default")])
+
+        assert results[0].error_kind == MatchErrorKind.DETERMINISTIC
+        assert results[1] is None
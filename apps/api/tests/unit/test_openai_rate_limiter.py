@@ -0,0 +1,84 @@
+"""Unit tests for the cluster-wide OpenAI token bucket."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.core.openai_rate_limiter import OpenAITokenBucket
+
+
+@pytest.fixture
+def local_bucket():
+    """Bucket that never reaches Redis."""
+    bucket = OpenAITokenBucket(requests_per_minute=600, tokens_per_minute=60000, fallback_share=1.0)
+    bucket._get_redis = AsyncMock(return_value=None)
+    return bucket
+
+
+class TestLocalFallback:
+    """Test the in-process bucket used without Redis."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_within_budget_does_not_wait(self, local_bucket):
+        waited = await local_bucket.acquire(1000)
+
+        assert waited < 1
+        stats = local_bucket.get_statistics()
+        assert stats["backend"] == "local"
+        assert stats["local_fallback_acquisitions"] == 1
+        assert stats["waited_acquisitions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_token_budget_exhaustion_waits(self, local_bucket):
+        """An empty token bucket makes the caller wait for the refill."""
+        local_bucket._local_tokens.tokens = 0  # 60000 tokens/min refill 1 token/ms
+
+        waited = await local_bucket.acquire(50)
+
+        assert waited >= 40
+        stats = local_bucket.get_statistics()
+        assert stats["waited_acquisitions"] == 1
+        assert stats["max_wait_ms"] >= 40
+
+    @pytest.mark.asyncio
+    async def test_cost_is_capped_at_capacity(self, local_bucket):
+        """A single call larger than the whole budget still gets through."""
+        waited = await local_bucket.acquire(10_000_000)
+        assert waited < 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_bucket_is_free(self):
+        bucket = OpenAITokenBucket(requests_per_minute=1, tokens_per_minute=1, enabled=False)
+        assert await bucket.acquire(1000) == 0.0
+        assert bucket.get_statistics()["acquisitions"] == 0
+
+
+class TestRedisBucket:
+    """Test the Redis-backed path."""
+
+    @pytest.mark.asyncio
+    async def test_uses_script_result(self):
+        bucket = OpenAITokenBucket(requests_per_minute=600, tokens_per_minute=60000)
+        bucket._redis = AsyncMock()
+        bucket._script = AsyncMock(side_effect=[20, 0])
+
+        with patch("src.core.openai_rate_limiter.asyncio.sleep", AsyncMock()) as mock_sleep:
+            await bucket.acquire(500)
+
+        assert bucket._script.await_count == 2
+        assert bucket._script.await_args.kwargs["keys"] == [
+            OpenAITokenBucket.REQUEST_BUCKET_KEY, OpenAITokenBucket.TOKEN_BUCKET_KEY
+        ]
+        assert bucket._script.await_args.kwargs["args"] == [600, 60000, 500]
+        mock_sleep.assert_awaited_once_with(0.02)
+        assert bucket.get_statistics()["local_fallback_acquisitions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_redis_error_falls_back_to_local(self):
+        bucket = OpenAITokenBucket(requests_per_minute=600, tokens_per_minute=60000)
+        bucket._redis = AsyncMock()
+        bucket._script = AsyncMock(side_effect=ConnectionError("Redis down"))
+
+        await bucket.acquire(500)
+
+        assert bucket._redis is None
+        assert bucket.get_statistics()["local_fallback_acquisitions"] == 1
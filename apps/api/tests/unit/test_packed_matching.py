@@ -0,0 +1,204 @@
+"""Unit tests for packed multi-product agent calls."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents import Runner
+
+from src.core.openai_config import (
+    MatchErrorKind,
+    OpenAIAgentConfig,
+    HSCodeResult,
+    HSCodeMatchResult,
+    HSCodePackedMatchItem,
+    HSCodePackedMatchOutput
+)
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.schemas.hs_matching import HSCodeMatchRequest
+
+
+def make_hs_result(code: str) -> HSCodeResult:
+    return HSCodeResult(
+        hs_code=code,
+        code_description="Test code",
+        confidence=0.9,
+        chapter=code[:2],
+        section="XI",
+        reasoning="Test"
+    )
+
+
+def runner_output(final_output):
+    result = MagicMock()
+    result.final_output = final_output
+    return result
+
+
+class TestPackedAgentCall:
+    """Test OpenAIAgentConfig.match_hs_codes_packed."""
+
+    @pytest.mark.asyncio
+    async def test_results_mapped_back_by_index(self):
+        """Out-of-order list items land on the right descriptions."""
+        output = HSCodePackedMatchOutput(results=[
+            HSCodePackedMatchItem(index=1, primary_match=make_hs_result("7304190000")),
+            HSCodePackedMatchItem(index=0, primary_match=make_hs_result("5208110000")),
+        ])
+        with patch.object(Runner, "run", AsyncMock(return_value=runner_output(output))) as mock_run:
+            results = await OpenAIAgentConfig.match_hs_codes_packed(["cotton fabric", "steel pipes"])
+
+        assert mock_run.await_count == 1
+        assert [r.primary_match.hs_code for r in results] == ["5208110000", "7304190000"]
+        assert [r.query for r in results] == ["cotton fabric", "steel pipes"]
+
+    @pytest.mark.asyncio
+    async def test_malformed_output_returns_all_missing(self):
+        """A non-list output marks every item for per-item fallback."""
+        with patch.object(Runner, "run", AsyncMock(return_value=runner_output("not json"))):
+            results = await OpenAIAgentConfig.match_hs_codes_packed(["cotton fabric", "steel pipes"])
+
+        assert results == [None, None]
+
+    @pytest.mark.asyncio
+    async def test_invalid_and_duplicate_indices_are_discarded(self):
+        """Only well-formed, unique indices are accepted."""
+        output = HSCodePackedMatchOutput(results=[
+            HSCodePackedMatchItem(index=0, primary_match=make_hs_result("5208110000")),
+            HSCodePackedMatchItem(index=0, primary_match=make_hs_result("9999999999")),
+            HSCodePackedMatchItem(index=5, primary_match=make_hs_result("9999999999")),
+        ])
+        with patch.object(Runner, "run", AsyncMock(return_value=runner_output(output))):
+            results = await OpenAIAgentConfig.match_hs_codes_packed(["cotton fabric", "steel pipes"])
+
+        assert results[0].primary_match.hs_code == "5208110000"
+        assert results[1] is None
+
+    def test_packed_query_numbers_products(self):
+        """Each description is listed with its index."""
+        query = OpenAIAgentConfig.build_packed_query(["cotton fabric", "steel pipes"])
+        assert '0. "cotton fabric"' in query
+        assert '1. "steel pipes"' in query
+
+
+class TestPackedBatchMatching:
+    """Test the packed path inside match_batch_products."""
+
+    @pytest.mark.asyncio
+    async def test_chunks_and_falls_back_for_missing_items(self):
+        """Misses are chunked; items absent from packed output go per item."""
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        requests = [HSCodeMatchRequest(product_description=f"product number {i}") for i in range(5)]
+
+        async def fake_packed(descriptions, country, agent=None):
+            # Drop the last item of every chunk to exercise the fallback
+            return [
+                HSCodeMatchResult(
+                    primary_match=make_hs_result("5208110000"),
+                    processing_time_ms=10.0,
+                    query=d
+                ) for d in descriptions[:-1]
+            ] + [None]
+
+        single_result = HSCodeMatchResult(
+            primary_match=make_hs_result("7304190000"), processing_time_ms=10.0, query="single"
+        )
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", 3), \
+             patch.object(service.agent_config, "match_hs_codes_packed", AsyncMock(side_effect=fake_packed)) as mock_packed, \
+             patch.object(service.agent_config, "match_hs_code", AsyncMock(return_value=single_result)) as mock_single:
+            results = await service.match_batch_products(requests)
+
+        assert mock_packed.await_count == 2  # chunks of 3 and 2
+        assert mock_single.await_count == 2  # one dropped item per chunk
+        assert [r.primary_match.hs_code for r in results] == [
+            "5208110000", "5208110000", "7304190000", "5208110000", "7304190000"
+        ]
+        summary = service._calculate_performance_summary()
+        assert summary["packed_items"] == 3
+        assert summary["packed_fallbacks"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_share_packed_items(self):
+        """Descriptions already in a packed call are not sent to the agent again."""
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+        packed_descriptions = []
+
+        async def fake_packed(descriptions, country, agent=None):
+            packed_descriptions.extend(descriptions)
+            await asyncio.sleep(0.02)
+            return [
+                HSCodeMatchResult(primary_match=make_hs_result("5208110000"), processing_time_ms=10.0, query=d)
+                for d in descriptions
+            ]
+
+        first = [HSCodeMatchRequest(product_description=f"product number {i}") for i in range(3)]
+        second = [HSCodeMatchRequest(product_description=f"product number {i}") for i in range(2, 5)]
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", 3), \
+             patch.object(service.agent_config, "match_hs_codes_packed", AsyncMock(side_effect=fake_packed)), \
+             patch.object(service.agent_config, "match_hs_code", AsyncMock()) as mock_single:
+            results = await asyncio.gather(
+                service.match_batch_products(first),
+                service.match_batch_products(second)
+            )
+
+        assert sorted(packed_descriptions) == [f"product number {i}" for i in range(5)]
+        mock_single.assert_not_awaited()
+        assert all(r.primary_match.hs_code == "5208110000" for batch in results for r in batch)
+        assert service._single_flight.inflight_count == 0
+
+    @pytest.mark.asyncio
+    async def test_items_locked_by_another_worker_are_not_packed(self):
+        service = HSCodeMatchingService()
+        cache = MagicMock(wraps=noop_cache_service)
+        cache.acquire_inflight_lock = AsyncMock(side_effect=lambda description, country: description != "steel pipes")
+        cache.release_inflight_lock = AsyncMock()
+        other_worker = HSCodeMatchResult(
+            primary_match=make_hs_result("7304190000"), processing_time_ms=10.0, query="steel pipes"
+        )
+        cache.wait_for_cached_match = AsyncMock(return_value=other_worker)
+        service._cache_service = cache
+        requests = [HSCodeMatchRequest(product_description=d) for d in ["cotton fabric", "steel pipes", "wheat flour"]]
+
+        async def fake_packed(descriptions, country, agent=None):
+            return [
+                HSCodeMatchResult(primary_match=make_hs_result("5208110000"), processing_time_ms=10.0, query=d)
+                for d in descriptions
+            ]
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", 3), \
+             patch.object(service.agent_config, "match_hs_codes_packed", AsyncMock(side_effect=fake_packed)) as mock_packed:
+            results = await service.match_batch_products(requests)
+
+        assert mock_packed.await_args.args[0] == ["cotton fabric", "wheat flour"]
+        assert [r.primary_match.hs_code for r in results] == ["5208110000", "7304190000", "5208110000"]
+        released = {call.args[0] for call in cache.release_inflight_lock.await_args_list}
+        assert {"cotton fabric", "wheat flour"} <= released
+
+    @pytest.mark.asyncio
+    async def test_missing_packed_item_failing_deterministically_is_negatively_cached(self):
+        service = HSCodeMatchingService()
+        cache = MagicMock(wraps=noop_cache_service)
+        service._cache_service = cache
+        requests = [HSCodeMatchRequest(product_description=d) for d in ["cotton fabric", "steel pipes"]]
+        rejected = service._create_error_result("steel pipes", "Invalid input", MatchErrorKind.DETERMINISTIC)
+
+        async def fake_packed(descriptions, country, agent=None):
+            return [
+                HSCodeMatchResult(primary_match=make_hs_result("5208110000"), processing_time_ms=10.0, query=descriptions[0]),
+                None
+            ]
+
+        with patch("src.services.hs_matching_service.settings.HS_MATCH_PACKED_CHUNK_SIZE", 2), \
+             patch.object(service.agent_config, "match_hs_codes_packed", AsyncMock(side_effect=fake_packed)), \
+             patch.object(service.agent_config, "match_hs_code", AsyncMock(return_value=rejected)):
+            results = await service.match_batch_products(requests)
+
+        assert results[1].error_kind == MatchErrorKind.DETERMINISTIC
+        cache.cache_negative_result.assert_called_once()
+        assert cache.cache_negative_result.call_args.args[0] == "steel pipes"
+
@@ -0,0 +1,134 @@
+"""Unit tests for priority lanes in the shared concurrency limiter."""
+
+import asyncio
+import pytest
+
+from src.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from src.core.priority_lanes import Lane, WeightedLaneQueue, current_lane, priority_lane
+
+
+class TestPriorityLaneContext:
+    """Test how the lane travels with the asyncio context."""
+
+    @pytest.mark.asyncio
+    async def test_default_lane_is_interactive(self):
+        assert current_lane() == Lane.INTERACTIVE
+
+    @pytest.mark.asyncio
+    async def test_tasks_inherit_the_lane(self):
+        async def lane_of_task():
+            return current_lane()
+
+        with priority_lane(Lane.BACKGROUND):
+            task = asyncio.create_task(lane_of_task())
+
+        assert await task == Lane.BACKGROUND
+        assert current_lane() == Lane.INTERACTIVE
+
+    def test_unknown_lane_is_rejected(self):
+        with pytest.raises(ValueError):
+            with priority_lane("bulk"):
+                pass
+
+
+class TestWeightedLaneQueue:
+    """Test smooth weighted round robin between lanes."""
+
+    def test_lanes_share_turns_by_weight(self):
+        queue = WeightedLaneQueue()
+        for lane in (Lane.INTERACTIVE, Lane.FILE_PROCESSING, Lane.BACKGROUND):
+            for i in range(24):
+                queue.push(lane, i)
+
+        served = [queue.pop(lambda lane: True)[0] for _ in range(12)]
+
+        assert served.count(Lane.INTERACTIVE) == 8
+        assert served.count(Lane.FILE_PROCESSING) == 3
+        assert served.count(Lane.BACKGROUND) == 1
+        # Interleaved rather than served in bursts
+        assert Lane.FILE_PROCESSING in served[:3]
+
+    def test_ineligible_lanes_are_skipped(self):
+        queue = WeightedLaneQueue()
+        queue.push(Lane.BACKGROUND, "warm")
+
+        assert queue.pop(lambda lane: lane == Lane.INTERACTIVE) is None
+        assert queue.pop(lambda lane: True) == (Lane.BACKGROUND, "warm")
+        assert len(queue) == 0
+
+
+class TestLimiterLanes:
+    """Test lane-aware admission in the adaptive limiter."""
+
+    @pytest.mark.asyncio
+    async def test_reserved_slots_only_admit_interactive_calls(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=5, max_limit=5, interactive_reserved_share=0.2)
+        release = asyncio.Event()
+        admitted = []
+
+        async def call(lane):
+            async with limiter.slot(lane=lane):
+                admitted.append(lane)
+                await release.wait()
+
+        tasks = [asyncio.create_task(call(Lane.FILE_PROCESSING)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert limiter.interactive_reserved == 1
+        assert admitted.count(Lane.FILE_PROCESSING) == 4
+
+        tasks.append(asyncio.create_task(call(Lane.INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        assert Lane.INTERACTIVE in admitted
+        assert limiter.in_flight == 5
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert limiter.in_flight == 0
+        lanes = limiter.get_statistics()["lanes"]
+        assert lanes[Lane.FILE_PROCESSING]["admitted"] == 5
+        assert lanes[Lane.FILE_PROCESSING]["waits"] == 1
+        assert lanes[Lane.INTERACTIVE]["waits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_interactive_calls_overtake_queued_file_work(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        order = []
+
+        async def call(lane, name):
+            async with limiter.slot(lane=lane):
+                order.append(name)
+                await asyncio.sleep(0.001)
+
+        with priority_lane(Lane.FILE_PROCESSING):
+            file_calls = [asyncio.create_task(call(None, f"file-{i}")) for i in range(6)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call(None, "interactive"))
+
+        await asyncio.gather(interactive, *file_calls)
+
+        # The interactive call waits for at most one file call to finish
+        assert order.index("interactive") <= 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert limiter.get_statistics()["lanes"][Lane.INTERACTIVE]["queued"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert limiter.get_statistics()["lanes"][Lane.INTERACTIVE]["queued"] == 0
+        release.set()
+        await holder
+        assert limiter.in_flight == 0
@@ -0,0 +1,220 @@
+"""Unit tests for single-flight request coalescing."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.request_coalescing import SingleFlight
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import CacheService, noop_cache_service
+from src.core.openai_config import HSCodeMatchResult, HSCodeResult
+
+
+@pytest.fixture
+def match_result():
+    """Sample match result returned by the mocked agent."""
+    return HSCodeMatchResult(
+        primary_match=HSCodeResult(
+            hs_code="5208110000",
+            code_description="Woven fabrics of cotton",
+            confidence=0.9,
+            chapter="52",
+            section="XI",
+            reasoning="Cotton fabric"
+        ),
+        alternative_matches=[],
+        processing_time_ms=50.0,
+        query="cotton fabric"
+    )
+
+
+class TestSingleFlight:
+    """Test the coalescing primitive."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Duplicates await the leader's future."""
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*[single_flight.do("key", work) for _ in range(5)])
+
+        assert results == ["result"] * 5
+        assert calls == 1
+        stats = single_flight.get_statistics()
+        assert stats["leader_calls"] == 1
+        assert stats["coalesced_calls"] == 4
+        assert stats["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_exceptions_propagate_to_all_callers(self):
+        """A failing leader fails every coalesced caller."""
+        single_flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("boom")
+
+        results = await asyncio.gather(
+            *[single_flight.do("key", work) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert single_flight.inflight_count == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_fail_followers(self):
+        """A follower takes over when the leader's caller is cancelled."""
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == "result"
+        assert leader.cancelled()
+        assert calls == 2
+        stats = single_flight.get_statistics()
+        assert stats["leader_cancellations"] == 1
+        assert stats["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+
+        assert await leader == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_claimed_keys_are_settled_for_followers(self):
+        """Keys computed elsewhere share their result, or let followers compute them."""
+        single_flight = SingleFlight()
+        work = AsyncMock(return_value="own")
+        shared = single_flight.claim("shared")
+        dropped = single_flight.claim("dropped")
+        assert single_flight.claim("shared") is None
+
+        followers = asyncio.gather(single_flight.do("shared", work), single_flight.do("dropped", work))
+        await asyncio.sleep(0)
+        single_flight.settle("shared", shared, "packed")
+        single_flight.settle("dropped", dropped, None)
+
+        assert await followers == ["packed", "own"]
+        assert work.await_count == 1
+        assert single_flight.inflight_count == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_do_not_coalesce(self):
+        """Only identical keys share work."""
+        single_flight = SingleFlight()
+        work = AsyncMock(return_value="ok")
+
+        await asyncio.gather(single_flight.do(("a", "default"), work), single_flight.do(("b", "default"), work))
+
+        assert work.await_count == 2
+
+
+class TestServiceCoalescing:
+    """Test coalescing inside HSCodeMatchingService."""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_matches_call_agent_once(self, match_result):
+        """Same cleaned description and country reach OpenAI once."""
+        service = HSCodeMatchingService()
+        service._cache_service = noop_cache_service
+
+        async def slow_match(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return match_result
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(side_effect=slow_match)) as mock_agent:
+            results = await asyncio.gather(
+                service.match_single_product("cotton   fabric"),
+                service.match_single_product("Cotton fabric"),
+                service.match_single_product("various cotton fabric")
+            )
+
+        assert mock_agent.await_count == 1
+        assert all(r.primary_match.hs_code == "5208110000" for r in results)
+        assert service._single_flight.get_statistics()["coalesced_calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_worker_when_lock_held(self, match_result):
+        """A held Redis lock makes this worker wait for the cached result."""
+        service = HSCodeMatchingService()
+        cache = CacheService()
+        cache.get_cached_match = AsyncMock(return_value=None)
+        cache.acquire_inflight_lock = AsyncMock(return_value=False)
+        cache.wait_for_cached_match = AsyncMock(return_value=match_result)
+        cache.release_inflight_lock = AsyncMock()
+        service._cache_service = cache
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock()) as mock_agent:
+            result = await service.match_single_product("cotton fabric")
+
+        mock_agent.assert_not_called()
+        assert result.primary_match.hs_code == "5208110000"
+        assert service._single_flight.get_statistics()["cross_worker_coalesced"] == 1
+
+
+class TestInflightLock:
+    """Test the Redis lock helpers on CacheService."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_and_release(self):
+        """The owner token is used to release the lock."""
+        service = CacheService()
+        service._redis = AsyncMock()
+        service._redis.set.return_value = True
+
+        assert await service.acquire_inflight_lock("cotton fabric") is True
+        lock_key = service._generate_inflight_key("cotton fabric")
+        assert lock_key.startswith(CacheService.INFLIGHT_KEY_PREFIX)
+        token = service._lock_tokens[lock_key]
+
+        await service.release_inflight_lock("cotton fabric")
+        service._redis.eval.assert_awaited_once_with(CacheService.RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    @pytest.mark.asyncio
+    async def test_acquire_fails_when_held(self):
+        """SET NX returning None means another worker owns the lock."""
+        service = CacheService()
+        service._redis = AsyncMock()
+        service._redis.set.return_value = None
+
+        assert await service.acquire_inflight_lock("cotton fabric") is False
+
+    @pytest.mark.asyncio
+    async def test_no_redis_proceeds(self):
+        """Without Redis every worker proceeds on its own."""
+        assert await CacheService().acquire_inflight_lock("cotton fabric") is True
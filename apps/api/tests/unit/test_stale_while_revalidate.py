@@ -0,0 +1,224 @@
+"""Unit tests for soft expiry, background refresh and TTL jitter of cache entries."""
+
+import time
+import asyncio
+import pytest
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.openai_config import HSCodeMatchResult
+from src.services.cache_codec import decode_cache_entry, encode_cache_entry
+from src.services.cache_service import CacheService
+from src.services.hs_matching_service import HSCodeMatchingService
+from helpers import make_result
+
+
+# Confident enough for the long TTL, and slow enough for early refreshes to matter
+cached_result = partial(make_result, confidence=0.97, processing_time_ms=2000.0, query="cotton fabric")
+
+
+@pytest.fixture
+def cache():
+    """Cache service on a mocked Redis whose in-flight locks are always free"""
+    cache = CacheService()
+    cache._redis = AsyncMock()
+    cache._redis.hgetall.return_value = {}
+    cache._redis.set.return_value = True
+    cache._classification_store = MagicMock()
+    cache._classification_store.get_many = AsyncMock(return_value={})
+    return cache
+
+
+def stored_entry(cache, soft_expires_in: float, result: HSCodeMatchResult = None) -> None:
+    cache._redis.get.return_value = encode_cache_entry(result or cached_result(), time.time() + soft_expires_in)
+
+
+async def drain(cache):
+    await asyncio.gather(*cache._refresh_tasks)
+
+
+@pytest.fixture
+def writes_soft_expiry():
+    with patch("src.services.cache_service.settings.HS_CACHE_STALE_WHILE_REVALIDATE", True):
+        yield
+
+
+class TestTTLs:
+    """Test soft and hard TTLs of new entries."""
+
+    @pytest.mark.usefixtures("writes_soft_expiry")
+    def test_entries_written_together_expire_apart(self, cache):
+        ttls = [cache._entry_ttls(cached_result(), CacheService.FREQUENT_MATCH_TTL_HOURS) for _ in range(20)]
+
+        full = CacheService.FREQUENT_MATCH_TTL_HOURS * 3600
+        assert len({soft for soft, _ in ttls}) > 1
+        assert all(full * 0.9 <= soft.total_seconds() <= full for soft, _ in ttls)
+        # Redis keeps the entry through the stale grace period
+        assert all(hard == soft * 1.1 for soft, hard in ttls)
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("writes_soft_expiry")
+    async def test_soft_expiry_is_stored_with_the_entry(self, cache):
+        await cache.cache_match_result("cotton fabric", cached_result())
+
+        _, ttl, payload = cache._redis.setex.call_args.args
+        result, soft_expires_at = decode_cache_entry(payload)
+        assert result.primary_match.hs_code == "5208110000"
+        assert soft_expires_at < time.time() + ttl.total_seconds()
+
+    @pytest.mark.asyncio
+    async def test_entries_are_written_without_soft_expiry_by_default(self, cache):
+        """Workers on older releases share Redis and cannot decode the envelope yet."""
+        await cache.cache_match_result("cotton fabric", cached_result())
+
+        _, ttl, payload = cache._redis.setex.call_args.args
+        assert payload == cached_result().model_dump_json()
+        assert ttl.total_seconds() <= CacheService.FREQUENT_MATCH_TTL_HOURS * 3600
+
+    def test_soft_expiry_does_not_need_the_compact_codec(self):
+        with patch("src.services.cache_codec.settings.HS_CACHE_COMPACT_CODEC_ENABLED", False):
+            payload = encode_cache_entry(cached_result(), time.time() + 60)
+
+        assert payload.endswith(cached_result().model_dump_json())
+        assert decode_cache_entry(payload)[1] is not None
+
+
+class TestBackgroundRefresh:
+    """Test serving stale entries while they are refreshed."""
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_and_refreshed_once(self, cache):
+        stored_entry(cache, soft_expires_in=-60)
+        refreshed = asyncio.Event()
+
+        async def refresh(description, country):
+            await refreshed.wait()
+            return cached_result("5208120000")
+
+        handler = AsyncMock(side_effect=refresh)
+        cache.set_refresh_handler(handler)
+
+        first, second = await asyncio.gather(
+            cache.get_cached_match("cotton fabric"),
+            cache.get_cached_match("cotton fabric")
+        )
+        refreshed.set()
+        await drain(cache)
+
+        assert first.primary_match.hs_code == second.primary_match.hs_code == "5208110000"
+        handler.assert_awaited_once_with("cotton fabric", "default")
+        stats = cache._get_refresh_statistics()
+        assert stats["stale_hits"] == 2
+        assert stats["refreshes_completed"] == 1
+        # Stale entries are not promoted into the L1
+        assert len(cache._local_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_entries_near_expiry_refresh_early(self, cache):
+        stored_entry(cache, soft_expires_in=1.0)
+        handler = AsyncMock(return_value=cached_result())
+        cache.set_refresh_handler(handler)
+
+        # An exponential draw of 1 times a two second recompute reaches past the expiry
+        with patch("src.services.cache_service.random.random", return_value=1 - 1 / 2.718281828):
+            result = await cache.get_cached_match("cotton fabric")
+        await drain(cache)
+
+        assert result is not None
+        handler.assert_awaited_once()
+        assert cache._refresh_stats["early_refreshes"] == 1
+        assert cache._refresh_stats["stale_hits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fresh_entries_are_left_alone(self, cache):
+        stored_entry(cache, soft_expires_in=3600)
+        cache._redis.mget.return_value = [cache._redis.get.return_value]
+        handler = AsyncMock()
+        cache.set_refresh_handler(handler)
+
+        await cache.get_cached_matches_bulk([("cotton fabric", "default")])
+        await drain(cache)
+
+        handler.assert_not_called()
+        # Promoted into the L1 until the soft expiry
+        expires_at, _ = next(iter(cache._local_cache._entries.values()))
+        assert expires_at - time.monotonic() == pytest.approx(3600, abs=5)
+
+    @pytest.mark.asyncio
+    async def test_entries_without_soft_expiry_are_not_refreshed(self, cache):
+        cache._redis.get.return_value = cached_result().model_dump_json()
+        handler = AsyncMock()
+        cache.set_refresh_handler(handler)
+
+        assert await cache.get_cached_match("cotton fabric") is not None
+        await drain(cache)
+
+        handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_refresh_in_another_worker_is_not_repeated(self, cache):
+        stored_entry(cache, soft_expires_in=-60)
+        cache._redis.set.return_value = None  # The in-flight lock is taken
+        handler = AsyncMock()
+        cache.set_refresh_handler(handler)
+
+        await cache.get_cached_match("cotton fabric")
+        await drain(cache)
+
+        handler.assert_not_called()
+        assert cache._refresh_stats["refreshes_skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_serving_stale(self, cache):
+        stored_entry(cache, soft_expires_in=-60)
+        cache.set_refresh_handler(AsyncMock(side_effect=ConnectionError("agent down")))
+
+        await cache.get_cached_match("cotton fabric")
+        await drain(cache)
+
+        assert cache._refresh_stats["refreshes_failed"] == 1
+        assert await cache.get_cached_match("cotton fabric") is not None
+        assert "refresh_ahead" in cache._get_tier_statistics()
+
+
+class TestMatchingServiceRefresh:
+    """Test the refresh handler of the matching service."""
+
+    @pytest.mark.asyncio
+    async def test_refresh_recomputes_and_caches(self):
+        cache = CacheService()
+        cache._classification_store = MagicMock()
+        service = HSCodeMatchingService()
+        service._cache_service = cache
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(return_value=cached_result("5208120000"))):
+            result = await service._refresh_cached_match("cotton fabric", "default")
+
+        assert result.primary_match.hs_code == "5208120000"
+        assert (await cache.get_cached_match("cotton fabric")).primary_match.hs_code == "5208120000"
+
+    @pytest.mark.asyncio
+    async def test_refresh_shares_a_concurrent_miss(self):
+        cache = CacheService()
+        cache._classification_store = MagicMock()
+        service = HSCodeMatchingService()
+        service._cache_service = cache
+        release = asyncio.Event()
+
+        async def match(*args, **kwargs):
+            await release.wait()
+            return cached_result("5208120000")
+
+        with patch.object(service.agent_config, "match_hs_code", AsyncMock(side_effect=match)) as agent:
+            miss = asyncio.create_task(service._single_flight.do(
+                ("cotton fabric", "default"),
+                lambda: service._compute_and_cache("cotton fabric", "default", cache, time.time())
+            ))
+            await asyncio.sleep(0)
+            refresh = asyncio.create_task(service._refresh_cached_match("Cotton  Fabric", "default"))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(miss, refresh)
+
+        assert agent.await_count == 1
+        assert results[0] is results[1]
@@ -0,0 +1,121 @@
+"""Unit tests for streaming batch matching and its use in the file orchestrator."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.hs_matching_service import HSCodeMatchingService
+from src.services.cache_service import noop_cache_service
+from src.services.file_processing.orchestrator import FileProcessingOrchestrator
+from src.schemas.hs_matching import HSCodeMatchRequest
+from helpers import make_result
+
+
+@pytest.fixture
+def hs_service():
+    service = HSCodeMatchingService()
+    service._cache_service = noop_cache_service
+    return service
+
+
+class TestIterBatchMatches:
+    """Test yielding results in completion order."""
+
+    @pytest.mark.asyncio
+    async def test_results_yielded_as_they_complete(self, hs_service):
+        """A fast product is yielded before a slow one listed earlier."""
+        delays = {"slow product": 0.1, "fast product": 0.0}
+
+        async def fake_match(description, country, candidates=None, agent=None, chapters=None):
+            await asyncio.sleep(delays[description])
+            return make_result(f"code:{description}", query=description)
+
+        requests = [HSCodeMatchRequest(product_description=d) for d in delays]
+        with patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(side_effect=fake_match)):
+            order = [index async for index, _ in hs_service.iter_batch_matches(requests)]
+
+        assert order == [1, 0]
+
+    @pytest.mark.asyncio
+    async def test_duplicates_and_errors_are_yielded(self, hs_service):
+        """Every row is yielded once; failures come back as error results."""
+        async def fake_match(description, country, candidates=None, agent=None, chapters=None):
+            if description == "broken item":
+                raise RuntimeError("agent failed")
+            return make_result(f"code:{description}", query=description)
+
+        requests = [
+            HSCodeMatchRequest(product_description=d)
+            for d in ["cotton fabric", "broken item", "Cotton Fabric"]
+        ]
+        with patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(side_effect=fake_match)) as mock_match:
+            results = dict([item async for item in hs_service.iter_batch_matches(requests)])
+
+        assert mock_match.await_count == 2
+        assert sorted(results) == [0, 1, 2]
+        assert results[0].primary_match.hs_code == results[2].primary_match.hs_code == "code:cotton fabric"
+        assert results[0] is not results[2]
+        assert results[1].primary_match.hs_code == "ERROR"
+
+    @pytest.mark.asyncio
+    async def test_early_close_cancels_pending_matches(self, hs_service):
+        """Stopping the iteration cancels matches still in flight."""
+        cancelled = asyncio.Event()
+
+        async def fake_match(description, country, candidates=None, agent=None, chapters=None):
+            if description == "slow product":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return make_result(f"code:{description}", query=description)
+
+        requests = [HSCodeMatchRequest(product_description=d) for d in ["slow product", "fast product"]]
+        with patch.object(hs_service.agent_config, "match_hs_code", AsyncMock(side_effect=fake_match)):
+            stream = hs_service.iter_batch_matches(requests)
+            index, _ = await stream.__anext__()
+            await stream.aclose()
+
+        assert index == 1
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self, hs_service):
+        requests = [HSCodeMatchRequest(product_description="cotton fabric")] * (hs_service.BATCH_SIZE_LIMIT + 1)
+
+        with pytest.raises(ValueError):
+            await hs_service.iter_batch_matches(requests).__anext__()
+
+
+class TestOrchestratorStreaming:
+    """Test chunked ProductMatch flushing and per-item progress."""
+
+    @pytest.mark.asyncio
+    async def test_rows_flushed_in_chunks_with_progress(self):
+        db = MagicMock()
+        orchestrator = FileProcessingOrchestrator(db)
+        orchestrator.PRODUCT_MATCH_FLUSH_SIZE = 2
+        job = MagicMock(id="job-1", user_id="user-1")
+        products = [
+            {"product_description": f"product {i}", "quantity": "1", "value": "10", "origin_country": "TKM"}
+            for i in range(5)
+        ]
+
+        async def fake_stream(requests):
+            # Completion order differs from file order
+            for i in [3, 0, 4, 1, 2]:
+                yield i, make_result(f"code:{requests[i].product_description}", query=requests[i].product_description)
+
+        ws_manager = MagicMock(send_job_update=AsyncMock(), send_hs_matching_update=AsyncMock())
+        with patch("src.services.file_processing.orchestrator.hs_matching_service.iter_batch_matches", fake_stream), \
+             patch("src.services.file_processing.orchestrator.ws_manager", ws_manager):
+            matches, errors = await orchestrator.process_products_with_hs_matching(job, products)
+
+        assert errors == []
+        assert [m.product_description for m in matches] == [f"product {i}" for i in range(5)]
+        # Two chunk flushes, then the final commit and the job status commit
+        assert db.commit.call_count == 4
+        updates = ws_manager.send_hs_matching_update.await_args_list
+        assert [u.kwargs["data"]["processedProducts"] for u in updates] == [1, 2, 3, 4, 5]
+        assert updates[-1].kwargs["data"]["totalProducts"] == 5